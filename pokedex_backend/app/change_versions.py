@@ -0,0 +1,98 @@
+"""无触发器数据库的表版本号维护模块
+
+SQLite 上 tableversion 由触发器维护 (见 app.models.change_version_models)，其他数据库不创建触发器。
+这里在会话层记录每个事务写入过的被跟踪表，提交前递增这些表的版本号，条件请求的 ETag 才会随写入变化。
+只统计经由 ORM 会话的写入：对象的增删改 (含多对多关联表) 以及 session.execute 执行的 INSERT / UPDATE / DELETE。
+"""
+
+from itertools import chain
+import random
+from typing import Set
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from app.crud.upsert import upsert_insert
+from app.models.change_version_models import (
+    TableVersion,
+    VERSIONED_TABLES,
+    VERSION_TRIGGER_DIALECTS,
+)
+
+# session.info 中记录本事务写入过的被跟踪表的键
+_CHANGED_TABLES_KEY = "changed_versioned_tables"
+
+
+def tracks_versions(session: Session) -> bool:
+    """会话连接的数据库没有版本号触发器时，由会话钩子维护版本号"""
+    return session.get_bind().dialect.name not in VERSION_TRIGGER_DIALECTS
+
+
+def _changed_tables(session: Session) -> Set[str]:
+    return session.info.setdefault(_CHANGED_TABLES_KEY, set())
+
+
+def _record_flushed_tables(session: Session, flush_context) -> None:
+    """flush 之后记录写入的表 (此时 new / dirty / deleted 和属性历史仍是 flush 之前的状态)"""
+    if not tracks_versions(session):
+        return
+    changed = _changed_tables(session)
+    # 模型对象不可哈希，按 id() 判断
+    pending_or_deleted = {id(instance) for instance in chain(session.new, session.deleted)}
+    for instance in chain(session.new, session.dirty, session.deleted):
+        state = inspect(instance)
+        changed.update(table.name for table in state.mapper.tables)
+        for relationship in state.mapper.relationships:
+            if relationship.secondary is None:
+                continue
+            if id(instance) in pending_or_deleted or state.attrs[relationship.key].history.has_changes():
+                changed.add(relationship.secondary.name)
+    changed.intersection_update(VERSIONED_TABLES)
+
+
+def _record_statement_table(orm_execute_state: ORMExecuteState) -> None:
+    """记录 session.execute 执行的批量 INSERT / UPDATE / DELETE 写入的表"""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    session = orm_execute_state.session
+    if not tracks_versions(session):
+        return
+    table_name = orm_execute_state.statement.table.name
+    if table_name in VERSIONED_TABLES:
+        _changed_tables(session).add(table_name)
+
+
+def _bump_changed_versions(session: Session) -> None:
+    """提交前递增本事务写入过的表的版本号，与数据写入在同一个事务中提交"""
+    if not tracks_versions(session):
+        return
+    # before_commit 在提交时的最后一次 flush 之前触发，先 flush 才能记录到全部写入
+    session.flush()
+    changed = session.info.pop(_CHANGED_TABLES_KEY, None)
+    if not changed:
+        return
+    insert = upsert_insert(session)
+    # 按固定顺序更新，并发事务不会因加锁顺序不同而死锁
+    for table_name in sorted(changed):
+        # 首次写入时版本号从随机值开始，与触发器的行为一致
+        statement = insert(TableVersion).values(
+            table_name=table_name, version=random.randrange(1_000_000_000)
+        ).on_conflict_do_update(
+            index_elements=["table_name"], set_={"version": TableVersion.version + 1}
+        )
+        session.execute(statement)
+
+
+def _forget_changed_tables(session: Session) -> None:
+    """事务回滚后丢弃记录 (保存点回滚不触发，多记录的表只会让 ETag 多变化一次)"""
+    session.info.pop(_CHANGED_TABLES_KEY, None)
+
+
+def track_table_versions() -> None:
+    """为所有会话 (包括 AsyncSession 内部的同步会话) 注册维护版本号的事件，重复调用不会重复注册"""
+    if event.contains(Session, "before_commit", _bump_changed_versions):
+        return
+    event.listen(Session, "after_flush", _record_flushed_tables)
+    event.listen(Session, "do_orm_execute", _record_statement_table)
+    event.listen(Session, "before_commit", _bump_changed_versions)
+    event.listen(Session, "after_rollback", _forget_changed_tables)
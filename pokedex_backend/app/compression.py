@@ -0,0 +1,248 @@
+"""响应压缩模块
+
+CompressionMiddleware 按 Accept-Encoding 对 JSON 等文本响应进行 brotli 或 gzip 压缩：
+- 只压缩可压缩的 Content-Type，小于 minimum_size 的响应和已带 Content-Encoding 的响应原样返回；
+- 图片静态文件挂载点 (本身已是压缩格式) 直接跳过，不检查响应；
+- 完整响应体的压缩结果按 (响应体摘要, 编码) 缓存在 CompressedBodyCache 中：
+  数据没有变化时列表和 OpenAPI 等接口每次返回相同的响应体，命中缓存时只需计算摘要，不再重复压缩；
+- 流式响应 (例如 NDJSON) 逐块压缩并立即刷新，不缓存。
+
+brotli 是可选依赖：未安装时只使用 gzip。
+"""
+
+from collections import OrderedDict
+import hashlib
+from typing import Optional, Sequence, Tuple
+import zlib
+
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.static_files import parse_accept
+
+try:
+    import brotli
+except ImportError:  # 未安装 brotli 时只提供 gzip
+    brotli = None
+
+# 文本类的 Content-Type 才值得压缩 (图片、视频等本身已是压缩格式)
+COMPRESSIBLE_MEDIA_TYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+}
+
+# 超过此大小的响应体在线程池中压缩，避免阻塞事件循环
+_THREADPOOL_MIN_SIZE = 256 * 1024
+
+
+def is_compressible(content_type: str) -> bool:
+    """判断 Content-Type 是否属于可压缩的文本类型"""
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return (
+        media_type in COMPRESSIBLE_MEDIA_TYPES
+        or media_type.startswith("text/")
+        or media_type.endswith("+json")
+    )
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """服务端支持的编码，按优先顺序排列"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """根据 Accept-Encoding 选择编码，客户端没有显式接受任何可用编码时返回None"""
+    accepted = parse_accept(accept_encoding)
+    for encoding in available_encodings():
+        if accepted.get(encoding, 0.0) > 0:
+            return encoding
+    return None
+
+
+class CompressedBodyCache:
+    """按 (响应体摘要, 编码) 缓存压缩结果的 LRU 缓存，总大小不超过 max_bytes
+
+    只在事件循环中访问，不需要加锁。
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[bytes, str], bytes]" = OrderedDict()
+
+    def get(self, key: Tuple[bytes, str]) -> Optional[bytes]:
+        compressed = self._entries.get(key)
+        if compressed is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return compressed
+
+    def put(self, key: Tuple[bytes, str], compressed: bytes) -> None:
+        if len(compressed) > self.max_bytes or key in self._entries:
+            return
+        self._entries[key] = compressed
+        self.size += len(compressed)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = self.hits = self.misses = 0
+
+
+class CompressionMiddleware:
+    """按 Accept-Encoding 压缩文本响应的 ASGI 中间件"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+        excluded_paths: Sequence[str] = (),
+        cache: Optional[CompressedBodyCache] = None,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.excluded_paths = tuple(path.rstrip("/") + "/" for path in excluded_paths)
+        self.cache = cache
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.excluded_paths):
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        """一次性压缩完整的响应体"""
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)  # wbits=31: gzip 格式
+        return compressor.compress(body) + compressor.flush()
+
+    async def compress_cached(self, body: bytes, encoding: str) -> bytes:
+        """压缩完整的响应体，相同响应体的压缩结果从缓存中读取"""
+        key = (hashlib.blake2b(body, digest_size=16).digest(), encoding)
+        if self.cache is not None:
+            compressed = self.cache.get(key)
+            if compressed is not None:
+                return compressed
+        if len(body) >= _THREADPOOL_MIN_SIZE:
+            compressed = await anyio.to_thread.run_sync(self.compress, body, encoding)
+        else:
+            compressed = self.compress(body, encoding)
+        if self.cache is not None:
+            self.cache.put(key, compressed)
+        return compressed
+
+
+class _StreamCompressor:
+    """流式响应的逐块压缩器，每块之后刷新，客户端可以立即解码已收到的数据"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int) -> None:
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            data = self._brotli.process(chunk)
+            return data + (self._brotli.finish() if final else self._brotli.flush())
+        data = self._zlib.compress(chunk)
+        return data + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _CompressionResponder:
+    """单个请求的响应处理：在收到第一块响应体后决定是否压缩"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+        self.stream: Optional[_StreamCompressor] = None
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            self.start_message = message
+            self.passthrough = "content-encoding" in headers or not is_compressible(
+                headers.get("content-type", "")
+            )
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        if self.passthrough:
+            await self._send_start()
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.stream is None:
+            if not more_body:
+                if len(body) < self.middleware.minimum_size:
+                    await self._send_start()
+                    await self._send(message)
+                    return
+                body = await self.middleware.compress_cached(body, self.encoding)
+                self._set_encoding_headers(content_length=len(body))
+                await self._send_start()
+                await self._send({"type": "http.response.body", "body": body})
+                return
+            self.stream = _StreamCompressor(
+                self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality
+            )
+            self._set_encoding_headers(content_length=None)
+            await self._send_start()
+
+        await self._send(
+            {
+                "type": "http.response.body",
+                "body": self.stream.compress(body, final=not more_body),
+                "more_body": more_body,
+            }
+        )
+
+    def _set_encoding_headers(self, content_length: Optional[int]) -> None:
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        if content_length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(content_length)
+        headers.add_vary_header("Accept-Encoding")
+        # 压缩后的字节与原响应不同，强 ETag 降为弱 ETag
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = "W/" + etag
+
+    async def _send_start(self) -> None:
+        if self.start_message is not None:
+            await self._send(self.start_message)
+            self.start_message = None
+
+
+compressed_body_cache = CompressedBodyCache(max_bytes=settings.compression_cache_max_bytes)
@@ -0,0 +1,72 @@
+"""条件请求模块
+
+为只读的 JSON 接口提供 ETag / If-None-Match 支持。ETag 由请求 URL 和接口所依赖的表的变更版本号
+(tableversion，SQLite 上由触发器、其他数据库由 app.change_versions 在写入时递增) 计算：客户端带上一次的 ETag 轮询时，
+只按主键读取几行版本号，数据没有变化就直接返回 304，不再执行列表查询和序列化。
+"""
+
+import hashlib
+from typing import Dict, Sequence
+
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlmodel import Session, col, select
+
+from app.database import get_session
+from app.models import TableVersion
+from app.static_files import parse_etags
+
+# JSON 接口的响应每次使用前都要用 ETag 重新验证
+CONDITIONAL_CACHE_CONTROL = "no-cache"
+
+
+def get_table_versions(session: Session, table_names: Sequence[str]) -> Dict[str, int]:
+    """读取各表当前的变更版本号 (还没有写入过的表版本号为 0)"""
+    rows = session.exec(
+        select(TableVersion).where(col(TableVersion.table_name).in_(table_names))
+    ).all()
+    versions = {row.table_name: row.version for row in rows}
+    return {name: versions.get(name, 0) for name in table_names}
+
+
+def compute_etag(request: Request, versions: Dict[str, int]) -> str:
+    """
+    由请求路径、查询参数和表版本号计算弱 ETag。
+
+    同一数据的不同分页、不同参数返回不同内容，因此查询参数也参与计算；
+    响应体可能被压缩等方式改写，使用弱 ETag。
+    """
+    key = "|".join(
+        [request.url.path, request.url.query]
+        + [f"{name}={version}" for name, version in sorted(versions.items())]
+    )
+    return f'W/"{hashlib.blake2b(key.encode(), digest_size=12).hexdigest()}"'
+
+
+def conditional_get(*table_names: str):
+    """
+    生成条件请求依赖，在路由装饰器的 dependencies 中使用。
+
+    依赖与接口共用同一个请求会话，版本号和接口的查询在同一个读事务中读取
+    (WAL 模式下看到的是同一个快照)。客户端的 If-None-Match 与当前 ETag 匹配时返回 304；
+    否则在响应中带上 ETag，继续执行接口。
+
+    参数:
+        *table_names (str): 接口响应所依赖的表 (须在 VERSIONED_TABLES 中)
+
+    返回:
+        FastAPI 依赖
+    """
+
+    def check_not_modified(
+        request: Request,
+        response: Response,
+        session: Session = Depends(get_session),
+    ) -> None:
+        etag = compute_etag(request, get_table_versions(session, table_names))
+        headers = {"ETag": etag, "Cache-Control": CONDITIONAL_CACHE_CONTROL}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag[2:] in parse_etags(if_none_match):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+
+    return Depends(check_not_modified)
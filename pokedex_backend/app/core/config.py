@@ -6,7 +6,7 @@
 """
 
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Dict, List, Literal, Tuple, Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -38,6 +38,23 @@ class Settings(BaseSettings):
     # database_url: str = "sqlite:///./pokedex.db"  # SQLite文件将创建在运行命令的目录下
     # 使用项目根目录的绝对路径，确保始终使用同一个数据库文件
     database_url: str = f"sqlite:///{PROJECT_PARENT}/pokedex.db"
+    # async def 接口使用的异步驱动URL，未设置时由 database_url 推导 (sqlite:// → sqlite+aiosqlite://)
+    async_database_url: Optional[str] = None
+    # SQLite 连接参数，每个新连接建立时通过 PRAGMA 设置 (非 SQLite 数据库忽略)
+    # WAL 模式下读写互不阻塞，上传写入期间列表查询不会遇到 "database is locked"
+    sqlite_journal_mode: Literal["DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"] = "WAL"
+    # WAL 模式下 NORMAL 只在检查点时 fsync，断电最多丢失最近的事务但不会损坏数据库
+    sqlite_synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    sqlite_mmap_size: int = 256 * 1024 * 1024  # 内存映射读取的字节数上限，0 表示禁用
+    sqlite_cache_size: int = -64 * 1024  # 页缓存大小，负数表示 KiB (即 64MB)
+    sqlite_temp_store: Literal["DEFAULT", "FILE", "MEMORY"] = "MEMORY"
+    sqlite_busy_timeout: int = 5000  # 等待写锁的毫秒数，超时后才报 "database is locked"
+    # 是否把每条 SQL 语句打印到控制台 (仅调试时开启，高负载下会占用明显的 CPU 和日志 I/O)
+    database_echo: bool = False
+    # 慢查询日志：耗时达到阈值的语句以 JSON 写入 app.slow_query 日志，并在内存中保留最慢的 N 个语句指纹
+    slow_query_log_enabled: bool = True
+    slow_query_threshold_ms: float = 100.0
+    slow_query_top_n: int = 20
 
     # 文件存储路径 (基于 app/static/uploads/ 结构)
     # image_storage_root: Path = APP_STATIC_ROOT / "uploads" / "images"
@@ -49,14 +66,67 @@ class Settings(BaseSettings):
     base_static_dir: Path = APP_STATIC_ROOT
     image_storage_root: Path = base_static_dir / "uploads" / "images"
     thumbnail_storage_root: Path = base_static_dir / "uploads" / "thumbnails"
+    # 上传过程中的临时文件和分块上传的暂存文件：不能位于静态文件挂载的目录下 (否则未完成的上传可被公开访问)，
+    # 最好与 image_storage_root 位于同一文件系统 (完成时直接原子地移动到最终路径，否则需要先复制一次)
+    upload_staging_root: Path = base_static_dir / "uploads" / "staging"
 
     # 文件上传限制
     allowed_mime_types: List[str] = ["image/jpeg", "image/png", "image/gif"]
     max_image_size: int = 20 * 1024 * 1024  # 10MB
+    upload_chunk_size: int = 1024 * 1024  # 流式写入上传文件时每次读取的块大小 (1MB)
+    # 批量上传接口单次请求的最大文件数，以及同时写入磁盘的文件数
+    batch_upload_max_files: int = 100
+    batch_upload_concurrency: int = 4
+    # 可续传分块上传：每块的字节数 (最后一块可以更小)，以及会话无写入多久后视为放弃并清理
+    resumable_upload_chunk_size: int = 2 * 1024 * 1024
+    resumable_upload_expiry_hours: int = 24
+    # 内容寻址存储：按内容摘要命名文件，重复上传的相同内容复用已有原图和缩略图
+    content_addressed_storage: bool = False
 
     # 缩略图参数
     thumbnail_size: Tuple[int, int] = (256, 256)
     thumbnail_quality: int = 85  # JPEG 缩略图质量
+    # 响应式图片的其他尺寸档位 (名称 → 最大宽高)，与缩略图在同一次解码中生成并保存在缩略图目录下；
+    # 不小于原图的档位不会生成
+    rendition_sizes: Dict[str, Tuple[int, int]] = {
+        "medium": (1024, 1024),
+        "large": (2048, 2048),
+    }
+    # 每个尺寸档位在原格式之外额外编码的格式 ("webp"、"avif")，静态文件服务根据请求的 Accept 头选择；
+    # Pillow 不支持的格式会被忽略
+    rendition_formats: List[str] = ["webp"]
+    # JPEG 缩略图使用草稿模式 (DCT 缩放) 解码，只解码接近目标尺寸的像素
+    thumbnail_jpeg_draft: bool = True
+    # 缩略图引擎: "process" 在独立进程池中解码 (不占用 GIL)，"thread" 在线程池中解码
+    thumbnail_engine_mode: str = "process"
+    # 同时进行的缩略图解码数量上限 (同时也是工作进程数)，未设置时使用 CPU 核数
+    thumbnail_max_workers: Optional[int] = None
+
+    # EXIF 解析专用线程池的最大线程数
+    exif_max_workers: int = 2
+
+    # 上传后处理任务队列 (缩略图、尺寸档位和 EXIF 在上传接口返回后由后台工作协程完成)
+    processing_workers: int = 2  # 工作协程数量 (解码并发仍受 thumbnail_max_workers 限制)
+    processing_max_attempts: int = 3  # 单个任务的最大尝试次数，之后图片标记为 failed
+    processing_poll_interval: float = 5.0  # 没有入队通知时检查任务表的间隔 (秒)
+
+    # 标签使用次数 (Tag.usage_count) 随关联增删增量维护；设置后按此间隔 (秒) 在后台按关联表
+    # 全量对账一次，修正偏差并删除未使用的标签。None 表示不定期对账 (可通过管理接口手动执行)
+    tag_usage_reconcile_interval: Optional[float] = None
+    # 标签搜索使用内存中的倒排索引 (每个标签对应的图片有序集合，在进程内求交集/并集)，
+    # 标签关联变化时失效并在下一次搜索时重建；只适用于单进程部署
+    tag_posting_index_enabled: bool = False
+    # 图片列表和类别详情接口跳过 response_model 的逐条校验，直接由 ORM 对象构造字典并用 orjson 编码
+    # (输出与默认方式相同)，用于图片数量很多的列表；orjson 是可选依赖，未安装时用标准库 json 编码
+    fast_json_responses: bool = False
+
+    # 响应压缩 (brotli 需要安装 brotli 包，否则只使用 gzip)；图片静态文件挂载点不压缩
+    compression_enabled: bool = True
+    compression_minimum_size: int = 1024  # 小于此字节数的响应不压缩
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 5
+    # 完整响应体的压缩结果缓存 (按响应体摘要)，相同的响应体不重复压缩；0 表示不缓存
+    compression_cache_max_bytes: int = 32 * 1024 * 1024
 
     # CORS 配置 (环境变量: BACKEND_CORS_ORIGINS - 逗号分隔的字符串)
     # pydantic-settings 会自动将环境变量中逗号分隔的字符串转换为 List[str]
@@ -74,6 +144,9 @@ class Settings(BaseSettings):
         "thumbnails"  # URL路径名，对应指南前端 VITE_THUMBNAILS_DIR_NAME
     )
     THUMBNAILS_DIR: Path = thumbnail_storage_root  # 服务器上实际存储缩略图的文件夹路径
+    # uuid4 hex / 内容摘要命名的图片和缩略图内容不会改变，静态文件响应带
+    # Cache-Control: immutable，浏览器在此有效期 (秒) 内不再重新验证
+    static_immutable_max_age: int = 31536000
 
     # 现有静态文件服务相关配置 (main.py 中会用到这些来推断挂载点和目录) - 这些可以保留，但下方挂载将优先使用上面的新配置
     # static_files_mount_url: str = "/static/uploads" # 由main.py硬编码或推断
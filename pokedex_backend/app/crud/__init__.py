@@ -8,7 +8,13 @@
 
 from . import category_crud
 from . import image_crud
+from . import tag_crud
+from . import async_tag_crud
+from . import async_image_crud
+from . import async_category_crud
+from . import job_crud
 from . import species_info_crud
+from . import upload_crud
 
 # 可选择性暴露具体CRUD函数，以便其他模块更清晰地导入
 # 例如:
@@ -18,7 +24,13 @@ from . import species_info_crud
 __all__ = [
     "category_crud",
     "image_crud",
+    "tag_crud",
+    "async_category_crud",
+    "async_image_crud",
+    "async_tag_crud",
+    "job_crud",
     "species_info_crud",
+    "upload_crud",
 ]
 
 # This file makes Python treat the directory as a package.
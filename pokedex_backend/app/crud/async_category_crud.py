@@ -0,0 +1,93 @@
+"""类别异步CRUD操作模块
+
+category_crud 中供 async def 接口使用的函数的异步版本，基于 AsyncSession，
+数据库访问不阻塞事件循环。
+"""
+
+from typing import Optional
+import uuid
+
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import Category, Image
+from app.services.file_storage_service import FileStorageService
+from app.services.tag_posting_index import tag_posting_index
+from app.crud import async_image_crud, async_tag_crud
+
+
+async def get_category_by_id(
+    *, session: AsyncSession, category_id: uuid.UUID
+) -> Optional[Category]:
+    """
+    根据ID从数据库中获取一个类别。
+
+    参数:
+        session (AsyncSession): 异步数据库会话对象。
+        category_id (uuid.UUID): 要获取的类别的ID。
+
+    返回:
+        Optional[Category]: 如果找到则返回类别SQLModel对象，否则返回None。
+    """
+    return await session.get(Category, category_id)
+
+
+async def delete_category(
+    *, session: AsyncSession, category_id: uuid.UUID
+) -> Optional[Category]:
+    """
+    从数据库中删除一个类别，并级联删除该类别下的所有图片数据库记录及其对应的物理文件。
+    同时会检查并删除不再被任何图片使用的标签。所有数据库更改在一个事务中提交，
+    物理文件在提交成功之后才删除。
+
+    参数:
+        session (AsyncSession): 异步数据库会话对象。
+        category_id (uuid.UUID): 要删除的类别的ID。
+
+    返回:
+        Optional[Category]: 如果删除成功则返回被删除的类别对象 (在从数据库删除前获取的状态)，
+                          如果未找到要删除的类别，则返回None。
+    """
+    category_to_delete = await get_category_by_id(
+        session=session, category_id=category_id
+    )
+    if not category_to_delete:
+        return None
+
+    file_service = FileStorageService()
+    images_in_category = (
+        await session.exec(
+            # 删除图片时 ORM 要删除其标签关联行，一次预加载所有图片的标签，避免逐张查询
+            select(Image)
+            .options(selectinload(Image.tags))
+            .where(Image.category_id == category_id)
+        )
+    ).all()
+
+    # 一条聚合查询减少类别下所有图片的标签使用次数
+    tag_ids = await async_tag_crud.release_tags_of_images(
+        session=session,
+        image_ids=select(Image.id).where(Image.category_id == category_id),
+    )
+
+    released = []
+    for img in images_in_category:
+        released_files = await async_image_crud.delete_image_record(
+            session=session, image=img, file_storage=file_service
+        )
+        if released_files:
+            released.append(released_files)
+    await session.delete(category_to_delete)
+    await session.flush()
+
+    await async_tag_crud.delete_tags_if_unused(session=session, tag_ids=tag_ids)
+
+    # 图片删除、类别删除和标签清理在单个原子事务中统一提交，提交成功后再删除文件：
+    # 提交失败时数据库记录仍然保留，不能留下指向已删除文件的记录
+    await session.commit()
+    tag_posting_index.invalidate()
+    await async_image_crud.delete_released_files(
+        session=session, file_storage=file_service, released=released
+    )
+    return category_to_delete
@@ -0,0 +1,278 @@
+"""图片异步CRUD操作模块
+
+image_crud 中供 async def 接口 (上传、删除) 使用的函数的异步版本，基于 AsyncSession，
+数据库访问不阻塞事件循环。与物理文件和语句构造相关的逻辑 (image_file_paths、ReleasedFiles 等) 仍复用 image_crud。
+"""
+
+from typing import Dict, List, Optional, Sequence
+import uuid
+
+from sqlalchemy.orm import selectinload
+from sqlmodel import col, select, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import (
+    Image,
+    ImageCreate,
+    ImageProcessingJob,
+    PROCESSING_PENDING,
+)
+from app.services.file_storage_service import FileStorageService
+from app.services.tag_posting_index import tag_posting_index
+from app.crud import async_tag_crud, job_crud
+from app.crud.image_crud import (
+    ReleasedFiles,
+    acquire_image_blob_statement,
+    decrement_blob_reference_statement,
+    delete_last_blob_reference_statement,
+    delete_unreferenced_blobs_statement,
+    image_file_paths,
+    referenced_blobs_statement,
+)
+from app.crud.upsert import upsert_insert
+
+
+async def create_image_with_tags(
+    db: AsyncSession,
+    image_create: ImageCreate,
+    tag_names: List[str],
+    set_as_category_thumbnail: bool = False,
+) -> Image:
+    """
+    创建一张图片并关联标签 (不存在的标签会被创建)。
+    处理状态为 pending 的图片在同一事务中加入后处理任务队列。
+    """
+    return (
+        await create_images_with_tags(
+            db=db,
+            image_creates=[image_create],
+            tag_names=tag_names,
+            set_as_category_thumbnail=set_as_category_thumbnail,
+        )
+    )[0]
+
+
+async def create_images_with_tags(
+    db: AsyncSession,
+    image_creates: List[ImageCreate],
+    tag_names: List[str],
+    set_as_category_thumbnail: bool = False,
+) -> List[Image]:
+    """
+    在一个事务中创建多张图片，并关联到同一组标签 (批量上传使用)。
+
+    参数:
+        db (AsyncSession): 异步数据库会话
+        image_creates (List[ImageCreate]): 图片数据列表
+        tag_names (List[str]): 所有图片共用的标签名称列表
+        set_as_category_thumbnail (bool): 是否将第一张图片设为类别缩略图 (记录在其任务上)
+
+    返回:
+        List[Image]: 创建的图片对象，顺序与 image_creates 一致
+    """
+    tags = await async_tag_crud.get_or_create_tags(session=db, names=tag_names)
+
+    db_images = []
+    for index, image_create in enumerate(image_creates):
+        db_image = Image.model_validate(image_create, update={"tags": []})
+        db.add(db_image)
+        await db.flush()
+
+        # 内容寻址存储：在同一事务中增加共享文件的引用计数
+        if db_image.content_digest:
+            await acquire_image_blob(session=db, content_digest=db_image.content_digest)
+
+        if db_image.processing_status == PROCESSING_PENDING:
+            job_crud.add_processing_job(
+                session=db,
+                image_id=db_image.id,
+                set_as_category_thumbnail=set_as_category_thumbnail and index == 0,
+            )
+
+        db_image.tags.extend(tags)
+        db_images.append(db_image)
+
+    await async_tag_crud.adjust_usage_counts(
+        session=db, tag_ids=[tag.id for tag in tags], delta=len(db_images)
+    )
+    image_ids = [db_image.id for db_image in db_images]
+    await db.commit()
+    tag_posting_index.invalidate()
+    # 一条查询刷新所有新图片并加载标签 (异步会话不能在序列化时延迟加载)
+    await db.exec(
+        select(Image)
+        .options(selectinload(Image.tags))
+        .where(col(Image.id).in_(image_ids))
+        .execution_options(populate_existing=True)
+    )
+    return db_images
+
+
+async def get_image_by_id(
+    *, session: AsyncSession, image_id: uuid.UUID
+) -> Optional[Image]:
+    """根据ID获取一个图片记录 (标签随查询一起加载)，不存在时返回None"""
+    statement = select(Image).options(selectinload(Image.tags)).where(Image.id == image_id)
+    return (await session.exec(statement)).first()
+
+
+async def get_images_by_upload_keys(
+    *, session: AsyncSession, upload_keys: Sequence[str]
+) -> Dict[str, Image]:
+    """
+    获取已用这些上传幂等键创建的图片 (标签随查询一起加载)。
+
+    返回:
+        Dict[str, Image]: 上传幂等键 → 图片，没有对应图片的键不在结果中
+    """
+    if not upload_keys:
+        return {}
+    statement = (
+        select(Image)
+        .options(selectinload(Image.tags))
+        .where(col(Image.upload_key).in_(upload_keys))
+    )
+    return {image.upload_key: image for image in (await session.exec(statement)).all()}
+
+
+async def get_image_by_content_digest(
+    *, session: AsyncSession, content_digest: str
+) -> Optional[Image]:
+    """获取任意一条引用指定内容摘要的图片记录 (内容寻址存储模式下用于复用已有文件和EXIF)"""
+    statement = select(Image).where(Image.content_digest == content_digest).limit(1)
+    return (await session.exec(statement)).first()
+
+
+async def requeue_image_processing(
+    *, session: AsyncSession, images: Sequence[Image]
+) -> None:
+    """
+    将图片重新置为 pending 并加入后处理任务队列，然后提交事务。
+    内容寻址存储模式下共享文件被恢复时使用：复用的缩略图和其他尺寸档位已随原文件一起被删除。
+    """
+    for image in images:
+        image.processing_status = PROCESSING_PENDING
+        session.add(image)
+        job_crud.add_processing_job(session=session, image_id=image.id)
+    await session.commit()
+
+
+async def acquire_image_blob(*, session: AsyncSession, content_digest: str) -> int:
+    """
+    增加共享文件的引用计数，记录不存在时创建 (一条 INSERT ... ON CONFLICT DO UPDATE)。不提交事务。
+
+    返回:
+        int: 更新后的引用计数
+    """
+    statement = acquire_image_blob_statement(content_digest, upsert_insert(session))
+    return (await session.scalars(statement)).one()
+
+
+async def release_image_blob(*, session: AsyncSession, content_digest: str) -> bool:
+    """
+    减少共享文件的引用计数，最后一条引用释放时删除计数记录 (带条件的 DELETE，否则在 SQL 中自减)。
+    不提交事务。
+
+    返回:
+        bool: 如果已没有任何图片引用该文件 (事务提交后可以删除物理文件)，返回True
+    """
+    deleted = await session.exec(delete_last_blob_reference_statement(content_digest))
+    if deleted.rowcount:
+        return True
+    updated = await session.exec(decrement_blob_reference_statement(content_digest))
+    # 没有引用计数记录 (例如历史数据) 视为最后一条引用
+    return not updated.rowcount
+
+
+async def delete_released_files(
+    *,
+    session: AsyncSession,
+    file_storage: FileStorageService,
+    released: Sequence[ReleasedFiles],
+) -> None:
+    """
+    删除图片的事务提交之后，删除不再被引用的物理文件。
+    内容寻址存储的共享文件在持有写锁的事务中确认仍未被重新引用后才删除 (见 image_crud.delete_released_files)。
+    """
+    content_digests = [item.content_digest for item in released if item.content_digest]
+    referenced = set()
+    if content_digests:
+        # 写语句使当前事务持有 SQLite 的写锁，并发上传的引用在文件删除之后才能提交
+        await session.exec(delete_unreferenced_blobs_statement(content_digests))
+        referenced = set(
+            (await session.exec(referenced_blobs_statement(content_digests))).all()
+        )
+    for item in released:
+        if item.content_digest not in referenced:
+            await file_storage.delete_files(item.paths)
+    if content_digests:
+        await session.commit()
+
+
+async def delete_image_record(
+    *, session: AsyncSession, image: Image, file_storage: FileStorageService
+) -> Optional[ReleasedFiles]:
+    """
+    删除一张图片的后处理任务和数据库记录，减少共享文件的引用计数。不提交事务，也不删除文件，
+    删除类别时多张图片在同一事务中提交。标签使用次数由调用方通过 async_tag_crud.release_tags_of_images 调整。
+
+    参数:
+        session (AsyncSession): 异步数据库会话
+        image (Image): 要删除的图片对象
+        file_storage (FileStorageService): 文件存储服务
+
+    返回:
+        Optional[ReleasedFiles]: 事务提交之后应删除的物理文件 (内容寻址存储模式下仍被其他图片引用时为None)
+    """
+    released = None
+    if not image.content_digest or await release_image_blob(
+        session=session, content_digest=image.content_digest
+    ):
+        released = ReleasedFiles(
+            paths=image_file_paths(file_storage=file_storage, image=image),
+            content_digest=image.content_digest,
+        )
+
+    await session.exec(
+        delete(ImageProcessingJob).where(ImageProcessingJob.image_id == image.id)
+    )
+    await session.delete(image)
+    return released
+
+
+async def delete_image(
+    *, session: AsyncSession, image_id: uuid.UUID
+) -> Optional[Image]:
+    """
+    从数据库中删除一张图片及其相关文件，并清理不再使用的标签。
+    如果图片不存在，则返回None。物理文件在事务提交成功之后才删除。
+
+    参数:
+        session (AsyncSession): 异步数据库会话
+        image_id (uuid.UUID): 要删除的图片ID
+
+    返回:
+        Optional[Image]: 如果图片存在并成功删除，返回被删除的图片对象；否则返回None
+    """
+    db_image = await get_image_by_id(session=session, image_id=image_id)
+    if not db_image:
+        return None
+
+    file_storage = FileStorageService()
+    tag_ids = await async_tag_crud.release_tags_of_images(
+        session=session, image_ids=[image_id]
+    )
+    released = await delete_image_record(
+        session=session, image=db_image, file_storage=file_storage
+    )
+    await session.flush()
+    # 只检查这张图片原来的标签，使用次数降为 0 的删除
+    await async_tag_crud.delete_tags_if_unused(session=session, tag_ids=tag_ids)
+    await session.commit()
+    tag_posting_index.invalidate()
+
+    if released:
+        await delete_released_files(
+            session=session, file_storage=file_storage, released=[released]
+        )
+    return db_image
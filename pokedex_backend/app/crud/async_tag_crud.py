@@ -0,0 +1,127 @@
+"""标签异步CRUD操作模块
+
+tag_crud 中供 async def 接口使用的函数的异步版本，基于 AsyncSession，不阻塞事件循环。
+"""
+
+from typing import Iterable, List, Optional, Union
+import uuid
+
+from sqlalchemy import Select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.crud.tag_crud import (
+    adjust_usage_counts_statement,
+    delete_unused_tags_statement,
+    group_tag_ids_by_count,
+    insert_missing_tags_statement,
+    tag_link_counts_statement,
+    tags_by_normalized_name_statement,
+    unique_tag_names,
+)
+from app.crud.upsert import upsert_insert
+from app.models import Tag, normalize_tag_name
+
+
+async def get_tag_by_name(*, session: AsyncSession, name: str) -> Optional[Tag]:
+    """
+    根据名称从数据库中获取一个标签 (忽略大小写，使用 name_normalized 的唯一索引)。
+
+    参数:
+        session (AsyncSession): 异步数据库会话对象。
+        name (str): 要获取的标签的名称。
+
+    返回:
+        Optional[Tag]: 如果找到则返回标签对象，否则返回None。
+    """
+    statement = select(Tag).where(Tag.name_normalized == normalize_tag_name(name))
+    return (await session.exec(statement)).first()
+
+
+async def get_or_create_tags(*, session: AsyncSession, names: Iterable[str]) -> List[Tag]:
+    """
+    获取一组标签，不存在的用一条多行 INSERT 创建 (不提交事务)，与 tag_crud.get_or_create_tags 相同。
+
+    参数:
+        session (AsyncSession): 异步数据库会话对象。
+        names (Iterable[str]): 标签名称 (忽略大小写和首尾空白去重，空白名称被忽略)。
+
+    返回:
+        List[Tag]: 标签对象，按名称首次出现的顺序排列。
+    """
+    names_by_normalized = unique_tag_names(names)
+    if not names_by_normalized:
+        return []
+
+    statement = tags_by_normalized_name_statement(names_by_normalized)
+    tags_by_normalized = {
+        tag.name_normalized: tag for tag in (await session.exec(statement)).all()
+    }
+
+    missing = {
+        normalized: name
+        for normalized, name in names_by_normalized.items()
+        if normalized not in tags_by_normalized
+    }
+    if missing:
+        for tag in (await session.scalars(insert_missing_tags_statement(missing, upsert_insert(session)))).all():
+            tags_by_normalized[tag.name_normalized] = tag
+        # 并发请求已创建的标签被跳过插入，再查询一次
+        conflicted = [normalized for normalized in missing if normalized not in tags_by_normalized]
+        if conflicted:
+            for tag in (await session.exec(tags_by_normalized_name_statement(conflicted))).all():
+                tags_by_normalized[tag.name_normalized] = tag
+
+    return [tags_by_normalized[normalized] for normalized in names_by_normalized]
+
+
+async def adjust_usage_counts(
+    *, session: AsyncSession, tag_ids: Iterable[uuid.UUID], delta: int
+) -> None:
+    """
+    在当前事务中调整标签的使用次数 (SQL 端自增，不改变 updated_at)。不提交事务。
+
+    参数:
+        session (AsyncSession): 异步数据库会话对象。
+        tag_ids (Iterable[uuid.UUID]): 关联数发生变化的标签ID。
+        delta (int): 每个标签的变化量 (新增关联为正，删除关联为负)。
+    """
+    tag_ids = list(tag_ids)
+    if not tag_ids or not delta:
+        return
+    await session.exec(adjust_usage_counts_statement(tag_ids, delta))
+
+
+async def release_tags_of_images(
+    *, session: AsyncSession, image_ids: Union[Iterable[uuid.UUID], Select]
+) -> List[uuid.UUID]:
+    """
+    为即将删除的图片减少其标签的使用次数 (每个标签减去它关联的图片数)。不提交事务。
+
+    参数:
+        session (AsyncSession): 异步数据库会话对象。
+        image_ids: 图片ID列表，或返回图片ID的子查询 (例如某个类别下的全部图片)。
+
+    返回:
+        List[uuid.UUID]: 使用次数减少的标签ID，删除图片后传给 delete_tags_if_unused。
+    """
+    rows = (await session.exec(tag_link_counts_statement(image_ids))).all()
+    for count, tag_ids in group_tag_ids_by_count(rows).items():
+        await adjust_usage_counts(session=session, tag_ids=tag_ids, delta=-count)
+    return [tag_id for tag_id, _ in rows]
+
+
+async def delete_tags_if_unused(
+    *, session: AsyncSession, tag_ids: Iterable[uuid.UUID]
+) -> None:
+    """
+    删除给定标签中使用次数已降为 0 的标签。只检查这些标签，代价与标签表大小无关。不提交事务。
+
+    参数:
+        session (AsyncSession): 异步数据库会话对象。
+        tag_ids (Iterable[uuid.UUID]): 需要检查的标签 (例如被删除图片原来的标签)。
+    """
+    tag_ids = list(tag_ids)
+    if not tag_ids:
+        return
+    await session.exec(delete_unused_tags_statement(tag_ids))
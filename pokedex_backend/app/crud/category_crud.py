@@ -3,23 +3,24 @@
 包含针对Category模型的数据库增删改查函数。
 """
 
-from typing import List, Optional
-from fastapi.concurrency import run_in_threadpool  # 用于在异步函数中运行同步IO操作
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session, select
-from sqlalchemy.orm import selectinload  # 用于预加载关联数据，避免N+1查询问题
 import uuid
 
 # 确保CategoryUpdate在模型中已定义并按需导入
+from app.crud import image_crud, tag_crud
+from app.crud.pagination import paginate
 from app.models import (
     Category,
     CategoryCreate,
     CategoryReadWithImages,
     Image,
+    ImageRead,
     CategoryUpdate,
-    Tag,
-    ImageTagLink,
 )
 from app.services.file_storage_service import FileStorageService
+from app.services.tag_posting_index import tag_posting_index
 
 # from app.core.config import settings # settings 似乎未在此文件中直接使用，可考虑移除
 # from pathlib import Path # Path 似乎未在此文件中直接使用，可考虑移除
@@ -78,52 +79,80 @@ def get_category_by_name(*, session: Session, name: str) -> Optional[Category]:
 
 
 def get_all_categories(
-    *, session: Session, skip: int = 0, limit: int = 100
+    *, session: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None
 ) -> List[Category]:
     """
-    从数据库中获取所有类别 (支持分页)。
+    从数据库中获取所有类别 (按 created_at, id 排序，支持 skip/limit 或游标分页)。
 
     参数:
         session (Session): 数据库会话对象。
-        skip (int): 跳过的记录数 (用于分页)。
+        skip (int): 跳过的记录数 (用于分页，提供 cursor 时忽略)。
         limit (int): 返回的最大记录数 (用于分页)。
+        cursor (Optional[str]): 上一页返回的游标。
 
     返回:
         List[Category]: 类别SQLModel对象列表。
     """
-    statement = select(Category).offset(skip).limit(limit)
+    statement = paginate(select(Category), Category, skip=skip, limit=limit, cursor=cursor)
     categories = session.exec(statement).all()  # 执行查询并获取所有结果
     return categories
 
 
+def get_category_and_image_page(
+    *,
+    session: Session,
+    category_id: uuid.UUID,
+    images_limit: int = 50,
+    images_cursor: Optional[str] = None,
+) -> Optional[Tuple[Category, List[Image]]]:
+    """
+    获取类别的ORM对象及其一页图片 (参数同 get_category_with_images_by_id)，未找到类别时返回None。
+    """
+    category_db = session.get(Category, category_id)
+    if not category_db:
+        return None
+
+    images = image_crud.get_images_by_category_id(
+        session=session, category_id=category_id, limit=images_limit, cursor=images_cursor
+    )
+    return category_db, images
+
+
 def get_category_with_images_by_id(
-    *, session: Session, category_id: uuid.UUID
+    *,
+    session: Session,
+    category_id: uuid.UUID,
+    images_limit: int = 50,
+    images_cursor: Optional[str] = None,
 ) -> Optional[CategoryReadWithImages]:
     """
-    根据ID获取类别及其关联的所有图片。
-    使用 `selectinload` 预加载图片数据以优化性能，避免N+1查询问题。
+    根据ID获取类别及其第一页图片 (按 created_at, id 排序)。
+    大类别一次性返回全部图片 (含标签和 EXIF 元数据) 会生成数MB的响应，
+    因此这里只返回 images_limit 张，其余图片通过游标分页或流式接口获取。
 
     参数:
         session (Session): 数据库会话对象。
         category_id (uuid.UUID): 类别的ID。
+        images_limit (int): 返回的最大图片数。
+        images_cursor (Optional[str]): 上一页返回的游标。
 
     返回:
-        Optional[CategoryReadWithImages]: 包含图片列表的Pydantic类别对象 (用于API响应)，如果未找到则为None。
+        Optional[CategoryReadWithImages]: 包含一页图片的Pydantic类别对象 (用于API响应)，如果未找到则为None。
     """
-    # 使用 selectinload 预加载 'images' 关系
-    category_db = session.exec(
-        select(Category)
-        .options(
-            selectinload(Category.images)
-        )  # 指示SQLAlchemy在查询Category时同时加载其关联的images
-        .where(Category.id == category_id)
-    ).first()
-
-    if not category_db:
+    page = get_category_and_image_page(
+        session=session,
+        category_id=category_id,
+        images_limit=images_limit,
+        images_cursor=images_cursor,
+    )
+    if page is None:
         return None
 
+    category_db, images = page
     # 将从数据库获取的SQLModel对象转换为Pydantic模型 (CategoryReadWithImages) 以便API返回
-    return CategoryReadWithImages.model_validate(category_db)
+    return CategoryReadWithImages.model_validate(
+        {**category_db.model_dump(), "images": [ImageRead.model_validate(image) for image in images]}
+    )
 
 
 # 注意: CategoryUpdate 模型应该从 app.models 导入
@@ -154,14 +183,11 @@ def update_category(
     return db_category
 
 
-async def delete_category(
-    *, session: Session, category_id: uuid.UUID
-) -> Optional[Category]:
+def delete_category(*, session: Session, category_id: uuid.UUID) -> Optional[Category]:
     """
     从数据库中删除一个类别，并级联删除该类别下的所有图片数据库记录及其对应的物理文件。
-    同时会检查并删除不再被任何图片使用的标签。
-    此函数设计为异步执行，文件IO和数据库操作通过 `run_in_threadpool` 在单独线程中运行，
-    以避免阻塞FastAPI的事件循环。
+    同时会检查并删除不再被任何图片使用的标签。所有数据库更改在一个事务中提交，
+    物理文件在提交成功之后才删除。async def 接口使用 async_category_crud.delete_category。
 
     参数:
         session (Session): 数据库会话对象。
@@ -171,65 +197,40 @@ async def delete_category(
         Optional[Category]: 如果删除成功则返回被删除的类别对象 (在从数据库删除前获取的状态)，
                           如果未找到要删除的类别，则返回None。
     """
-    # 在线程池中执行同步的数据库get操作
-    def get_category_sync():
-        return session.get(Category, category_id)
-
-    category_to_delete = await run_in_threadpool(get_category_sync)
-
+    category_to_delete = get_category_by_id(session=session, category_id=category_id)
     if not category_to_delete:
         return None
 
-    file_service = FileStorageService()  # 初始化文件存储服务
-
-    # 定义一个同步函数来获取类别下的所有图片，以便在线程池中运行
-    def get_images_sync():
-        return session.exec(select(Image).where(Image.category_id == category_id)).all()
-
-    images_in_category = await run_in_threadpool(get_images_sync)
-
-    # 收集所有需要检查的标签（使用列表存储）
-    all_tags_to_check = []
+    file_storage = FileStorageService()
+    images_in_category = session.exec(
+        # 删除图片时 ORM 要删除其标签关联行，一次预加载所有图片的标签，避免逐张查询
+        select(Image)
+        .options(selectinload(Image.tags))
+        .where(Image.category_id == category_id)
+    ).all()
+
+    # 一条聚合查询减少类别下所有图片的标签使用次数
+    tag_ids = tag_crud.release_tags_of_images(
+        session=session,
+        image_ids=select(Image.id).where(Image.category_id == category_id),
+    )
+
+    released = []
     for img in images_in_category:
-        for tag in img.tags:
-            if tag not in all_tags_to_check:  # 手动去重
-                all_tags_to_check.append(tag)
+        released_files = image_crud.delete_image_record(
+            session=session, image=img, file_storage=file_storage
+        )
+        if released_files:
+            released.append(released_files)
+    session.delete(category_to_delete)
+    session.flush()
 
-    # 级联删除图片文件和数据库记录
-    for img in images_in_category:
-        # 首先尝试删除物理文件
-        if img.relative_file_path:
-            original_image_full_path = (
-                file_service.image_storage_root / img.relative_file_path
-            )
-            # 文件删除是异步的IO操作，直接await
-            await file_service.delete_file(original_image_full_path)
-        if img.relative_thumbnail_path:
-            thumbnail_full_path = (
-                file_service.thumbnail_storage_root / img.relative_thumbnail_path
-            )
-            await file_service.delete_file(thumbnail_full_path)
-
-        # 在线程池中执行同步的数据库delete操作 (针对单个图片)
-        # 注意：这里只是标记为删除，真正的事务提交在最后统一进行
-        await run_in_threadpool(session.delete, img)
-
-    # 在线程池中执行同步的数据库delete操作 (针对类别本身)
-    await run_in_threadpool(session.delete, category_to_delete)
-
-    # 检查并删除未使用的标签
-    def cleanup_unused_tags_sync(tags_to_check: List[Tag]):
-        for tag in tags_to_check:
-            # 检查标签是否还被其他图片使用
-            link_statement = select(ImageTagLink).where(ImageTagLink.tag_id == tag.id)
-            first_link = session.exec(link_statement).first()
-            if not first_link:
-                # 如果没有其他图片使用此标签，则删除标签
-                session.delete(tag)
-
-    await run_in_threadpool(cleanup_unused_tags_sync, all_tags_to_check)
-
-    # 将所有数据库更改（图片删除、类别删除和标签清理）在单个原子事务中统一提交
-    await run_in_threadpool(session.commit)
-
-    return category_to_delete  # 返回删除前获取到的类别对象信息
+    tag_crud.delete_tags_if_unused(session=session, tag_ids=tag_ids)
+
+    # 图片删除、类别删除和标签清理在单个原子事务中统一提交，提交成功后再删除文件
+    session.commit()
+    tag_posting_index.invalidate()
+    image_crud.delete_released_files(
+        session=session, file_storage=file_storage, released=released
+    )
+    return category_to_delete
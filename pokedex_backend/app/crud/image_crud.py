@@ -3,53 +3,117 @@
 包含针对Image模型的数据库增删改查函数。
 """
 
-from typing import List, Optional
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Set
 from fastapi.concurrency import run_in_threadpool
-from sqlmodel import Session, select, func, col
+from sqlmodel import Session, select, func, col, delete, update
 import uuid
-from sqlalchemy.orm import selectinload, joinedload  # 导入 selectinload 和 joinedload
+from sqlalchemy.orm import selectinload, joinedload, load_only  # 导入 selectinload 和 joinedload
 
 from app.models import (
     Image,
+    ImageBlob,
     ImageCreate,
     ImageUpdate,
     ExifData,
+    IMAGE_COMPUTED_FIELD_COLUMNS,
     Tag,
     ImageTagLink,
+    PROCESSING_DONE,
+    PROCESSING_PENDING,
+    normalize_tag_name,
 )  # ImageCreate 通常在内部使用
 from app.services.file_storage_service import FileStorageService
+from app.services.tag_posting_index import tag_posting_index
+from app.services.thumbnail_engine import alternate_format_paths
 from app.core.config import settings
 from pathlib import Path
-from app.crud import tag_crud
-from app.crud.tag_crud import get_tag_by_name, create_tag, get_or_create_tag
+from app.crud import job_crud, tag_crud
+from app.crud.pagination import next_cursor, paginate
+from app.crud.upsert import upsert_insert
 
 
 def create_image_with_tags(
-    db: Session, image_create: ImageCreate, tag_names: List[str]
+    db: Session,
+    image_create: ImageCreate,
+    tag_names: List[str],
+    set_as_category_thumbnail: bool = False,
 ) -> Image:
     """
     Create an image and associate it with tags.
     If a tag does not exist, it will be created.
+    处理状态为 pending 的图片会在同一事务中加入后处理任务队列，
+    set_as_category_thumbnail 记录在任务上，缩略图生成后再设置。
+    """
+    return create_images_with_tags(
+        db=db,
+        image_creates=[image_create],
+        tag_names=tag_names,
+        set_as_category_thumbnail=set_as_category_thumbnail,
+    )[0]
+
+
+def create_images_with_tags(
+    db: Session,
+    image_creates: List[ImageCreate],
+    tag_names: List[str],
+    set_as_category_thumbnail: bool = False,
+) -> List[Image]:
     """
-    # Create the Image instance from the create-schema, but exclude 'tags' for now
-    # as we need to handle them separately.
-    db_image = Image.model_validate(image_create, update={"tags": []})
+    在一个事务中创建多张图片，并关联到同一组标签 (批量上传使用)。
 
-    # Add the image to the session to get an ID before creating relationships
-    db.add(db_image)
-    db.flush()
+    标签只查询或创建一次；处理状态为 pending 的图片在同一事务中加入后处理任务队列。
 
-    # Handle tags
-    if tag_names:
-        for tag_name in tag_names:
-            if tag_name.strip():
-                # Get or create the tag
-                tag = get_or_create_tag(session=db, tag_name=tag_name.strip())
-                db_image.tags.append(tag)
+    参数:
+        db (Session): 数据库会话
+        image_creates (List[ImageCreate]): 图片数据列表
+        tag_names (List[str]): 所有图片共用的标签名称列表
+        set_as_category_thumbnail (bool): 是否将第一张图片设为类别缩略图 (记录在其任务上)
 
+    返回:
+        List[Image]: 创建的图片对象，顺序与 image_creates 一致
+    """
+    # 整批图片共用的标签一次查询、一次插入 (不随标签数量增加往返次数)
+    tags = tag_crud.get_or_create_tags(session=db, names=tag_names)
+
+    db_images = []
+    for index, image_create in enumerate(image_creates):
+        # Create the Image instance from the create-schema, but exclude 'tags' for now
+        # as we need to handle them separately.
+        db_image = Image.model_validate(image_create, update={"tags": []})
+
+        # Add the image to the session to get an ID before creating relationships
+        db.add(db_image)
+        db.flush()
+
+        # 内容寻址存储：在同一事务中增加共享文件的引用计数
+        if db_image.content_digest:
+            acquire_image_blob(session=db, content_digest=db_image.content_digest)
+
+        if db_image.processing_status == PROCESSING_PENDING:
+            job_crud.add_processing_job(
+                session=db,
+                image_id=db_image.id,
+                set_as_category_thumbnail=set_as_category_thumbnail and index == 0,
+            )
+
+        db_image.tags.extend(tags)
+        db_images.append(db_image)
+
+    tag_crud.adjust_usage_counts(
+        session=db, tag_ids=[tag.id for tag in tags], delta=len(db_images)
+    )
+    image_ids = [db_image.id for db_image in db_images]  # 提交后对象过期，先记下ID
     db.commit()
-    db.refresh(db_image)
-    return db_image
+    tag_posting_index.invalidate()
+    # 一条查询刷新所有新图片并加载标签 (populate_existing 覆盖会话中已过期的对象)
+    db.exec(
+        select(Image)
+        .options(selectinload(Image.tags))
+        .where(col(Image.id).in_(image_ids))
+        .execution_options(populate_existing=True)
+    ).all()
+    return db_images
 
 
 def get_image_by_id(*, session: Session, image_id: uuid.UUID) -> Optional[Image]:
@@ -64,34 +128,378 @@ def get_image_by_id(*, session: Session, image_id: uuid.UUID) -> Optional[Image]
     return image
 
 
+def get_image_by_content_digest(
+    *, session: Session, content_digest: str
+) -> Optional[Image]:
+    """
+    获取任意一条引用指定内容摘要的图片记录 (内容寻址存储模式下用于复用已有文件和EXIF)。
+
+    参数:
+        session (Session): 数据库会话
+        content_digest (str): 文件内容的SHA-256摘要
+
+    返回:
+        Optional[Image]: 找到则返回图片对象，否则返回None
+    """
+    statement = select(Image).where(Image.content_digest == content_digest).limit(1)
+    return session.exec(statement).first()
+
+
+def apply_processing_result(
+    *,
+    session: Session,
+    image: Image,
+    relative_thumbnail_path: Optional[str],
+    renditions: Optional[Dict[str, Dict[str, Any]]],
+    file_metadata: Optional[Dict[str, Any]],
+    exif_info: Optional[ExifData],
+) -> Image:
+    """
+    写入后台处理得到的缩略图、尺寸档位和EXIF，并将图片标记为处理完成。不提交事务。
+
+    参数:
+        session (Session): 数据库会话
+        image (Image): 图片对象
+        relative_thumbnail_path (Optional[str]): 相对于缩略图根目录的缩略图路径
+        renditions (Optional[Dict[str, Dict[str, Any]]]): 尺寸档位
+        file_metadata (Optional[Dict[str, Any]]): 原始EXIF字典
+        exif_info (Optional[ExifData]): 结构化的EXIF信息
+
+    返回:
+        Image: 更新后的图片对象
+    """
+    image.relative_thumbnail_path = relative_thumbnail_path
+    image.renditions = renditions
+    image.file_metadata = file_metadata
+    image.exif_info = exif_info
+    image.processing_status = PROCESSING_DONE
+    session.add(image)
+    return image
+
+
+def acquire_image_blob_statement(content_digest: str, insert: Callable):
+    """
+    构造增加引用计数的 INSERT ... ON CONFLICT DO UPDATE ... RETURNING ref_count 语句。
+    insert 为会话所连接数据库方言的 insert() (见 upsert.upsert_insert)。
+    """
+    return (
+        insert(ImageBlob)
+        .values(content_digest=content_digest, ref_count=1)
+        .on_conflict_do_update(
+            index_elements=["content_digest"],
+            set_={"ref_count": ImageBlob.ref_count + 1},
+        )
+        .returning(ImageBlob.ref_count)
+    )
+
+
+def acquire_image_blob(*, session: Session, content_digest: str) -> int:
+    """
+    增加共享文件的引用计数，记录不存在时创建。不提交事务。
+
+    使用一条 INSERT ... ON CONFLICT DO UPDATE 完成：同一内容的两个首次上传并发提交时，
+    后提交的一方在冲突时自增而不是违反主键约束；自增在 SQL 中完成，不会覆盖其他事务的更新。
+
+    参数:
+        session (Session): 数据库会话
+        content_digest (str): 文件内容的SHA-256摘要
+
+    返回:
+        int: 更新后的引用计数
+    """
+    statement = acquire_image_blob_statement(content_digest, upsert_insert(session))
+    return session.scalars(statement).one()
+
+
+def delete_last_blob_reference_statement(content_digest: str):
+    """构造在释放最后一条引用时删除引用计数记录的 DELETE 语句 ("是否为最后一条引用" 的判断在同一条语句中完成)"""
+    return delete(ImageBlob).where(
+        ImageBlob.content_digest == content_digest, ImageBlob.ref_count <= 1
+    )
+
+
+def decrement_blob_reference_statement(content_digest: str):
+    """构造在 SQL 中将引用计数减一的 UPDATE 语句"""
+    return (
+        update(ImageBlob)
+        .where(ImageBlob.content_digest == content_digest)
+        .values(ref_count=ImageBlob.ref_count - 1)
+    )
+
+
+def release_image_blob(*, session: Session, content_digest: str) -> bool:
+    """
+    减少共享文件的引用计数，最后一条引用释放时删除计数记录。不提交事务。
+
+    "是否为最后一条引用" 的判断与删除在同一条带条件的 DELETE 中完成，否则在 SQL 中自减；
+    两条语句都在当前写事务内执行，其他事务的引用计数更新不会插入其间。
+
+    参数:
+        session (Session): 数据库会话
+        content_digest (str): 文件内容的SHA-256摘要
+
+    返回:
+        bool: 如果已没有任何图片引用该文件 (事务提交后可以删除物理文件)，返回True
+    """
+    deleted = session.exec(delete_last_blob_reference_statement(content_digest))
+    if deleted.rowcount:
+        return True
+    updated = session.exec(decrement_blob_reference_statement(content_digest))
+    # 没有引用计数记录 (例如历史数据) 视为最后一条引用
+    return not updated.rowcount
+
+
+@dataclass
+class ReleasedFiles:
+    """删除图片记录后不再被引用的物理文件，在事务提交之后由 delete_released_files 删除"""
+
+    paths: List[Path]
+    # 内容寻址存储的共享文件：删除前要确认提交之后没有新的上传重新引用它
+    content_digest: Optional[str] = None
+
+
+def delete_unreferenced_blobs_statement(content_digests: List[str]):
+    """
+    构造清理引用计数已不为正的记录的 DELETE 语句。
+    在确认共享文件是否仍被引用之前执行，使当前事务持有 SQLite 的写锁。
+    """
+    return delete(ImageBlob).where(
+        col(ImageBlob.content_digest).in_(content_digests), ImageBlob.ref_count <= 0
+    )
+
+
+def referenced_blobs_statement(content_digests: List[str]):
+    """构造查询哪些内容摘要仍有引用计数记录的 SELECT 语句"""
+    return select(ImageBlob.content_digest).where(
+        col(ImageBlob.content_digest).in_(content_digests)
+    )
+
+
+def referenced_blob_digests(*, session: Session, content_digests: List[str]) -> Set[str]:
+    """
+    在写事务中查询哪些共享文件 (又) 有了引用计数记录。不提交事务。
+
+    先执行一条写语句 (清理引用计数已不为正的记录) 使当前事务持有 SQLite 的写锁：
+    在本事务结束之前，并发上传无法提交新的引用。
+
+    参数:
+        session (Session): 数据库会话
+        content_digests (List[str]): 待确认的内容摘要
+
+    返回:
+        Set[str]: 仍被引用的摘要
+    """
+    session.exec(delete_unreferenced_blobs_statement(content_digests))
+    return set(session.exec(referenced_blobs_statement(content_digests)).all())
+
+
+def delete_released_files(
+    *, session: Session, file_storage: FileStorageService, released: Sequence[ReleasedFiles]
+) -> None:
+    """
+    删除图片的事务提交之后，删除不再被引用的物理文件。
+
+    内容寻址存储的共享文件可能在提交之后、删除之前被新的上传复用 (上传发现文件已存在)：
+    在持有写锁的事务中确认其引用计数记录仍不存在后才删除。并发上传的引用要等文件删除完才能提交，
+    提交后发现文件已不存在时由上传保留的副本恢复 (见 FileStorageService.settle_content_addressed_upload)。
+
+    参数:
+        session (Session): 数据库会话 (删除图片的事务已提交)
+        file_storage (FileStorageService): 文件存储服务
+        released (Sequence[ReleasedFiles]): delete_image_record 返回的待删除文件
+    """
+    content_digests = [item.content_digest for item in released if item.content_digest]
+    referenced = (
+        referenced_blob_digests(session=session, content_digests=content_digests)
+        if content_digests
+        else set()
+    )
+    for item in released:
+        if item.content_digest not in referenced:
+            file_storage.delete_files_sync(item.paths)
+    if content_digests:
+        session.commit()
+
+
+def image_file_paths(*, file_storage: FileStorageService, image: Image) -> List[Path]:
+    """
+    图片记录对应的所有物理文件：原图、缩略图和其他尺寸档位 (含 WebP/AVIF 版本)。
+
+    删除图片时在提交事务之前取得路径，提交成功之后再删除文件：
+    如果事务提交失败，数据库记录仍然保留，其引用的文件也不能删除。
+
+    参数:
+        file_storage (FileStorageService): 文件存储服务
+        image (Image): 图片对象
+
+    返回:
+        List[Path]: 文件的绝对路径 (文件不一定都存在)
+    """
+    paths = []
+    if image.relative_file_path:
+        paths.append(file_storage.image_storage_root / image.relative_file_path)
+    thumbnail_paths = set()
+    if image.relative_thumbnail_path:
+        thumbnail_paths.add(image.relative_thumbnail_path)
+    thumbnail_paths.update(
+        rendition["path"] for rendition in (image.renditions or {}).values()
+    )
+    for relative_path in sorted(thumbnail_paths):
+        rendition_path = file_storage.thumbnail_storage_root / relative_path
+        paths.append(rendition_path)
+        # 同一档位的 WebP/AVIF 版本 (不存在时删除视为成功)
+        paths.extend(alternate_format_paths(rendition_path))
+    return paths
+
+
+def delete_image_record(
+    *, session: Session, image: Image, file_storage: FileStorageService
+) -> Optional[ReleasedFiles]:
+    """
+    删除一张图片的后处理任务和数据库记录，减少共享文件的引用计数。不提交事务，也不删除文件。
+    标签使用次数由调用方通过 tag_crud.release_tags_of_images 调整。
+
+    参数:
+        session (Session): 数据库会话
+        image (Image): 要删除的图片对象
+        file_storage (FileStorageService): 文件存储服务
+
+    返回:
+        Optional[ReleasedFiles]: 事务提交之后应删除的物理文件 (内容寻址存储模式下仍被其他图片引用时为None)
+    """
+    released = None
+    if not image.content_digest or release_image_blob(
+        session=session, content_digest=image.content_digest
+    ):
+        released = ReleasedFiles(
+            paths=image_file_paths(file_storage=file_storage, image=image),
+            content_digest=image.content_digest,
+        )
+
+    job_crud.delete_jobs_by_image_id(session=session, image_id=image.id)
+    session.delete(image)
+    return released
+
+
+def delete_image(*, session: Session, image_id: uuid.UUID) -> Optional[Image]:
+    """
+    从数据库中删除一张图片及其相关文件，并清理不再使用的标签。
+    如果图片不存在，则返回None。物理文件在事务提交成功之后才删除。
+
+    参数:
+        session (Session): 数据库会话
+        image_id (uuid.UUID): 要删除的图片ID
+
+    返回:
+        Optional[Image]: 如果图片存在并成功删除，返回被删除的图片对象；否则返回None
+    """
+    db_image = get_image_by_id(session=session, image_id=image_id)
+    if not db_image:
+        return None
+
+    file_storage = FileStorageService()
+    tag_ids = tag_crud.release_tags_of_images(session=session, image_ids=[image_id])
+    released = delete_image_record(session=session, image=db_image, file_storage=file_storage)
+    session.flush()
+    # 只检查这张图片原来的标签，使用次数降为 0 的删除
+    tag_crud.delete_tags_if_unused(session=session, tag_ids=tag_ids)
+    session.commit()
+    tag_posting_index.invalidate()
+
+    if released:
+        delete_released_files(session=session, file_storage=file_storage, released=[released])
+    return db_image
+
+
+# 游标分页的排序键，只返回部分字段时也始终加载
+_ALWAYS_LOADED_COLUMNS = ("id", "created_at")
+
+
+def image_load_options(fields: Optional[Sequence[str]] = None) -> list:
+    """
+    图片列表查询的加载选项。
+
+    fields 为None时加载全部列并预加载标签；否则只加载 fields (ImageRead 的字段名) 需要的列，
+    file_metadata、exif_info 等未请求的 JSON 列既不查询也不解码 (访问时直接报错，而不是逐条补查)，
+    只有请求了 tags 时才预加载标签。
+    """
+    if fields is None:
+        return [selectinload(Image.tags)]
+    columns = set(_ALWAYS_LOADED_COLUMNS)
+    for name in fields:
+        if name != "tags":
+            columns.update(IMAGE_COMPUTED_FIELD_COLUMNS.get(name, (name,)))
+    options = [load_only(*(getattr(Image, column) for column in sorted(columns)), raiseload=True)]
+    if "tags" in fields:
+        options.append(selectinload(Image.tags))
+    return options
+
+
 def get_images_by_category_id(
-    *, session: Session, category_id: uuid.UUID, skip: int = 0, limit: int = 100
+    *,
+    session: Session,
+    category_id: uuid.UUID,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[Sequence[str]] = None,
 ) -> List[Image]:
     """
-    根据类别ID获取图片记录列表 (支持分页)。
+    根据类别ID获取图片记录列表 (按 created_at, id 排序，支持 skip/limit 或游标分页)。
     使用 selectinload 优化，一次性加载所有图片的关联标签，避免N+1查询。
+    提供 fields 时只加载这些字段需要的列 (见 image_load_options)。
     """
-    statement = (
+    statement = paginate(
         select(Image)
-        .options(selectinload(Image.tags))  # 预加载标签
-        .where(Image.category_id == category_id)
-        .offset(skip)
-        .limit(limit)
+        .options(*image_load_options(fields))
+        .where(Image.category_id == category_id),
+        Image,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
     )
     images = session.exec(statement).all()
     return images
 
 
-def get_all_images(*, session: Session, skip: int = 0, limit: int = 100) -> List[Image]:
+def iter_images_by_category_id(
+    *, session: Session, category_id: uuid.UUID, batch_size: int = 200
+) -> Iterator[Image]:
+    """
+    按 (created_at, id) 顺序逐批读取类别下的全部图片，每批是一次游标分页查询。
+    用于流式导出：任意时刻只持有一批图片，内存占用与类别大小无关。
+    """
+    cursor = None
+    while True:
+        images = get_images_by_category_id(
+            session=session, category_id=category_id, limit=batch_size, cursor=cursor
+        )
+        yield from images
+        cursor = next_cursor(images, batch_size)
+        if cursor is None:
+            return
+        session.expunge_all()  # 释放上一批对象，避免在会话中累积
+
+
+def get_all_images(
+    *,
+    session: Session,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> List[Image]:
     """
-    获取数据库中所有的图片记录 (支持分页)。
+    获取数据库中所有的图片记录 (按 created_at, id 排序，支持 skip/limit 或游标分页)。
     使用 selectinload 优化，一次性加载所有图片的关联标签，避免N+1查询。
+    提供 fields 时只加载这些字段需要的列 (见 image_load_options)。
     """
-    statement = (
-        select(Image)
-        .options(selectinload(Image.tags))  # 预加载标签
-        .offset(skip)
-        .limit(limit)
+    statement = paginate(
+        select(Image).options(*image_load_options(fields)),
+        Image,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
     )
     images = session.exec(statement).all()
     return images
@@ -122,64 +530,41 @@ def update_image_metadata(
         if field != "tags" and field != "set_as_category_thumbnail":
             setattr(image, field, value)
 
-    # 更新标签
+    # 更新标签：只增删有变化的关联，并在同一事务中调整这些标签的使用次数
     if "tags" in update_data:
-        # 清除现有标签
-        session.query(ImageTagLink).filter(ImageTagLink.image_id == image.id).delete()
-        
-        # 如果提供了新标签，则添加它们
-        if new_tags:
-            for tag in new_tags:
-                link = ImageTagLink(image_id=image.id, tag_id=tag.id)
-                session.add(link)
-        
-        # 清理未使用的标签
-        tag_crud.cleanup_unused_tags(session=session)
+        current_tag_ids = set(
+            session.exec(
+                select(ImageTagLink.tag_id).where(ImageTagLink.image_id == image.id)
+            ).all()
+        )
+        new_tag_ids = {tag.id for tag in new_tags or []}
+        removed_tag_ids = current_tag_ids - new_tag_ids
+        added_tag_ids = new_tag_ids - current_tag_ids
+
+        if removed_tag_ids:
+            session.exec(
+                delete(ImageTagLink).where(
+                    ImageTagLink.image_id == image.id,
+                    col(ImageTagLink.tag_id).in_(removed_tag_ids),
+                )
+            )
+        for tag_id in added_tag_ids:
+            session.add(ImageTagLink(image_id=image.id, tag_id=tag_id))
+
+        tag_crud.adjust_usage_counts(session=session, tag_ids=added_tag_ids, delta=1)
+        tag_crud.adjust_usage_counts(session=session, tag_ids=removed_tag_ids, delta=-1)
+        # 只检查使用次数减少的标签，降为 0 的删除
+        tag_crud.delete_tags_if_unused(session=session, tag_ids=removed_tag_ids)
+        session.expire(image, ["tags"])  # 关联已直接修改，下次访问时重新加载
 
     session.add(image)
     session.commit()
+    if "tags" in update_data:
+        tag_posting_index.invalidate()
     session.refresh(image)
     return image
 
 
-async def delete_image(*, session: Session, image_id: uuid.UUID) -> Optional[Image]:
-    """
-    从数据库中删除一张图片及其相关文件。
-    如果图片不存在，则返回None。
-
-    参数:
-        session (Session): 数据库会话
-        image_id (uuid.UUID): 要删除的图片ID
-
-    返回:
-        Optional[Image]: 如果图片存在并成功删除，返回被删除的图片对象；否则返回None
-    """
-    db_image = get_image_by_id(session=session, image_id=image_id)
-    if not db_image:
-        return None
-
-    # 初始化文件存储服务
-    file_storage = FileStorageService()
-
-    # 删除物理文件
-    if db_image.relative_file_path:
-        original_image_abs_path = settings.image_storage_root / db_image.relative_file_path
-        await file_storage.delete_file(original_image_abs_path)
-
-    if db_image.relative_thumbnail_path:
-        thumbnail_abs_path = settings.thumbnail_storage_root / db_image.relative_thumbnail_path
-        await file_storage.delete_file(thumbnail_abs_path)
-
-    # 删除数据库记录
-    session.delete(db_image)
-    session.commit()
-
-    # 清理未使用的标签
-    tag_crud.cleanup_unused_tags(session=session)
-
-    return db_image
-
-
 def get_images_by_tag_names(
     *,
     session: Session,
@@ -187,58 +572,75 @@ def get_images_by_tag_names(
     match_all: bool = False,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[Sequence[str]] = None,
 ) -> List[Image]:
     """
-    根据一个或多个标签名称获取图片列表。
+    根据一个或多个标签名称获取图片列表 (按 created_at, id 排序)。
 
     参数:
         session: 数据库会话。
         tag_names: 标签名称列表。
         match_all: 如果为 True，则图片必须匹配所有标签 (AND)；
                    如果为 False (默认)，则图片匹配任何一个标签 (OR)。
-        skip: 分页偏移量。
+        skip: 分页偏移量 (提供 cursor 时忽略)。
         limit: 每页数量。
+        cursor: 上一页返回的游标。
+        fields: 只加载这些字段需要的列 (见 image_load_options)，None 表示全部。
 
     返回:
         符合条件的图片列表。
     """
-    # 基础查询，连接 Image 和 ImageTagLink
-    statement = select(Image).join(ImageTagLink)
-
     if not tag_names:
         return []
 
-    # 子查询：找到所有名字匹配的 Tag 的 ID
-    tag_ids_stmt = select(Tag.id).where(col(Tag.name).in_(tag_names))
+    # 找到所有名字匹配的 Tag 的 ID
+    tag_ids_stmt = select(Tag.id).where(
+        col(Tag.name_normalized).in_([normalize_tag_name(name) for name in tag_names])
+    )
     tag_ids = session.exec(tag_ids_stmt).all()
 
     if not tag_ids:
         return []
 
+    if settings.tag_posting_index_enabled:
+        # 在内存倒排索引中求交集/并集并分页，只按ID取回当前页的图片
+        image_ids = tag_posting_index.search(
+            session, tag_ids, match_all=match_all, skip=skip, limit=limit, cursor=cursor
+        )
+        if not image_ids:
+            return []
+        images_by_id = {
+            image.id: image
+            for image in session.exec(
+                select(Image)
+                .options(*image_load_options(fields))
+                .where(col(Image.id).in_(image_ids))
+            ).all()
+        }
+        return [images_by_id[image_id] for image_id in image_ids if image_id in images_by_id]
+
+    # 通过 (tag_id, image_id) 索引在关联表中找到匹配的 image_id
+    matching_image_ids = select(ImageTagLink.image_id).where(
+        col(ImageTagLink.tag_id).in_(tag_ids)
+    )
     if match_all:
         # AND 逻辑：图片必须拥有所有指定的标签
-        # 筛选出 image_id，这些 image_id 在 ImageTagLink 中与所有找到的 tag_id 相关联
-        # 1. 过滤 ImageTagLink，只保留与目标 tag_ids 关联的记录
-        # 2. 按 image_id 分组
-        # 3. 使用 having 子句，确保每个 image_id 分组中的 tag_id 数量等于目标 tag_id 的总数
-        subquery = (
-            select(ImageTagLink.image_id)
-            .where(col(ImageTagLink.tag_id).in_(tag_ids))
-            .group_by(ImageTagLink.image_id)
-            .having(func.count(ImageTagLink.tag_id) == len(tag_ids))
-        ).alias("matching_images")
-
-        # 主查询只选择 image_id 在子查询结果中的图片
-        statement = statement.where(col(Image.id).in_(select(subquery.c.image_id)))
-
-    else:
-        # OR 逻辑：图片拥有任何一个指定的标签即可
-        # 只需要 image_id 在 ImageTagLink 中与任何一个找到的 tag_id 关联即可
-        statement = statement.where(col(ImageTagLink.tag_id).in_(tag_ids))
-
-    # 去重，因为一个图片可能匹配多个标签 (在 OR 模式下)
-    # 应用分页
-    final_statement = statement.distinct().offset(skip).limit(limit)
+        # 按 image_id 分组，每组中匹配的 tag_id 数量等于目标 tag_id 的总数
+        matching_image_ids = matching_image_ids.group_by(ImageTagLink.image_id).having(
+            func.count(ImageTagLink.tag_id) == len(tag_ids)
+        )
+    # OR 逻辑：拥有任何一个指定的标签即可；IN 子查询本身不会产生重复的图片，无需 DISTINCT
+
+    final_statement = paginate(
+        select(Image)
+        .options(*image_load_options(fields))
+        .where(col(Image.id).in_(matching_image_ids)),
+        Image,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+    )
     images = session.exec(final_statement).all()
     return images
 
@@ -248,12 +650,22 @@ def update_image_tags(session: Session, *, image: Image, new_tags: List[Tag]) ->
     更新图片的标签。
     这将替换图片所有现有的标签为新提供的标签列表。
     """
+    old_tag_ids = {tag.id for tag in image.tags}
+    new_tag_ids = {tag.id for tag in new_tags}
     # 清除旧的标签关联
     image.tags.clear()
     # 添加新的标签关联
     image.tags.extend(new_tags)
+    tag_crud.adjust_usage_counts(
+        session=session, tag_ids=new_tag_ids - old_tag_ids, delta=1
+    )
+    tag_crud.adjust_usage_counts(
+        session=session, tag_ids=old_tag_ids - new_tag_ids, delta=-1
+    )
+    tag_crud.delete_tags_if_unused(session=session, tag_ids=old_tag_ids - new_tag_ids)
 
     session.add(image)
     session.commit()
+    tag_posting_index.invalidate()
     session.refresh(image)
     return image
@@ -0,0 +1,163 @@
+"""后台任务CRUD操作模块
+
+包含针对 ImageProcessingJob 模型 (持久化的图片后处理任务队列) 的数据库操作函数。
+"""
+
+from datetime import datetime
+from typing import List, Optional
+import uuid
+
+from sqlmodel import Session, select, update, col
+
+from app.models import (
+    ImageProcessingJob,
+    PROCESSING_DONE,
+    PROCESSING_FAILED,
+    PROCESSING_PENDING,
+    PROCESSING_RUNNING,
+)
+
+
+def add_processing_job(
+    *, session: Session, image_id: uuid.UUID, set_as_category_thumbnail: bool = False
+) -> ImageProcessingJob:
+    """
+    为图片添加一个待处理任务。不提交事务，调用方在创建图片记录的同一事务中提交，
+    保证不会出现没有任务的 pending 图片。
+
+    参数:
+        session (Session): 数据库会话
+        image_id (uuid.UUID): 待处理的图片ID
+        set_as_category_thumbnail (bool): 处理完成后是否设为类别缩略图
+
+    返回:
+        ImageProcessingJob: 新建的任务对象
+    """
+    job = ImageProcessingJob(
+        image_id=image_id, set_as_category_thumbnail=set_as_category_thumbnail
+    )
+    session.add(job)
+    return job
+
+
+def get_jobs_by_image_id(
+    *, session: Session, image_id: uuid.UUID
+) -> List[ImageProcessingJob]:
+    """
+    获取图片的所有处理任务，按入队时间排序。
+
+    参数:
+        session (Session): 数据库会话
+        image_id (uuid.UUID): 图片ID
+
+    返回:
+        List[ImageProcessingJob]: 任务列表
+    """
+    statement = (
+        select(ImageProcessingJob)
+        .where(ImageProcessingJob.image_id == image_id)
+        .order_by(ImageProcessingJob.created_at)
+    )
+    return session.exec(statement).all()
+
+
+def claim_next_job(*, session: Session) -> Optional[ImageProcessingJob]:
+    """
+    领取最早入队的待处理任务：将其状态改为 processing 并增加尝试次数，然后提交。
+
+    多个工作协程同时领取时，带状态条件的 UPDATE 保证同一任务只会被一个协程领到。
+
+    参数:
+        session (Session): 数据库会话
+
+    返回:
+        Optional[ImageProcessingJob]: 领到的任务，没有待处理任务时返回None
+    """
+    while True:
+        job_id = session.exec(
+            select(ImageProcessingJob.id)
+            .where(ImageProcessingJob.status == PROCESSING_PENDING)
+            .order_by(ImageProcessingJob.created_at)
+            .limit(1)
+        ).first()
+        if job_id is None:
+            return None
+        result = session.exec(
+            update(ImageProcessingJob)
+            .where(
+                col(ImageProcessingJob.id) == job_id,
+                col(ImageProcessingJob.status) == PROCESSING_PENDING,
+            )
+            .values(
+                status=PROCESSING_RUNNING,
+                attempts=ImageProcessingJob.attempts + 1,
+                updated_at=datetime.utcnow(),
+            )
+        )
+        session.commit()
+        if result.rowcount == 1:
+            return session.get(ImageProcessingJob, job_id)
+        # 已被其他工作协程领走，继续尝试下一个
+
+
+def finish_job(
+    *,
+    session: Session,
+    job: ImageProcessingJob,
+    error: Optional[str] = None,
+    max_attempts: int = 1,
+) -> ImageProcessingJob:
+    """
+    记录任务的处理结果。成功时标记为 done；失败时未达到最大尝试次数则重新置为 pending 等待重试，
+    否则标记为 failed。不提交事务。
+
+    参数:
+        session (Session): 数据库会话
+        job (ImageProcessingJob): 任务对象
+        error (Optional[str]): 失败时的错误信息，成功时为None
+        max_attempts (int): 最大尝试次数
+
+    返回:
+        ImageProcessingJob: 更新后的任务对象
+    """
+    if error is None:
+        job.status = PROCESSING_DONE
+    else:
+        job.status = (
+            PROCESSING_PENDING if job.attempts < max_attempts else PROCESSING_FAILED
+        )
+        job.last_error = error[:1000]
+    session.add(job)
+    return job
+
+
+def requeue_interrupted_jobs(*, session: Session) -> int:
+    """
+    将上次运行中断时仍处于 processing 状态的任务重新置为 pending 并提交。
+    应在工作协程启动前调用 (此时不会有任务真正在处理)。
+
+    参数:
+        session (Session): 数据库会话
+
+    返回:
+        int: 重新入队的任务数量
+    """
+    result = session.exec(
+        update(ImageProcessingJob)
+        .where(col(ImageProcessingJob.status) == PROCESSING_RUNNING)
+        .values(status=PROCESSING_PENDING, updated_at=datetime.utcnow())
+    )
+    session.commit()
+    return result.rowcount
+
+
+def delete_jobs_by_image_id(*, session: Session, image_id: uuid.UUID) -> None:
+    """
+    删除图片的所有处理任务 (删除图片时调用)。不提交事务。
+
+    参数:
+        session (Session): 数据库会话
+        image_id (uuid.UUID): 图片ID
+    """
+    for job in get_jobs_by_image_id(session=session, image_id=image_id):
+        session.delete(job)
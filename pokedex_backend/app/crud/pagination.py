@@ -0,0 +1,87 @@
+"""列表分页工具模块
+
+列表查询统一按 (created_at, id) 排序，支持两种分页方式：
+- skip/limit：兼容已有调用，深分页的代价随 skip 线性增长；
+- 游标 (keyset)：客户端传回上一页返回的 next_cursor，查询直接从该位置之后开始，
+  借助 (created_at, id) 复合索引，任意深度的翻页代价都相同。
+
+游标对客户端是不透明的字符串 (上一页最后一条记录的 created_at 和 id 的 base64 编码)。
+"""
+
+import base64
+import binascii
+from datetime import datetime
+import json
+from typing import Optional, Sequence, Tuple
+import uuid
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import tuple_
+
+# 列表接口通过此响应头返回下一页的游标 (没有更多数据时不返回)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, record_id: uuid.UUID) -> str:
+    """将排序键编码为不透明的游标字符串"""
+    payload = json.dumps([created_at.isoformat(), record_id.hex], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """
+    解析游标字符串。
+
+    异常:
+        HTTPException (400 Bad Request): 游标格式无效 (被篡改或来自不兼容的版本)
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, record_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), uuid.UUID(hex=record_id)
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="无效的分页游标。"
+        )
+
+
+def paginate(statement, model, *, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    """
+    为列表查询添加 (created_at, id) 排序和分页条件。
+
+    参数:
+        statement: 待分页的 select 语句
+        model: 提供 created_at 和 id 列的表模型
+        skip (int): 跳过的记录数 (提供 cursor 时忽略)
+        limit (int): 返回的最大记录数
+        cursor (Optional[str]): 上一页返回的游标
+
+    返回:
+        添加了排序和分页条件的 select 语句
+    """
+    statement = statement.order_by(model.created_at, model.id)
+    if cursor:
+        created_at, record_id = decode_cursor(cursor)
+        statement = statement.where(
+            tuple_(model.created_at, model.id) > tuple_(created_at, record_id)
+        )
+    elif skip:
+        statement = statement.offset(skip)
+    return statement.limit(limit)
+
+
+def next_cursor(items: Sequence, limit: int) -> Optional[str]:
+    """
+    根据本页结果计算下一页的游标。本页不满 limit 条时说明已没有更多数据，返回None。
+    """
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(last.created_at, last.id)
+
+
+def set_next_cursor_header(response: Response, items: Sequence, limit: int) -> None:
+    """本页已满时在响应头 X-Next-Cursor 中返回下一页的游标"""
+    cursor = next_cursor(items, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
@@ -4,12 +4,16 @@
 包含针对Tag模型的数据库增删改查函数。
 """
 
-from typing import List, Optional
-from sqlmodel import Session, select, func, col
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+from sqlalchemy import Select
+from sqlmodel import Session, select, func, col, update, delete
 import uuid
-from sqlalchemy.orm import selectinload
 
-from app.models import Tag, TagBase, TagUpdate, ImageTagLink, Image
+from app.models import Tag, TagBase, TagUpdate, ImageTagLink, Image, normalize_tag_name
+from app.crud.pagination import paginate
+from app.crud.upsert import upsert_insert
 from fastapi import HTTPException, status
 
 
@@ -32,7 +36,9 @@ def create_tag(*, session: Session, tag_in: TagBase) -> Tag:
             detail=f"标签 '{tag_in.name}' 已存在。",
         )
 
-    db_tag = Tag.model_validate(tag_in)
+    db_tag = Tag.model_validate(
+        tag_in, update={"name_normalized": normalize_tag_name(tag_in.name)}
+    )
     session.add(db_tag)
     session.commit()
     session.refresh(db_tag)
@@ -55,7 +61,7 @@ def get_tag_by_id(*, session: Session, tag_id: uuid.UUID) -> Optional[Tag]:
 
 def get_tag_by_name(*, session: Session, name: str) -> Optional[Tag]:
     """
-    根据名称从数据库中获取一个标签 (忽略大小写)。
+    根据名称从数据库中获取一个标签 (忽略大小写，使用 name_normalized 的唯一索引)。
 
     参数:
         session (Session): 数据库会话对象。
@@ -64,13 +70,96 @@ def get_tag_by_name(*, session: Session, name: str) -> Optional[Tag]:
     返回:
         Optional[Tag]: 如果找到则返回标签对象，否则返回None。
     """
-    statement = select(Tag).where(func.lower(Tag.name) == func.lower(name))
+    statement = select(Tag).where(Tag.name_normalized == normalize_tag_name(name))
     return session.exec(statement).first()
 
 
+def unique_tag_names(names: Iterable[str]) -> Dict[str, str]:
+    """
+    按规范形式去重标签名称，忽略空白名称。
+
+    返回:
+        Dict[str, str]: 规范名称 → 首次出现的原始名称 (去除首尾空白)，保持输入顺序
+    """
+    names_by_normalized: Dict[str, str] = {}
+    for name in names:
+        if name.strip():
+            names_by_normalized.setdefault(normalize_tag_name(name), name.strip())
+    return names_by_normalized
+
+
+def insert_missing_tags_statement(names_by_normalized: Dict[str, str], insert: Callable):
+    """
+    构造一次插入多个标签的 INSERT ... ON CONFLICT DO NOTHING RETURNING 语句。
+    insert 为会话所连接数据库方言的 insert() (见 upsert.upsert_insert)。
+
+    并发请求已创建的同名标签触发唯一约束冲突时被跳过 (不会报错)，RETURNING 只返回实际插入的行。
+    """
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "name": name,
+            "name_normalized": normalized,
+            "usage_count": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for normalized, name in names_by_normalized.items()
+    ]
+    return (
+        insert(Tag)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["name_normalized"])
+        .returning(Tag)
+    )
+
+
+def tags_by_normalized_name_statement(normalized_names: Iterable[str]):
+    """构造按规范名称批量查询标签的 SELECT 语句 (使用 name_normalized 的唯一索引)"""
+    return select(Tag).where(col(Tag.name_normalized).in_(list(normalized_names)))
+
+
+def get_or_create_tags(*, session: Session, names: Iterable[str]) -> List[Tag]:
+    """
+    获取一组标签，不存在的一次性创建 (不提交事务)。
+
+    通常只需两次数据库往返：一次 SELECT 查出已有标签，一次多行 INSERT 创建其余标签。
+    并发请求同时创建同名标签时，被跳过的插入再查询一次即可取得对方创建的标签。
+
+    参数:
+        session (Session): 数据库会话对象。
+        names (Iterable[str]): 标签名称 (忽略大小写和首尾空白去重，空白名称被忽略)。
+
+    返回:
+        List[Tag]: 标签对象，按名称首次出现的顺序排列。
+    """
+    names_by_normalized = unique_tag_names(names)
+    if not names_by_normalized:
+        return []
+
+    statement = tags_by_normalized_name_statement(names_by_normalized)
+    tags_by_normalized = {tag.name_normalized: tag for tag in session.exec(statement).all()}
+
+    missing = {
+        normalized: name
+        for normalized, name in names_by_normalized.items()
+        if normalized not in tags_by_normalized
+    }
+    if missing:
+        for tag in session.scalars(insert_missing_tags_statement(missing, upsert_insert(session))).all():
+            tags_by_normalized[tag.name_normalized] = tag
+        conflicted = [normalized for normalized in missing if normalized not in tags_by_normalized]
+        if conflicted:
+            for tag in session.exec(tags_by_normalized_name_statement(conflicted)).all():
+                tags_by_normalized[tag.name_normalized] = tag
+
+    return [tags_by_normalized[normalized] for normalized in names_by_normalized]
+
+
 def get_or_create_tag(*, session: Session, tag_name: str) -> Tag:
     """
-    获取指定名称的标签，如果不存在则创建。
+    获取指定名称的标签，如果不存在则创建 (不提交事务)。
 
     参数:
         session (Session): 数据库会话对象。
@@ -79,30 +168,18 @@ def get_or_create_tag(*, session: Session, tag_name: str) -> Tag:
     返回:
         Tag: 获取或创建的标签对象。
     """
-    db_tag = get_tag_by_name(session=session, name=tag_name)
-    if not db_tag:
-        tag_create = TagBase(name=tag_name)
-        db_tag = Tag.model_validate(tag_create)
-        session.add(db_tag)
-        # Flush the session to assign an ID to the new tag without committing the transaction
-        session.flush()
-    return db_tag
+    return get_or_create_tags(session=session, names=[tag_name])[0]
 
 
-def get_all_tags(*, session: Session, skip: int = 0, limit: int = 100) -> List[Tag]:
+def get_all_tags(
+    *, session: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None
+) -> List[Tag]:
     """
-    获取数据库中所有的标签记录 (支持分页)。
-    使用 selectinload 优化，一次性加载所有标签的关联图片，避免N+1查询。
-    虽然列表API当前不返回图片，但这是一个好的实践，以防未来需要。
+    获取数据库中所有的标签记录 (按 created_at, id 排序，支持 skip/limit 或游标分页)。
+    使用次数直接读取维护好的 usage_count 列，不加载关联的图片。
     """
-    statement = (
-        select(Tag)
-        .options(selectinload(Tag.images))  # 预加载图片
-        .offset(skip)
-        .limit(limit)
-    )
-    tags = session.exec(statement).all()
-    return tags
+    statement = paginate(select(Tag), Tag, skip=skip, limit=limit, cursor=cursor)
+    return session.exec(statement).all()
 
 
 def update_tag(*, session: Session, db_tag: Tag, tag_in: TagUpdate) -> Tag:
@@ -131,6 +208,7 @@ def update_tag(*, session: Session, db_tag: Tag, tag_in: TagUpdate) -> Tag:
 
     for key, value in update_data.items():
         setattr(db_tag, key, value)
+    db_tag.name_normalized = normalize_tag_name(db_tag.name)
 
     session.add(db_tag)
     session.commit()
@@ -172,25 +250,127 @@ def delete_tag(*, session: Session, tag_id: uuid.UUID) -> Optional[Tag]:
     return db_tag
 
 
-def cleanup_unused_tags(*, session: Session) -> None:
+def adjust_usage_counts_statement(tag_ids: List[uuid.UUID], delta: int):
+    """构造在 SQL 中调整标签使用次数的 UPDATE 语句 (usage_count = usage_count + delta，不改变 updated_at)"""
+    return (
+        update(Tag)
+        .where(col(Tag.id).in_(tag_ids))
+        .values(usage_count=Tag.usage_count + delta, updated_at=Tag.updated_at)
+    )
+
+
+def adjust_usage_counts(
+    *, session: Session, tag_ids: Iterable[uuid.UUID], delta: int
+) -> None:
     """
-    清理不再被任何图片使用的标签。
+    在当前事务中调整标签的使用次数，与图片标签关联的增删一起提交。不提交事务。
+
+    在 SQL 中自增 (usage_count = usage_count + delta)，并发事务之间不会相互覆盖；
+    不改变 updated_at (它表示标签本身最后一次被修改)。
 
     参数:
         session (Session): 数据库会话对象。
+        tag_ids (Iterable[uuid.UUID]): 关联数发生变化的标签ID。
+        delta (int): 每个标签的变化量 (新增关联为正，删除关联为负)。
+    """
+    tag_ids = list(tag_ids)
+    if not tag_ids or not delta:
+        return
+    session.exec(adjust_usage_counts_statement(tag_ids, delta))
+
+
+def tag_link_counts_statement(image_ids: Union[Iterable[uuid.UUID], Select]):
     """
-    # 查找所有没有关联图片的标签
-    statement = (
-        select(Tag)
-        .outerjoin(ImageTagLink)
-        .group_by(Tag.id)
-        .having(func.count(ImageTagLink.tag_id) == 0)
+    构造查询这些图片关联的每个标签及其关联图片数的 SELECT 语句。
+    image_ids 为图片ID列表，或返回图片ID的子查询 (例如某个类别下的全部图片)。
+    """
+    if not isinstance(image_ids, Select):
+        image_ids = list(image_ids)
+    return (
+        select(ImageTagLink.tag_id, func.count(ImageTagLink.image_id))
+        .where(col(ImageTagLink.image_id).in_(image_ids))
+        .group_by(ImageTagLink.tag_id)
     )
-    unused_tags = session.exec(statement).all()
 
-    # 删除这些标签
-    for tag in unused_tags:
-        session.delete(tag)
 
-    if unused_tags:
-        session.commit()
+def group_tag_ids_by_count(rows: Iterable[Tuple[uuid.UUID, int]]) -> Dict[int, List[uuid.UUID]]:
+    """将 tag_link_counts_statement 的结果按关联图片数分组，关联图片数相同的标签用一条 UPDATE 调整"""
+    tag_ids_by_count: Dict[int, List[uuid.UUID]] = defaultdict(list)
+    for tag_id, count in rows:
+        tag_ids_by_count[count].append(tag_id)
+    return tag_ids_by_count
+
+
+def release_tags_of_images(
+    *, session: Session, image_ids: Union[Iterable[uuid.UUID], Select]
+) -> List[uuid.UUID]:
+    """
+    为即将删除的图片减少其标签的使用次数 (每个标签减去它关联的图片数)。不提交事务。
+
+    参数:
+        session (Session): 数据库会话对象。
+        image_ids: 图片ID列表，或返回图片ID的子查询 (例如某个类别下的全部图片)。
+
+    返回:
+        List[uuid.UUID]: 使用次数减少的标签ID，删除图片后传给 delete_tags_if_unused。
+    """
+    rows = session.exec(tag_link_counts_statement(image_ids)).all()
+    for count, tag_ids in group_tag_ids_by_count(rows).items():
+        adjust_usage_counts(session=session, tag_ids=tag_ids, delta=-count)
+    return [tag_id for tag_id, _ in rows]
+
+
+def delete_unused_tags_statement(tag_ids: List[uuid.UUID]):
+    """构造删除给定标签中使用次数已降为 0 的标签的 DELETE 语句"""
+    return delete(Tag).where(col(Tag.id).in_(tag_ids), Tag.usage_count <= 0)
+
+
+def delete_tags_if_unused(*, session: Session, tag_ids: Iterable[uuid.UUID]) -> None:
+    """
+    删除给定标签中使用次数已降为 0 的标签。只检查这些标签，代价与标签表大小无关。不提交事务。
+
+    参数:
+        session (Session): 数据库会话对象。
+        tag_ids (Iterable[uuid.UUID]): 需要检查的标签 (例如刚被移除关联的标签)。
+    """
+    tag_ids = list(tag_ids)
+    if not tag_ids:
+        return
+    session.exec(delete_unused_tags_statement(tag_ids))
+
+
+def usage_count_reconcile_statement():
+    """
+    构造按关联表重新计算标签使用次数的 UPDATE 语句。
+
+    只更新与实际关联数不一致的标签，不改变 updated_at；数据库结构升级时也用它为已有的标签填充使用次数。
+    """
+    actual_count = (
+        select(func.count(ImageTagLink.image_id))
+        .where(ImageTagLink.tag_id == Tag.id)
+        .scalar_subquery()
+    )
+    return (
+        update(Tag)
+        .where(Tag.usage_count != actual_count)
+        .values(usage_count=actual_count, updated_at=Tag.updated_at)
+    )
+
+
+def reconcile_tag_usage_counts(*, session: Session) -> int:
+    """
+    按关联表重新计算所有标签的使用次数，并删除不再被任何图片使用的标签 (全表扫描，用于定期对账)。
+
+    正常情况下 usage_count 与关联表一致；此函数用于修复直接修改数据库等情况造成的偏差，
+    以及为新增 usage_count 列之前的数据填充初始值。
+
+    参数:
+        session (Session): 数据库会话对象。
+
+    返回:
+        int: 使用次数被修正的标签数量。
+    """
+    result = session.exec(usage_count_reconcile_statement())
+    session.exec(delete(Tag).where(Tag.usage_count <= 0))
+    session.commit()
+    return result.rowcount
@@ -0,0 +1,128 @@
+"""分块上传会话CRUD操作模块
+
+包含针对 UploadSession 和 UploadChunk 模型的数据库增删改查函数。
+分块上传接口都是 async def，这里的函数均基于 AsyncSession。
+"""
+
+from datetime import datetime, timedelta
+from typing import List, Optional
+import uuid
+
+from sqlmodel import delete, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.crud.upsert import upsert_insert
+from app.models import UploadChunk, UploadSession, UploadSessionCreate, UploadSessionRead
+
+
+async def create_upload_session(
+    *, session: AsyncSession, session_in: UploadSessionCreate, chunk_size: int
+) -> UploadSession:
+    """
+    创建一个分块上传会话。
+
+    参数:
+        session (AsyncSession): 异步数据库会话
+        session_in (UploadSessionCreate): 文件名、总大小和图片元数据
+        chunk_size (int): 除最后一块外每块的字节数
+
+    返回:
+        UploadSession: 新建的上传会话
+    """
+    upload_session = UploadSession.model_validate(
+        session_in, update={"chunk_size": chunk_size}
+    )
+    session.add(upload_session)
+    await session.commit()
+    await session.refresh(upload_session)
+    return upload_session
+
+
+async def get_upload_session(
+    *, session: AsyncSession, upload_id: uuid.UUID
+) -> Optional[UploadSession]:
+    """根据ID获取上传会话，不存在时返回None"""
+    return await session.get(UploadSession, upload_id)
+
+
+async def get_received_chunks(*, session: AsyncSession, upload_id: uuid.UUID) -> List[int]:
+    """获取上传会话已写入的块号 (升序)"""
+    statement = (
+        select(UploadChunk.chunk_index)
+        .where(UploadChunk.upload_id == upload_id)
+        .order_by(UploadChunk.chunk_index)
+    )
+    return list((await session.exec(statement)).all())
+
+
+async def read_upload_session(
+    *, session: AsyncSession, upload_session: UploadSession
+) -> UploadSessionRead:
+    """上传会话的状态，包括已写入的块号"""
+    return UploadSessionRead.model_validate(
+        upload_session,
+        update={
+            "received_chunks": await get_received_chunks(
+                session=session, upload_id=upload_session.id
+            )
+        },
+    )
+
+
+async def mark_chunk_received(
+    *, session: AsyncSession, upload_session: UploadSession, chunk_index: int
+) -> UploadSessionRead:
+    """
+    记录一个数据块已写入暂存文件并提交。重复上传同一块是幂等的。
+
+    每个块插入一行 (INSERT ... ON CONFLICT DO NOTHING)，会话的更新时间在 SQL 中直接设置，
+    并发的数据块请求不会互相覆盖已记录的块号。
+
+    参数:
+        session (AsyncSession): 异步数据库会话
+        upload_session (UploadSession): 上传会话
+        chunk_index (int): 块号 (从0开始)
+
+    返回:
+        UploadSessionRead: 更新后的上传会话状态
+    """
+    insert = upsert_insert(session)
+    await session.exec(
+        insert(UploadChunk)
+        .values(upload_id=upload_session.id, chunk_index=chunk_index)
+        .on_conflict_do_nothing()
+    )
+    await session.exec(
+        update(UploadSession)
+        .where(UploadSession.id == upload_session.id)
+        .values(updated_at=datetime.utcnow())
+    )
+    await session.commit()
+    await session.refresh(upload_session)
+    return await read_upload_session(session=session, upload_session=upload_session)
+
+
+async def delete_upload_session(
+    *, session: AsyncSession, upload_session: UploadSession
+) -> None:
+    """删除上传会话记录及其数据块记录 (完成或取消时调用)。不提交事务。"""
+    await session.exec(delete(UploadChunk).where(UploadChunk.upload_id == upload_session.id))
+    await session.delete(upload_session)
+
+
+async def get_expired_upload_sessions(
+    *, session: AsyncSession, max_age: timedelta
+) -> List[UploadSession]:
+    """
+    获取超过 max_age 没有写入任何数据块的上传会话 (客户端已放弃，可以清理)。
+
+    参数:
+        session (AsyncSession): 异步数据库会话
+        max_age (timedelta): 会话的最长空闲时间
+
+    返回:
+        List[UploadSession]: 过期的上传会话
+    """
+    cutoff = datetime.utcnow() - max_age
+    statement = select(UploadSession).where(UploadSession.updated_at < cutoff)
+    return (await session.exec(statement)).all()
@@ -0,0 +1,58 @@
+"""按数据库方言构造 INSERT ... ON CONFLICT 语句的工具模块
+
+ON CONFLICT 不是标准 SQL，SQLAlchemy 只在具体方言的 insert() 上提供 on_conflict_do_nothing /
+on_conflict_do_update。SQLite 和 PostgreSQL 的写法相同，这里按会话绑定的数据库选择对应的 insert()，
+CRUD 函数不必直接依赖某一种方言。其他数据库在应用启动时由 ensure_upsert_supported 拒绝。
+"""
+
+from typing import Callable, Dict, Union
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+_INSERT_BY_DIALECT: Dict[str, Callable] = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def _insert_for_dialect(dialect_name: str) -> Callable:
+    try:
+        return _INSERT_BY_DIALECT[dialect_name]
+    except KeyError:
+        raise NotImplementedError(
+            f"数据库 {dialect_name} 不支持 INSERT ... ON CONFLICT (支持: {', '.join(_INSERT_BY_DIALECT)})"
+        ) from None
+
+
+def ensure_upsert_supported(*engines: Engine) -> None:
+    """
+    在应用启动时检查引擎连接的数据库是否支持 INSERT ... ON CONFLICT，
+    不支持时直接启动失败，而不是等到第一次上传或创建标签时才报错。
+
+    参数:
+        *engines (Engine): 应用使用的数据库引擎 (异步引擎传入其 sync_engine)
+
+    异常:
+        NotImplementedError: 数据库不支持 INSERT ... ON CONFLICT (目前只支持 SQLite 和 PostgreSQL)
+    """
+    for engine in engines:
+        _insert_for_dialect(engine.dialect.name)
+
+
+def upsert_insert(session: Union[Session, AsyncSession]) -> Callable:
+    """
+    返回会话所连接数据库方言的 insert() 构造函数 (支持 ON CONFLICT)。
+
+    参数:
+        session (Session | AsyncSession): 数据库会话对象。
+
+    返回:
+        Callable: sqlalchemy.dialects.<方言>.insert
+
+    异常:
+        NotImplementedError: 数据库不支持 INSERT ... ON CONFLICT (目前只支持 SQLite 和 PostgreSQL)
+    """
+    return _insert_for_dialect(session.get_bind().dialect.name)
@@ -1,10 +1,25 @@
 """数据库连接和会话管理模块
 
 负责初始化SQLModel引擎、创建数据库表以及提供数据库会话依赖。
+同步引擎供线程池中运行的 def 接口和后台任务使用；异步引擎 (aiosqlite) 供 async def 接口使用，
+数据库访问不再阻塞事件循环。
 """
 
+from typing import AsyncIterator
+import logging
+
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.change_versions import track_table_versions
 from app.core.config import settings  # 引入应用配置
+from app.schema_upgrade import upgrade_schema
+from app.slow_query_log import SlowQueryLog
+
+logger = logging.getLogger(__name__)
 
 # 从配置中读取数据库连接URL
 SQLALCHEMY_DATABASE_URL = settings.database_url
@@ -13,19 +28,93 @@ SQLALCHEMY_DATABASE_URL = settings.database_url
 # connect_args 是SQLite特有的配置，用于允许多线程访问 (FastAPI是异步的，可能在不同线程处理请求)
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    echo=True,  # 在控制台打印SQLAlchemy生成的SQL语句，便于调试
+    echo=settings.database_echo,  # 是否在控制台打印SQL语句，默认关闭，调试时通过配置开启
     connect_args={"check_same_thread": False},  # 仅SQLite需要
 )
 
 
-def create_db_and_tables() -> None:
+def to_async_database_url(database_url: str) -> str:
+    """将同步驱动的数据库URL转换为异步驱动的URL (sqlite:// → sqlite+aiosqlite://)"""
+    if database_url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + database_url[len("sqlite://"):]
+    return database_url
+
+
+# 异步数据库引擎，与同步引擎连接同一个数据库
+async_engine = create_async_engine(
+    settings.async_database_url or to_async_database_url(SQLALCHEMY_DATABASE_URL),
+    echo=settings.database_echo,
+)
+
+
+def sqlite_pragmas() -> dict:
+    """根据配置返回每个 SQLite 连接需要设置的 PRAGMA (名称 → 值)"""
+    return {
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "mmap_size": settings.sqlite_mmap_size,
+        "cache_size": settings.sqlite_cache_size,
+        "temp_store": settings.sqlite_temp_store,
+        "busy_timeout": settings.sqlite_busy_timeout,
+    }
+
+
+def configure_sqlite_engine(target_engine: Engine) -> None:
+    """为 SQLite 引擎注册 connect 事件，在每个新建的数据库连接上设置 PRAGMA
+
+    journal_mode 会持久化到数据库文件中，其余 PRAGMA 只对当前连接有效，因此每个连接都要设置。
+    非 SQLite 引擎不做任何处理。
+
+    参数:
+        target_engine (Engine): 要配置的引擎
+    """
+    if target_engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(target_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            # PRAGMA 不支持参数绑定；取值已由 Settings 的类型约束校验
+            for name, value in sqlite_pragmas().items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+configure_sqlite_engine(engine)
+configure_sqlite_engine(async_engine.sync_engine)
+
+# 没有版本号触发器的数据库 (非 SQLite) 在会话提交前递增写入过的表的版本号，条件请求的 ETag 随写入变化
+track_table_versions()
+
+# 慢查询日志：记录每条语句的耗时，超过阈值时输出 JSON 日志，管理接口可查看最慢的语句
+slow_query_log = SlowQueryLog(
+    threshold_ms=settings.slow_query_threshold_ms, top_n=settings.slow_query_top_n
+)
+if settings.slow_query_log_enabled:
+    slow_query_log.attach(engine)
+    slow_query_log.attach(async_engine.sync_engine)
+
+
+def create_db_and_tables(db_engine: Engine = engine) -> None:
     """创建数据库表结构
 
-    根据SQLModel元数据创建所有数据库表。
+    根据SQLModel元数据创建所有数据库表，并将已有的数据库升级到当前模型的结构。
     应在应用启动时（例如在 main.py 中）调用。
+
+    参数:
+        db_engine (Engine): 要初始化的数据库引擎，默认为应用的同步引擎
     """
     # 确保所有模型都已在SQLModel.metadata中注册（通常在models/__init__.py中完成）
-    SQLModel.metadata.create_all(engine)
+    SQLModel.metadata.create_all(db_engine)
+    # create_all 不修改已有的表：先添加后来新增的列并填充数据，索引依赖这些列
+    with db_engine.begin() as connection:
+        upgrade_schema(connection)
+    # create_all 只为新建的表创建索引；为已有的表补建后来新增的索引
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db_engine, checkfirst=True)
 
 
 def get_session() -> Session:
@@ -37,6 +126,10 @@ def get_session() -> Session:
         try:
             yield session
             session.commit()  # 请求正常处理完毕，提交事务
+        except HTTPException:
+            # 404、304 等是正常的 HTTP 响应，不打印堆栈
+            session.rollback()
+            raise
         except Exception:
             import traceback
 
@@ -46,3 +139,24 @@ def get_session() -> Session:
             raise
         finally:
             session.close()  # 无论成功或失败，最终都关闭会话
+
+
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    """依赖注入函数，为 async def 接口提供一个异步数据库会话。
+
+    与 get_session 一样在请求正常结束时提交、异常时回滚。
+    提交后不使对象过期 (expire_on_commit=False)：异步会话中访问过期属性会触发隐式 IO 并报错，
+    而响应序列化发生在提交之后。
+    """
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        try:
+            yield session
+            await session.commit()
+        except HTTPException:
+            # 404、304 等是正常的 HTTP 响应，不记录堆栈
+            await session.rollback()
+            raise
+        except Exception:
+            logger.exception("处理请求时发生异常，异步会话的事务已回滚")
+            await session.rollback()
+            raise
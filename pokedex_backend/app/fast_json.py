@@ -0,0 +1,177 @@
+"""高吞吐 JSON 响应模块
+
+图片列表接口默认返回 ORM 对象，由 FastAPI 按 response_model 逐条校验为 ImageRead (from_attributes)、
+计算 computed_field，再转换为 JSON 兼容的数据并用标准库 json 编码；图片较多时这些步骤占据了大部分响应时间。
+
+开启 settings.fast_json_responses 后，这些接口直接从 ORM 对象的属性构造字典 (数据在写入时已经校验过，
+不再逐条校验)，URL 由缓存的前缀拼接，最后用 orjson 编码。输出与 ImageRead / CategoryReadWithImages 的 JSON 相同。
+
+orjson 是可选依赖：未安装时改用标准库 json 编码 (输出相同，只是编码更慢)，跳过逐条校验的收益仍然保留。
+
+图片列表接口的 fields 参数 (稀疏字段集) 也通过这里序列化：只输出请求的字段，
+查询时只加载这些字段需要的列 (见 image_crud.image_load_options)。
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时用标准库 json 编码
+    orjson = None
+
+from app.models import (
+    Category,
+    CategoryRead,
+    ExifData,
+    Image,
+    ImageRead,
+    TagRead,
+)
+from app.models.image_models import (
+    MISSING_IMAGE_URL,
+    build_image_url,
+    build_rendition_urls,
+    build_srcset,
+    build_thumbnail_url,
+)
+
+# 按 Read 模型的字段顺序直接读取 ORM 属性
+IMAGE_FIELDS = tuple(ImageRead.model_fields)
+TAG_FIELDS = tuple(TagRead.model_fields)
+CATEGORY_FIELDS = tuple(CategoryRead.model_fields)
+
+# fields 参数可以请求的字段：ImageRead 的字段和计算字段
+IMAGE_SELECTABLE_FIELDS = IMAGE_FIELDS + tuple(ImageRead.model_computed_fields)
+
+# 不能从接口的 response 参数复制到最终响应的头 (由响应体决定)
+_BODY_HEADERS = {"content-length", "content-type"}
+
+
+def read_attributes(instance: Any, names: Iterable[str]) -> Dict[str, Any]:
+    """
+    读取 ORM 对象的属性值。
+
+    已加载的属性直接从实例的 __dict__ 读取，绕过 SQLAlchemy 属性描述符 (列表中每张图片有十几个属性，
+    描述符的开销占了构造字典的大部分时间)；未加载或已过期的属性仍通过 getattr 加载。
+    """
+    loaded = instance.__dict__
+    return {name: loaded[name] if name in loaded else getattr(instance, name) for name in names}
+
+
+def exif_to_dict(exif_info: Any) -> Any:
+    """EXIF 信息转换为字典 (从数据库读取时已是 ExifData；刚赋值的对象可能还是字典)"""
+    if exif_info is None:
+        return None
+    if not isinstance(exif_info, ExifData):
+        exif_info = ExifData.model_validate(exif_info)
+    # ExifData 只有字符串字段，__dict__ 与 model_dump() 的结果相同，orjson 可直接编码
+    return exif_info.__dict__
+
+
+def image_url_for(relative_file_path: Optional[str]) -> str:
+    """同 ImageRead.image_url"""
+    return build_image_url(relative_file_path) if relative_file_path else MISSING_IMAGE_URL
+
+
+def thumbnail_url_for(relative_thumbnail_path: Optional[str]) -> Optional[str]:
+    """同 ImageRead.thumbnail_url"""
+    return build_thumbnail_url(relative_thumbnail_path) if relative_thumbnail_path else None
+
+
+def image_to_dict(image: Image) -> Dict[str, Any]:
+    """将图片 ORM 对象转换为与 ImageRead JSON 相同结构的字典 (调用前需已加载 tags)"""
+    data = read_attributes(image, IMAGE_FIELDS)
+    data["exif_info"] = exif_to_dict(data["exif_info"])
+    data["tags"] = [read_attributes(tag, TAG_FIELDS) for tag in data["tags"]]
+    data["image_url"] = image_url_for(data["relative_file_path"])
+    data["thumbnail_url"] = thumbnail_url_for(data["relative_thumbnail_path"])
+    data["rendition_urls"] = build_rendition_urls(data["renditions"])
+    data["srcset"] = build_srcset(data["renditions"])
+    return data
+
+
+def images_to_list(images: Iterable[Image]) -> List[Dict[str, Any]]:
+    """批量转换图片，结构同 List[ImageRead]"""
+    return [image_to_dict(image) for image in images]
+
+
+# 不是直接读取同名列的字段
+_PARTIAL_FIELD_SERIALIZERS: Dict[str, Callable[[Image], Any]] = {
+    "exif_info": lambda image: exif_to_dict(image.exif_info),
+    "tags": lambda image: [read_attributes(tag, TAG_FIELDS) for tag in image.tags],
+    "image_url": lambda image: image_url_for(image.relative_file_path),
+    "thumbnail_url": lambda image: thumbnail_url_for(image.relative_thumbnail_path),
+    "rendition_urls": lambda image: build_rendition_urls(image.renditions),
+    "srcset": lambda image: build_srcset(image.renditions),
+}
+
+
+def parse_image_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    解析图片列表接口的 fields 参数 (逗号分隔的字段名)，保持请求中的顺序并去重。
+
+    异常:
+        HTTPException (400 Bad Request): 包含 ImageRead 中不存在的字段
+    """
+    if fields is None:
+        return None
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in IMAGE_SELECTABLE_FIELDS]
+    if not names or unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"无效的字段: {', '.join(unknown) or fields!r}。"
+            f"可选字段: {', '.join(IMAGE_SELECTABLE_FIELDS)}",
+        )
+    return names
+
+
+def image_to_partial_dict(image: Image, fields: Sequence[str]) -> Dict[str, Any]:
+    """只输出 fields 中的字段 (值与 ImageRead 相同)，不会访问未请求的列"""
+    return {
+        name: (
+            _PARTIAL_FIELD_SERIALIZERS[name](image)
+            if name in _PARTIAL_FIELD_SERIALIZERS
+            else getattr(image, name)
+        )
+        for name in fields
+    }
+
+
+def images_to_partial_list(
+    images: Iterable[Image], fields: Sequence[str]
+) -> List[Dict[str, Any]]:
+    """批量转换图片，只包含 fields 中的字段"""
+    return [image_to_partial_dict(image, fields) for image in images]
+
+
+def category_with_images_to_dict(category: Category, images: Iterable[Image]) -> Dict[str, Any]:
+    """将类别和一页图片转换为与 CategoryReadWithImages JSON 相同结构的字典"""
+    data = read_attributes(category, CATEGORY_FIELDS)
+    data["images"] = images_to_list(images)
+    data["thumbnail_url"] = (
+        build_thumbnail_url(data["thumbnail_path"]) if data["thumbnail_path"] else None
+    )
+    return data
+
+
+def fast_json_response(content: Any, response: Response) -> JSONResponse:
+    """
+    用 orjson 编码响应 (未安装 orjson 时先将 datetime、UUID 等转换为 JSON 兼容的值，再用标准库 json 编码)。
+
+    接口直接返回 Response 时 FastAPI 不再合并依赖和接口通过 response 参数设置的响应头
+    (ETag、X-Next-Cursor 等)，这里把它们复制到新的响应上。
+    """
+    headers = {
+        name: value
+        for name, value in response.headers.items()
+        if name not in _BODY_HEADERS
+    }
+    status_code = response.status_code or 200
+    if orjson is None:
+        return JSONResponse(jsonable_encoder(content), status_code=status_code, headers=headers)
+    return ORJSONResponse(content, status_code=status_code, headers=headers)
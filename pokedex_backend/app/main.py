@@ -4,20 +4,27 @@
 """
 
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path  # 确保导入 Path
 
-from app.database import create_db_and_tables, engine  # 引入数据库初始化函数和引擎
+from app.database import async_engine, create_db_and_tables, engine  # 引入数据库初始化函数和引擎
 from app.routers import categories as categories_router  # 使用别名以匹配指南中的变量名
 from app.routers import images as images_router  # 使用别名以匹配指南中的变量名
 from app.routers import species_info_router
 from app.routers import tags
+from app.routers import admin as admin_router
 from app.models import (
     species_info_models,  # 导入此模块以确保SQLModel元数据包含Species表
     image_models,  # 新增：确保 Image 和 ExifData 模型被加载
 )
+from app.compression import CompressionMiddleware, compressed_body_cache
 from app.core.config import settings
+from app.crud.pagination import NEXT_CURSOR_HEADER
+from app.crud.upsert import ensure_upsert_supported
+from app.services.processing_queue import image_processing_queue
+from app.services.tag_usage_reconciler import tag_usage_reconciler
+from app.services.thumbnail_engine import thumbnail_engine
+from app.static_files import CachingStaticFiles, RenditionStaticFiles
 
 # 在应用启动时创建数据库表 (如果尚不存在)
 # 注意：对于更复杂的迁移管理，应考虑使用 Alembic
@@ -84,6 +91,7 @@ def create_application() -> FastAPI:
                 allow_credentials=True,
                 allow_methods=["*"],
                 allow_headers=["*"],
+                expose_headers=[NEXT_CURSOR_HEADER, "ETag"],  # 允许前端读取分页游标和 ETag
             )
         elif settings.environment == "production":  # processed_origins 为空且在生产环境
             print(
@@ -91,6 +99,21 @@ def create_application() -> FastAPI:
             )
     # else: # backend_cors_origins 未在settings中设置，通常Pydantic会用默认值或报错，这里不额外打印
 
+    # --- 响应压缩 ---
+    if settings.compression_enabled:
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.compression_minimum_size,
+            gzip_level=settings.compression_gzip_level,
+            brotli_quality=settings.compression_brotli_quality,
+            # 图片和缩略图本身已是压缩格式
+            excluded_paths=[
+                f"/{settings.IMAGES_DIR_NAME.strip('/')}",
+                f"/{settings.THUMBNAILS_DIR_NAME.strip('/')}",
+            ],
+            cache=compressed_body_cache if settings.compression_cache_max_bytes > 0 else None,
+        )
+
     # --- 静态文件挂载 ---
     if (
         hasattr(settings, "IMAGES_DIR_NAME")
@@ -99,7 +122,10 @@ def create_application() -> FastAPI:
     ):
         app.mount(
             f"/{settings.IMAGES_DIR_NAME.strip('/')}",
-            StaticFiles(directory=settings.IMAGES_DIR),
+            CachingStaticFiles(
+                directory=settings.IMAGES_DIR,
+                immutable_max_age=settings.static_immutable_max_age,
+            ),
             name="uploaded_images",
         )
     else:
@@ -114,7 +140,10 @@ def create_application() -> FastAPI:
     ):
         app.mount(
             f"/{settings.THUMBNAILS_DIR_NAME.strip('/')}",
-            StaticFiles(directory=settings.THUMBNAILS_DIR),
+            RenditionStaticFiles(
+                directory=settings.THUMBNAILS_DIR,
+                immutable_max_age=settings.static_immutable_max_age,
+            ),
             name="thumbnails",
         )
     else:
@@ -135,6 +164,9 @@ def create_application() -> FastAPI:
         tags=["Species Information"],
     )
     app.include_router(tags.router, prefix=settings.api_v1_prefix, tags=["Tags"])
+    app.include_router(
+        admin_router.router, prefix=settings.api_v1_prefix, tags=["Admin"]
+    )
     return app
 
 
@@ -144,15 +176,33 @@ app = create_application()
 
 @app.on_event("startup")
 def on_startup_revised():
+    # 标签和共享文件引用计数依赖 INSERT ... ON CONFLICT，不支持的数据库直接启动失败
+    ensure_upsert_supported(engine, async_engine.sync_engine)
     create_db_and_tables()  # 确保数据库和表已创建
     print(f"Application startup complete. Environment: {settings.environment}.")
     # CORS 配置日志现在在 create_application 中处理，如果需要确认最终配置，可以在这里添加简单的日志
     # 例如: print(f"CORS middleware added for origins: {app.user_middleware[...]} " if any cors middleware)
 
 
+async def start_background_workers():
+    # 启动图片后处理任务队列，上次未完成或中断的任务会继续执行
+    await image_processing_queue.start()
+    # 配置了对账间隔时，定期按关联表校正标签使用次数
+    await tag_usage_reconciler.start()
+
+
+async def on_shutdown():
+    await image_processing_queue.stop()  # 正在处理的任务在下次启动时重新执行
+    await tag_usage_reconciler.stop()
+    thumbnail_engine.shutdown()  # 关闭缩略图引擎的工作进程
+    await async_engine.dispose()  # 关闭异步引擎的连接池 (aiosqlite 为每个连接维护一个线程)
+
+
 # 清理旧的事件处理器，避免重复执行
 app.router.on_startup = []
 app.add_event_handler("startup", on_startup_revised)
+app.add_event_handler("startup", start_background_workers)
+app.add_event_handler("shutdown", on_shutdown)
 
 
 @app.get("/")
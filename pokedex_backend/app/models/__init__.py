@@ -20,10 +20,14 @@ from .category_models import (
 from .image_models import (
     Image,
     ImageBase,
+    ImageBatchUploadItem,
+    ImageBatchUploadResult,
+    ImageBlob,
     ImageCreate,
     ImageRead,
     ImageUpdate,
     ExifData,
+    IMAGE_COMPUTED_FIELD_COLUMNS,
 )
 from .species_info_models import (
     Species,
@@ -38,9 +42,27 @@ from .tag_models import (
     Tag,
     TagBase,
     TagRead,
+    TagReadWithUsage,
     TagUpdate,
+    normalize_tag_name,
 )
 from .link_models import ImageTagLink
+from .upload_models import (
+    UploadChunk,
+    UploadSession,
+    UploadSessionCreate,
+    UploadSessionRead,
+)
+from .query_stats_models import SlowQueryStat
+from .change_version_models import TableVersion, VERSIONED_TABLES, VERSION_TRIGGER_DIALECTS
+from .job_models import (
+    ImageProcessingJob,
+    ImageProcessingJobRead,
+    PROCESSING_DONE,
+    PROCESSING_FAILED,
+    PROCESSING_PENDING,
+    PROCESSING_RUNNING,
+)
 
 # 解析所有模型导入后的前向引用
 # 这对于使用字符串类型提示（如 List["Image"]）定义的关系至关重要
@@ -49,10 +71,13 @@ Image.model_rebuild()
 ExifData.model_rebuild()
 CategoryReadWithImages.model_rebuild()
 ImageRead.model_rebuild()
+ImageBatchUploadItem.model_rebuild()
+ImageBatchUploadResult.model_rebuild()
 Species.model_rebuild()
 SpeciesRead.model_rebuild()
 Tag.model_rebuild()
 ImageTagLink.model_rebuild()
+UploadSessionRead.model_rebuild()
 
 __all__ = [
     "Category",
@@ -63,10 +88,14 @@ __all__ = [
     "CategoryUpdate",
     "Image",
     "ImageBase",
+    "ImageBatchUploadItem",
+    "ImageBatchUploadResult",
+    "ImageBlob",
     "ImageCreate",
     "ImageRead",
     "ImageUpdate",
     "ExifData",
+    "IMAGE_COMPUTED_FIELD_COLUMNS",
     "Species",
     "SpeciesBase",
     "SpeciesCreate",
@@ -77,6 +106,22 @@ __all__ = [
     "Tag",
     "TagBase",
     "TagRead",
+    "TagReadWithUsage",
     "TagUpdate",
+    "normalize_tag_name",
     "ImageTagLink",
+    "ImageProcessingJob",
+    "ImageProcessingJobRead",
+    "PROCESSING_DONE",
+    "PROCESSING_FAILED",
+    "PROCESSING_PENDING",
+    "PROCESSING_RUNNING",
+    "UploadChunk",
+    "UploadSession",
+    "UploadSessionCreate",
+    "UploadSessionRead",
+    "SlowQueryStat",
+    "TableVersion",
+    "VERSIONED_TABLES",
+    "VERSION_TRIGGER_DIALECTS",
 ]
@@ -5,13 +5,13 @@
 
 from typing import List, Optional
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 from datetime import datetime # 导入 datetime
 import uuid # 导入 uuid
 from pydantic import computed_field # 导入 computed_field
-from app.core.config import settings # 导入 settings
 
 # 延迟导入或使用字符串引用以避免循环导入
-from .image_models import ImageRead
+from .image_models import ImageRead, build_thumbnail_url
 
 class CategoryBase(SQLModel):
     name: str = Field(..., max_length=50, unique=True, index=True, description="类别名称") # 之前缺失 ...
@@ -20,6 +20,7 @@ class CategoryBase(SQLModel):
 
 
 class Category(CategoryBase, table=True):
+    __table_args__ = (Index("ix_category_created_at_id", "created_at", "id"),)  # 游标分页
     # id: Optional[int] = Field(default=None, primary_key=True) # 改为UUID
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True, index=True, nullable=False)
     thumbnail_path: Optional[str] = Field(None, description="存储缩略图的相对路径") # 新增，对应文档数据库模型
@@ -67,13 +68,8 @@ class CategoryRead(CategoryBase):
     @property
     def thumbnail_url(self) -> Optional[str]:
         if self.thumbnail_path:
-            # 假设 settings.server_host 是 "127.0.0.1", settings.server_port 是 8000
-            # settings.THUMBNAILS_DIR_NAME 是 "thumbnails"
-            # self.thumbnail_path 是类似 "category_slug/thumb.jpg"
-            base_url = f"http://{settings.server_host}:{settings.server_port}"
-            thumbnails_segment = settings.THUMBNAILS_DIR_NAME.strip('/')
-            path_segment = self.thumbnail_path.strip('/')
-            return f"{base_url}/{thumbnails_segment}/{path_segment}"
+            # self.thumbnail_path 是类似 "category_slug/thumb.jpg" 的相对缩略图根目录的路径
+            return build_thumbnail_url(self.thumbnail_path)
         return None
 
     class Config:
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""数据变更版本模型模块
+
+每张被跟踪的表在 tableversion 中有一行版本号，由数据库触发器在该表每次插入、更新、删除后递增。
+只在 VERSION_TRIGGER_DIALECTS 中的数据库上创建触发器，其他数据库由 app.change_versions 在会话提交前递增版本号。
+读取接口用版本号生成 ETag，客户端带 If-None-Match 轮询时只需按主键读取几行版本号即可判断数据是否变化。
+"""
+
+from sqlalchemy import event, text
+from sqlmodel import SQLModel, Field
+
+# 由触发器维护版本号的表 (接口响应所依赖的数据)
+VERSIONED_TABLES = ("category", "image", "tag", "imagetaglink")
+
+# 创建版本号触发器的数据库方言
+VERSION_TRIGGER_DIALECTS = ("sqlite",)
+
+# 首次写入时版本号从随机值开始：数据库重建后版本号不会与旧数据库的 ETag 重合
+_BUMP_VERSION_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS tableversion_{table}_{suffix}
+AFTER {operation} ON "{table}"
+BEGIN
+    INSERT INTO tableversion (table_name, version)
+    VALUES ('{table}', abs(random() % 1000000000))
+    ON CONFLICT (table_name) DO UPDATE SET version = version + 1;
+END
+"""
+
+
+class TableVersion(SQLModel, table=True):
+    """表数据的变更版本号 (由触发器或会话提交前的钩子写入)"""
+
+    table_name: str = Field(primary_key=True, max_length=64, description="表名")
+    version: int = Field(default=0, nullable=False, description="每次写入后递增的版本号")
+
+
+@event.listens_for(SQLModel.metadata, "after_create")
+def create_version_triggers(target, connection, **kwargs) -> None:
+    """create_all 之后为被跟踪的表创建触发器 (已存在的触发器不会重复创建，已有数据库启动时也会补建)"""
+    if connection.dialect.name not in VERSION_TRIGGER_DIALECTS:
+        return
+    for table in VERSIONED_TABLES:
+        for operation in ("INSERT", "UPDATE", "DELETE"):
+            statement = _BUMP_VERSION_TRIGGER.format(
+                table=table, operation=operation, suffix=operation.lower()
+            )
+            connection.execute(text(statement))
@@ -4,10 +4,12 @@
 """
 
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, Tuple
 from sqlmodel import SQLModel, Field, Relationship, Column, JSON
 import uuid
 from pydantic import computed_field
+from sqlalchemy import Index
 from sqlalchemy.types import TypeDecorator, JSON as SQLAlchemyJSON
 
 from app.core.config import settings
@@ -15,6 +17,7 @@ from app.core.config import settings
 # Import Tag and TagRead for relationships and schema definitions
 from .tag_models import Tag, TagRead
 from .link_models import ImageTagLink
+from .job_models import PROCESSING_DONE
 
 # 避免循环导入，CategoryRead 在需要时以字符串形式提示，或按需导入
 # from app.models.category_models import CategoryRead
@@ -88,8 +91,9 @@ class ImageBase(SQLModel):
 
     title: Optional[str] = Field(None, max_length=255, description="图片标题")
     original_filename: Optional[str] = Field(None, description="用户上传时的原始文件名")
+    # 内容寻址存储模式下，内容相同的多条图片记录共享同一个存储文件名，因此不设唯一约束
     stored_filename: Optional[str] = Field(
-        None, unique=True, index=True, description="服务器存储的UUID文件名"
+        None, index=True, description="服务器存储的UUID (或内容摘要) 文件名"
     )
     relative_file_path: Optional[str] = Field(
         None, description="相对于图片存储根目录的路径"
@@ -99,7 +103,14 @@ class ImageBase(SQLModel):
     )
     mime_type: Optional[str] = Field(None, description="如 image/jpeg")
     size_bytes: Optional[int] = Field(None, description="文件大小")
+    content_digest: Optional[str] = Field(
+        None, max_length=64, index=True, description="内容寻址存储模式下文件内容的SHA-256摘要"
+    )
     description: Optional[str] = Field(None, max_length=500, description="图片描述")
+    processing_status: str = Field(
+        default=PROCESSING_DONE,
+        description="上传后处理 (缩略图、EXIF) 的状态: pending / processing / done / failed",
+    )
     # category_id 将在 Image (DB model) 和 ImageRead 中定义，并使用 uuid.UUID
     # exif_info 将在 Image (DB model), ImageCreate 和 ImageRead 中定义
 
@@ -107,6 +118,12 @@ class ImageBase(SQLModel):
 class Image(ImageBase, table=True):
     """图片数据库表模型"""
 
+    # 列表按 (created_at, id) 排序并用游标分页，复合索引使任意深度的翻页都是一次索引定位
+    __table_args__ = (
+        Index("ix_image_created_at_id", "created_at", "id"),
+        Index("ix_image_category_id_created_at_id", "category_id", "created_at", "id"),
+    )
+
     id: uuid.UUID = Field(
         default_factory=uuid.uuid4, primary_key=True, index=True, nullable=False
     )
@@ -133,19 +150,44 @@ class Image(ImageBase, table=True):
         description="结构化的EXIF信息"
     )
 
+    renditions: Optional[Dict[str, Dict[str, Any]]] = Field(
+        default=None,
+        sa_column=Column(JSON),
+        description="响应式图片的尺寸档位: 名称 → {path (相对缩略图根目录), width, height}",
+    )
+
     category_id: uuid.UUID = Field(
         foreign_key="category.id", index=True, description="所属类别ID"
     )
     category: Optional["Category"] = Relationship(back_populates="images")
 
+    # 客户端为每个文件生成的幂等键：重试时已创建的图片直接返回，不会重复创建
+    upload_key: Optional[str] = Field(
+        default=None, max_length=64, unique=True, index=True, description="上传幂等键"
+    )
+
     # Add relationship to Tag model
+    # 默认延迟加载：需要标签的查询显式使用 selectinload(Image.tags)，
+    # 避免不需要标签的查询 (删除、后处理、统计等) 也额外加载
     tags: List["Tag"] = Relationship(
         back_populates="images",
         link_model=ImageTagLink,
-        sa_relationship_kwargs={"lazy": "selectin"},
     )
 
 
+class ImageBlob(SQLModel, table=True):
+    """内容寻址存储模式下物理文件的引用计数表
+
+    多条 Image 记录可以共享同一份原图和缩略图文件 (以内容摘要标识)，
+    ref_count 记录引用该文件的图片数量，只有最后一条引用被删除时才删除物理文件。
+    """
+
+    content_digest: str = Field(
+        primary_key=True, max_length=64, description="文件内容的SHA-256摘要"
+    )
+    ref_count: int = Field(default=0, nullable=False, description="引用此文件的图片数量")
+
+
 class ImageCreate(SQLModel):
     """创建新图片时，API端点可能接收的元数据 (文件本身是 UploadFile)
     或者服务层用于聚合数据的模型。
@@ -166,10 +208,69 @@ class ImageCreate(SQLModel):
     )
     mime_type: str = Field(description="如 image/jpeg")
     size_bytes: int = Field(description="文件大小")
+    content_digest: Optional[str] = Field(
+        default=None, description="内容寻址存储模式下文件内容的SHA-256摘要"
+    )
     file_metadata: Optional[Dict[str, Any]] = Field(
         default=None, description="图片文件元数据，例如 EXIF 信息"
     )
     exif_info: Optional[ExifData] = Field(default=None, description="结构化的EXIF信息")
+    renditions: Optional[Dict[str, Dict[str, Any]]] = Field(
+        default=None, description="响应式图片的尺寸档位"
+    )
+    upload_key: Optional[str] = Field(default=None, description="客户端提供的上传幂等键")
+    processing_status: str = Field(
+        default=PROCESSING_DONE, description="上传后处理的状态，异步处理时为 pending"
+    )
+
+
+# relative_file_path 为空时 image_url 返回的占位值
+MISSING_IMAGE_URL = "default_image_url_if_path_is_none"
+
+
+@lru_cache(maxsize=16)
+def static_url_prefix(server_host: str, server_port: int, dir_name: str) -> str:
+    """静态文件挂载点的URL前缀 (以 / 结尾)；列表中每张图片都要拼接多个URL，前缀只构造一次"""
+    return f"http://{server_host}:{server_port}/{dir_name.strip('/')}/"
+
+
+def build_image_url(relative_path: str) -> str:
+    """根据相对于图片存储根目录的路径构造原图的访问URL"""
+    return static_url_prefix(
+        settings.server_host, settings.server_port, settings.IMAGES_DIR_NAME
+    ) + relative_path.strip("/")
+
+
+def build_thumbnail_url(relative_path: str) -> str:
+    """根据相对于缩略图存储根目录的路径构造缩略图 (及其他尺寸档位) 的访问URL"""
+    return static_url_prefix(
+        settings.server_host, settings.server_port, settings.THUMBNAILS_DIR_NAME
+    ) + relative_path.strip("/")
+
+
+def build_rendition_urls(renditions: Optional[Dict[str, Dict[str, Any]]]) -> Dict[str, str]:
+    """各尺寸档位的访问URL (名称 → URL)"""
+    return {
+        name: build_thumbnail_url(rendition["path"])
+        for name, rendition in (renditions or {}).items()
+    }
+
+
+def build_srcset(renditions: Optional[Dict[str, Dict[str, Any]]]) -> Optional[str]:
+    """由尺寸档位构造 <img srcset> 字符串，没有尺寸档位时为None"""
+    if not renditions:
+        return None
+    ordered = sorted(renditions.values(), key=lambda r: r["width"])
+    return ", ".join(f"{build_thumbnail_url(r['path'])} {r['width']}w" for r in ordered)
+
+
+# ImageRead 的计算字段 → 计算所需的列 (只返回部分字段时据此决定需要从数据库加载哪些列)
+IMAGE_COMPUTED_FIELD_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "image_url": ("relative_file_path",),
+    "thumbnail_url": ("relative_thumbnail_path",),
+    "rendition_urls": ("renditions",),
+    "srcset": ("renditions",),
+}
 
 
 class ImageRead(ImageBase):
@@ -181,32 +282,60 @@ class ImageRead(ImageBase):
     updated_at: Optional[datetime] = None
     file_metadata: Optional[Dict[str, Any]] = None
     exif_info: Optional[ExifData] = None
+    renditions: Optional[Dict[str, Dict[str, Any]]] = None
     tags: List["TagRead"] = Field(default_factory=list)
 
     @computed_field
     @property
     def image_url(self) -> str:
         if self.relative_file_path:
-            # 确保 IMAGES_DIR_NAME 不以斜杠开头（如果 settings.server_host 已包含尾部斜杠，则需要调整）
-            # 假设 settings.server_host 是类似 "http://localhost:8000"
-            return f"http://{settings.server_host}:{settings.server_port}/{settings.IMAGES_DIR_NAME.strip('/')}/{self.relative_file_path.strip('/')}"
+            return build_image_url(self.relative_file_path)
         # 根据实际情况，如果 relative_file_path 为 None，可能需要返回一个默认图片URL或抛出错误
         # 但 ImageRead 的 image_url 是非可选的，因此这里假设 relative_file_path 总是有效
         # 如果 self.relative_file_path 可以为 None，则 image_url 应该定义为 Optional[str]
         # 或者在这里提供一个默认的 "image not found" URL
-        return "default_image_url_if_path_is_none"  # 应当有更好的处理
+        return MISSING_IMAGE_URL  # 应当有更好的处理
 
     @computed_field
     @property
     def thumbnail_url(self) -> Optional[str]:
         if self.relative_thumbnail_path:
-            return f"http://{settings.server_host}:{settings.server_port}/{settings.THUMBNAILS_DIR_NAME.strip('/')}/{self.relative_thumbnail_path.strip('/')}"
+            return build_thumbnail_url(self.relative_thumbnail_path)
         return None
 
+    @computed_field
+    @property
+    def rendition_urls(self) -> Dict[str, str]:
+        """各尺寸档位的访问URL (名称 → URL)"""
+        return build_rendition_urls(self.renditions)
+
+    @computed_field
+    @property
+    def srcset(self) -> Optional[str]:
+        """可直接用于 <img srcset> 的字符串 (按宽度从小到大，例如 "..._thumb.jpg 256w, ..._medium.jpg 1024w")"""
+        return build_srcset(self.renditions)
+
     class Config:
         from_attributes = True
 
 
+class ImageBatchUploadItem(SQLModel):
+    """批量上传中单个文件的处理结果"""
+
+    filename: Optional[str] = Field(default=None, description="上传时的原始文件名")
+    image: Optional[ImageRead] = Field(default=None, description="创建成功的图片，失败时为None")
+    error: Optional[str] = Field(default=None, description="失败原因，成功时为None")
+
+
+class ImageBatchUploadResult(SQLModel):
+    """批量上传的汇总结果 (results 与请求中文件的顺序一致)"""
+
+    category_id: uuid.UUID
+    uploaded: int = Field(description="成功创建的图片数量")
+    failed: int = Field(description="失败的文件数量")
+    results: List[ImageBatchUploadItem] = Field(default_factory=list)
+
+
 class ImageUpdate(SQLModel):
     """更新图片元数据时使用的模型"""
 
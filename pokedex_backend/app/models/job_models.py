@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""后台任务数据模型模块
+
+定义上传后处理 (缩略图、尺寸档位、EXIF) 任务的持久化队列表和API Schema
+"""
+
+from datetime import datetime
+from typing import Optional
+from sqlmodel import SQLModel, Field
+import uuid
+
+# 图片和任务共用的处理状态
+PROCESSING_PENDING = "pending"  # 已入队，等待工作协程领取
+PROCESSING_RUNNING = "processing"  # 正在处理 (应用重启后会被重新置为 pending)
+PROCESSING_DONE = "done"
+PROCESSING_FAILED = "failed"  # 超过最大尝试次数仍失败
+
+
+class ImageProcessingJobBase(SQLModel):
+    """图片后处理任务基础模型"""
+
+    image_id: uuid.UUID = Field(
+        foreign_key="image.id", index=True, description="待处理的图片ID"
+    )
+    status: str = Field(
+        default=PROCESSING_PENDING,
+        index=True,
+        description="任务状态: pending / processing / done / failed",
+    )
+    attempts: int = Field(default=0, nullable=False, description="已尝试处理的次数")
+    last_error: Optional[str] = Field(
+        default=None, max_length=1000, description="最近一次失败的错误信息"
+    )
+    set_as_category_thumbnail: bool = Field(
+        default=False, description="处理完成后是否将缩略图设为类别缩略图"
+    )
+
+
+class ImageProcessingJob(ImageProcessingJobBase, table=True):
+    """图片后处理任务数据库表模型 (持久化的任务队列，重启后未完成的任务继续执行)"""
+
+    id: uuid.UUID = Field(
+        default_factory=uuid.uuid4, primary_key=True, index=True, nullable=False
+    )
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow, nullable=False, description="入队时间"
+    )
+    updated_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        nullable=False,
+        sa_column_kwargs={"onupdate": datetime.utcnow},
+        description="最后更新时间",
+    )
+
+
+class ImageProcessingJobRead(ImageProcessingJobBase):
+    """读取任务状态时使用的模型"""
+
+    id: uuid.UUID
+    created_at: datetime
+    updated_at: datetime
@@ -5,11 +5,15 @@
 """
 
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
 import uuid
 
 
 class ImageTagLink(SQLModel, table=True):
     """图片和标签之间的多对多关系链接表"""
 
+    # 主键 (image_id, tag_id) 只能按图片查找；按标签查图片 (标签搜索、标签是否仍被使用) 使用此索引
+    __table_args__ = (Index("ix_imagetaglink_tag_id_image_id", "tag_id", "image_id"),)
+
     image_id: uuid.UUID = Field(default=None, primary_key=True, foreign_key="image.id")
     tag_id: uuid.UUID = Field(default=None, primary_key=True, foreign_key="tag.id")
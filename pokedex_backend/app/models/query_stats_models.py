@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""SQL 查询统计模型模块
+
+定义慢查询统计的 API Schema (只在内存中维护，不对应数据库表)
+"""
+
+from datetime import datetime
+from typing import Optional
+from sqlmodel import SQLModel, Field
+from pydantic import computed_field
+
+
+class SlowQueryStat(SQLModel):
+    """同一语句指纹的执行耗时统计"""
+
+    fingerprint: str = Field(description="去掉字面量和参数列表长度差异后的语句")
+    count: int = Field(default=0, description="记录到的执行次数")
+    total_ms: float = Field(default=0.0, description="累计耗时 (毫秒)")
+    max_ms: float = Field(default=0.0, description="最长一次耗时 (毫秒)")
+    last_ms: float = Field(default=0.0, description="最近一次耗时 (毫秒)")
+    last_row_count: Optional[int] = Field(
+        default=None, description="最近一次影响的行数 (SELECT 在执行时无法得知，为None)"
+    )
+    last_seen: datetime = Field(default_factory=datetime.utcnow, description="最近一次执行时间")
+
+    @computed_field
+    @property
+    def avg_ms(self) -> float:
+        return self.total_ms / self.count if self.count else 0.0
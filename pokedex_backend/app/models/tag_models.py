@@ -7,6 +7,7 @@
 from datetime import datetime
 from typing import Optional, List, TYPE_CHECKING
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 import uuid
 
 if TYPE_CHECKING:
@@ -16,6 +17,11 @@ if TYPE_CHECKING:
 from .link_models import ImageTagLink
 
 
+def normalize_tag_name(name: str) -> str:
+    """标签名称的规范形式 (去除首尾空白并转为小写)，名称比较和唯一性都基于此形式"""
+    return name.strip().lower()
+
+
 class TagBase(SQLModel):
     """标签基础模型"""
 
@@ -25,9 +31,16 @@ class TagBase(SQLModel):
 class Tag(TagBase, table=True):
     """标签数据库表模型"""
 
+    __table_args__ = (Index("ix_tag_created_at_id", "created_at", "id"),)  # 游标分页
+
     id: uuid.UUID = Field(
         default_factory=uuid.uuid4, primary_key=True, index=True, nullable=False
     )
+    # normalize_tag_name(name)：忽略大小写的查找走这一列的唯一索引 (lower(name) 无法使用索引)，
+    # 并发创建同名 (仅大小写不同) 的标签时由唯一约束保证只有一个成功
+    name_normalized: str = Field(
+        max_length=100, unique=True, index=True, nullable=False, description="规范化的标签名称"
+    )
     created_at: datetime = Field(
         default_factory=datetime.utcnow, nullable=False, description="创建日期"
     )
@@ -37,12 +50,17 @@ class Tag(TagBase, table=True):
         sa_column_kwargs={"onupdate": datetime.utcnow},
         description="最后更新日期",
     )
+    # 随图片标签关联的增删在同一事务中增减，降为 0 的标签随即删除；
+    # tag_crud.reconcile_tag_usage_counts 可按关联表重新计算 (定期对账)
+    usage_count: int = Field(
+        default=0, nullable=False, description="使用该标签的图片数量"
+    )
 
     # Relationship to Image through ImageTagLink
+    # 默认延迟加载：常用标签关联成千上万张图片，查询标签时不应顺带加载它们
     images: List["Image"] = Relationship(
         back_populates="tags",
         link_model=ImageTagLink,
-        sa_relationship_kwargs={"lazy": "selectin"},
     )
 
 
@@ -54,6 +72,12 @@ class TagRead(TagBase):
     updated_at: datetime
 
 
+class TagReadWithUsage(TagRead):
+    """标签列表使用的模型，附带使用该标签的图片数量 (Tag.usage_count)"""
+
+    usage_count: int = Field(default=0, description="使用该标签的图片数量")
+
+
 class TagUpdate(SQLModel):
     """更新标签信息时使用的模型"""
 
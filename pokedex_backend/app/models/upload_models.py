@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""可续传上传数据模型模块
+
+定义分块上传会话的数据库表模型和API Schema
+"""
+
+from datetime import datetime
+from typing import List, Optional
+from sqlmodel import SQLModel, Field
+from pydantic import computed_field
+import uuid
+
+
+class UploadSessionBase(SQLModel):
+    """分块上传会话基础模型 (finalize 时用于创建图片记录的元数据)"""
+
+    category_id: uuid.UUID = Field(foreign_key="category.id", description="图片所属的类别ID")
+    filename: str = Field(max_length=255, description="原始文件名 (用于确定扩展名)")
+    size_bytes: int = Field(gt=0, description="文件总字节数")
+    title: Optional[str] = Field(default=None, max_length=255, description="图片标题")
+    description: Optional[str] = Field(default=None, max_length=500, description="图片描述")
+    tags: Optional[str] = Field(default=None, description="逗号分隔的标签字符串")
+    set_as_category_thumbnail: bool = Field(
+        default=False, description="处理完成后是否设为类别缩略图"
+    )
+
+
+class UploadSession(UploadSessionBase, table=True):
+    """分块上传会话数据库表模型
+
+    数据块直接写入暂存目录下的暂存文件 (按块号计算偏移)，UploadChunk 记录已写入的块号，
+    服务重启后客户端仍可查询缺失的块并继续上传。
+    """
+
+    id: uuid.UUID = Field(
+        default_factory=uuid.uuid4, primary_key=True, index=True, nullable=False
+    )
+    chunk_size: int = Field(description="除最后一块外每块的字节数 (创建会话时由服务端确定)")
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow, nullable=False, description="创建时间"
+    )
+    updated_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        nullable=False,
+        sa_column_kwargs={"onupdate": datetime.utcnow},
+        description="最后一次写入数据块的时间",
+    )
+
+
+class UploadChunk(SQLModel, table=True):
+    """分块上传会话中已写入暂存文件的数据块
+
+    每个块一行，主键 (upload_id, chunk_index) 保证重复上传同一块是幂等的；
+    并发的数据块请求各自插入一行，不会像在会话上读-改-写一个 JSON 列表那样丢失更新。
+    """
+
+    upload_id: uuid.UUID = Field(primary_key=True, foreign_key="uploadsession.id")
+    chunk_index: int = Field(primary_key=True, description="块号 (从0开始)")
+
+
+class UploadSessionCreate(UploadSessionBase):
+    """创建分块上传会话时的请求体"""
+
+
+class UploadSessionRead(SQLModel):
+    """分块上传会话的状态 (客户端据此决定还需要上传哪些块)"""
+
+    id: uuid.UUID
+    filename: str
+    size_bytes: int
+    chunk_size: int
+    received_chunks: List[int] = Field(default_factory=list)
+    created_at: datetime
+    updated_at: datetime
+
+    @computed_field
+    @property
+    def chunk_count(self) -> int:
+        return -(-self.size_bytes // self.chunk_size)
+
+    @computed_field
+    @property
+    def missing_chunks(self) -> List[int]:
+        received = set(self.received_chunks)
+        return [index for index in range(self.chunk_count) if index not in received]
+
+    @computed_field
+    @property
+    def received_bytes(self) -> int:
+        last_index = self.chunk_count - 1
+        return sum(
+            self.size_bytes - last_index * self.chunk_size
+            if index == last_index
+            else self.chunk_size
+            for index in set(self.received_chunks)
+        )
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""管理接口路由模块
+
+提供运维用的诊断信息 (慢查询统计等) 和维护操作 (标签使用次数对账)。
+"""
+
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query, Response, status
+from sqlmodel import Session
+
+from app.crud import tag_crud
+from app.database import get_session, slow_query_log
+from app.models import SlowQueryStat
+
+router = APIRouter(prefix="/admin", tags=["管理"])
+
+
+@router.get("/slow-queries/", response_model=List[SlowQueryStat], summary="查看最慢的SQL语句")
+def get_slow_queries(
+    limit: Optional[int] = Query(None, ge=1, description="最多返回的语句数"),
+):
+    """
+    返回进程启动 (或上次清空) 以来最慢的SQL语句指纹及其耗时统计，按最长耗时降序排列。
+
+    统计只保存在当前进程的内存中，多进程部署时每个进程各自统计。
+    """
+    return slow_query_log.top(limit)
+
+
+@router.delete(
+    "/slow-queries/", status_code=status.HTTP_204_NO_CONTENT, summary="清空慢查询统计"
+)
+def reset_slow_queries():
+    """清空内存中的慢查询统计 (例如在调整索引后重新观察)"""
+    slow_query_log.reset()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post("/tag-usage/reconcile/", summary="按关联表重新计算标签使用次数")
+def reconcile_tag_usage(session: Session = Depends(get_session)):
+    """
+    按图片标签关联表重新计算所有标签的使用次数，并删除不再被任何图片使用的标签。
+
+    使用次数平时随关联增删增量维护，此操作为全表扫描，用于修复偏差
+    (例如直接修改了数据库) 或为升级前的数据填充初始值。
+    """
+    corrected = tag_crud.reconcile_tag_usage_counts(session=session)
+    return {"corrected": corrected}
@@ -3,13 +3,24 @@
 提供与图片类别相关的HTTP接口，包括创建、查询、更新和删除类别。
 """
 
-from typing import List, Optional
+from typing import Iterator, List, Optional, Union
 import uuid
 
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Depends, HTTPException, status, Response, Query
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.database import get_session
+from app.conditional_get import conditional_get
+from app.core.config import settings
+from app.database import get_async_session, get_session
+from app.fast_json import (
+    category_with_images_to_dict,
+    fast_json_response,
+    images_to_list,
+    images_to_partial_list,
+    parse_image_fields,
+)
 from app.models import (
     Category,
     CategoryCreate,
@@ -18,9 +29,10 @@ from app.models import (
     CategoryUpdate,
     ImageRead,
 )
+from app.crud import async_category_crud
 from app.crud import category_crud
 from app.crud import image_crud
-from app.utils import run_sync
+from app.crud.pagination import set_next_cursor_header
 
 router = APIRouter(
     prefix="/categories",
@@ -57,35 +69,72 @@ def create_category(
     return created_category
 
 
-@router.get("/", response_model=List[CategoryRead], summary="获取所有类别列表")
+@router.get(
+    "/",
+    response_model=List[CategoryRead],
+    summary="获取所有类别列表",
+    dependencies=[conditional_get("category")],
+)
 def read_categories(
-    *, session: Session = Depends(get_session), skip: int = 0, limit: int = 100
+    *,
+    session: Session = Depends(get_session),
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 中的游标"),
+    response: Response,
 ) -> List[Category]:
     """
-    检索所有图片类别，支持分页。
+    检索所有图片类别，按创建时间排序，支持 skip/limit 或游标分页。
     """
     categories = category_crud.get_all_categories(
-        session=session, skip=skip, limit=limit
+        session=session, skip=skip, limit=limit, cursor=cursor
     )
+    set_next_cursor_header(response, categories, limit)
     return categories
 
 
 @router.get(
     "/{category_id}/",
     response_model=CategoryReadWithImages,
-    summary="获取特定类别及其图片",
+    summary="获取特定类别及其第一页图片",
+    dependencies=[conditional_get("category", "image", "tag", "imagetaglink")],
 )
 def read_category_with_images(
-    *, session: Session = Depends(get_session), category_id: uuid.UUID
-) -> CategoryReadWithImages:
+    *,
+    session: Session = Depends(get_session),
+    category_id: uuid.UUID,
+    images_limit: int = Query(50, ge=1, le=500, description="返回的最大图片数"),
+    images_cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 中的游标"),
+    response: Response,
+) -> Union[CategoryReadWithImages, Response]:
     """
-    根据ID获取一个特定类别及其包含的所有图片的元数据。
+    根据ID获取一个特定类别及其一页图片的元数据 (按上传时间排序)。
+    类别还有更多图片时，响应头 X-Next-Cursor 返回下一页的游标，
+    可传给本接口的 images_cursor 或 /{category_id}/images/ 的 cursor 继续获取；
+    需要全部图片时使用 /{category_id}/images/stream/。
     """
+    if settings.fast_json_responses:
+        page = category_crud.get_category_and_image_page(
+            session=session,
+            category_id=category_id,
+            images_limit=images_limit,
+            images_cursor=images_cursor,
+        )
+        if page is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="类别未找到")
+        category_db, images = page
+        set_next_cursor_header(response, images, images_limit)
+        return fast_json_response(category_with_images_to_dict(category_db, images), response)
+
     db_category = category_crud.get_category_with_images_by_id(
-        session=session, category_id=category_id
+        session=session,
+        category_id=category_id,
+        images_limit=images_limit,
+        images_cursor=images_cursor,
     )
     if not db_category:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="类别未找到")
+    set_next_cursor_header(response, db_category.images, images_limit)
     return db_category
 
 
@@ -130,7 +179,7 @@ def update_category(
     "/{category_id}/", status_code=status.HTTP_204_NO_CONTENT, summary="删除特定类别"
 )
 async def delete_category(
-    *, session: Session = Depends(get_session), category_id: uuid.UUID
+    *, session: AsyncSession = Depends(get_async_session), category_id: uuid.UUID
 ):
     """
     删除指定ID的类别。
@@ -140,14 +189,14 @@ async def delete_category(
     在执行删除前，会首先检查类别是否存在。
     """
     # 检查类别是否存在
-    db_category = await run_sync(
-        category_crud.get_category_by_id, session=session, category_id=category_id
+    db_category = await async_category_crud.get_category_by_id(
+        session=session, category_id=category_id
     )
     if not db_category:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="类别未找到")
 
     # 执行删除操作，CRUD函数中已包含完整的级联删除逻辑
-    await category_crud.delete_category(session=session, category_id=category_id)
+    await async_category_crud.delete_category(session=session, category_id=category_id)
 
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
@@ -155,13 +204,22 @@ async def delete_category(
 @router.get("/{category_id}/images/", response_model=List[ImageRead])
 def get_images_in_category(
     category_id: uuid.UUID,
+    response: Response,
     session: Session = Depends(get_session),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 中的游标"),
+    fields: Optional[str] = Query(
+        None,
+        description="只返回这些字段 (逗号分隔，例如 id,title,thumbnail_url)；未请求的列不会从数据库加载",
+    ),
 ):
     """
-    获取指定类别下的所有图片 (支持分页)。
+    获取指定类别下的所有图片 (按上传时间排序，支持 skip/limit 或游标分页)。
+    大类别的无限滚动应使用游标：响应头 X-Next-Cursor 返回下一页的游标，翻页代价不随深度增长。
+    画廊网格只需要少数字段时可用 fields 参数 (例如 fields=id,title,thumbnail_url) 减小响应。
     """
+    image_fields = parse_image_fields(fields)
     # 首先校验类别是否存在
     db_category = category_crud.get_category_by_id(
         session=session, category_id=category_id
@@ -171,6 +229,49 @@ def get_images_in_category(
 
     # 获取该类别下的图片
     images = image_crud.get_images_by_category_id(
-        session=session, category_id=category_id, skip=skip, limit=limit
+        session=session,
+        category_id=category_id,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        fields=image_fields,
     )
+    set_next_cursor_header(response, images, limit)
+    if image_fields is not None:
+        return fast_json_response(images_to_partial_list(images, image_fields), response)
+    if settings.fast_json_responses:
+        return fast_json_response(images_to_list(images), response)
     return images
+
+
+@router.get(
+    "/{category_id}/images/stream/",
+    response_class=StreamingResponse,
+    summary="以 NDJSON 流式返回类别下的全部图片",
+)
+def stream_images_in_category(
+    category_id: uuid.UUID,
+    session: Session = Depends(get_session),
+    batch_size: int = Query(200, ge=1, le=1000, description="每次查询读取的图片数"),
+) -> StreamingResponse:
+    """
+    以 NDJSON (每行一个 ImageRead JSON 对象) 流式返回指定类别下的全部图片。
+    服务端按游标逐批查询并立即输出，内存占用与类别大小无关，适合导出等需要完整列表的场景。
+    """
+    db_category = category_crud.get_category_by_id(
+        session=session, category_id=category_id
+    )
+    if not db_category:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="类别未找到")
+
+    # 依赖注入的会话在响应开始发送前就会关闭，流式输出使用同一引擎上的独立会话
+    bind = session.get_bind()
+
+    def ndjson_lines() -> Iterator[str]:
+        with Session(bind) as stream_session:
+            for image in image_crud.iter_images_by_category_id(
+                session=stream_session, category_id=category_id, batch_size=batch_size
+            ):
+                yield ImageRead.model_validate(image).model_dump_json() + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
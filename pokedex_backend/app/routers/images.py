@@ -3,12 +3,11 @@
 提供与图片资源相关的HTTP接口，包括图片上传、元数据管理和删除。
 """
 
-from typing import List, Optional
-from pathlib import Path
+from datetime import timedelta
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 import asyncio
-import aiofiles.os as aio_os
+import logging
 import uuid
-import exifread
 
 from fastapi import (
     APIRouter,
@@ -20,24 +19,49 @@ from fastapi import (
     Form,
     Response,
     Query,
+    Request,
 )
 from sqlmodel import Session
-
-from app.database import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.conditional_get import conditional_get
+from app.database import get_async_session, get_session
+from app.fast_json import (
+    fast_json_response,
+    images_to_list,
+    images_to_partial_list,
+    parse_image_fields,
+)
 from app.models import (
+    ImageBatchUploadItem,
+    ImageBatchUploadResult,
     ImageCreate,
     ImageRead,
     ImageUpdate,
+    ImageProcessingJobRead,
     Category,
-    ExifData,
     Image,
     Tag,
+    PROCESSING_DONE,
+    PROCESSING_PENDING,
+    UploadSession,
+    UploadSessionCreate,
+    UploadSessionRead,
+)
+from app.crud import (
+    async_category_crud,
+    async_image_crud,
+    image_crud,
+    job_crud,
+    tag_crud,
+    upload_crud,
 )
-from app.crud import image_crud, category_crud, tag_crud
-from app.services.file_storage_service import FileStorageService  # 假设服务已实现
-from app.services.image_processing_service import (
-    ImageProcessingService,
-)  # 假设服务已实现
+from app.services.file_storage_service import (  # 假设服务已实现
+    FileStorageService,
+    StoredUpload,
+)
+from app.crud.pagination import set_next_cursor_header
+from app.services.processing_queue import image_processing_queue
 from app.core.config import settings
 
 router = APIRouter(
@@ -48,7 +72,9 @@ router = APIRouter(
 
 # 服务实例化 (后续可考虑通过依赖注入)
 file_storage = FileStorageService()
-image_processor = ImageProcessingService()
+logger = logging.getLogger(__name__)
+# 缩略图和EXIF由后台任务队列处理，与队列共用同一个图像处理服务
+image_processor = image_processing_queue.image_processor
 
 
 @router.post(
@@ -59,7 +85,7 @@ image_processor = ImageProcessingService()
 )
 async def upload_image(
     *,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     file: UploadFile = File(..., description="要上传的图片文件"),
     category_id: uuid.UUID = Form(..., description="图片所属的类别ID"),
     title: Optional[str] = Form(None, description="图片的可选标题"),
@@ -68,35 +94,42 @@ async def upload_image(
     set_as_category_thumbnail: Optional[bool] = Form(
         False, description="是否将此图片设置为类别的缩略图"
     ),
-    file_service: FileStorageService = Depends(),
+    upload_key: Optional[str] = Form(
+        None, max_length=64, description="客户端生成的幂等键，重试时返回已创建的图片 (可选)"
+    ),
 ) -> ImageRead:
     """
     上传新图片，并关联到类别和标签。
+    原图保存后立即返回 (processing_status 为 pending)，缩略图和EXIF由后台任务生成，
+    可通过 GET /images/{image_id}/jobs/ 查询处理进度。
     - **file**: 必须是图片文件。
     - **title**: 图片标题。
     - **description**: 图片描述 (可选)。
     - **category_id**: 图片所属的类别ID。
     - **tags**: 逗号分隔的标签字符串 (例如 "风景,旅行") (可选)。
+    - **upload_key**: 幂等键 (可选)。同一个键的图片已创建时直接返回该图片，不再保存文件。
     """
+    if upload_key:
+        existing = await async_image_crud.get_images_by_upload_keys(
+            session=session, upload_keys=[upload_key]
+        )
+        if upload_key in existing:
+            return existing[upload_key]
+
     # 检查类别是否存在
-    category = category_crud.get_category_by_id(
+    category = await async_category_crud.get_category_by_id(
         session=session, category_id=category_id
     )
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
 
     # 处理标签字符串，将其拆分为一个标签名称列表
-    # 如果 tags 字符串非空，则按逗号分割并去除首尾空格
-    tag_names = [name.strip() for name in tags.split(",")] if tags else []
-    # 过滤掉空的标签名 (例如 "tag1,,tag2" 的情况)
-    tag_names = [name for name in tag_names if name]
+    tag_names = parse_tag_names(tags)
 
-    # 2. 保存原始文件 (FileStorageService 应处理文件名唯一化和分级目录)
+    # 2. 保存原始文件 (流式写入的同时完成类型识别、字节计数和内容摘要)
     try:
         # filename type ignore due to UploadFile.filename potentially being None, though FastAPI usually ensures it for File(...)
-        image_absolute_path, stored_filename = await file_storage.save_upload_file(
-            upload_file=file, filename=file.filename  # type: ignore
-        )
+        stored_upload = await file_storage.save_upload_file(upload_file=file)
     except HTTPException as e:  # Catch specific HTTPExceptions from service
         raise e
     except Exception as e:
@@ -106,149 +139,459 @@ async def upload_image(
             detail=f"文件保存过程中发生意外错误。",
         )
 
-    # 3. 获取相对子目录以生成缩略图
+    # 3. 构造 pending 状态的图片记录，缩略图和EXIF由后台任务队列生成
+    image_create_data = await build_image_create(
+        session=session,
+        stored_upload=stored_upload,
+        original_filename=file.filename,  # type: ignore
+        category_id=category_id,
+        title=title,
+        description=description,
+        upload_key=upload_key,
+    )
+
+    # 4. 调用重构后的CRUD函数，分别传入 image 模型和 tag 名称列表；
+    # pending 的图片在同一事务中加入任务队列，类别缩略图在处理完成后由任务设置
     try:
-        relative_sub_dir = await file_storage.get_relative_sub_directory_for_file(
-            stored_filename
+        db_image = await async_image_crud.create_image_with_tags(
+            db=session,
+            image_create=image_create_data,
+            tag_names=tag_names,
+            set_as_category_thumbnail=bool(set_as_category_thumbnail),
         )
-    except Exception as e:
-        print(f"获取文件相对子目录失败: {e}")  # 日志记录
-        # 清理已保存的原图，因为没有子目录信息无法继续生成缩略图或记录正确路径
-        await file_storage.delete_file(image_absolute_path)
+    except Exception:
+        await file_storage.discard_retained_copy(stored_upload)
+        raise
+    await settle_stored_uploads(session=session, uploads=[(stored_upload, db_image)])
+    image_processing_queue.notify()
+
+    # 5. 复用已处理完成的文件时，立即设置类别缩略图
+    if set_as_category_thumbnail and db_image.relative_thumbnail_path and category:
+        category.thumbnail_path = db_image.relative_thumbnail_path
+        session.add(category)
+        await session.commit()
+        await session.refresh(category)
+        # session.refresh(db_image) # db_image 本身没有改变，但如果需要最新的 category 信息可以考虑
+
+    return db_image
+
+
+@router.post(
+    "/batch-upload/",
+    response_model=ImageBatchUploadResult,
+    status_code=status.HTTP_201_CREATED,
+    summary="批量上传图片到同一类别",
+)
+async def batch_upload_images(
+    *,
+    session: AsyncSession = Depends(get_async_session),
+    files: List[UploadFile] = File(..., description="要上传的图片文件 (可多个)"),
+    category_id: uuid.UUID = Form(..., description="所有图片所属的类别ID"),
+    titles: Optional[List[str]] = Form(
+        None, description="与 files 一一对应的标题 (可选，数量必须与文件数一致)"
+    ),
+    tags: Optional[str] = Form(None, description="所有图片共用的逗号分隔标签字符串"),
+    set_as_category_thumbnail: Optional[bool] = Form(
+        False, description="是否将第一张上传成功的图片设置为类别缩略图"
+    ),
+    upload_keys: Optional[List[str]] = Form(
+        None, description="与 files 一一对应的幂等键 (可选，数量必须与文件数一致)"
+    ),
+) -> ImageBatchUploadResult:
+    """
+    在一个请求中上传多张图片到同一类别。
+
+    类别只查询一次；文件以有界并发 (settings.batch_upload_concurrency) 流式写入磁盘；
+    所有保存成功的文件在一个事务中创建图片记录和后处理任务。
+    单个文件保存失败 (类型不支持、过大等) 不影响其他文件，结果中按文件顺序逐一返回。
+    提供 upload_keys 时，幂等键已创建过图片的文件直接返回已有的图片 (客户端重试整批请求不会重复创建)。
+    """
+    if len(files) > settings.batch_upload_max_files:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="处理文件路径信息时出错。",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"单次最多上传 {settings.batch_upload_max_files} 个文件。",
         )
+    if titles is not None and len(titles) != len(files):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="titles 的数量必须与 files 一致。",
+        )
+    if upload_keys is not None and (
+        len(upload_keys) != len(files) or any(len(key) > 64 for key in upload_keys)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="upload_keys 的数量必须与 files 一致，且每个键不超过 64 个字符。",
+        )
+
+    category = await async_category_crud.get_category_by_id(
+        session=session, category_id=category_id
+    )
+    if not category:
+        raise HTTPException(status_code=404, detail="Category not found")
+
+    tag_names = parse_tag_names(tags)
+
+    semaphore = asyncio.Semaphore(settings.batch_upload_concurrency)
+
+    async def save(upload_file: UploadFile) -> Union[StoredUpload, str]:
+        async with semaphore:
+            try:
+                return await file_storage.save_upload_file(upload_file=upload_file)
+            except HTTPException as e:
+                return str(e.detail)
+            except OSError as e:
+                logger.error(f"批量上传保存文件 {upload_file.filename} 失败: {e}")
+                return "文件保存过程中发生错误。"
+            except Exception:
+                # 非预期的错误不当作单个文件的失败吞掉，记录后让整个请求失败
+                logger.exception(f"批量上传保存文件 {upload_file.filename} 时发生意外错误")
+                raise
+
+    results = [ImageBatchUploadItem(filename=upload_file.filename) for upload_file in files]
+    # 重试的请求中已创建过的文件直接返回已有的图片，不再保存
+    existing = await async_image_crud.get_images_by_upload_keys(
+        session=session, upload_keys=upload_keys or []
+    )
+    pending_indexes = []
+    for index in range(len(files)):
+        if upload_keys and upload_keys[index] in existing:
+            results[index].image = ImageRead.model_validate(existing[upload_keys[index]])
+        else:
+            pending_indexes.append(index)
+
+    saved = dict(
+        zip(
+            pending_indexes,
+            await asyncio.gather(*(save(files[index]) for index in pending_indexes)),
+        )
+    )
 
-    # 4. 生成缩略图
-    thumbnail_absolute_path: Optional[Path] = None
+    image_creates = []
+    created_indexes = []
+    for index, stored_upload in saved.items():
+        upload_file = files[index]
+        if isinstance(stored_upload, str):
+            results[index].error = stored_upload
+            continue
+        image_creates.append(
+            await build_image_create(
+                session=session,
+                stored_upload=stored_upload,
+                original_filename=upload_file.filename,  # type: ignore
+                category_id=category_id,
+                title=titles[index] if titles else None,
+                upload_key=upload_keys[index] if upload_keys else None,
+            )
+        )
+        created_indexes.append(index)
+
+    stored_uploads = [saved[index] for index in created_indexes]
     try:
-        thumbnail_absolute_path = await image_processor.generate_thumbnail(
-            source_image_path=image_absolute_path,
-            relative_sub_dir=relative_sub_dir,
-            stored_filename=stored_filename,
+        db_images = (
+            await async_image_crud.create_images_with_tags(
+                db=session,
+                image_creates=image_creates,
+                tag_names=tag_names,
+                set_as_category_thumbnail=bool(set_as_category_thumbnail),
+            )
+            if image_creates
+            else []
         )
-    except HTTPException as e:
-        print(
-            f"警告: 缩略图生成失败 ({e.detail}) 对于文件 {stored_filename}. 图片仍会保存但无缩略图。"
+    except Exception:
+        for stored_upload in stored_uploads:
+            await file_storage.discard_retained_copy(stored_upload)
+        raise
+    await settle_stored_uploads(session=session, uploads=list(zip(stored_uploads, db_images)))
+    image_processing_queue.notify()
+
+    for index, db_image in zip(created_indexes, db_images):
+        results[index].image = ImageRead.model_validate(db_image)
+
+    # 复用已处理完成的文件时，立即设置类别缩略图
+    if set_as_category_thumbnail and db_images and db_images[0].relative_thumbnail_path:
+        category.thumbnail_path = db_images[0].relative_thumbnail_path
+        session.add(category)
+        await session.commit()
+
+    uploaded = sum(1 for result in results if result.image is not None)
+    return ImageBatchUploadResult(
+        category_id=category_id,
+        uploaded=uploaded,
+        failed=len(files) - uploaded,
+        results=results,
+    )
+
+
+@router.post(
+    "/uploads/",
+    response_model=UploadSessionRead,
+    status_code=status.HTTP_201_CREATED,
+    summary="创建可续传的分块上传会话",
+)
+async def create_resumable_upload(
+    *,
+    session: AsyncSession = Depends(get_async_session),
+    session_in: UploadSessionCreate,
+) -> UploadSessionRead:
+    """
+    创建分块上传会话，并在暂存目录下预留同样大小的暂存文件。
+
+    上传流程：
+    1. `POST /images/uploads/` 创建会话，返回服务端确定的 chunk_size 和 chunk_count；
+    2. `PUT /images/uploads/{upload_id}/chunks/{chunk_index}` 逐块上传原始字节
+       (偏移 = chunk_index × chunk_size，可乱序、可重传)；
+    3. 连接中断后 `GET /images/uploads/{upload_id}/` 查询 missing_chunks，只补传缺失的块；
+    4. `POST /images/uploads/{upload_id}/complete/` 完成上传并创建图片记录。
+    """
+    if session_in.size_bytes > settings.max_image_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"文件大小超过限制 ({settings.max_image_size / 1024 / 1024:.0f}MB).",
         )
-    except Exception as e:
-        print(f"缩略图服务发生意外错误: {e}")
-        print(
-            f"警告: 缩略图生成发生意外错误对于文件 {stored_filename}. 图片仍会保存但无缩略图。"
+    category = await async_category_crud.get_category_by_id(
+        session=session, category_id=session_in.category_id
+    )
+    if not category:
+        raise HTTPException(status_code=404, detail="Category not found")
+
+    # 顺带清理客户端已放弃的会话及其暂存文件
+    for expired in await upload_crud.get_expired_upload_sessions(
+        session=session,
+        max_age=timedelta(hours=settings.resumable_upload_expiry_hours),
+    ):
+        await file_storage.delete_file(file_storage.staging_path_for(expired.id))
+        await upload_crud.delete_upload_session(session=session, upload_session=expired)
+
+    upload_session = await upload_crud.create_upload_session(
+        session=session,
+        session_in=session_in,
+        chunk_size=settings.resumable_upload_chunk_size,
+    )
+    await file_storage.create_staging_file(upload_session.id, upload_session.size_bytes)
+    return await upload_crud.read_upload_session(session=session, upload_session=upload_session)
+
+
+async def get_upload_session_or_404(
+    session: AsyncSession, upload_id: uuid.UUID
+) -> UploadSession:
+    upload_session = await upload_crud.get_upload_session(
+        session=session, upload_id=upload_id
+    )
+    if not upload_session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return upload_session
+
+
+@router.get(
+    "/uploads/{upload_id}/",
+    response_model=UploadSessionRead,
+    summary="查询分块上传会话的进度",
+)
+async def read_resumable_upload(
+    *, session: AsyncSession = Depends(get_async_session), upload_id: uuid.UUID
+) -> UploadSessionRead:
+    """返回已接收和缺失的块号，客户端断线重连后据此续传。"""
+    upload_session = await get_upload_session_or_404(session, upload_id)
+    return await upload_crud.read_upload_session(session=session, upload_session=upload_session)
+
+
+@router.put(
+    "/uploads/{upload_id}/chunks/{chunk_index}",
+    response_model=UploadSessionRead,
+    summary="上传一个数据块",
+)
+async def upload_chunk(
+    *,
+    session: AsyncSession = Depends(get_async_session),
+    upload_id: uuid.UUID,
+    chunk_index: int,
+    request: Request,
+) -> UploadSessionRead:
+    """
+    请求体是该块的原始字节 (application/octet-stream)，直接流式写入暂存文件的
+    chunk_index × chunk_size 偏移处。除最后一块外每块必须正好是 chunk_size 字节。
+    """
+    upload_session = await get_upload_session_or_404(session, upload_id)
+    session_state = UploadSessionRead.model_validate(upload_session)
+    if not 0 <= chunk_index < session_state.chunk_count:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"块号超出范围 (0-{session_state.chunk_count - 1})。",
+        )
+    offset = chunk_index * upload_session.chunk_size
+    length = min(upload_session.chunk_size, upload_session.size_bytes - offset)
+
+    await file_storage.write_staged_chunk(upload_id, offset, length, request.stream())
+    return await upload_crud.mark_chunk_received(
+        session=session, upload_session=upload_session, chunk_index=chunk_index
+    )
+
+
+@router.post(
+    "/uploads/{upload_id}/complete/",
+    response_model=ImageRead,
+    status_code=status.HTTP_201_CREATED,
+    summary="完成分块上传并创建图片",
+)
+async def complete_resumable_upload(
+    *, session: AsyncSession = Depends(get_async_session), upload_id: uuid.UUID
+) -> ImageRead:
+    """
+    所有块都已接收后，校验文件类型、计算内容摘要，将暂存文件移动到最终存储路径，
+    然后像普通上传一样创建 pending 状态的图片记录并加入后处理队列。
+    """
+    upload_session = await get_upload_session_or_404(session, upload_id)
+    missing_chunks = (
+        await upload_crud.read_upload_session(session=session, upload_session=upload_session)
+    ).missing_chunks
+    if missing_chunks:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"仍有 {len(missing_chunks)} 个数据块未上传: {missing_chunks[:20]}",
         )
 
-    # 新增：提取 EXIF 信息
-    exif_data_raw = {}
-    parsed_exif_object: Optional[ExifData] = None
     try:
-        with open(image_absolute_path, "rb") as f:
-            tags_exif = exifread.process_file(
-                f, details=False
-            )  # details=False 避免提取过多信息
-            if tags_exif:
-                # 临时存储原始提取的、经过基本过滤的EXIF数据，用于 file_metadata
-                exif_data_raw = {
-                    str(key): str(value)
-                    for key, value in tags_exif.items()
-                    if key
-                    not in (
-                        "JPEGThumbnail",
-                        "TIFFThumbnail",
-                        "Filename",
-                        "EXIF MakerNote",
-                    )
-                }
-
-                # Helper function to safely get string value of a tag or None
-                def get_tag_str_value(tag_key: str) -> Optional[str]:
-                    tag_value = tags_exif.get(tag_key)
-                    return str(tag_value) if tag_value is not None else None
-
-                def get_alternative_tag_str_value(
-                    key1: str, key2: str
-                ) -> Optional[str]:
-                    val = tags_exif.get(key1)
-                    if val is not None:
-                        return str(val)
-                    val = tags_exif.get(key2)
-                    return str(val) if val is not None else None
-
-                # Structured EXIF data for exif_info field
-                parsed_exif_object = ExifData(
-                    make=get_tag_str_value("Image Make"),  # Camera Make
-                    model=get_tag_str_value("Image Model"),  # Camera Model
-                    lens_make=get_tag_str_value(
-                        "Image LensMake"
-                    ),  # Populate new lens_make field
-                    bits_per_sample=get_alternative_tag_str_value(
-                        "Image BitsPerSample", "EXIF BitsPerSample"
-                    ),
-                    date_time_original=get_tag_str_value("EXIF DateTimeOriginal"),
-                    exposure_time=get_tag_str_value("EXIF ExposureTime"),
-                    f_number=get_tag_str_value("EXIF FNumber"),
-                    exposure_program=get_tag_str_value("EXIF ExposureProgram"),
-                    iso_speed_rating=get_tag_str_value("EXIF ISOSpeedRatings"),
-                    focal_length=get_tag_str_value("EXIF FocalLength"),
-                    lens_specification=get_alternative_tag_str_value(
-                        "EXIF LensSpecification", "Image LensSpecification"
-                    ),
-                    lens_model=get_alternative_tag_str_value(
-                        "EXIF LensModel", "Image LensModel"
-                    ),
-                    exposure_mode=get_tag_str_value("EXIF ExposureMode"),
-                    cfa_pattern=get_tag_str_value(
-                        "EXIF CFAPattern"
-                    ),  # Consider adding "EXIF CVAPattern" if needed
-                    color_space=get_tag_str_value("EXIF ColorSpace"),
-                    white_balance=get_tag_str_value("EXIF WhiteBalance"),
-                )
-    except Exception as e:
-        print(f"提取 EXIF 信息时发生错误: {e}")  # 记录错误，但不中断流程
-
-    # 5. 创建数据库记录 for Image
-    # 构建 image_create_data 时，使用 thumbnail_absolute_path 计算 relative_thumbnail_path
-    calculated_relative_thumbnail_path = (
-        str(thumbnail_absolute_path.relative_to(settings.thumbnail_storage_root))
-        if thumbnail_absolute_path
-        and settings.thumbnail_storage_root
-        and thumbnail_absolute_path.exists()
-        else None
+        stored_upload = await file_storage.finalize_staged_upload(upload_id)
+    except HTTPException:
+        # 文件内容无效，暂存文件已删除，会话随之作废
+        await upload_crud.delete_upload_session(
+            session=session, upload_session=upload_session
+        )
+        await session.commit()
+        raise
+
+    image_create_data = await build_image_create(
+        session=session,
+        stored_upload=stored_upload,
+        original_filename=upload_session.filename,
+        category_id=upload_session.category_id,
+        title=upload_session.title,
+        description=upload_session.description,
     )
-    image_create_data = ImageCreate(
+    set_as_category_thumbnail = upload_session.set_as_category_thumbnail
+    # 会话记录与图片记录在同一事务中删除/创建
+    await upload_crud.delete_upload_session(session=session, upload_session=upload_session)
+    try:
+        db_image = await async_image_crud.create_image_with_tags(
+            db=session,
+            image_create=image_create_data,
+            tag_names=parse_tag_names(upload_session.tags),
+            set_as_category_thumbnail=set_as_category_thumbnail,
+        )
+    except Exception:
+        await file_storage.discard_retained_copy(stored_upload)
+        raise
+    await settle_stored_uploads(session=session, uploads=[(stored_upload, db_image)])
+    image_processing_queue.notify()
+
+    # 复用已处理完成的文件时，立即设置类别缩略图
+    if set_as_category_thumbnail and db_image.relative_thumbnail_path:
+        category = await async_category_crud.get_category_by_id(
+            session=session, category_id=db_image.category_id
+        )
+        if category:
+            category.thumbnail_path = db_image.relative_thumbnail_path
+            session.add(category)
+            await session.commit()
+    return db_image
+
+
+@router.delete(
+    "/uploads/{upload_id}/",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="取消分块上传",
+)
+async def abort_resumable_upload(
+    *, session: AsyncSession = Depends(get_async_session), upload_id: uuid.UUID
+):
+    """删除上传会话及其暂存文件。会话不存在时同样返回204。"""
+    upload_session = await upload_crud.get_upload_session(
+        session=session, upload_id=upload_id
+    )
+    if upload_session:
+        await file_storage.delete_file(file_storage.staging_path_for(upload_id))
+        await upload_crud.delete_upload_session(
+            session=session, upload_session=upload_session
+        )
+        await session.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+def parse_tag_names(tags: Optional[str]) -> List[str]:
+    """将逗号分隔的标签字符串拆分为标签名称列表，去除首尾空格并过滤空名称 (例如 "tag1,,tag2")"""
+    tag_names = [name.strip() for name in tags.split(",")] if tags else []
+    return [name for name in tag_names if name]
+
+
+async def settle_stored_uploads(
+    *, session: AsyncSession, uploads: Sequence[Tuple[StoredUpload, Image]]
+) -> None:
+    """
+    图片记录提交之后处理内容重复的上传保留的内容 (见 FileStorageService.settle_retained_copy)。
+    共享文件被恢复时，复用的缩略图已随之删除，已标记为处理完成的图片重新加入后处理队列。
+    """
+    reprocess = []
+    for stored_upload, db_image in uploads:
+        restored = await file_storage.settle_retained_copy(stored_upload)
+        if restored and db_image.processing_status == PROCESSING_DONE:
+            reprocess.append(db_image)
+    if reprocess:
+        await async_image_crud.requeue_image_processing(session=session, images=reprocess)
+
+
+async def build_image_create(
+    *,
+    session: AsyncSession,
+    stored_upload: StoredUpload,
+    original_filename: str,
+    category_id: uuid.UUID,
+    title: Optional[str] = None,
+    description: Optional[str] = None,
+    upload_key: Optional[str] = None,
+) -> ImageCreate:
+    """
+    根据已保存的上传文件构造图片记录数据。
+
+    图片以 pending 状态创建，缩略图、尺寸档位和EXIF由后台任务队列生成；
+    内容寻址存储模式下，相同内容已被其他图片记录引用且已处理完成时直接复用其缩略图和EXIF。
+    """
+    existing_image: Optional[Image] = None
+    if stored_upload.is_duplicate:
+        existing_image = await async_image_crud.get_image_by_content_digest(
+            session=session, content_digest=stored_upload.content_digest
+        )
+
+    processing_fields = dict(processing_status=PROCESSING_PENDING)
+    if existing_image and existing_image.processing_status == PROCESSING_DONE:
+        processing_fields = dict(
+            relative_thumbnail_path=existing_image.relative_thumbnail_path,
+            file_metadata=existing_image.file_metadata or None,
+            exif_info=existing_image.exif_info,
+            renditions=existing_image.renditions,
+            processing_status=PROCESSING_DONE,
+        )
+
+    return ImageCreate(
         title=title,
-        original_filename=file.filename,  # type: ignore
-        stored_filename=stored_filename,
+        original_filename=original_filename,
+        stored_filename=stored_upload.stored_filename,
         relative_file_path=str(
-            image_absolute_path.relative_to(settings.image_storage_root)
+            stored_upload.absolute_path.relative_to(settings.image_storage_root)
         ),
-        relative_thumbnail_path=calculated_relative_thumbnail_path,  # 使用计算好的值
-        mime_type=file.content_type,  # type: ignore
-        size_bytes=(await aio_os.stat(image_absolute_path)).st_size,
+        mime_type=stored_upload.mime_type,  # 根据文件头识别，而非客户端声明的类型
+        size_bytes=stored_upload.size_bytes,  # 由流式写入时累计得到，无需再 stat
+        content_digest=(
+            stored_upload.content_digest
+            if settings.content_addressed_storage
+            else None
+        ),  # 仅内容寻址模式下记录摘要，用于共享文件的引用计数
         description=description,
-        # tags=tag_names,  # Tags are now handled by create_image_with_tags
         category_id=category_id,
-        file_metadata=(
-            exif_data_raw if exif_data_raw else None
-        ),  # 将原始提取的EXIF存入 file_metadata
-        exif_info=parsed_exif_object,  # 将结构化的 ExifData 实例存入 exif_info
+        upload_key=upload_key,
+        **processing_fields,
     )
 
-    # 调用重构后的CRUD函数，分别传入 image 模型和 tag 名称列表
-    db_image = image_crud.create_image_with_tags(
-        db=session, image_create=image_create_data, tag_names=tag_names
-    )
-
-    # 6. 如果需要，设置类别缩略图
-    if set_as_category_thumbnail and db_image.relative_thumbnail_path and category:
-        category.thumbnail_path = db_image.relative_thumbnail_path
-        session.add(category)
-        session.commit()
-        session.refresh(category)
-        # session.refresh(db_image) # db_image 本身没有改变，但如果需要最新的 category 信息可以考虑
-
-    return db_image
-
 
 @router.get("/by-tags/", response_model=List[ImageRead], summary="根据标签名称搜索图片")
 def search_images_by_tags(
@@ -264,14 +607,23 @@ def search_images_by_tags(
     limit: int = Query(
         100, ge=1, le=200, description="返回的最大记录数"
     ),  # Max 200 to prevent overload
-) -> List[ImageRead]:
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 中的游标"),
+    fields: Optional[str] = Query(
+        None,
+        description="只返回这些字段 (逗号分隔，例如 id,title,thumbnail_url)；未请求的列不会从数据库加载",
+    ),
+    response: Response,
+) -> Union[List[ImageRead], Response]:
     """
-    根据一个或多个标签的名称搜索图片。
+    根据一个或多个标签的名称搜索图片，按上传时间排序。
+    还有下一页时响应头 X-Next-Cursor 返回游标，传回 cursor 参数即可继续翻页。
 
     - **tag_names**: 一个或多个标签名称。
     - **match_all**: 如果为 `true`，则只返回包含所有指定标签的图片 (AND查询)。
                      如果为 `false` (默认)，则返回包含任何一个指定标签的图片 (OR查询)。
+    - **fields**: 只返回这些字段 (逗号分隔)，未请求的列不会从数据库加载。
     """
+    image_fields = parse_image_fields(fields)
     if not tag_names:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -283,11 +635,55 @@ def search_images_by_tags(
         match_all=match_all,
         skip=skip,
         limit=limit,
+        cursor=cursor,
+        fields=image_fields,
     )
+    set_next_cursor_header(response, images, limit)
+    if image_fields is not None:
+        return fast_json_response(images_to_partial_list(images, image_fields), response)
+    if settings.fast_json_responses:
+        return fast_json_response(images_to_list(images), response)
     return images
 
 
-@router.get("/{image_id}/", response_model=ImageRead)
+@router.get(
+    "/thumbnail-engine/metrics/",
+    response_model=Dict[str, Union[int, float]],
+    summary="缩略图引擎运行指标",
+)
+def read_thumbnail_engine_metrics() -> Dict[str, Union[int, float]]:
+    """
+    返回缩略图引擎的队列深度、并发数和解码耗时等指标，
+    用于观察批量导入 (folder2db) 期间缩略图生成是否积压。
+    """
+    return image_processor.thumbnail_engine.metrics.snapshot()
+
+
+@router.get(
+    "/{image_id}/jobs/",
+    response_model=List[ImageProcessingJobRead],
+    summary="查询图片的后处理任务",
+)
+def read_image_jobs(
+    *,
+    session: Session = Depends(get_session),
+    image_id: uuid.UUID,
+) -> List[ImageProcessingJobRead]:
+    """
+    返回图片的缩略图/EXIF后处理任务 (状态、尝试次数和最近一次错误)，
+    图片本身的 processing_status 汇总了最终结果。
+    """
+    db_image = image_crud.get_image_by_id(session=session, image_id=image_id)
+    if not db_image:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return job_crud.get_jobs_by_image_id(session=session, image_id=image_id)
+
+
+@router.get(
+    "/{image_id}/",
+    response_model=ImageRead,
+    dependencies=[conditional_get("image", "tag", "imagetaglink")],
+)
 def read_image(
     *,
     session: Session = Depends(get_session),
@@ -320,10 +716,9 @@ def update_image_metadata(
     # 处理标签更新
     new_tags = []
     if image_in.tags is not None and image_in.tags.strip():
-        tag_names = [name.strip() for name in image_in.tags.split(",") if name.strip()]
-        for tag_name in tag_names:
-            tag = tag_crud.get_or_create_tag(session=session, tag_name=tag_name)
-            new_tags.append(tag)
+        new_tags = tag_crud.get_or_create_tags(
+            session=session, names=image_in.tags.split(",")
+        )
 
     # 更新图片元数据
     updated_image = image_crud.update_image_metadata(
@@ -338,12 +733,14 @@ def update_image_metadata(
 @router.delete(
     "/{image_id}/", status_code=status.HTTP_204_NO_CONTENT, summary="删除图片"
 )
-async def delete_image(*, session: Session = Depends(get_session), image_id: uuid.UUID):
+async def delete_image(
+    *, session: AsyncSession = Depends(get_async_session), image_id: uuid.UUID
+):
     """
     从数据库中删除一张图片及其相关文件。
     如果图片不存在，则不执行任何操作并返回204。
     """
-    deleted_image = await image_crud.delete_image(session=session, image_id=image_id)
+    deleted_image = await async_image_crud.delete_image(session=session, image_id=image_id)
     if not deleted_image:
         # The image might have already been deleted, or never existed.
         # Returning 204 is appropriate in either case as the client's desired state
@@ -354,16 +751,37 @@ async def delete_image(*, session: Session = Depends(get_session), image_id: uui
 
 @router.get("/", response_model=List[ImageRead])
 def get_all_images(
-    session: Session = Depends(get_session), skip: int = 0, limit: int = 100
+    response: Response,
+    session: Session = Depends(get_session),
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 中的游标"),
+    fields: Optional[str] = Query(
+        None,
+        description="只返回这些字段 (逗号分隔，例如 id,title,thumbnail_url)；未请求的列不会从数据库加载",
+    ),
 ):
     """
-    获取所有图片的列表 (支持分页)。
+    获取所有图片的列表 (按上传时间排序，支持 skip/limit 或游标分页)。
+    可用 fields 参数只返回部分字段 (例如 fields=id,title,thumbnail_url)。
     """
-    images = image_crud.get_all_images(session=session, skip=skip, limit=limit)
+    image_fields = parse_image_fields(fields)
+    images = image_crud.get_all_images(
+        session=session, skip=skip, limit=limit, cursor=cursor, fields=image_fields
+    )
+    set_next_cursor_header(response, images, limit)
+    if image_fields is not None:
+        return fast_json_response(images_to_partial_list(images, image_fields), response)
+    if settings.fast_json_responses:
+        return fast_json_response(images_to_list(images), response)
     return images
 
 
-@router.get("/{image_id}", response_model=ImageRead)
+@router.get(
+    "/{image_id}",
+    response_model=ImageRead,
+    dependencies=[conditional_get("image", "tag", "imagetaglink")],
+)
 def get_image_by_id(image_id: uuid.UUID, session: Session = Depends(get_session)):
     """
     根据ID获取单个图片对象的详细信息。
@@ -1,24 +1,33 @@
 #!/usr/bin/env python3
 
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlmodel import Session
 
+from app.conditional_get import conditional_get
 from app.database import get_session
 from app.crud import tag_crud
-from app.models import TagRead
+from app.crud.pagination import set_next_cursor_header
+from app.models import TagReadWithUsage
 
 router = APIRouter(prefix="/tags", tags=["标签管理"])
 
 # 你可以在这里添加标签相关的API端点
 
 
-@router.get("/", response_model=List[TagRead])
+@router.get(
+    "/", response_model=List[TagReadWithUsage], dependencies=[conditional_get("tag")]
+)
 def get_all_tags(
-    session: Session = Depends(get_session), skip: int = 0, limit: int = 100
+    response: Response,
+    session: Session = Depends(get_session),
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 中的游标"),
 ):
     """
-    获取所有标签的列表 (支持分页)。
+    获取所有标签的列表及每个标签的使用次数 (按创建时间排序，支持 skip/limit 或游标分页)。
     """
-    tags = tag_crud.get_all_tags(session=session, skip=skip, limit=limit)
+    tags = tag_crud.get_all_tags(session=session, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor_header(response, tags, limit)
     return tags
@@ -0,0 +1,173 @@
+"""已有数据库的结构升级模块
+
+SQLModel.metadata.create_all 只创建不存在的表 (及其索引)，不会修改已有的表。
+模型后来新增到已有表中的列由这里添加 (ALTER TABLE ... ADD COLUMN)，并为已有的行填充数据。
+每个步骤都先检查数据库的当前结构，重复执行不会产生任何修改。
+
+create_db_and_tables 在 create_all 之后、补建索引之前调用 upgrade_schema：
+新增列上的索引 (包括唯一索引) 只有在列已添加、数据已填充之后才能创建。
+"""
+
+import json
+from typing import Dict, List, NamedTuple, Set, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+from app.crud.tag_crud import usage_count_reconcile_statement
+from app.models.job_models import PROCESSING_DONE
+from app.models.tag_models import normalize_tag_name
+
+
+class AddedColumn(NamedTuple):
+    """模型中后来新增到已有表的列"""
+
+    table: str
+    name: str
+    # ADD COLUMN 的列定义；NOT NULL 列必须带 DEFAULT，作为已有行的值
+    definition: str
+
+
+# 按新增的先后顺序排列
+ADDED_COLUMNS: Tuple[AddedColumn, ...] = (
+    AddedColumn("image", "content_digest", "VARCHAR(64)"),
+    AddedColumn("image", "renditions", "JSON"),
+    # 已有的图片在上传时已同步处理完毕
+    AddedColumn("image", "processing_status", f"VARCHAR NOT NULL DEFAULT '{PROCESSING_DONE}'"),
+    # 已有的标签由 usage_count_reconcile_statement 按关联表填充
+    AddedColumn("tag", "usage_count", "INTEGER NOT NULL DEFAULT 0"),
+    # 已有的标签由 merge_normalized_tag_names 填充
+    AddedColumn("tag", "name_normalized", "VARCHAR(100) NOT NULL DEFAULT ''"),
+    AddedColumn("image", "upload_key", "VARCHAR(64)"),
+)
+
+# 模型中已不再唯一的旧唯一索引 (表名, 索引名)：删除后由补建索引的步骤按当前定义重建为普通索引
+# (内容寻址存储模式下内容相同的图片共享同一个 stored_filename)
+RELAXED_UNIQUE_INDEXES: Tuple[Tuple[str, str], ...] = (("image", "ix_image_stored_filename"),)
+
+
+def existing_columns(connection: Connection, table: str) -> Set[str]:
+    """数据库中某张表当前的列名"""
+    return {column["name"] for column in inspect(connection).get_columns(table)}
+
+
+def add_missing_columns(connection: Connection) -> Set[Tuple[str, str]]:
+    """
+    为已有的表添加缺少的列。
+
+    参数:
+        connection (Connection): 数据库连接 (create_all 之后，所有表都已存在)。
+
+    返回:
+        Set[Tuple[str, str]]: 实际添加的 (表名, 列名)
+    """
+    added: Set[Tuple[str, str]] = set()
+    for column in ADDED_COLUMNS:
+        if column.name in existing_columns(connection, column.table):
+            continue
+        connection.execute(
+            text(f'ALTER TABLE "{column.table}" ADD COLUMN "{column.name}" {column.definition}')
+        )
+        added.add((column.table, column.name))
+        print(f"数据库结构升级：{column.table} 表添加列 {column.name}")
+    return added
+
+
+def drop_relaxed_unique_indexes(connection: Connection) -> None:
+    """删除已不再唯一的旧唯一索引 (已是普通索引的不做处理)"""
+    for table, name in RELAXED_UNIQUE_INDEXES:
+        indexes = {index["name"]: index for index in inspect(connection).get_indexes(table)}
+        if name in indexes and indexes[name]["unique"]:
+            connection.execute(text(f'DROP INDEX "{name}"'))
+            print(f"数据库结构升级：{table} 表的索引 {name} 不再唯一")
+
+
+def merge_normalized_tag_names(connection: Connection) -> bool:
+    """
+    为 name_normalized 尚未填充的标签计算规范名称，并合并规范名称相同 (仅大小写或首尾空白不同) 的标签。
+
+    同一规范名称下保留已填充规范名称的标签，其次是最早创建的标签；其余标签的图片关联改为指向保留的标签
+    (图片已关联保留的标签时直接删除该关联)，然后删除这些重复的标签。
+    必须在创建 name_normalized 的唯一索引之前执行。
+
+    参数:
+        connection (Connection): 数据库连接。
+
+    返回:
+        bool: 是否合并了重复的标签 (合并后需要重新计算使用次数)
+    """
+    if connection.execute(text("SELECT 1 FROM tag WHERE name_normalized = '' LIMIT 1")).first() is None:
+        return False
+
+    tags = connection.execute(
+        text("SELECT id, name, name_normalized FROM tag ORDER BY name_normalized = '', created_at, id")
+    ).all()
+    kept_by_normalized: Dict[str, str] = {}
+    normalized_updates: List[Dict[str, str]] = []
+    duplicates: List[Dict[str, str]] = []
+    for tag_id, name, name_normalized in tags:
+        normalized = name_normalized or normalize_tag_name(name)
+        kept_id = kept_by_normalized.setdefault(normalized, tag_id)
+        if kept_id != tag_id:
+            duplicates.append({"duplicate": tag_id, "kept": kept_id})
+        elif not name_normalized:
+            normalized_updates.append({"id": tag_id, "normalized": normalized})
+
+    if duplicates:
+        connection.execute(
+            text(
+                "DELETE FROM imagetaglink WHERE tag_id = :duplicate AND image_id IN "
+                "(SELECT image_id FROM imagetaglink WHERE tag_id = :kept)"
+            ),
+            duplicates,
+        )
+        connection.execute(
+            text("UPDATE imagetaglink SET tag_id = :kept WHERE tag_id = :duplicate"), duplicates
+        )
+        connection.execute(text("DELETE FROM tag WHERE id = :duplicate"), duplicates)
+        print(f"数据库结构升级：合并了 {len(duplicates)} 个仅大小写不同的重复标签")
+    if normalized_updates:
+        connection.execute(
+            text("UPDATE tag SET name_normalized = :normalized WHERE id = :id"), normalized_updates
+        )
+    return bool(duplicates)
+
+
+def move_received_chunks(connection: Connection) -> None:
+    """
+    旧版本在 uploadsession.received_chunks (JSON 列表) 中记录已写入的块号，
+    改为 uploadchunk 表中每块一行。未完成的会话的块号移到新表并清空旧列，客户端可以继续续传。
+    """
+    if "received_chunks" not in existing_columns(connection, "uploadsession"):
+        return
+    sessions = connection.execute(
+        text("SELECT id, received_chunks FROM uploadsession WHERE received_chunks IS NOT NULL")
+    ).all()
+    chunks = [
+        {"upload_id": upload_id, "chunk_index": chunk_index}
+        for upload_id, received_chunks in sessions
+        for chunk_index in set(json.loads(received_chunks) or [])
+    ]
+    if chunks:
+        connection.execute(
+            text("INSERT INTO uploadchunk (upload_id, chunk_index) VALUES (:upload_id, :chunk_index)"),
+            chunks,
+        )
+    if sessions:
+        connection.execute(text("UPDATE uploadsession SET received_chunks = NULL"))
+        print(f"数据库结构升级：{len(sessions)} 个分块上传会话的块号移到 uploadchunk 表")
+
+
+def upgrade_schema(connection: Connection) -> None:
+    """
+    将已有数据库升级到当前模型的结构 (幂等)。
+
+    参数:
+        connection (Connection): 数据库连接，调用方负责提交事务。
+    """
+    added = add_missing_columns(connection)
+    drop_relaxed_unique_indexes(connection)
+    merged = merge_normalized_tag_names(connection)
+    move_received_chunks(connection)
+    if merged or ("tag", "usage_count") in added:
+        connection.execute(usage_count_reconcile_statement())
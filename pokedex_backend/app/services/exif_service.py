@@ -0,0 +1,211 @@
+"""EXIF 提取服务模块
+
+只读取并解析图片中的 EXIF 数据段 (JPEG 的 APP1 段)，在有界线程池中执行，避免阻塞事件循环。
+"""
+
+import asyncio
+import io
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+import exifread
+
+from app.core.config import settings
+from app.models import ExifData
+
+# 不写入 file_metadata 的 EXIF 标签 (体积大或无意义)
+EXCLUDED_EXIF_TAGS = ("JPEGThumbnail", "TIFFThumbnail", "Filename", "EXIF MakerNote")
+EXIF_HEADER = b"Exif\x00\x00"  # JPEG APP1 段中 EXIF 数据的标识，其后是标准 TIFF 结构
+
+# JPEG 标记
+JPEG_SOI = 0xD8  # 图像开始
+JPEG_APP1 = 0xE1
+JPEG_SOS = 0xDA  # 扫描开始，此后是压缩的图像数据，不会再出现 APP1
+JPEG_EOI = 0xD9
+# 没有长度字段的独立标记 (TEM 和 RSTn)
+JPEG_STANDALONE_MARKERS = {0x01, *range(0xD0, 0xD8)}
+
+ExifResult = Tuple[Dict[str, str], Optional[ExifData]]
+
+
+def read_jpeg_exif_segment(fp: BinaryIO) -> Optional[bytes]:
+    """
+    沿 JPEG 标记段依次跳转，只读取 EXIF 所在的 APP1 段，不读取后面的图像数据。
+
+    参数:
+        fp (BinaryIO): 位于文件开头的二进制文件对象。
+
+    返回:
+        Optional[bytes]: 去掉 "Exif\\0\\0" 前缀后的 TIFF 数据；不是 JPEG 或没有 EXIF 时返回None。
+    """
+    if fp.read(2) != bytes((0xFF, JPEG_SOI)):
+        return None
+
+    while True:
+        marker_prefix = fp.read(1)
+        if not marker_prefix:
+            return None
+        if marker_prefix != b"\xff":
+            continue  # 容错：跳过标记之间的非法填充字节
+        marker = fp.read(1)
+        while marker == b"\xff":  # 标记前允许有多个 0xFF 填充
+            marker = fp.read(1)
+        if not marker:
+            return None
+        marker_code = marker[0]
+        if marker_code in (JPEG_SOS, JPEG_EOI):
+            return None
+        if marker_code in JPEG_STANDALONE_MARKERS:
+            continue
+
+        length_bytes = fp.read(2)
+        if len(length_bytes) < 2:
+            return None
+        segment_length = struct.unpack(">H", length_bytes)[0] - 2  # 长度字段包含自身的 2 字节
+        if segment_length < 0:
+            return None
+
+        if marker_code == JPEG_APP1:
+            segment = fp.read(segment_length)
+            if segment.startswith(EXIF_HEADER):
+                return segment[len(EXIF_HEADER):]
+            continue  # 其他 APP1 段 (例如 XMP)，继续查找
+        fp.seek(segment_length, io.SEEK_CUR)
+
+
+def parse_exif_tags(tags_exif: Dict[str, Any]) -> ExifResult:
+    """
+    将 exifread 解析出的标签转换为原始字典和结构化的 ExifData。
+
+    参数:
+        tags_exif (Dict[str, Any]): exifread.process_file 的返回值。
+
+    返回:
+        Tuple[Dict[str, str], Optional[ExifData]]:
+            - 经过基本过滤的原始EXIF数据，用于 file_metadata。
+            - 结构化的EXIF信息，用于 exif_info；无EXIF时为None。
+    """
+    if not tags_exif:
+        return {}, None
+
+    exif_data_raw = {
+        str(key): str(value)
+        for key, value in tags_exif.items()
+        if key not in EXCLUDED_EXIF_TAGS
+    }
+
+    # Helper function to safely get string value of a tag or None
+    def get_tag_str_value(tag_key: str) -> Optional[str]:
+        tag_value = tags_exif.get(tag_key)
+        return str(tag_value) if tag_value is not None else None
+
+    def get_alternative_tag_str_value(key1: str, key2: str) -> Optional[str]:
+        val = tags_exif.get(key1)
+        if val is not None:
+            return str(val)
+        val = tags_exif.get(key2)
+        return str(val) if val is not None else None
+
+    parsed_exif_object = ExifData(
+        make=get_tag_str_value("Image Make"),  # Camera Make
+        model=get_tag_str_value("Image Model"),  # Camera Model
+        lens_make=get_tag_str_value("Image LensMake"),
+        bits_per_sample=get_alternative_tag_str_value(
+            "Image BitsPerSample", "EXIF BitsPerSample"
+        ),
+        date_time_original=get_tag_str_value("EXIF DateTimeOriginal"),
+        exposure_time=get_tag_str_value("EXIF ExposureTime"),
+        f_number=get_tag_str_value("EXIF FNumber"),
+        exposure_program=get_tag_str_value("EXIF ExposureProgram"),
+        iso_speed_rating=get_tag_str_value("EXIF ISOSpeedRatings"),
+        focal_length=get_tag_str_value("EXIF FocalLength"),
+        lens_specification=get_alternative_tag_str_value(
+            "EXIF LensSpecification", "Image LensSpecification"
+        ),
+        lens_model=get_alternative_tag_str_value("EXIF LensModel", "Image LensModel"),
+        exposure_mode=get_tag_str_value("EXIF ExposureMode"),
+        cfa_pattern=get_tag_str_value("EXIF CFAPattern"),
+        color_space=get_tag_str_value("EXIF ColorSpace"),
+        white_balance=get_tag_str_value("EXIF WhiteBalance"),
+    )
+    return exif_data_raw, parsed_exif_object
+
+
+def parse_exif_segment(exif_segment: Optional[bytes]) -> ExifResult:
+    """
+    解析 EXIF 数据段 (TIFF 结构，可带 "Exif\\0\\0" 前缀)。同步阻塞，应在工作线程中调用。
+
+    参数:
+        exif_segment (Optional[bytes]): EXIF 数据段。
+
+    返回:
+        Tuple[Dict[str, str], Optional[ExifData]]: 原始EXIF字典和结构化EXIF信息。
+    """
+    if not exif_segment:
+        return {}, None
+    if exif_segment.startswith(EXIF_HEADER):
+        exif_segment = exif_segment[len(EXIF_HEADER):]
+    try:
+        tags_exif = exifread.process_file(io.BytesIO(exif_segment), details=False)
+    except Exception as e:  # exifread 对损坏数据可能抛出各种异常
+        print(f"提取 EXIF 信息时发生错误: {e}")  # 记录错误，但不中断流程
+        return {}, None
+    return parse_exif_tags(tags_exif)
+
+
+class ExifExtractionService:
+    """EXIF 提取服务
+
+    职责：
+        - 从文件中只读取 EXIF 所在的数据段，而不是交给 exifread 扫描整个文件
+        - 在容量有限的专用线程池中解析，避免占用事件循环和默认线程池
+    """
+
+    def __init__(self, max_workers: Optional[int] = None) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.exif_max_workers,
+            thread_name_prefix="exif",
+        )
+
+    async def parse_segment(self, exif_segment: Optional[bytes]) -> ExifResult:
+        """
+        在有界线程池中解析已读取的 EXIF 数据段 (例如图像处理时 Pillow 读到的 APP1 段)。
+
+        参数:
+            exif_segment (Optional[bytes]): EXIF 数据段。
+
+        返回:
+            Tuple[Dict[str, str], Optional[ExifData]]: 原始EXIF字典和结构化EXIF信息。
+        """
+        if not exif_segment:
+            return {}, None
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, parse_exif_segment, exif_segment
+        )
+
+    async def extract_from_file(self, image_path: Path) -> ExifResult:
+        """
+        在有界线程池中从 JPEG 文件读取并解析 APP1 段中的 EXIF 信息。
+
+        参数:
+            image_path (Path): 图片文件的绝对路径。
+
+        返回:
+            Tuple[Dict[str, str], Optional[ExifData]]: 原始EXIF字典和结构化EXIF信息；
+            非 JPEG、无 EXIF 或读取失败时返回空结果。
+        """
+
+        def extract() -> ExifResult:
+            try:
+                with open(image_path, "rb") as f:
+                    exif_segment = read_jpeg_exif_segment(f)
+            except OSError as e:
+                print(f"读取 EXIF 数据段失败 {image_path}: {e}")
+                return {}, None
+            return parse_exif_segment(exif_segment)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, extract)
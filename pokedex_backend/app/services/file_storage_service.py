@@ -3,10 +3,15 @@
 处理图片文件的上传、存储路径生成、物理保存和删除逻辑。
 """
 
+import asyncio
+import errno
+import hashlib
+import shutil
 import uuid
 import os
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Tuple
+from typing import AsyncIterator, Iterable, Optional, Tuple
 
 import aiofiles
 import aiofiles.os as aio_os  # For async file operations like stat and remove
@@ -14,12 +19,63 @@ from fastapi import UploadFile, HTTPException, status
 
 from app.core.config import settings
 
+# 用于识别上传内容真实类型的文件头魔数 (magic bytes)，不依赖客户端声明的 content_type
+IMAGE_SIGNATURES: Tuple[Tuple[bytes, str], ...] = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+SNIFF_HEADER_SIZE = 16  # 识别文件类型需要读取的文件头字节数
+# 根据识别出的类型确定存储扩展名，不使用客户端文件名中的扩展名；
+# 内容寻址存储模式下也保证相同内容总是落到同一路径
+MIME_TYPE_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+}
+
+
+def detect_image_mime_type(header: bytes) -> Optional[str]:
+    """
+    根据文件头魔数识别图片的MIME类型。
+
+    参数:
+        header (bytes): 文件开头的若干字节 (至少 12 字节才能识别 WebP)。
+
+    返回:
+        Optional[str]: 识别出的MIME类型，无法识别时返回None。
+    """
+    for signature, mime_type in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return mime_type
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+@dataclass
+class StoredUpload:
+    """一次上传在流式写入过程中收集到的全部信息，后续步骤无需再访问磁盘获取"""
+
+    absolute_path: Path  # 原图保存的绝对路径
+    stored_filename: str  # 存储时使用的唯一文件名 (含扩展名)
+    relative_sub_directory: Path  # 相对于图片根目录的子目录 (e.g., Path("ab/cd"))
+    size_bytes: int  # 实际写入磁盘的字节数
+    content_digest: str  # 文件内容的 SHA-256 十六进制摘要
+    mime_type: str  # 根据文件头魔数识别出的MIME类型
+    is_duplicate: bool = False  # 内容寻址模式下相同内容的文件已存在，本次未写入新文件
+    # 内容重复时保留的本次上传内容，引用计数提交之后由 settle_retained_copy 处理
+    # (提交之前共享文件可能正被删除最后一条引用的请求删除)
+    retained_copy: Optional[Path] = None
+
 
 class FileStorageService:
     """文件存储服务类
 
     负责管理图片文件的物理存储，包括：
-    - 生成基于UUID和分级目录的存储路径。
+    - 生成基于UUID (或内容摘要) 和分级目录的存储路径。
     - 异步保存上传的文件。
     - 异步删除物理文件。
     - 文件大小和类型校验（部分在此处理，部分在路由层）。
@@ -29,22 +85,27 @@ class FileStorageService:
         """初始化存储服务的根路径，并确保它们存在。"""
         self.image_storage_root: Path = settings.image_storage_root
         self.thumbnail_storage_root: Path = settings.thumbnail_storage_root
+        # 写入中的临时文件和分块上传的暂存文件 (不在静态文件目录下，不会被公开访问)
+        self.upload_staging_root: Path = settings.upload_staging_root
 
         # 确保根存储目录存在
         self.image_storage_root.mkdir(parents=True, exist_ok=True)
         self.thumbnail_storage_root.mkdir(parents=True, exist_ok=True)
+        self.upload_staging_root.mkdir(parents=True, exist_ok=True)
 
     async def _generate_structured_path(
-        self, original_filename: str, base_path: Path
+        self, original_filename: str, base_path: Path, file_key: Optional[str] = None
     ) -> Tuple[Path, str, Path]:
         """
         内部辅助方法：为文件生成一个结构化的存储路径和唯一文件名。
 
-        路径结构: base_path / <uuid_char1_2> / <uuid_char3_4> / <uuid>.<ext>
+        路径结构: base_path / <key_char1_2> / <key_char3_4> / <key>.<ext>
 
         参数:
             original_filename (str): 用户上传的原始文件名，用于提取扩展名。
             base_path (Path): 存储文件的基础根目录 (例如 images_root 或 thumbnails_root)。
+            file_key (Optional[str]): 用作文件名和分级目录的键，默认生成新的UUID；
+                                      内容寻址模式下传入内容摘要。
 
         返回:
             Tuple[Path, str, Path]:
@@ -58,7 +119,7 @@ class FileStorageService:
                 status_code=status.HTTP_400_BAD_REQUEST, detail="文件名缺少扩展名"
             )
 
-        file_uuid = uuid.uuid4().hex
+        file_uuid = file_key or uuid.uuid4().hex
         stored_filename = f"{file_uuid}{file_extension}"
 
         # 使用UUID的前4个字符创建两级子目录
@@ -74,53 +135,200 @@ class FileStorageService:
         full_file_path = absolute_save_directory / stored_filename
         return full_file_path, stored_filename, relative_sub_directory
 
-    async def save_upload_file(
-        self, upload_file: UploadFile, filename: str
-    ) -> Tuple[Path, str]:
+    async def _content_addressed_path(
+        self, content_digest: str, mime_type: str
+    ) -> Tuple[Path, str, Path]:
+        """内容寻址存储模式下根据内容摘要和识别出的类型计算存储路径 (返回值同 _generate_structured_path)"""
+        return await self._generate_structured_path(
+            original_filename=f"{content_digest}{MIME_TYPE_EXTENSIONS[mime_type]}",
+            base_path=self.image_storage_root,
+            file_key=content_digest,
+        )
+
+    async def _generated_path_for(self, mime_type: str) -> Tuple[Path, str, Path]:
+        """为新文件生成UUID命名的存储路径，扩展名由识别出的类型决定 (返回值同 _generate_structured_path)"""
+        file_key = uuid.uuid4().hex
+        return await self._generate_structured_path(
+            original_filename=f"{file_key}{MIME_TYPE_EXTENSIONS[mime_type]}",
+            base_path=self.image_storage_root,
+            file_key=file_key,
+        )
+
+    async def _move_into_storage(
+        self, source_path: Path, target_path: Path, exclusive: bool = False
+    ) -> None:
+        """
+        将暂存目录中写完的文件原子地放到存储路径。
+
+        exclusive 为 False 时用 replace 移动；为 True 时用硬链接创建目标文件
+        (目标已存在时抛出 FileExistsError，源文件保留，由调用方处理)。
+        暂存目录与存储目录不在同一文件系统 (EXDEV) 时，先把内容复制到目标目录下的临时文件，
+        再从该文件原子地 replace/link 到目标路径，不会在目标路径留下写了一半的文件。
+
+        参数:
+            source_path (Path): 暂存目录中的源文件。
+            target_path (Path): 最终存储路径。
+            exclusive (bool): 是否只在目标不存在时创建。
+        """
+        place = aio_os.link if exclusive else aio_os.replace
+        try:
+            await place(source_path, target_path)
+            return
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+
+        local_copy = target_path.parent / f".{uuid.uuid4().hex}.part"
+        await asyncio.to_thread(shutil.copyfile, source_path, local_copy)
+        try:
+            await place(local_copy, target_path)
+        finally:
+            # replace 成功后临时文件已不存在；link 成功或失败后都需要删除
+            await self.delete_file(local_copy)
+        if not exclusive:
+            await self.delete_file(source_path)
+
+    async def _place_content_addressed_file(
+        self, source_path: Path, image_absolute_path: Path
+    ) -> Optional[Path]:
+        """
+        将写完的临时文件放到内容寻址存储路径。
+
+        通过硬链接原子地创建目标文件：目标不存在时链接成功并删除临时文件；
+        目标已存在 (内容重复) 时不覆盖共享文件，临时文件保留到引用计数提交之后。
+
+        返回:
+            Optional[Path]: 内容重复时保留的临时文件路径，否则为None
+        """
+        try:
+            await self._move_into_storage(source_path, image_absolute_path, exclusive=True)
+        except FileExistsError:
+            return source_path
+        await self.delete_file(source_path)
+        return None
+
+    async def settle_retained_copy(self, stored_upload: StoredUpload) -> bool:
+        """
+        引用计数的事务提交之后，处理内容重复时保留的上传内容。
+
+        删除共享文件的一方在持有写锁的事务中确认没有引用之后才删除文件，
+        所以提交之后共享文件仍不存在，说明它在提交之前已被删除，此时用保留的内容恢复它。
+
+        返回:
+            bool: 是否恢复了共享文件 (复用的缩略图等派生文件同时被删除，需要重新生成)
+        """
+        retained_copy = stored_upload.retained_copy
+        if retained_copy is None:
+            return False
+        stored_upload.retained_copy = None
+        restored = False
+        try:
+            await self._move_into_storage(
+                retained_copy, stored_upload.absolute_path, exclusive=True
+            )
+            restored = True
+        except FileExistsError:
+            pass
+        await self.delete_file(retained_copy)
+        return restored
+
+    async def discard_retained_copy(self, stored_upload: StoredUpload) -> None:
+        """创建图片记录失败时删除内容重复时保留的上传内容"""
+        if stored_upload.retained_copy is not None:
+            await self.delete_file(stored_upload.retained_copy)
+            stored_upload.retained_copy = None
+
+    async def save_upload_file(self, upload_file: UploadFile) -> StoredUpload:
         """
         异步保存上传的图片文件。
 
+        文件以 `settings.upload_chunk_size` 为单位分块流式写入同目录下的临时文件，
+        写入过程中累计字节数、计算 SHA-256 摘要并校验大小限制，完成后通过原子重命名放到最终路径，
+        避免将整个文件读入内存，也不会在目标路径留下写了一半的文件。
+        文件类型根据文件头魔数识别，而不是信任客户端声明的 content_type，存储扩展名也由识别出的类型决定。
+
+        启用 `settings.content_addressed_storage` 时，文件以内容摘要命名并放在摘要派生的两级目录下；
+        若相同内容的文件已存在，则标记 is_duplicate，本次写入的临时文件保留到引用计数提交之后
+        (见 settle_retained_copy)。
+
         参数:
             upload_file (UploadFile): FastAPI的上传文件对象。
-            filename (str): 原始文件名 (通常来自 upload_file.filename)。
 
         返回:
-            Tuple[Path, str]:
-                - image_absolute_path (Path): 原图保存的绝对路径。
-                - stored_filename (str): 存储时使用的唯一文件名 (含扩展名)。
+            StoredUpload: 保存路径、字节数、内容摘要和识别出的MIME类型。
 
         可能抛出 HTTPException:
-            - 400 BAD_REQUEST: 如果文件类型不允许或无扩展名。
+            - 400 BAD_REQUEST: 如果文件类型不允许。
             - 413 REQUEST_ENTITY_TOO_LARGE: 如果文件大小超过限制。
             - 500 INTERNAL_SERVER_ERROR: 如果文件写入失败。
         """
-        if upload_file.content_type not in settings.allowed_mime_types:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"不支持的文件类型: {upload_file.content_type}.",
-            )
-
         # 文件大小校验 (使用 seek 和 tell 获取大小，避免一次性读入内存)
         upload_file.file.seek(0, os.SEEK_END)
         file_size = upload_file.file.tell()
         if file_size > settings.max_image_size:
+            await upload_file.close()
             raise HTTPException(
                 status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
                 detail=f"文件大小 {file_size / 1024 / 1024:.2f}MB 超过限制 ({settings.max_image_size / 1024 / 1024:.0f}MB).",
             )
         await upload_file.seek(0)  # 重置文件指针以供读取
 
-        image_absolute_path, stored_filename, _ = await self._generate_structured_path(
-            original_filename=filename, base_path=self.image_storage_root
-        )
-
+        header = await upload_file.read(SNIFF_HEADER_SIZE)
+        mime_type = detect_image_mime_type(header)
+        if mime_type not in settings.allowed_mime_types:
+            await upload_file.close()
+            detail = (
+                f"不支持的文件类型: {mime_type}."
+                if mime_type
+                else f"无法识别的文件内容 (声明类型: {upload_file.content_type})."
+            )
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+        content_addressed = settings.content_addressed_storage
+        if not content_addressed:
+            (
+                image_absolute_path,
+                stored_filename,
+                relative_sub_directory,
+            ) = await self._generated_path_for(mime_type)
+        # 先写入暂存目录下的临时文件 (内容寻址模式下摘要要在写完后才知道)，
+        # 由 _move_into_storage 原子地 replace/link 到最终路径
+        temp_file_path = self.upload_staging_root / f"{uuid.uuid4().hex}.part"
+
+        bytes_written = 0
+        digest = hashlib.sha256()
         try:
-            async with aiofiles.open(image_absolute_path, "wb") as out_file:
-                content = await upload_file.read()  # 异步读取文件内容
-                await out_file.write(content)  # 异步写入磁盘
+            async with aiofiles.open(temp_file_path, "wb") as out_file:
+                chunk = header  # 已读取的文件头作为第一块写入
+                while chunk:
+                    bytes_written += len(chunk)
+                    # 流式过程中再次校验大小，防止 seek/tell 得到的大小与实际内容不一致
+                    if bytes_written > settings.max_image_size:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"文件大小超过限制 ({settings.max_image_size / 1024 / 1024:.0f}MB).",
+                        )
+                    digest.update(chunk)
+                    await out_file.write(chunk)
+                    chunk = await upload_file.read(settings.upload_chunk_size)
+
+            retained_copy = None
+            if content_addressed:
+                (
+                    image_absolute_path,
+                    stored_filename,
+                    relative_sub_directory,
+                ) = await self._content_addressed_path(digest.hexdigest(), mime_type)
+                retained_copy = await self._place_content_addressed_file(
+                    temp_file_path, image_absolute_path
+                )
+            else:
+                await self._move_into_storage(temp_file_path, image_absolute_path)
+        except HTTPException:
+            await self.delete_file(temp_file_path)
+            raise
         except IOError as e:
-            # 可以考虑在这里清理已创建的空文件或部分写入的文件
-            # await self.delete_file(image_absolute_path) # 如果需要回滚
+            await self.delete_file(temp_file_path)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"无法保存文件到磁盘: {e}",
@@ -128,7 +336,156 @@ class FileStorageService:
         finally:
             await upload_file.close()
 
-        return image_absolute_path, stored_filename
+        return StoredUpload(
+            absolute_path=image_absolute_path,
+            stored_filename=stored_filename,
+            relative_sub_directory=relative_sub_directory,
+            size_bytes=bytes_written,
+            content_digest=digest.hexdigest(),
+            mime_type=mime_type,
+            is_duplicate=retained_copy is not None,
+            retained_copy=retained_copy,
+        )
+
+    def staging_path_for(self, upload_id: uuid.UUID) -> Path:
+        """分块上传会话的暂存文件路径"""
+        return self.upload_staging_root / f"{upload_id.hex}.part"
+
+    async def create_staging_file(self, upload_id: uuid.UUID, size_bytes: int) -> Path:
+        """
+        为分块上传会话创建暂存文件，并预先扩展到文件总大小，使各数据块可以按偏移乱序写入。
+
+        参数:
+            upload_id (uuid.UUID): 上传会话ID。
+            size_bytes (int): 文件总字节数。
+
+        返回:
+            Path: 暂存文件的绝对路径。
+        """
+        staging_path = self.staging_path_for(upload_id)
+        await aio_os.makedirs(staging_path.parent, exist_ok=True)
+        async with aiofiles.open(staging_path, "wb") as staging_file:
+            await staging_file.truncate(size_bytes)
+        return staging_path
+
+    async def write_staged_chunk(
+        self,
+        upload_id: uuid.UUID,
+        offset: int,
+        length: int,
+        data: AsyncIterator[bytes],
+    ) -> None:
+        """
+        将一个数据块从请求体流式写入暂存文件的指定偏移处，不在内存中缓存整个数据块。
+
+        参数:
+            upload_id (uuid.UUID): 上传会话ID。
+            offset (int): 数据块在文件中的起始偏移。
+            length (int): 数据块应有的字节数。
+            data (AsyncIterator[bytes]): 请求体的字节流 (例如 request.stream())。
+
+        可能抛出 HTTPException:
+            - 400 BAD_REQUEST: 如果数据块长度与预期不一致。
+            - 404 NOT_FOUND: 如果暂存文件不存在 (会话已完成或已取消)。
+        """
+        staging_path = self.staging_path_for(upload_id)
+        bytes_written = 0
+        try:
+            async with aiofiles.open(staging_path, "r+b") as staging_file:
+                await staging_file.seek(offset)
+                async for piece in data:
+                    bytes_written += len(piece)
+                    if bytes_written > length:
+                        raise HTTPException(
+                            status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"数据块超过预期长度 {length} 字节。",
+                        )
+                    await staging_file.write(piece)
+        except FileNotFoundError:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="上传会话的暂存文件不存在。"
+            )
+        if bytes_written != length:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"数据块长度 {bytes_written} 与预期的 {length} 字节不一致。",
+            )
+
+    async def finalize_staged_upload(self, upload_id: uuid.UUID) -> StoredUpload:
+        """
+        将所有数据块都已写入的暂存文件移动到最终存储路径。
+
+        在线程中顺序读取一遍暂存文件以识别类型并计算 SHA-256 摘要 (数据块可能乱序到达，
+        无法在写入时增量计算)，之后的路径规则与 save_upload_file 相同。
+
+        参数:
+            upload_id (uuid.UUID): 上传会话ID。
+
+        返回:
+            StoredUpload: 保存路径、字节数、内容摘要和识别出的MIME类型。
+
+        可能抛出 HTTPException:
+            - 400 BAD_REQUEST: 如果文件类型不允许 (暂存文件会被删除)。
+        """
+        staging_path = self.staging_path_for(upload_id)
+
+        def inspect_staging_file() -> Tuple[bytes, str, int]:
+            digest = hashlib.sha256()
+            size_bytes = 0
+            with open(staging_path, "rb") as staged:
+                header = staged.read(SNIFF_HEADER_SIZE)
+                chunk = header
+                while chunk:
+                    size_bytes += len(chunk)
+                    digest.update(chunk)
+                    chunk = staged.read(settings.upload_chunk_size)
+            return header, digest.hexdigest(), size_bytes
+
+        header, content_digest, size_bytes = await asyncio.to_thread(
+            inspect_staging_file
+        )
+        mime_type = detect_image_mime_type(header)
+        if mime_type not in settings.allowed_mime_types:
+            await self.delete_file(staging_path)
+            detail = (
+                f"不支持的文件类型: {mime_type}."
+                if mime_type
+                else "无法识别的文件内容."
+            )
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+        content_addressed = settings.content_addressed_storage
+        if content_addressed:
+            (
+                image_absolute_path,
+                stored_filename,
+                relative_sub_directory,
+            ) = await self._content_addressed_path(content_digest, mime_type)
+        else:
+            (
+                image_absolute_path,
+                stored_filename,
+                relative_sub_directory,
+            ) = await self._generated_path_for(mime_type)
+
+        retained_copy = None
+        if content_addressed:
+            retained_copy = await self._place_content_addressed_file(
+                staging_path, image_absolute_path
+            )
+        else:
+            await self._move_into_storage(staging_path, image_absolute_path)
+
+        return StoredUpload(
+            absolute_path=image_absolute_path,
+            stored_filename=stored_filename,
+            relative_sub_directory=relative_sub_directory,
+            size_bytes=size_bytes,
+            content_digest=content_digest,
+            mime_type=mime_type,
+            is_duplicate=retained_copy is not None,
+            retained_copy=retained_copy,
+        )
 
     async def delete_file(self, file_path: Path) -> bool:
         """
@@ -151,6 +508,19 @@ class FileStorageService:
             # 根据策略，这里可以返回False或重新抛出异常
             return False
 
+    async def delete_files(self, file_paths: Iterable[Path]) -> None:
+        """异步删除多个物理文件 (单个文件删除失败不影响其余文件)"""
+        for file_path in file_paths:
+            await self.delete_file(file_path)
+
+    def delete_files_sync(self, file_paths: Iterable[Path]) -> None:
+        """delete_files 的同步版本，供在线程池中运行的同步代码使用"""
+        for file_path in file_paths:
+            try:
+                file_path.unlink(missing_ok=True)
+            except OSError as e:
+                print(f"删除文件 {file_path} 时发生错误: {e}")
+
     async def get_relative_sub_directory_for_file(self, stored_filename: str) -> Path:
         """
         根据已存储的文件名（包含UUID）推断其相对子目录结构。
@@ -4,29 +4,138 @@
 """
 
 import asyncio
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Tuple
-from PIL import Image as PILImage
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import features as pil_features
 from fastapi import HTTPException, status
+
 from app.core.config import settings
+from app.services.thumbnail_engine import (
+    ALTERNATE_FORMATS,
+    THUMBNAIL_RENDITION,
+    ThumbnailEngine,
+    thumbnail_engine,
+)
+
+
+@dataclass
+class ProcessedImage:
+    """对已保存原图进行一次性处理后的结果"""
+
+    thumbnail_path: Optional[Path] = None  # 缩略图绝对路径，生成失败时为None
+    exif_segment: Optional[bytes] = None  # 解码时读到的 EXIF 数据段，交给 ExifExtractionService 解析
+    # 成功生成的尺寸档位 (含缩略图)：名称 → {"path": 相对缩略图根目录的路径, "width": 宽, "height": 高}
+    renditions: Dict[str, Dict[str, Any]] = field(default_factory=dict)
 
 
 class ImageProcessingService:
     """图像处理器
 
     职责：
-        - 生成和管理图片缩略图
+        - 生成和管理图片缩略图及响应式图片的多个尺寸档位 (实际解码由 ThumbnailEngine 在进程池中完成)
         - 保证图像处理过程的安全性和可靠性
     """
 
-    def __init__(self):
+    def __init__(self, engine: Optional[ThumbnailEngine] = None):
+        # 解码和缩放交给缩略图引擎 (默认使用应用共享的进程池)
+        self.thumbnail_engine: ThumbnailEngine = engine or thumbnail_engine
         self.thumbnail_storage_root: Path = settings.thumbnail_storage_root
         self.default_thumbnail_size: Tuple[int, int] = (
             settings.thumbnail_size
         )  # e.g. (256, 256)
+        # 除缩略图外的尺寸档位，e.g. {"medium": (1024, 1024), "large": (2048, 2048)}
+        self.rendition_sizes: Dict[str, Tuple[int, int]] = dict(settings.rendition_sizes)
+        # 每个档位额外编码的格式，跳过当前 Pillow 不支持编码的格式 (例如未编译 AVIF)
+        self.rendition_formats: List[str] = []
+        for format_name in settings.rendition_formats:
+            if format_name in ALTERNATE_FORMATS and pil_features.check(format_name):
+                self.rendition_formats.append(format_name)
+            else:
+                print(f"警告: 不支持的尺寸档位格式 {format_name}，已忽略。")
         # 确保缩略图根目录存在 (也可由FileStorageService或main.py保证)
         self.thumbnail_storage_root.mkdir(parents=True, exist_ok=True)
 
+    def _rendition_path_for(
+        self, relative_sub_dir: Path, stored_filename: str, rendition_name: str
+    ) -> Path:
+        """根据原图的相对子目录和存储文件名计算某个尺寸档位的绝对路径 (<stem>_<档位><ext>)。"""
+        original_stem = Path(stored_filename).stem
+        original_suffix = Path(stored_filename).suffix
+        return (
+            self.thumbnail_storage_root
+            / relative_sub_dir
+            / f"{original_stem}_{rendition_name}{original_suffix}"
+        )
+
+    def _thumbnail_path_for(self, relative_sub_dir: Path, stored_filename: str) -> Path:
+        """根据原图的相对子目录和存储文件名计算缩略图的绝对路径。"""
+        return self._rendition_path_for(
+            relative_sub_dir, stored_filename, THUMBNAIL_RENDITION
+        )
+
+    async def process_uploaded_image(
+        self,
+        source_image_path: Path,
+        relative_sub_dir: Path,
+        stored_filename: str,
+    ) -> ProcessedImage:
+        """
+        在缩略图引擎的工作进程中对刚保存的原图只打开、解码一次，生成缩略图和
+        settings.rendition_sizes 中配置的其他尺寸档位 (每档另存 settings.rendition_formats 中的
+        WebP/AVIF 版本)，并顺带取出 EXIF 数据段。
+
+        EXIF 数据段取自 Pillow 解析文件头时已读到的 APP1/eXIf 数据，调用方交给
+        ExifExtractionService 解析，不再为 EXIF 单独打开和读取一遍文件。
+        原图无法打开或解码时异常向上抛出，由后台任务队列记录失败并重试 (达到最大次数后标记为 failed)。
+
+        参数:
+            source_image_path (Path): 原始图片的绝对路径。
+            relative_sub_dir (Path): 图片在存储系统中的相对子目录 (例如 Path("ab/cd"))。
+            stored_filename (str): 图片存储时使用的唯一文件名 (包含扩展名)。
+
+        返回:
+            ProcessedImage: 缩略图路径、各尺寸档位以及原始 EXIF 数据段。
+
+        可能抛出:
+            OSError / ValueError / PIL.Image.DecompressionBombError: 原图无法打开或解码。
+        """
+        thumbnail_absolute_path = self._thumbnail_path_for(
+            relative_sub_dir, stored_filename
+        )
+        rendition_paths = {
+            name: self._rendition_path_for(relative_sub_dir, stored_filename, name)
+            for name in self.rendition_sizes
+        }
+
+        result = await self.thumbnail_engine.render(
+            source_image_path,
+            thumbnail_absolute_path,
+            self.default_thumbnail_size,
+            extra_renditions={
+                name: (path, self.rendition_sizes[name])
+                for name, path in rendition_paths.items()
+            },
+            alternate_formats=self.rendition_formats,
+        )
+
+        rendition_paths[THUMBNAIL_RENDITION] = thumbnail_absolute_path
+        return ProcessedImage(
+            thumbnail_path=thumbnail_absolute_path if result.thumbnail_written else None,
+            exif_segment=result.exif_segment,
+            renditions={
+                name: {
+                    "path": str(
+                        rendition_paths[name].relative_to(self.thumbnail_storage_root)
+                    ),
+                    "width": width,
+                    "height": height,
+                }
+                for name, (width, height) in result.renditions.items()
+            },
+        )
+
     async def generate_thumbnail(
         self,
         source_image_path: Path,  # 原图的绝对路径
@@ -54,34 +163,17 @@ class ImageProcessingService:
                 detail=f"生成缩略图失败：源文件不存在于 {source_image_path}",
             )
 
-        thumbnail_target_directory = self.thumbnail_storage_root / relative_sub_dir
-        await asyncio.to_thread(
-            thumbnail_target_directory.mkdir, parents=True, exist_ok=True
+        thumbnail_absolute_path = self._thumbnail_path_for(
+            relative_sub_dir, stored_filename
         )
 
-        original_stem = Path(stored_filename).stem
-        original_suffix = Path(stored_filename).suffix
-        thumbnail_filename = f"{original_stem}_thumb{original_suffix}"
-        thumbnail_absolute_path = thumbnail_target_directory / thumbnail_filename
-
         try:
-            # Pillow的图像操作是同步阻塞的，使用asyncio.to_thread在单独线程中运行
-            def process_image():
-                with PILImage.open(source_image_path) as img:
-                    # 保持宽高比进行缩放
-                    img.thumbnail(self.default_thumbnail_size)
-                    # 可以根据图片类型选择不同的保存选项，例如JPEG的quality
-                    if img.mode == "RGBA" and original_suffix.lower() in [
-                        ".jpg",
-                        ".jpeg",
-                    ]:
-                        # JPEG不支持alpha通道，转换为RGB
-                        img = img.convert("RGB")
-                    img.save(
-                        thumbnail_absolute_path, quality=settings.thumbnail_quality
-                    )
-
-            await asyncio.to_thread(process_image)
+            # Pillow的图像操作是同步阻塞的，交给缩略图引擎在工作进程中运行
+            result = await self.thumbnail_engine.render(
+                source_image_path, thumbnail_absolute_path, self.default_thumbnail_size
+            )
+            if not result.thumbnail_written:
+                raise OSError("缩略图保存失败")
 
         except FileNotFoundError:
             raise HTTPException(
@@ -0,0 +1,207 @@
+"""图片后处理任务队列模块
+
+上传接口在原图落盘、写入 pending 状态的图片记录后立即返回，缩略图、尺寸档位和 EXIF
+由本模块的工作协程从 SQLite 任务表中领取任务后异步完成。任务表是持久化的：
+应用重启后，未完成 (pending) 和中断 (processing) 的任务会继续执行。
+"""
+
+import asyncio
+from pathlib import Path
+from typing import Dict, List, Optional
+import uuid
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.crud import image_crud, job_crud
+from app.database import engine as default_engine
+from app.models import (
+    Category,
+    ExifData,
+    Image,
+    ImageProcessingJob,
+    PROCESSING_FAILED,
+)
+from app.services.exif_service import ExifExtractionService
+from app.services.image_processing_service import (
+    ImageProcessingService,
+    ProcessedImage,
+)
+
+
+class ImageProcessingQueue:
+    """图片后处理任务队列
+
+    职责：
+        - 启动时把上次中断的任务重新入队，并启动固定数量的工作协程
+        - 工作协程按入队顺序领取任务，在缩略图引擎和 EXIF 线程池中处理后写回图片记录
+        - 失败的任务在达到最大尝试次数前自动重试，之后图片被标记为 failed
+
+    只适用于单进程部署：多个应用进程共享同一数据库时，启动时的重新入队会把其他进程
+    正在处理的任务也重置为 pending。
+    """
+
+    def __init__(
+        self,
+        image_processor: Optional[ImageProcessingService] = None,
+        exif_extractor: Optional[ExifExtractionService] = None,
+        db_engine: Optional[Engine] = None,
+        workers: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+    ) -> None:
+        self.image_processor = image_processor or ImageProcessingService()
+        self.exif_extractor = exif_extractor or ExifExtractionService()
+        self.db_engine: Engine = db_engine or default_engine
+        self.workers = workers or settings.processing_workers
+        self.max_attempts = max_attempts or settings.processing_max_attempts
+        # 兜底轮询间隔：即使漏掉了入队通知 (例如任务由其他进程写入)，任务也会被领取
+        self.poll_interval = poll_interval or settings.processing_poll_interval
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        """重新入队中断的任务并启动工作协程 (应在应用启动时调用)"""
+        if self.running:
+            return
+        requeued = await run_in_threadpool(self._requeue_interrupted_jobs)
+        if requeued:
+            print(f"已重新入队 {requeued} 个中断的图片处理任务。")
+        self._wakeup = asyncio.Event()
+        self._wakeup.set()  # 启动后立即检查一次积压的任务
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"image-processing-{index}")
+            for index in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """停止工作协程 (应在应用关闭时调用)；正在处理的任务在下次启动时重新执行"""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._wakeup = None
+
+    def notify(self) -> None:
+        """通知工作协程有新任务入队 (任务记录提交之后调用)"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _worker(self) -> None:
+        while True:
+            # 先清除通知再领取任务，领取期间到达的通知不会丢失
+            self._wakeup.clear()
+            job = await run_in_threadpool(self._claim_next_job)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            # 可能还有更多积压的任务，唤醒其他空闲的工作协程
+            self._wakeup.set()
+            await self.run_job(job)
+
+    async def run_job(self, job: ImageProcessingJob) -> None:
+        """处理一个已领取的任务并记录结果，异常不会向外抛出"""
+        image = await run_in_threadpool(self._get_image, job.image_id)
+        if image is None:
+            # 图片已被删除 (其任务也随之删除)，无需处理
+            return
+        try:
+            processed = await self.image_processor.process_uploaded_image(
+                source_image_path=settings.image_storage_root / image.relative_file_path,
+                relative_sub_dir=Path(image.relative_file_path).parent,
+                stored_filename=image.stored_filename,
+            )
+            exif_data_raw, parsed_exif_object = await self.exif_extractor.parse_segment(
+                processed.exif_segment
+            )
+            await run_in_threadpool(
+                self._save_result, job, processed, exif_data_raw, parsed_exif_object
+            )
+        except Exception as e:
+            print(f"图片处理任务失败 (image_id={job.image_id}, 第 {job.attempts} 次): {e!r}")
+            await run_in_threadpool(self._record_failure, job, repr(e))
+
+    # --- 以下同步方法在线程池中执行，每次使用独立的数据库会话 ---
+
+    def _requeue_interrupted_jobs(self) -> int:
+        with Session(self.db_engine) as session:
+            return job_crud.requeue_interrupted_jobs(session=session)
+
+    def _claim_next_job(self) -> Optional[ImageProcessingJob]:
+        with Session(self.db_engine, expire_on_commit=False) as session:
+            return job_crud.claim_next_job(session=session)
+
+    def _get_image(self, image_id: uuid.UUID) -> Optional[Image]:
+        with Session(self.db_engine) as session:
+            image = session.get(Image, image_id)
+            if image is not None:
+                session.expunge(image)
+            return image
+
+    def _save_result(
+        self,
+        job: ImageProcessingJob,
+        processed: ProcessedImage,
+        exif_data_raw: Dict[str, str],
+        parsed_exif_object: Optional[ExifData],
+    ) -> None:
+        with Session(self.db_engine) as session:
+            image = session.get(Image, job.image_id)
+            db_job = session.get(ImageProcessingJob, job.id)
+            if image is None or db_job is None:
+                return  # 处理期间图片被删除
+            relative_thumbnail_path = (
+                str(
+                    processed.thumbnail_path.relative_to(
+                        self.image_processor.thumbnail_storage_root
+                    )
+                )
+                if processed.thumbnail_path
+                else None
+            )
+            image_crud.apply_processing_result(
+                session=session,
+                image=image,
+                relative_thumbnail_path=relative_thumbnail_path,
+                renditions=processed.renditions or None,
+                file_metadata=exif_data_raw or None,
+                exif_info=parsed_exif_object,
+            )
+            if db_job.set_as_category_thumbnail and relative_thumbnail_path:
+                category = session.get(Category, image.category_id)
+                if category is not None:
+                    category.thumbnail_path = relative_thumbnail_path
+                    session.add(category)
+            job_crud.finish_job(session=session, job=db_job)
+            session.commit()
+
+    def _record_failure(self, job: ImageProcessingJob, error: str) -> None:
+        with Session(self.db_engine) as session:
+            db_job = session.get(ImageProcessingJob, job.id)
+            if db_job is None:
+                return
+            job_crud.finish_job(
+                session=session,
+                job=db_job,
+                error=error,
+                max_attempts=self.max_attempts,
+            )
+            if db_job.status == PROCESSING_FAILED:
+                image = session.get(Image, job.image_id)
+                if image is not None:
+                    image.processing_status = PROCESSING_FAILED
+                    session.add(image)
+            session.commit()
+
+
+# 应用共享的任务队列 (在 main.py 的启动/关闭事件中启动和停止)
+image_processing_queue = ImageProcessingQueue()
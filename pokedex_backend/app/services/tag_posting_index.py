@@ -0,0 +1,154 @@
+"""标签倒排索引模块
+
+为标签搜索 (画廊的多标签筛选) 在内存中维护 标签 → 图片 的倒排表 (posting list)：
+所有带标签的图片按 (created_at, id) 排序后编号，每个标签对应其图片编号的有序数组。
+编号顺序就是分页顺序，因此 AND 查询沿最短的数组逐个检查其余标签的集合，OR 查询归并各数组，
+凑满一页即停止，代价与页大小而不是匹配的图片总数成正比，不需要在 SQL 中 JOIN 和 GROUP BY 关联表。
+
+索引在标签关联发生变化 (创建/删除图片、修改图片标签) 后由 CRUD 函数调用 invalidate 失效，
+下一次搜索时从数据库重建。失效只在当前进程内传播，因此只适用于单进程部署。
+
+重建时先读取版本号，再在新的会话中查询：新会话的读事务晚于版本号读取开始，
+看到的数据不早于该版本对应的提交。请求自己的会话可能在更早的读事务中 (例如已经查询过标签)，
+用它重建会把提交之前的数据当作当前版本缓存下来。
+"""
+
+import heapq
+import threading
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import groupby, islice
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+import uuid
+
+from sqlmodel import Session, select
+
+from app.crud.pagination import decode_cursor
+from app.models import Image, ImageTagLink
+
+
+@dataclass(frozen=True)
+class PostingSnapshot:
+    """某一时刻的倒排索引 (构建后不再修改，查询无需加锁)"""
+
+    keys: List[Tuple[datetime, uuid.UUID]]  # 编号 → (created_at, image_id)，按分页顺序排列
+    postings: Dict[uuid.UUID, Tuple[int, ...]]  # tag_id → 升序的图片编号
+    members: Dict[uuid.UUID, FrozenSet[int]]  # tag_id → 图片编号集合 (AND 查询的成员检查)
+
+
+class TagPostingIndex:
+    """按需构建、整体失效的标签倒排索引"""
+
+    def __init__(self) -> None:
+        self._snapshot: Optional[PostingSnapshot] = None
+        self._version = 0
+        # _lock 保护 _version 和 _snapshot (只短暂持有，invalidate 不会等待重建)；
+        # _build_lock 使同一时间只有一个线程在重建
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        """标签关联发生变化后调用 (事务提交之后)，下一次搜索时重建索引"""
+        with self._lock:
+            self._version += 1
+            self._snapshot = None
+
+    def snapshot(self, session: Session) -> PostingSnapshot:
+        """
+        返回当前索引，失效时先从数据库重建。
+
+        参数:
+            session (Session): 请求的数据库会话，只用来取得引擎；重建在新的会话中进行
+        """
+        with self._lock:
+            if self._snapshot is not None:
+                return self._snapshot
+        with self._build_lock:
+            with self._lock:
+                if self._snapshot is not None:
+                    return self._snapshot
+                version = self._version
+            # 版本号在任何查询之前读取，新会话的读事务不会早于这个版本
+            with Session(session.get_bind()) as build_session:
+                snapshot = self._build(build_session)
+            with self._lock:
+                # 构建期间索引又被失效时不保存 (本次查询仍使用构建结果)
+                if version == self._version:
+                    self._snapshot = snapshot
+            return snapshot
+
+    def search(
+        self,
+        session: Session,
+        tag_ids: Iterable[uuid.UUID],
+        match_all: bool = False,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> List[uuid.UUID]:
+        """
+        返回带有指定标签的图片ID，顺序和分页与 SQL 查询 (按 created_at, id 排序) 一致。
+
+        参数:
+            session (Session): 请求的数据库会话 (索引失效时用它的引擎重建)
+            tag_ids (Iterable[uuid.UUID]): 标签ID
+            match_all (bool): True 表示图片必须带有所有标签 (AND)，否则带有任意一个即可 (OR)
+            skip (int): 跳过的记录数 (提供 cursor 时忽略)
+            limit (int): 返回的最大记录数
+            cursor (Optional[str]): 上一页返回的游标
+
+        返回:
+            List[uuid.UUID]: 当前页的图片ID
+        """
+        snapshot = self.snapshot(session)
+        tag_ids = list(dict.fromkeys(tag_ids))
+        if not tag_ids:
+            return []
+        start = 0
+        if cursor:
+            start = bisect_right(snapshot.keys, decode_cursor(cursor))
+            skip = 0
+
+        def from_start(tag_id: uuid.UUID) -> Iterator[int]:
+            postings = snapshot.postings.get(tag_id, ())
+            return islice(postings, bisect_left(postings, start), None)
+
+        if match_all:
+            # 沿最短的数组逐个检查是否也属于其余每个标签
+            tag_ids.sort(key=lambda tag_id: len(snapshot.postings.get(tag_id, ())))
+            others = [snapshot.members.get(tag_id, frozenset()) for tag_id in tag_ids[1:]]
+            matches = (
+                position
+                for position in from_start(tag_ids[0])
+                if all(position in members for members in others)
+            )
+        else:
+            # 归并各标签的有序数组，去掉同时带有多个标签的重复编号
+            merged = heapq.merge(*(from_start(tag_id) for tag_id in tag_ids))
+            matches = (position for position, _ in groupby(merged))
+
+        page = islice(matches, skip, skip + limit)
+        return [snapshot.keys[position][1] for position in page]
+
+    @staticmethod
+    def _build(session: Session) -> PostingSnapshot:
+        rows = session.exec(
+            select(ImageTagLink.tag_id, Image.id, Image.created_at).join(
+                Image, Image.id == ImageTagLink.image_id
+            )
+        ).all()
+        keys = sorted({(created_at, image_id) for _, image_id, created_at in rows})
+        positions = {image_id: position for position, (_, image_id) in enumerate(keys)}
+        postings: Dict[uuid.UUID, set] = defaultdict(set)
+        for tag_id, image_id, _ in rows:
+            postings[tag_id].add(positions[image_id])
+        return PostingSnapshot(
+            keys=keys,
+            postings={tag_id: tuple(sorted(members)) for tag_id, members in postings.items()},
+            members={tag_id: frozenset(members) for tag_id, members in postings.items()},
+        )
+
+
+tag_posting_index = TagPostingIndex()
@@ -0,0 +1,59 @@
+"""标签使用次数对账模块
+
+Tag.usage_count 随图片标签关联的增删在同一事务中增量维护。本模块按配置的间隔在后台
+调用 tag_crud.reconcile_tag_usage_counts，按关联表全量重新计算一次，修正直接修改数据库
+等情况造成的偏差，并删除不再被使用的标签。
+"""
+
+import asyncio
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.crud import tag_crud
+from app.database import engine as default_engine
+
+
+class TagUsageReconciler:
+    """定期对账标签使用次数的后台协程 (未配置间隔时不启动)"""
+
+    def __init__(
+        self, db_engine: Optional[Engine] = None, interval: Optional[float] = None
+    ) -> None:
+        self.db_engine: Engine = db_engine or default_engine
+        self.interval = interval or settings.tag_usage_reconcile_interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """启动对账协程 (应在应用启动时调用)"""
+        if self._task is not None or not self.interval:
+            return
+        self._task = asyncio.create_task(self._run(), name="tag-usage-reconciler")
+
+    async def stop(self) -> None:
+        """停止对账协程 (应在应用关闭时调用)"""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def reconcile(self) -> int:
+        """执行一次全量对账，返回被修正的标签数量 (同步方法，在线程池中执行)"""
+        with Session(self.db_engine) as session:
+            return tag_crud.reconcile_tag_usage_counts(session=session)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                corrected = await run_in_threadpool(self.reconcile)
+                if corrected:
+                    print(f"标签使用次数对账：修正了 {corrected} 个标签。")
+            except Exception as e:
+                print(f"标签使用次数对账失败: {e!r}")
+
+
+tag_usage_reconciler = TagUsageReconciler()
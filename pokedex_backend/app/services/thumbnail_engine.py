@@ -0,0 +1,356 @@
+"""缩略图引擎模块
+
+在独立的进程池中解码图片并生成缩略图 (及其他尺寸档位)，使 Pillow 的解码不再与请求处理争用默认线程池和 GIL，
+并通过信号量限制同时进行的解码数量，超出部分排队等待 (背压)，同时统计队列深度和解码耗时。
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from PIL import Image as PILImage
+
+from app.core.config import settings
+
+
+THUMBNAIL_RENDITION = "thumb"  # 缩略图在尺寸档位中的名称，总会生成
+RenditionTarget = Tuple[Path, Tuple[int, int]]  # (保存路径, 最大宽高)
+
+# 尺寸档位可额外编码的格式: 名称 → (扩展名, MIME类型)，按内容协商时的优先顺序排列 (压缩率高的在前)。
+# 额外格式与原格式的文件同名、仅扩展名不同，例如 <stem>_thumb.jpg 旁的 <stem>_thumb.webp
+ALTERNATE_FORMATS: Dict[str, Tuple[str, str]] = {
+    "avif": (".avif", "image/avif"),
+    "webp": (".webp", "image/webp"),
+}
+
+
+def alternate_format_paths(rendition_path: Path) -> List[Path]:
+    """返回某个尺寸档位所有可能的额外格式文件路径 (无论是否已生成)。"""
+    return [
+        rendition_path.with_suffix(extension)
+        for extension, _ in ALTERNATE_FORMATS.values()
+    ]
+
+
+@dataclass
+class ThumbnailResult:
+    """工作进程返回的单张图片处理结果 (需可序列化后传回主进程)"""
+
+    renditions: Dict[str, Tuple[int, int]]  # 成功写入的尺寸档位名称 → 实际宽高
+    exif_segment: Optional[bytes]  # 解码时读到的 EXIF 数据段
+    decode_seconds: float  # 打开、解码、缩放并保存所有尺寸档位所用时间
+
+    @property
+    def thumbnail_written(self) -> bool:
+        """缩略图是否成功写入"""
+        return THUMBNAIL_RENDITION in self.renditions
+
+
+def fit_within(image_size: Tuple[int, int], max_size: Tuple[int, int]) -> Tuple[int, int]:
+    """计算保持宽高比、不超过 max_size 的目标尺寸 (不放大)。"""
+    width, height = image_size
+    max_width, max_height = max_size
+    scale = min(max_width / width, max_height / height, 1.0)
+    return max(round(width * scale), 1), max(round(height * scale), 1)
+
+
+def _draft_jpeg(img: PILImage.Image, target_size: Tuple[int, int]) -> Optional[Tuple]:
+    """
+    JPEG 快速路径：让解码器按 1/2、1/4、1/8 的 DCT 缩放直接解码出不小于目标尺寸的草稿图，
+    24MP 的原图解码的像素数可减少到约 1/64。必须在图像解码之前调用。
+
+    返回草稿图中与原图对应的区域 (用于 resize 的 box，避免向上取整产生的边缘偏移)，
+    不支持草稿模式的格式 (PNG、GIF 等) 返回None。
+    """
+    if img.format != "JPEG" or target_size == img.size:
+        return None
+    draft = img.draft(None, target_size)
+    return draft[1] if draft else None
+
+
+def _save_image(img: PILImage.Image, path: Path, quality: int) -> None:
+    if img.mode == "RGBA" and path.suffix.lower() in [".jpg", ".jpeg"]:
+        # JPEG不支持alpha通道，转换为RGB
+        img = img.convert("RGB")
+    img.save(path, quality=quality)
+
+
+def save_thumbnail(
+    img: PILImage.Image,
+    thumbnail_path: Path,
+    size: Tuple[int, int],
+    quality: int,
+    use_draft: bool = True,
+) -> None:
+    """
+    将刚打开 (尚未解码) 的图像缩放并保存为缩略图 (同步阻塞)。
+
+    JPEG 先以草稿模式解码出接近目标尺寸的图像再重采样；PNG、GIF 等格式没有草稿模式，
+    完整解码后先按整数倍盒式缩小 (reducing_gap) 再重采样。
+    """
+    # 目标尺寸按原始尺寸计算，草稿解码后的尺寸是向上取整的，不能用来计算宽高比
+    target_size = fit_within(img.size, size)
+    if target_size != img.size:
+        draft_box = _draft_jpeg(img, target_size) if use_draft else None
+        img = img.resize(
+            target_size, PILImage.Resampling.LANCZOS, box=draft_box, reducing_gap=2.0
+        )
+    _save_image(img, thumbnail_path, quality)
+
+
+def save_renditions(
+    img: PILImage.Image,
+    targets: Dict[str, RenditionTarget],
+    quality: int,
+    use_draft: bool = True,
+    alternate_formats: Sequence[str] = (),
+) -> Dict[str, Tuple[int, int]]:
+    """
+    对刚打开 (尚未解码) 的图像只解码一次，生成多个尺寸档位 (同步阻塞)。
+
+    按目标尺寸从大到小依次生成，每一档都从上一档缩小而来；JPEG 按最大一档的尺寸以草稿模式解码。
+    不小于原图的档位没有意义，直接跳过，但最小的一档 (缩略图) 总会生成。
+    某一档保存失败时删除写了一半的文件，只跳过该档。
+    每一档以原格式保存后，再编码为 alternate_formats 中的额外格式 (WebP/AVIF)，
+    额外格式编码失败只删除对应文件，原格式始终作为回退。
+
+    参数:
+        img (PILImage.Image): 刚打开的图像。
+        targets (Dict[str, RenditionTarget]): 档位名称 → (保存路径, 最大宽高)。
+        quality (int): JPEG/WebP/AVIF 编码质量。
+        use_draft (bool): JPEG 是否使用草稿模式解码。
+        alternate_formats (Sequence[str]): 额外编码的格式，ALTERNATE_FORMATS 中的名称。
+
+    返回:
+        Dict[str, Tuple[int, int]]: 成功写入的档位名称 → 实际宽高。
+    """
+    original_size = img.size
+    # 最小的一档按配置的最大宽高确定 (小图的多个档位缩放后可能同样大小)
+    smallest_name = min(targets, key=lambda name: targets[name][1][0] * targets[name][1][1])
+    planned = sorted(
+        (
+            (name, path, fit_within(original_size, max_size))
+            for name, (path, max_size) in targets.items()
+        ),
+        key=lambda plan: plan[2][0] * plan[2][1],
+        reverse=True,
+    )
+    planned = [
+        plan for plan in planned if plan[2] != original_size or plan[0] == smallest_name
+    ]
+
+    source, box = img, None
+    if use_draft:
+        box = _draft_jpeg(img, planned[0][2])
+
+    written: Dict[str, Tuple[int, int]] = {}
+    for name, path, target_size in planned:
+        try:
+            rendition = source
+            if box is not None or source.size != target_size:
+                rendition = source.resize(
+                    target_size, PILImage.Resampling.LANCZOS, box=box, reducing_gap=2.0
+                )
+            _save_image(rendition, path, quality)
+        except (OSError, ValueError) as e:
+            print(f"警告: 尺寸档位 {name} 生成失败 ({e}) 对于文件 {path.name}.")
+            path.unlink(missing_ok=True)
+            continue
+        written[name] = target_size
+        source, box = rendition, None
+
+        for format_name in alternate_formats:
+            alternate_path = path.with_suffix(ALTERNATE_FORMATS[format_name][0])
+            try:
+                _save_image(rendition, alternate_path, quality)
+            except (OSError, ValueError) as e:
+                print(f"警告: 尺寸档位 {name} 的 {format_name} 编码失败 ({e}).")
+                alternate_path.unlink(missing_ok=True)
+    return written
+
+
+def render_thumbnail(
+    source_image_path: Path,
+    targets: Dict[str, RenditionTarget],
+    quality: int,
+    read_block_size: int,
+    use_draft: bool = True,
+    alternate_formats: Sequence[str] = (),
+) -> ThumbnailResult:
+    """
+    打开原图一次，生成缩略图及其他尺寸档位，并取出 EXIF 数据段。在工作进程 (或线程) 中执行。
+
+    原图无法打开或识别时抛出 OSError / ValueError / DecompressionBombError，由调用方处理。
+    """
+    started = time.perf_counter()
+    for path, _ in targets.values():
+        path.parent.mkdir(parents=True, exist_ok=True)
+    with PILImage.open(source_image_path) as img:
+        # 以与上传相同的大块读取原图，减少解码时的 read 系统调用次数 (Pillow 默认 64KB)
+        img.decodermaxblock = max(img.decodermaxblock, read_block_size)
+        exif_bytes = img.info.get("exif")
+        renditions = save_renditions(
+            img, targets, quality, use_draft, alternate_formats
+        )
+        # PNG 的 eXIf 数据块可能位于图像数据之后，解码完成后再读取一次
+        exif_segment = exif_bytes or img.info.get("exif")
+    return ThumbnailResult(
+        renditions=renditions,
+        exif_segment=exif_segment,
+        decode_seconds=time.perf_counter() - started,
+    )
+
+
+@dataclass
+class ThumbnailEngineMetrics:
+    """缩略图引擎的运行指标"""
+
+    max_concurrency: int  # 允许同时进行的解码数量
+    queue_depth: int = 0  # 当前排队等待的任务数
+    max_queue_depth: int = 0  # 启动以来的最大排队任务数
+    in_flight: int = 0  # 当前正在解码的任务数
+    completed: int = 0  # 已完成的任务数
+    failed: int = 0  # 无法打开或解码的任务数
+    total_wait_seconds: float = 0.0  # 累计排队等待时间
+    total_decode_seconds: float = 0.0  # 累计解码时间 (工作进程内测得)
+    max_decode_seconds: float = 0.0  # 单张图片的最大解码时间
+
+    def snapshot(self) -> Dict[str, Union[int, float]]:
+        """返回当前指标的快照，附带平均等待和解码时间。"""
+        data: Dict[str, Union[int, float]] = asdict(self)
+        finished = self.completed + self.failed
+        data["avg_wait_seconds"] = self.total_wait_seconds / finished if finished else 0.0
+        data["avg_decode_seconds"] = (
+            self.total_decode_seconds / self.completed if self.completed else 0.0
+        )
+        return data
+
+
+class ThumbnailEngine:
+    """缩略图引擎
+
+    职责：
+        - 在进程池 (或线程池，见 settings.thumbnail_engine_mode) 中生成缩略图
+        - 用信号量限制同时进行的解码数量，超出部分在事件循环上排队，对上传形成背压
+        - 统计队列深度和解码耗时
+    """
+
+    def __init__(
+        self, max_workers: Optional[int] = None, mode: Optional[str] = None
+    ) -> None:
+        self.max_workers: int = (
+            max_workers or settings.thumbnail_max_workers or os.cpu_count() or 1
+        )
+        self.mode: str = mode or settings.thumbnail_engine_mode
+        if self.mode not in ("process", "thread"):
+            raise ValueError(f"未知的缩略图引擎模式: {self.mode}")
+        self.metrics = ThumbnailEngineMetrics(max_concurrency=self.max_workers)
+        self._executor: Optional[Executor] = None  # 首次使用时创建，避免导入模块时启动进程
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "process":
+                # 使用 spawn 启动工作进程：主进程中已有多个线程，fork 可能复制到被持有的锁
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="thumbnail"
+                )
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # asyncio.Semaphore 绑定到首次等待时的事件循环，事件循环变化时 (例如测试中) 重新创建
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def render(
+        self,
+        source_image_path: Path,
+        thumbnail_path: Path,
+        size: Optional[Tuple[int, int]] = None,
+        extra_renditions: Optional[Dict[str, RenditionTarget]] = None,
+        alternate_formats: Sequence[str] = (),
+    ) -> ThumbnailResult:
+        """
+        排队等待空闲的工作进程，然后在一次解码中生成缩略图 (及其他尺寸档位) 并取出 EXIF 数据段。
+
+        参数:
+            source_image_path (Path): 原图的绝对路径。
+            thumbnail_path (Path): 缩略图的绝对保存路径。
+            size (Optional[Tuple[int, int]]): 缩略图最大尺寸，默认 settings.thumbnail_size。
+            extra_renditions (Optional[Dict[str, RenditionTarget]]): 其他尺寸档位，
+                名称 → (绝对保存路径, 最大宽高)。
+            alternate_formats (Sequence[str]): 每个档位额外编码的格式 (例如 ["webp"])。
+
+        返回:
+            ThumbnailResult: 写入的尺寸档位、EXIF 数据段和解码耗时。
+
+        可能抛出:
+            OSError / ValueError / PIL.Image.DecompressionBombError: 原图无法打开或解码。
+        """
+        targets: Dict[str, RenditionTarget] = dict(extra_renditions or {})
+        targets[THUMBNAIL_RENDITION] = (
+            thumbnail_path,
+            tuple(size or settings.thumbnail_size),
+        )
+        semaphore = self._get_semaphore()
+        metrics = self.metrics
+        queued_at = time.perf_counter()
+        must_wait = semaphore.locked()  # 所有工作进程都在忙，需要排队
+        if must_wait:
+            metrics.queue_depth += 1
+            metrics.max_queue_depth = max(metrics.max_queue_depth, metrics.queue_depth)
+        try:
+            await semaphore.acquire()
+        finally:
+            if must_wait:
+                metrics.queue_depth -= 1
+        metrics.total_wait_seconds += time.perf_counter() - queued_at
+
+        metrics.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self._get_executor(),
+                render_thumbnail,
+                source_image_path,
+                targets,
+                settings.thumbnail_quality,
+                settings.upload_chunk_size,
+                settings.thumbnail_jpeg_draft,
+                tuple(alternate_formats),
+            )
+        except Exception:
+            metrics.failed += 1
+            raise
+        finally:
+            metrics.in_flight -= 1
+            semaphore.release()
+
+        metrics.completed += 1
+        metrics.total_decode_seconds += result.decode_seconds
+        metrics.max_decode_seconds = max(metrics.max_decode_seconds, result.decode_seconds)
+        return result
+
+    def shutdown(self) -> None:
+        """关闭工作进程池 (应用关闭时调用)。"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+# 应用内共享的缩略图引擎，保证所有上传共用同一个进程池和并发上限
+thumbnail_engine = ThumbnailEngine()
@@ -0,0 +1,134 @@
+"""慢查询日志模块
+
+通过 SQLAlchemy 的 before_cursor_execute / after_cursor_execute 事件统计每条语句的耗时：
+超过阈值的语句以 JSON 格式写入日志，同时在内存中按语句指纹保留最慢的 N 条，供管理接口查看。
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.models import SlowQueryStat
+
+logger = logging.getLogger("app.slow_query")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint_statement(statement: str) -> str:
+    """
+    计算语句指纹：字面量替换为 ?，IN (?, ?, ...) 折叠为 IN (...)，空白合并为一个空格。
+
+    selectinload 和 IN 查询的参数个数随数据变化，折叠后同一查询只对应一个指纹。
+    """
+    fingerprint = _STRING_LITERAL.sub("?", statement)
+    fingerprint = _NUMBER_LITERAL.sub("?", fingerprint)
+    fingerprint = _PLACEHOLDER_LIST.sub("(...)", fingerprint)
+    return _WHITESPACE.sub(" ", fingerprint).strip()
+
+
+class SlowQueryLog:
+    """按语句指纹统计执行耗时的慢查询记录器
+
+    所有语句都参与最慢 N 条的统计 (记录已满且耗时不超过其中最快的一条时直接跳过，
+    不计算指纹)，只有耗时达到 threshold_ms 的语句才写入日志。
+    """
+
+    def __init__(self, threshold_ms: float = 100.0, top_n: int = 20) -> None:
+        self.threshold_ms = threshold_ms
+        self.top_n = top_n
+        self._stats: Dict[str, SlowQueryStat] = {}
+        self._lock = threading.Lock()
+        self._admission_ms = 0.0  # 记录已满时进入前 N 条所需的最短耗时
+
+    def attach(self, engine: Engine) -> None:
+        """为引擎注册语句执行计时事件"""
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ) -> None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    def _after_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ) -> None:
+        duration_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1000
+        row_count = cursor.rowcount if cursor.rowcount >= 0 else None
+        self.record(statement, duration_ms, row_count, executemany)
+
+    def record(
+        self,
+        statement: str,
+        duration_ms: float,
+        row_count: Optional[int] = None,
+        executemany: bool = False,
+    ) -> None:
+        """
+        记录一次语句执行。
+
+        参数:
+            statement (str): 执行的SQL语句 (带占位符，不含参数值)
+            duration_ms (float): 执行耗时 (毫秒)
+            row_count (Optional[int]): 影响的行数，未知时为None
+            executemany (bool): 是否为批量执行
+        """
+        is_slow = duration_ms >= self.threshold_ms
+        if not is_slow and duration_ms <= self._admission_ms:
+            return
+
+        fingerprint = fingerprint_statement(statement)
+        if is_slow:
+            logger.warning(
+                json.dumps(
+                    {
+                        "event": "slow_query",
+                        "fingerprint": fingerprint,
+                        "duration_ms": round(duration_ms, 3),
+                        "row_count": row_count,
+                        "executemany": executemany,
+                    },
+                    ensure_ascii=False,
+                )
+            )
+
+        with self._lock:
+            stat = self._stats.get(fingerprint)
+            if stat is None:
+                if len(self._stats) >= self.top_n:
+                    fastest = min(self._stats.values(), key=lambda s: s.max_ms)
+                    if fastest.max_ms >= duration_ms:
+                        return
+                    del self._stats[fastest.fingerprint]
+                stat = self._stats[fingerprint] = SlowQueryStat(fingerprint=fingerprint)
+            stat.count += 1
+            stat.total_ms += duration_ms
+            stat.max_ms = max(stat.max_ms, duration_ms)
+            stat.last_ms = duration_ms
+            stat.last_row_count = row_count
+            stat.last_seen = datetime.utcnow()
+            if len(self._stats) >= self.top_n:
+                self._admission_ms = min(s.max_ms for s in self._stats.values())
+
+    def top(self, limit: Optional[int] = None) -> List[SlowQueryStat]:
+        """返回按最长耗时降序排列的语句统计"""
+        with self._lock:
+            stats = sorted(self._stats.values(), key=lambda s: s.max_ms, reverse=True)
+            return [stat.model_copy() for stat in stats[:limit]]
+
+    def reset(self) -> None:
+        """清空统计"""
+        with self._lock:
+            self._stats.clear()
+            self._admission_ms = 0.0
@@ -0,0 +1,155 @@
+"""静态文件服务模块
+
+- CachingStaticFiles: 为文件名不可变的图片 (uuid4 hex 或内容摘要命名) 返回长期缓存头和强 ETag；
+- RenditionStaticFiles: 在此基础上为缩略图目录按 Accept 头协商图片格式。
+"""
+
+import mimetypes
+import os
+from pathlib import PurePosixPath
+import re
+from typing import Dict, List, Optional
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, PathLike, StaticFiles
+from starlette.types import Scope
+
+from app.services.thumbnail_engine import ALTERNATE_FORMATS
+
+# Python 3.11 的 mimetypes 不认识 .avif，FileResponse 依赖它推断 Content-Type
+mimetypes.add_type("image/avif", ".avif")
+
+# 可以协商替换为 WebP/AVIF 的原格式扩展名
+NEGOTIABLE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif"}
+
+# 存储的文件名是 uuid4 hex (32 位) 或内容摘要 (内容寻址存储)，尺寸档位再加 _thumb/_medium 等后缀；
+# 同一文件名的内容不会改变，可以让浏览器长期缓存而不必重新验证
+IMMUTABLE_FILENAME = re.compile(r"^[0-9a-f]{32,}(?:_[a-z0-9]+)?\.[a-z0-9]+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age={max_age}, immutable"
+# 其他文件 (例如手动放入目录的文件) 每次使用前都用 ETag 重新验证
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+def parse_accept(accept_header: str) -> Dict[str, float]:
+    """
+    解析 Accept 头，返回显式列出的媒体类型及其 q 值。
+
+    通配符 (image/*、*/*) 不代表客户端能解码 WebP/AVIF，因此只认显式列出的类型。
+    """
+    accepted: Dict[str, float] = {}
+    for item in accept_header.split(","):
+        media_type, *params = (part.strip() for part in item.split(";"))
+        if not media_type:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[media_type.lower()] = quality
+    return accepted
+
+
+def parse_etags(header_value: str) -> List[str]:
+    """解析 If-None-Match 头，返回去掉弱验证前缀 W/ 的 ETag 列表 (If-None-Match 按弱比较匹配)"""
+    etags = []
+    for item in header_value.split(","):
+        item = item.strip()
+        if item.startswith("W/"):
+            item = item[2:]
+        if item:
+            etags.append(item)
+    return etags
+
+
+class CachingStaticFiles(StaticFiles):
+    """为不可变文件名返回长期缓存头的静态文件服务
+
+    - 文件名匹配 IMMUTABLE_FILENAME 时返回 Cache-Control: public, max-age=..., immutable，
+      浏览器在有效期内直接使用缓存，刷新页面也不会发出条件请求；其他文件返回 no-cache；
+    - ETag 由文件的 stat 信息 (修改时间纳秒值、大小) 和扩展名组成，不需要读取文件内容，
+      文件被替换时一定会变化，可作为强 ETag 使用；
+    - If-None-Match 匹配 (包括 *) 时返回 304，响应保留 ETag、Cache-Control 和 Vary；
+      请求带 If-None-Match 时忽略 If-Modified-Since (RFC 9110 13.1.3)。
+    """
+
+    def __init__(self, *args, immutable_max_age: int = 31536000, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.immutable_max_age = immutable_max_age
+
+    def cache_control_for(self, full_path: PathLike) -> str:
+        """根据文件名返回 Cache-Control 头的值"""
+        if IMMUTABLE_FILENAME.match(os.path.basename(full_path)):
+            return IMMUTABLE_CACHE_CONTROL.format(max_age=self.immutable_max_age)
+        return REVALIDATE_CACHE_CONTROL
+
+    @staticmethod
+    def etag_for(full_path: PathLike, stat_result: os.stat_result) -> str:
+        """
+        由 stat 信息计算强 ETag。
+
+        同一 URL 可能协商出不同格式的文件，ETag 中包含实际文件的扩展名，保证各格式的 ETag 不同。
+        """
+        extension = os.path.splitext(full_path)[1].lstrip(".").lower()
+        return f'"{extension}-{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+    def file_response(
+        self,
+        full_path: PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        headers = {
+            "cache-control": self.cache_control_for(full_path),
+            "etag": self.etag_for(full_path, stat_result),
+        }
+        response = FileResponse(
+            full_path, status_code=status_code, headers=headers, stat_result=stat_result
+        )
+        if status_code == 200 and self.is_not_modified(
+            response.headers, Headers(scope=scope)
+        ):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def is_not_modified(self, response_headers: Headers, request_headers: Headers) -> bool:
+        if_none_match: Optional[str] = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            etags = parse_etags(if_none_match)
+            return "*" in etags or response_headers["etag"] in etags
+        return super().is_not_modified(response_headers, request_headers)
+
+
+class RenditionStaticFiles(CachingStaticFiles):
+    """按 Accept 头选择尺寸档位格式的静态文件服务
+
+    请求 <stem>_thumb.jpg 时，如果客户端显式接受 image/avif 或 image/webp，
+    且同名的 .avif/.webp 文件存在，则返回该文件；否则回退到原格式文件。
+    所有响应 (包括 304) 都带 Vary: Accept，避免共享缓存把 WebP 返回给不支持的客户端。
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        requested = PurePosixPath(path)
+        if requested.suffix.lower() in NEGOTIABLE_EXTENSIONS:
+            accepted = parse_accept(Headers(scope=scope).get("accept", ""))
+            for extension, media_type in ALTERNATE_FORMATS.values():
+                if accepted.get(media_type, 0.0) <= 0:
+                    continue
+                try:
+                    response = await super().get_response(
+                        str(requested.with_suffix(extension)), scope
+                    )
+                except HTTPException:
+                    continue  # 该档位没有此格式的版本
+                response.headers["Vary"] = "Accept"
+                return response
+
+        response = await super().get_response(path, scope)
+        response.headers["Vary"] = "Accept"
+        return response
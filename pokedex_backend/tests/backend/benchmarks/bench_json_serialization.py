@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""图片列表 JSON 序列化基准测试
+
+对比图片列表响应 (List[ImageRead]) 的两种序列化方式：
+- default: FastAPI 的默认流程，按 response_model 逐条校验 ORM 对象 (from_attributes)、计算 computed_field、
+  转换为 JSON 兼容数据后由 JSONResponse 用标准库 json 编码；
+- fast: settings.fast_json_responses 开启后的流程，直接从 ORM 属性构造字典并由 ORJSONResponse 编码
+  (orjson 是可选依赖，未安装时与接口一样改用标准库 json 编码)。
+
+图片 (含标签、EXIF、尺寸档位) 从 SQLite 中读出后只计时序列化部分，并检查两种方式输出的 JSON 相同。
+
+用法 (在 pokedex_backend/ 目录下):
+    python -m tests.backend.benchmarks.bench_json_serialization [--sizes 1000 10000] [--repeat 5]
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.crud import category_crud, image_crud
+from app.fast_json import fast_json_response, images_to_list
+from app.models import CategoryCreate, ExifData, Image, ImageCreate, ImageRead
+from tests.backend.benchmarks.bench_sqlite_concurrency import TAG_NAMES, make_image_create
+
+RESPONSE_FIELD = create_model_field(
+    name="Response_List_ImageRead", type_=List[ImageRead], mode="serialization"
+)
+
+
+def seed_images(engine, count: int) -> None:
+    """创建 count 张带 2 个标签、EXIF 和两个尺寸档位的图片"""
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        category = category_crud.create_category(
+            session=session, category_create=CategoryCreate(name="Benchmark")
+        )
+        image_creates: List[ImageCreate] = []
+        for index in range(count):
+            image_create = make_image_create(category.id, index)
+            stem = image_create.stored_filename.split(".")[0]
+            image_create.relative_thumbnail_path = f"2025/01/{stem}_thumb.jpg"
+            image_create.exif_info = ExifData(make="Canon", model="EOS R5", iso_speed_rating="200")
+            image_create.renditions = {
+                "thumb": {"path": f"2025/01/{stem}_thumb.jpg", "width": 256, "height": 171},
+                "medium": {"path": f"2025/01/{stem}_medium.jpg", "width": 1024, "height": 683},
+            }
+            image_creates.append(image_create)
+        image_crud.create_images_with_tags(
+            db=session, image_creates=image_creates, tag_names=TAG_NAMES[:2]
+        )
+
+
+def default_serialize(images: List[Image]) -> bytes:
+    content = asyncio.run(serialize_response(field=RESPONSE_FIELD, response_content=images))
+    return JSONResponse(content).body
+
+
+def fast_serialize(images: List[Image]) -> bytes:
+    return fast_json_response(images_to_list(images), Response()).body
+
+
+def measure(serialize: Callable[[List[Image]], bytes], images: List[Image], repeat: int) -> Dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = serialize(images)
+        timings.append(time.perf_counter() - start)
+    return {
+        "median ms": statistics.median(timings) * 1000,
+        "min ms": min(timings) * 1000,
+        "KB": len(body) / 1024,
+        "body": body,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="图片列表 JSON 序列化基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="图片数量")
+    parser.add_argument("--repeat", type=int, default=5, help="每种方式的重复次数")
+    args = parser.parse_args()
+
+    print(f"{'images':>8}{'path':>10}{'median ms':>12}{'min ms':>10}{'KB':>10}{'speedup':>10}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.db'}")
+            seed_images(engine, size)
+            with Session(engine) as session:
+                images = image_crud.get_all_images(session=session, limit=size)
+                results = {
+                    "default": measure(default_serialize, images, args.repeat),
+                    "fast": measure(fast_serialize, images, args.repeat),
+                }
+            engine.dispose()
+
+        if json.loads(results["default"]["body"]) != json.loads(results["fast"]["body"]):
+            raise SystemExit("两种方式输出的 JSON 不一致")
+        baseline = results["default"]["median ms"]
+        for name, result in results.items():
+            print(
+                f"{size:>8}{name:>10}{result['median ms']:>12.1f}{result['min ms']:>10.1f}"
+                f"{result['KB']:>10.0f}{baseline / result['median ms']:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
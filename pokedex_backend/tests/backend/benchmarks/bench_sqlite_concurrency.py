@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""SQLite 并发读写基准测试
+
+在上传持续写入 (每次上传在一个事务中创建图片、关联标签并加入后处理任务) 的同时，
+多个线程反复执行类别图片列表查询，对比 SQLite 默认配置 (回滚日志、synchronous=FULL)
+与 Settings 中的 PRAGMA 配置 (WAL、synchronous=NORMAL、mmap 等) 下的读吞吐量、
+读延迟、写入次数以及 "database is locked" 错误数。
+
+FastAPI 在线程池中运行同步的数据库操作，因此这里用线程模拟并发请求。
+
+用法 (在 pokedex_backend/ 目录下):
+    python -m tests.backend.benchmarks.bench_sqlite_concurrency [--seconds 5] [--readers 4] [--writers 2]
+"""
+
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.crud import category_crud, image_crud
+from app.database import configure_sqlite_engine, sqlite_pragmas
+from app.models import CategoryCreate, ImageCreate
+
+SEED_IMAGES = 2000
+PAGE_SIZE = 50
+TAG_NAMES = ["鸟类", "哺乳动物", "昆虫", "植物", "benchmark"]
+
+
+def make_image_create(category_id: uuid.UUID, index: int) -> ImageCreate:
+    stored_filename = f"{uuid.uuid4().hex}.jpg"
+    return ImageCreate(
+        title=f"image {index}",
+        category_id=category_id,
+        original_filename=f"image_{index}.jpg",
+        stored_filename=stored_filename,
+        relative_file_path=f"2025/01/{stored_filename}",
+        mime_type="image/jpeg",
+        size_bytes=100_000,
+    )
+
+
+def seed_database(engine) -> uuid.UUID:
+    """创建一个类别和 SEED_IMAGES 张带标签的图片"""
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        category = category_crud.create_category(
+            session=session, category_create=CategoryCreate(name="Benchmark")
+        )
+        image_creates = [make_image_create(category.id, i) for i in range(SEED_IMAGES)]
+        image_crud.create_images_with_tags(
+            db=session, image_creates=image_creates, tag_names=TAG_NAMES[:2]
+        )
+        return category.id
+
+
+def run_profile(db_path: Path, tuned: bool, seconds: float, readers: int, writers: int) -> Dict:
+    engine = create_engine(
+        f"sqlite:///{db_path}", connect_args={"check_same_thread": False}
+    )
+    if tuned:
+        configure_sqlite_engine(engine)
+    category_id = seed_database(engine)
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    read_latencies: List[float] = []
+    counters = {"writes": 0, "read_errors": 0, "write_errors": 0}
+
+    def reader() -> None:
+        latencies = []
+        offset = 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                with Session(engine) as session:
+                    images = image_crud.get_images_by_category_id(
+                        session=session, category_id=category_id, skip=offset, limit=PAGE_SIZE
+                    )
+                    for image in images:
+                        image.tags  # 与接口序列化一样访问标签
+                latencies.append(time.perf_counter() - start)
+            except OperationalError:
+                with lock:
+                    counters["read_errors"] += 1
+            offset = (offset + PAGE_SIZE) % SEED_IMAGES
+        with lock:
+            read_latencies.extend(latencies)
+
+    def writer() -> None:
+        index = 0
+        while not stop.is_set():
+            try:
+                with Session(engine) as session:
+                    image_crud.create_image_with_tags(
+                        db=session,
+                        image_create=make_image_create(category_id, index),
+                        tag_names=TAG_NAMES[:2],  # 已存在的标签 (查找标签不会加载其图片)
+                    )
+                with lock:
+                    counters["writes"] += 1
+            except OperationalError:
+                with lock:
+                    counters["write_errors"] += 1
+            index += 1
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    read_latencies.sort()
+    return {
+        "reads/s": len(read_latencies) / seconds,
+        "read p50 ms": statistics.median(read_latencies) * 1000 if read_latencies else 0.0,
+        "read p95 ms": (
+            read_latencies[int(len(read_latencies) * 0.95)] * 1000 if read_latencies else 0.0
+        ),
+        "writes/s": counters["writes"] / seconds,
+        "read errors": counters["read_errors"],
+        "write errors": counters["write_errors"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SQLite 并发读写基准测试")
+    parser.add_argument("--seconds", type=float, default=5.0, help="每种配置的运行秒数")
+    parser.add_argument("--readers", type=int, default=4, help="读线程数")
+    parser.add_argument("--writers", type=int, default=2, help="写线程数 (模拟并发上传)")
+    args = parser.parse_args()
+
+    print(f"PRAGMA 配置: {sqlite_pragmas()}")
+    print(
+        f"{args.readers} 个读线程 (每次 {PAGE_SIZE} 张，含标签) + "
+        f"{args.writers} 个写线程，每种配置运行 {args.seconds:.0f}s"
+    )
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, tuned in (("default", False), ("tuned", True)):
+            results[name] = run_profile(
+                Path(tmp_dir) / f"{name}.db", tuned, args.seconds, args.readers, args.writers
+            )
+
+    columns = list(results["default"])
+    print(f"{'profile':<10}" + "".join(f"{column:>14}" for column in columns))
+    for name, result in results.items():
+        print(
+            f"{name:<10}"
+            + "".join(
+                f"{value:>14.1f}" if isinstance(value, float) else f"{value:>14}"
+                for value in result.values()
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
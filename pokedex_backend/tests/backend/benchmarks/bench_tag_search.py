@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""标签搜索基准测试
+
+对比多标签 AND/OR 搜索 (画廊的标签筛选) 在 SQL 查询 (关联表 (tag_id, image_id) 索引) 与
+内存倒排索引 (settings.tag_posting_index_enabled) 下的延迟。两种方式都包含按ID取回一页图片
+(含标签) 的查询，另外单独列出 (index) 倒排索引求交集/并集和分页本身的耗时。
+
+用法 (在 pokedex_backend/ 目录下):
+    python -m tests.backend.benchmarks.bench_tag_search [--images 20000] [--tags 200] [--repeat 200]
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List
+import uuid
+
+from sqlmodel import Session, SQLModel, col, create_engine, insert, select
+
+from app.core.config import settings
+from app.crud import image_crud
+from app.database import configure_sqlite_engine
+from app.models import Category, Image, ImageTagLink, Tag, normalize_tag_name
+from app.services.tag_posting_index import tag_posting_index
+
+PAGE_SIZE = 50
+
+
+def seed_database(engine, images: int, tags: int) -> List[str]:
+    """按 Zipf 式分布为每张图片随机分配 1~5 个标签 (少数标签非常常用)"""
+    SQLModel.metadata.create_all(engine)
+    rng = random.Random(0)
+    now = datetime.utcnow()
+    tag_rows = [
+        {"id": uuid.uuid4(), "name": f"tag-{i}", "name_normalized": normalize_tag_name(f"tag-{i}"),
+         "usage_count": 0, "created_at": now, "updated_at": now}
+        for i in range(tags)
+    ]
+    weights = [1 / (rank + 1) for rank in range(tags)]
+    with Session(engine) as session:
+        category = Category(name="Benchmark")
+        session.add(category)
+        session.flush()
+        session.exec(insert(Tag), params=tag_rows)
+        image_rows, link_rows = [], []
+        for index in range(images):
+            image_id = uuid.uuid4()
+            image_rows.append(
+                {"id": image_id, "category_id": category.id, "original_filename": f"{index}.jpg",
+                 "stored_filename": f"{index}.jpg", "relative_file_path": f"{index}.jpg",
+                 "processing_status": "done", "created_at": now + timedelta(seconds=index),
+                 "updated_at": now}
+            )
+            chosen = {rng.choices(range(tags), weights)[0] for _ in range(rng.randint(1, 5))}
+            link_rows += [{"image_id": image_id, "tag_id": tag_rows[i]["id"]} for i in chosen]
+        session.exec(insert(Image), params=image_rows)
+        session.exec(insert(ImageTagLink), params=link_rows)
+        session.commit()
+    return [row["name"] for row in tag_rows]
+
+
+def measure(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {"p50 ms": statistics.median(latencies), "p95 ms": latencies[int(len(latencies) * 0.95)]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="标签搜索基准测试")
+    parser.add_argument("--images", type=int, default=20000, help="图片数量")
+    parser.add_argument("--tags", type=int, default=200, help="标签数量")
+    parser.add_argument("--repeat", type=int, default=200, help="每个查询的重复次数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'tags.db'}")
+        configure_sqlite_engine(engine)
+        tag_names = seed_database(engine, args.images, args.tags)
+        queries = {
+            "OR  常用+常用": (tag_names[:2], False),
+            "AND 常用+常用": (tag_names[:2], True),
+            "AND 常用x3": (tag_names[:3], True),
+            "OR  少见x3": (tag_names[-3:], False),
+        }
+
+        print(f"{args.images} 张图片，{args.tags} 个标签，每页 {PAGE_SIZE} 张")
+        print(f"{'query':<14}{'mode':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        with Session(engine) as session:
+            for label, (names, match_all) in queries.items():
+                for mode, enabled in (("sql", False), ("postings", True)):
+                    settings.tag_posting_index_enabled = enabled
+                    result = measure(
+                        lambda: image_crud.get_images_by_tag_names(
+                            session=session, tag_names=names, match_all=match_all, limit=PAGE_SIZE
+                        ),
+                        args.repeat,
+                    )
+                    session.expunge_all()
+                    print(f"{label:<14}{mode:>10}{result['p50 ms']:>10.2f}{result['p95 ms']:>10.2f}")
+
+                tag_ids = session.exec(select(Tag.id).where(col(Tag.name).in_(names))).all()
+                result = measure(
+                    lambda: tag_posting_index.search(
+                        session, tag_ids, match_all=match_all, limit=PAGE_SIZE
+                    ),
+                    args.repeat,
+                )
+                print(f"{label:<14}{'index':>10}{result['p50 ms']:>10.2f}{result['p95 ms']:>10.2f}")
+        settings.tag_posting_index_enabled = False
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
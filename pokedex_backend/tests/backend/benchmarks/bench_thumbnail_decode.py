@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""缩略图解码基准测试
+
+对比三种生成缩略图的方式在测试素材上每张缩略图的耗时和峰值内存：
+    - full-decode:    完整解码原图后再缩放 (save_thumbnail 关闭草稿模式，PNG/GIF 的回退路径)
+    - pillow-default: 改造前 generate_thumbnail 的做法，直接调用 Image.thumbnail
+    - draft:          JPEG 草稿模式，按 DCT 缩放解码出接近目标尺寸的草稿图后再重采样
+
+峰值内存在每次测量独占的子进程中通过 ru_maxrss 的增量统计 (Pillow 的像素缓冲区不经过 tracemalloc)。
+
+用法 (在 pokedex_backend/ 目录下):
+    python -m tests.backend.benchmarks.bench_thumbnail_decode
+"""
+
+import multiprocessing
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Tuple
+
+from PIL import Image as PILImage
+
+from app.core.config import settings
+from app.services.thumbnail_engine import save_thumbnail
+
+ASSET_DIRS = [
+    Path(__file__).resolve().parents[3] / "app" / "static" / "uploads" / "images",
+    Path(__file__).resolve().parents[1] / "assets",
+]
+VARIANTS = ("full-decode", "pillow-default", "draft")
+TIMING_REPEATS = 3
+
+
+def make_thumbnail(variant: str, source: Path, thumbnail_path: Path) -> None:
+    size = tuple(settings.thumbnail_size)
+    with PILImage.open(source) as img:
+        if variant == "pillow-default":
+            img.thumbnail(size)
+            img.save(thumbnail_path, quality=settings.thumbnail_quality)
+        else:
+            save_thumbnail(
+                img,
+                thumbnail_path,
+                size,
+                settings.thumbnail_quality,
+                use_draft=(variant == "draft"),
+            )
+
+
+def measure(variant: str, source: Path, thumbnail_path: Path) -> Tuple[float, int]:
+    """在新的子进程中执行：返回平均耗时 (秒) 和首次生成时的峰值内存增量 (KB)"""
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    make_thumbnail(variant, source, thumbnail_path)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+
+    start = time.perf_counter()
+    for _ in range(TIMING_REPEATS):
+        make_thumbnail(variant, source, thumbnail_path)
+    return (time.perf_counter() - start) / TIMING_REPEATS, peak_kb
+
+
+def main() -> None:
+    sources: List[Path] = sorted(
+        p
+        for asset_dir in ASSET_DIRS
+        for p in asset_dir.rglob("*")
+        if p.suffix.lower() in (".jpg", ".jpeg", ".png", ".gif")
+    )
+    jpeg_count = sum(p.suffix.lower() in (".jpg", ".jpeg") for p in sources)
+    print(
+        f"样本: {len(sources)} 张图片 (其中 JPEG {jpeg_count} 张)，"
+        f"目标尺寸 {tuple(settings.thumbnail_size)}"
+    )
+    print(f"{'variant':<16}{'ms/thumb':>10}{'peak MB':>10}{'max peak MB':>13}")
+
+    # 每次测量使用全新的子进程，ru_maxrss 才能反映单张缩略图的峰值内存
+    with tempfile.TemporaryDirectory() as tmp_dir, ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=multiprocessing.get_context("spawn"),
+        max_tasks_per_child=1,
+    ) as executor:
+        for variant in VARIANTS:
+            results = [
+                executor.submit(
+                    measure, variant, source, Path(tmp_dir) / f"thumb{source.suffix}"
+                ).result()
+                for source in sources
+            ]
+            n = len(results)
+            peaks = [peak_kb for _, peak_kb in results]
+            print(
+                f"{variant:<16}{sum(t for t, _ in results) / n * 1000:>10.1f}"
+                f"{sum(peaks) / n / 1024:>10.1f}{max(peaks) / 1024:>13.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
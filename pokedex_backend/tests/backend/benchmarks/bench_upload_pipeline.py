@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""上传流水线基准测试
+
+对比旧的上传流程 (整文件读入内存写盘 → Pillow 重新打开生成缩略图 → 再次 open() 交给 exifread
+→ stat 获取大小) 与新的单次处理流程 (流式写入时计算摘要/大小/类型 → 工作线程中只打开一次原图，
+同时完成缩略图与 EXIF) 每次上传对已存储文件的访问次数、读系统调用次数和读取字节数。
+样本文件放入 UploadFile 的过程在统计之外，两条流程的统计范围都从读取 UploadFile 开始。
+
+读取字节数无法减半：缩略图仍需解码整个原图，旧流程中 exifread 只读取文件开头，省掉的字节很少。
+单次处理流程还会生成多档尺寸和格式的派生图，耗时列不能直接比较。
+
+用法 (在 pokedex_backend/ 目录下):
+    python -m tests.backend.benchmarks.bench_upload_pipeline
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import exifread
+from PIL import Image as PILImage
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+
+from app.core.config import settings
+from app.services.file_storage_service import FileStorageService
+from app.services.exif_service import parse_exif_segment
+from app.services.image_processing_service import ImageProcessingService
+from app.services.thumbnail_engine import ThumbnailEngine
+
+ASSET_DIRS = [
+    Path(__file__).resolve().parents[3] / "app" / "static" / "uploads" / "images",
+    Path(__file__).resolve().parents[1] / "assets",
+]
+SPOOL_MAX_SIZE = 1024 * 1024  # 与 Starlette 解析 multipart 时使用的 SpooledTemporaryFile 阈值一致
+
+
+class IOCounter:
+    """统计对原图存储目录中文件的 open/stat 次数，以及进程级读系统调用次数和读取字节数
+
+    open 通过审计钩子统计，stat 通过临时包装 os.stat 统计 (pathlib 在调用时查找 os.stat)。
+    """
+
+    def __init__(self, originals_root: Path) -> None:
+        self.originals_root = str(originals_root)
+        self.opens = 0
+        self.stats = 0
+        self.enabled = False
+        self._os_stat = os.stat
+        sys.addaudithook(self._hook)
+
+    def _is_original(self, path) -> bool:
+        return isinstance(path, (str, Path)) and str(path).startswith(self.originals_root)
+
+    def _hook(self, event: str, args: tuple) -> None:
+        if self.enabled and event == "open" and self._is_original(args[0]):
+            self.opens += 1
+
+    def _counting_stat(self, path, *args, **kwargs):
+        if self.enabled and self._is_original(path):
+            self.stats += 1
+        return self._os_stat(path, *args, **kwargs)
+
+    @staticmethod
+    def _proc_io() -> Dict[str, int]:
+        try:
+            with open("/proc/self/io") as f:
+                return {k: int(v) for k, v in (line.split(": ") for line in f)}
+        except OSError:
+            return {"syscr": 0, "rchar": 0}  # 非 Linux 平台只统计 open 次数
+
+    def __enter__(self) -> "IOCounter":
+        self.opens = self.stats = 0
+        os.stat = self._counting_stat
+        self._start = self._proc_io()
+        self.enabled = True
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.enabled = False
+        os.stat = self._os_stat
+        end = self._proc_io()
+        self.read_syscalls = end["syscr"] - self._start["syscr"]
+        self.bytes_read = end["rchar"] - self._start["rchar"]
+
+
+def make_upload_file(source: Path) -> UploadFile:
+    """像 Starlette 一样把源文件放进 SpooledTemporaryFile，构造 UploadFile"""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    spool.write(source.read_bytes())
+    spool.seek(0)
+    return UploadFile(
+        file=spool,
+        filename=source.name,
+        headers=Headers({"content-type": "image/jpeg"}),
+    )
+
+
+async def legacy_pipeline(
+    storage: FileStorageService, processor: ImageProcessingService, upload_file: UploadFile
+) -> None:
+    """复现改造前 upload_image 的文件处理步骤"""
+    image_path, stored_filename, relative_sub_dir = await storage._generate_structured_path(
+        original_filename=upload_file.filename,  # type: ignore
+        base_path=storage.image_storage_root,
+    )
+    content = await upload_file.read()
+    with open(image_path, "wb") as out_file:
+        out_file.write(content)
+    await upload_file.close()
+    # 旧的 generate_thumbnail：检查原图存在后用 Pillow 默认的读取块大小重新打开解码
+    thumbnail_path = processor._thumbnail_path_for(relative_sub_dir, stored_filename)
+
+    def make_thumbnail() -> None:
+        if not image_path.is_file():
+            return
+        thumbnail_path.parent.mkdir(parents=True, exist_ok=True)
+        with PILImage.open(image_path) as img:
+            img.thumbnail(processor.default_thumbnail_size)
+            if img.mode == "RGBA" and thumbnail_path.suffix.lower() in [".jpg", ".jpeg"]:
+                img = img.convert("RGB")
+            img.save(thumbnail_path, quality=settings.thumbnail_quality)
+
+    await asyncio.to_thread(make_thumbnail)
+    with open(image_path, "rb") as f:
+        exifread.process_file(f, details=False)
+    os.stat(image_path)
+
+
+async def single_pass_pipeline(
+    storage: FileStorageService, processor: ImageProcessingService, upload_file: UploadFile
+) -> None:
+    """新的单次处理流程"""
+    stored = await storage.save_upload_file(upload_file=upload_file)
+    processed = await processor.process_uploaded_image(
+        source_image_path=stored.absolute_path,
+        relative_sub_dir=stored.relative_sub_directory,
+        stored_filename=stored.stored_filename,
+    )
+    parse_exif_segment(processed.exif_segment)
+
+
+async def run_benchmark(sources: List[Path], storage_root: Path) -> None:
+    settings.image_storage_root = storage_root / "images"
+    settings.thumbnail_storage_root = storage_root / "thumbnails"
+    storage = FileStorageService()
+    # 使用线程模式的缩略图引擎，使解码发生在本进程内，才能被 IOCounter 统计到
+    processor = ImageProcessingService(engine=ThumbnailEngine(mode="thread"))
+    counter = IOCounter(settings.image_storage_root)
+
+    print(f"样本: {len(sources)} 张图片 (open/stat 仅统计原图文件)")
+    print(
+        f"{'pipeline':<12}{'open':>8}{'stat':>8}{'read syscalls':>15}"
+        f"{'KB read':>10}{'ms':>8}   (每张平均)"
+    )
+    averages: List[List[float]] = []
+    for name, pipeline in (("legacy", legacy_pipeline), ("single-pass", single_pass_pipeline)):
+        opens = stats = read_syscalls = bytes_read = 0
+        elapsed = 0.0
+        for source in sources:
+            upload_file = make_upload_file(source)
+            start = time.perf_counter()
+            with counter:
+                await pipeline(storage, processor, upload_file)
+            elapsed += time.perf_counter() - start
+            opens += counter.opens
+            stats += counter.stats
+            read_syscalls += counter.read_syscalls
+            bytes_read += counter.bytes_read
+        n = len(sources)
+        averages.append(
+            [opens / n, stats / n, read_syscalls / n, bytes_read / n / 1024, elapsed / n * 1000]
+        )
+        print(
+            f"{name:<12}{averages[-1][0]:>8.1f}{averages[-1][1]:>8.1f}{averages[-1][2]:>15.1f}"
+            f"{averages[-1][3]:>10.1f}{averages[-1][4]:>8.1f}"
+        )
+    # 目标是 open/stat/读系统调用/读取字节数各减少至少一半
+    reductions = [
+        (1 - new / old) * 100 if old else 0.0
+        for old, new in zip(averages[0][:4], averages[1][:4])
+    ]
+    print(
+        f"{'reduction':<12}{reductions[0]:>7.0f}%{reductions[1]:>7.0f}%"
+        f"{reductions[2]:>14.0f}%{reductions[3]:>9.0f}%"
+    )
+
+
+def main() -> None:
+    sources = sorted(
+        p
+        for asset_dir in ASSET_DIRS
+        for p in asset_dir.rglob("*")
+        if p.suffix.lower() in (".jpg", ".jpeg", ".png", ".gif")
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        asyncio.run(run_benchmark(sources, Path(tmp_dir)))
+
+
+if __name__ == "__main__":
+    main()
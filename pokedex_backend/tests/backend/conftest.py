@@ -14,7 +14,8 @@ def engine_fixture():
     # 这里我们显式导入，以确保测试环境的独立性和可靠性。
     try:
         # 导入 app.models 会触发 app/models/__init__.py 中的模型加载和 model_rebuild
-        import pokedex_backend.app.models
+        # 应用内部统一使用 `app.` 绝对导入，因此测试需在 pokedex_backend/ 目录下运行
+        import app.models
     except ImportError as e:
         print(f"ERROR: Failed to import models in conftest.py: {e}")
         raise
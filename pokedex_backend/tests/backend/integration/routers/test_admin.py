@@ -0,0 +1,22 @@
+import httpx
+import pytest
+
+from app.database import slow_query_log
+from app.main import app
+
+
+@pytest.mark.asyncio
+async def test_admin_endpoint_lists_and_resets_slow_queries():
+    """管理接口按最长耗时降序返回统计，DELETE 后清空"""
+    slow_query_log.reset()
+    slow_query_log.record("SELECT slow", 50.0)
+    slow_query_log.record("SELECT slower", 80.0)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/api/admin/slow-queries/", params={"limit": 2})
+        assert response.status_code == 200
+        assert [s["fingerprint"] for s in response.json()] == ["SELECT slower", "SELECT slow"]
+        assert response.json()[0]["avg_ms"] == 80.0
+
+        assert (await client.delete("/api/admin/slow-queries/")).status_code == 204
+        assert (await client.get("/api/admin/slow-queries/")).json() == []
@@ -0,0 +1,237 @@
+import io
+from pathlib import Path
+
+import httpx
+import pytest
+from PIL import Image as PILImage
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.database import get_async_session, get_session
+from app.main import app
+from app.models import Image, ImageProcessingJob
+from app.routers import images as images_router
+
+
+def make_jpeg(color: str) -> bytes:
+    buffer = io.BytesIO()
+    PILImage.new("RGB", (320, 240), color=color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def isolated_app(tmp_path: Path, monkeypatch):
+    """使用临时 SQLite 文件和临时存储目录运行应用 (不启动后台任务队列)"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'batch.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    SQLModel.metadata.create_all(engine)
+
+    def get_session_override():
+        with Session(engine) as session:
+            yield session
+            session.commit()
+
+    # async def 接口使用异步会话；NullPool 使连接随会话关闭，不跨测试的事件循环复用
+    async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'batch.db'}", poolclass=NullPool
+    )
+
+    async def get_async_session_override():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+            await session.commit()
+
+    images_root = tmp_path / "images"
+    images_root.mkdir()
+    monkeypatch.setattr(settings, "image_storage_root", images_root)
+    monkeypatch.setattr(images_router.file_storage, "image_storage_root", images_root)
+    staging_root = tmp_path / "staging"
+    staging_root.mkdir()
+    monkeypatch.setattr(images_router.file_storage, "upload_staging_root", staging_root)
+
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_async_session] = get_async_session_override
+    yield app, engine
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_batch_upload_creates_all_images_in_one_request(isolated_app):
+    """验证一个请求上传多个文件：有效文件全部入库并入队，无效文件单独报错
+
+    场景：
+    - 一次上传两张 JPEG 和一个文本文件，附带标题和共用标签
+
+    期望结果：
+    - 两张图片以 pending 状态创建，标题按顺序对应，共用同一组标签
+    - 每张图片各有一个后处理任务，只有第一张的任务负责设置类别缩略图
+    - 文本文件在结果中返回错误，不影响其他文件
+    """
+    test_app, engine = isolated_app
+    transport = httpx.ASGITransport(app=test_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/api/categories/", json={"name": "Batch"})
+        category_id = response.json()["id"]
+
+        response = await client.post(
+            "/api/images/batch-upload/",
+            data={
+                "category_id": category_id,
+                "titles": ["红", "蓝", "文本"],
+                "tags": "鸟类,batch",
+                "set_as_category_thumbnail": "true",
+            },
+            files=[
+                ("files", ("red.jpg", make_jpeg("red"), "image/jpeg")),
+                ("files", ("blue.jpg", make_jpeg("blue"), "image/jpeg")),
+                ("files", ("notes.txt", b"not an image", "text/plain")),
+            ],
+        )
+
+    assert response.status_code == 201, response.text
+    body = response.json()
+    assert (body["uploaded"], body["failed"]) == (2, 1)
+    red, blue, notes = body["results"]
+    assert [red["image"]["title"], blue["image"]["title"]] == ["红", "蓝"]
+    assert red["image"]["processing_status"] == "pending"
+    assert {tag["name"] for tag in blue["image"]["tags"]} == {"鸟类", "batch"}
+    assert notes["filename"] == "notes.txt"
+    assert notes["image"] is None and notes["error"]
+
+    with Session(engine) as session:
+        assert len(session.exec(select(Image)).all()) == 2
+        jobs = {
+            str(job.image_id): job for job in session.exec(select(ImageProcessingJob))
+        }
+    assert set(jobs) == {red["image"]["id"], blue["image"]["id"]}
+    assert jobs[red["image"]["id"]].set_as_category_thumbnail
+    assert not jobs[blue["image"]["id"]].set_as_category_thumbnail
+
+
+@pytest.mark.asyncio
+async def test_batch_upload_rejects_mismatched_titles(isolated_app):
+    """titles 数量与文件数不一致时整个请求被拒绝，不创建任何记录"""
+    test_app, engine = isolated_app
+    transport = httpx.ASGITransport(app=test_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/api/categories/", json={"name": "Batch"})
+        response = await client.post(
+            "/api/images/batch-upload/",
+            data={"category_id": response.json()["id"], "titles": ["only one"]},
+            files=[
+                ("files", ("a.jpg", make_jpeg("red"), "image/jpeg")),
+                ("files", ("b.jpg", make_jpeg("blue"), "image/jpeg")),
+            ],
+        )
+
+    assert response.status_code == 400
+    with Session(engine) as session:
+        assert session.exec(select(Image)).all() == []
+
+
+@pytest.mark.asyncio
+async def test_batch_upload_reports_disk_errors_per_file(isolated_app, monkeypatch):
+    """保存单个文件时的磁盘错误 (OSError) 只作为该文件的错误返回，其余文件照常创建"""
+    test_app, engine = isolated_app
+    save_upload_file = images_router.file_storage.save_upload_file
+
+    async def failing_save(upload_file):
+        if upload_file.filename == "broken.jpg":
+            raise OSError("No space left on device")
+        return await save_upload_file(upload_file=upload_file)
+
+    monkeypatch.setattr(images_router.file_storage, "save_upload_file", failing_save)
+    transport = httpx.ASGITransport(app=test_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/api/categories/", json={"name": "Batch"})
+        response = await client.post(
+            "/api/images/batch-upload/",
+            data={"category_id": response.json()["id"]},
+            files=[
+                ("files", ("ok.jpg", make_jpeg("red"), "image/jpeg")),
+                ("files", ("broken.jpg", make_jpeg("blue"), "image/jpeg")),
+            ],
+        )
+
+    assert response.status_code == 201, response.text
+    ok, broken = response.json()["results"]
+    assert ok["image"] is not None
+    assert broken["image"] is None and broken["error"]
+    with Session(engine) as session:
+        assert len(session.exec(select(Image)).all()) == 1
+
+
+@pytest.mark.asyncio
+async def test_delete_image_and_category_use_async_session(isolated_app):
+    """删除图片和类别 (AsyncSession) 时一并删除文件、任务和不再使用的标签"""
+    test_app, engine = isolated_app
+    transport = httpx.ASGITransport(app=test_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/api/categories/", json={"name": "Batch"})
+        category_id = response.json()["id"]
+        response = await client.post(
+            "/api/images/batch-upload/",
+            data={"category_id": category_id, "tags": "batch"},
+            files=[
+                ("files", ("red.jpg", make_jpeg("red"), "image/jpeg")),
+                ("files", ("blue.jpg", make_jpeg("blue"), "image/jpeg")),
+            ],
+        )
+        red, blue = (item["image"] for item in response.json()["results"])
+
+        response = await client.delete(f"/api/images/{red['id']}/")
+        assert response.status_code == 204
+        assert (await client.get(f"/api/images/{red['id']}/")).status_code == 404
+        tags = (await client.get("/api/tags/")).json()
+        assert [(tag["name"], tag["usage_count"]) for tag in tags] == [("batch", 1)]
+
+        response = await client.delete(f"/api/categories/{category_id}/")
+        assert response.status_code == 204
+        assert (await client.get(f"/api/images/{blue['id']}/")).status_code == 404
+        assert (await client.get("/api/tags/")).json() == []
+
+    assert not any(settings.image_storage_root.rglob("*.jpg"))
+    with Session(engine) as session:
+        assert session.exec(select(ImageProcessingJob)).all() == []
+
+
+@pytest.mark.asyncio
+async def test_batch_upload_retry_with_upload_keys_is_idempotent(isolated_app):
+    """客户端重试整批请求 (例如上次响应丢失) 时，幂等键已创建过图片的文件不会重复创建"""
+    test_app, engine = isolated_app
+    transport = httpx.ASGITransport(app=test_app)
+    files = [
+        ("files", ("red.jpg", make_jpeg("red"), "image/jpeg")),
+        ("files", ("blue.jpg", make_jpeg("blue"), "image/jpeg")),
+    ]
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/api/categories/", json={"name": "Batch"})
+        category_id = response.json()["id"]
+
+        first = await client.post(
+            "/api/images/batch-upload/",
+            data={"category_id": category_id, "upload_keys": ["key-red"]},
+            files=files[:1],
+        )
+        retried = await client.post(
+            "/api/images/batch-upload/",
+            data={"category_id": category_id, "upload_keys": ["key-red", "key-blue"]},
+            files=files,
+        )
+
+    assert first.status_code == 201, first.text
+    assert retried.status_code == 201, retried.text
+    body = retried.json()
+    assert (body["uploaded"], body["failed"]) == (2, 0)
+    red, blue = body["results"]
+    assert red["image"]["id"] == first.json()["results"][0]["image"]["id"]
+    assert blue["image"]["original_filename"] == "blue.jpg"
+    with Session(engine) as session:
+        assert len(session.exec(select(Image)).all()) == 2
+        assert len(session.exec(select(ImageProcessingJob)).all()) == 2
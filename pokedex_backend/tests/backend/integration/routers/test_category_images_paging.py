@@ -0,0 +1,90 @@
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.crud.pagination import NEXT_CURSOR_HEADER
+from app.database import get_session
+from app.main import app
+from app.models import Category, Image
+
+
+@pytest.fixture
+def category_app(tmp_path: Path):
+    """临时 SQLite 文件中的一个类别，含 7 张按时间先后上传的图片"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'paging.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        category = Category(name="Paging")
+        session.add(category)
+        session.flush()
+        for index in range(7):
+            session.add(
+                Image(
+                    category_id=category.id,
+                    original_filename=f"{index}.jpg",
+                    stored_filename=f"{index}.jpg",
+                    relative_file_path=f"2025/01/{index}.jpg",
+                    created_at=datetime(2025, 1, 1) + timedelta(minutes=index),
+                )
+            )
+        session.commit()
+        category_id = str(category.id)
+
+    def get_session_override():
+        with Session(engine) as session:
+            yield session
+            session.commit()
+
+    app.dependency_overrides[get_session] = get_session_override
+    yield category_id
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_category_detail_returns_bounded_first_page(category_app):
+    """类别详情只返回 images_limit 张图片，游标可用于继续翻页直到最后一页"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get(
+            f"/api/categories/{category_app}/", params={"images_limit": 3}
+        )
+        assert response.status_code == 200
+        assert response.json()["name"] == "Paging"
+        assert [i["original_filename"] for i in response.json()["images"]] == ["0.jpg", "1.jpg", "2.jpg"]
+
+        filenames, cursor = [], response.headers[NEXT_CURSOR_HEADER]
+        while cursor:
+            page = await client.get(
+                f"/api/categories/{category_app}/images/", params={"limit": 3, "cursor": cursor}
+            )
+            filenames += [i["original_filename"] for i in page.json()]
+            cursor = page.headers.get(NEXT_CURSOR_HEADER)
+        assert filenames == ["3.jpg", "4.jpg", "5.jpg", "6.jpg"]
+
+
+@pytest.mark.asyncio
+async def test_stream_returns_every_image_as_ndjson(category_app):
+    """流式接口跨多个批次按顺序输出全部图片，每行一个 JSON 对象"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get(
+            f"/api/categories/{category_app}/images/stream/", params={"batch_size": 2}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        images = [json.loads(line) for line in response.text.splitlines()]
+        assert [i["original_filename"] for i in images] == [f"{n}.jpg" for n in range(7)]
+        assert images[0]["image_url"].endswith("2025/01/0.jpg")
+
+        missing = await client.get(
+            "/api/categories/00000000-0000-0000-0000-000000000000/images/stream/"
+        )
+        assert missing.status_code == 404
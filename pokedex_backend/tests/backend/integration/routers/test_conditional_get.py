@@ -0,0 +1,182 @@
+from pathlib import Path
+import uuid
+
+import httpx
+import pytest
+from sqlalchemy import event, text, update
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import change_versions
+from app.database import get_session
+from app.main import app
+from app.models import Category, Image, Tag, change_version_models, normalize_tag_name
+
+
+@pytest.fixture
+def conditional_app(tmp_path: Path):
+    """临时 SQLite 文件中的一个类别和一张带标签的图片，返回 (引擎, 类别ID, 图片ID, 执行过的语句)"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'conditional.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        category = Category(name="Conditional")
+        tag = Tag(name="鸟类", name_normalized=normalize_tag_name("鸟类"), usage_count=1)
+        image = Image(
+            category=category,
+            original_filename="0.jpg",
+            stored_filename="0.jpg",
+            relative_file_path="2025/01/0.jpg",
+            tags=[tag],
+        )
+        session.add(image)
+        session.commit()
+        category_id, image_id = str(category.id), str(image.id)
+
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    def get_session_override():
+        with Session(engine) as session:
+            yield session
+            session.commit()
+
+    app.dependency_overrides[get_session] = get_session_override
+    yield engine, category_id, image_id, statements
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+@pytest.fixture
+def triggerless_app(monkeypatch, request):
+    """与 conditional_app 相同，但按没有版本号触发器的数据库 (如 PostgreSQL) 处理"""
+    monkeypatch.setattr(change_version_models, "VERSION_TRIGGER_DIALECTS", ())
+    monkeypatch.setattr(change_versions, "VERSION_TRIGGER_DIALECTS", ())
+    return request.getfixturevalue("conditional_app")
+
+
+async def get(path: str, **headers: str) -> httpx.Response:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path, headers={k.replace("_", "-"): v for k, v in headers.items()})
+
+
+@pytest.mark.asyncio
+async def test_unchanged_resources_return_304_with_one_query(conditional_app):
+    """ETag 未变化时返回 304，只执行一次版本号查询"""
+    engine, category_id, image_id, statements = conditional_app
+
+    for path in (
+        "/api/categories/",
+        f"/api/categories/{category_id}/",
+        f"/api/images/{image_id}/",
+        "/api/tags/",
+    ):
+        first = await get(path)
+        assert first.status_code == 200
+        assert first.headers["etag"].startswith('W/"')
+        assert first.headers["cache-control"] == "no-cache"
+
+        statements.clear()
+        second = await get(path, if_none_match=first.headers["etag"])
+        assert second.status_code == 304, path
+        assert second.content == b""
+        assert second.headers["etag"] == first.headers["etag"]
+        assert len(statements) == 1 and "tableversion" in statements[0]
+
+
+@pytest.mark.asyncio
+async def test_writes_change_the_etag(conditional_app):
+    """相关表的任何写入 (包括 SQL 批量更新) 都会使 ETag 变化，不相关的表不影响"""
+    engine, category_id, image_id, _ = conditional_app
+    categories = await get("/api/categories/")
+    detail = await get(f"/api/categories/{category_id}/")
+    tags = await get("/api/tags/")
+
+    with Session(engine) as session:
+        session.exec(update(Tag).values(usage_count=Tag.usage_count + 1))
+        session.commit()
+
+    assert (await get("/api/categories/", if_none_match=categories.headers["etag"])).status_code == 304
+    changed_detail = await get(f"/api/categories/{category_id}/", if_none_match=detail.headers["etag"])
+    assert changed_detail.status_code == 200
+    assert changed_detail.headers["etag"] != detail.headers["etag"]
+    assert (await get("/api/tags/", if_none_match=tags.headers["etag"])).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_query_parameters_are_part_of_the_etag(conditional_app):
+    first_page = await get("/api/tags/?limit=1")
+    other_page = await get("/api/tags/?limit=2", if_none_match=first_page.headers["etag"])
+    assert other_page.status_code == 200
+    assert other_page.headers["etag"] != first_page.headers["etag"]
+
+
+@pytest.mark.asyncio
+async def test_missing_resource_is_still_404(conditional_app):
+    response = await get(
+        "/api/images/00000000-0000-0000-0000-000000000000/", if_none_match="*"
+    )
+    assert response.status_code == 404
+    assert "etag" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_writes_change_the_etag_without_triggers(triggerless_app):
+    """没有触发器时由会话提交前递增版本号：对象写入、关联表写入和批量更新都会使相关 ETag 变化"""
+    engine, category_id, image_id, _ = triggerless_app
+    with engine.connect() as connection:
+        triggers = connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'"))
+        assert triggers.all() == []
+
+    categories = await get("/api/categories/")
+    image = await get(f"/api/images/{image_id}/")
+    tags = await get("/api/tags/")
+
+    with Session(engine) as session:
+        session.get(Category, uuid.UUID(category_id)).name = "Renamed"
+        session.commit()
+    assert (await get("/api/categories/", if_none_match=categories.headers["etag"])).status_code == 200
+    assert (await get(f"/api/images/{image_id}/", if_none_match=image.headers["etag"])).status_code == 304
+    assert (await get("/api/tags/", if_none_match=tags.headers["etag"])).status_code == 304
+
+    # 只改多对多关系：image 表本身没有变化，imagetaglink 的版本号变化
+    with Session(engine) as session:
+        session.get(Image, uuid.UUID(image_id)).tags = []
+        session.commit()
+    assert (await get(f"/api/images/{image_id}/", if_none_match=image.headers["etag"])).status_code == 200
+
+    with Session(engine) as session:
+        session.exec(update(Tag).values(usage_count=0))
+        session.commit()
+    assert (await get("/api/tags/", if_none_match=tags.headers["etag"])).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_async_and_rolled_back_writes_without_triggers(triggerless_app):
+    """异步会话的写入同样递增版本号，回滚的写入不会递增"""
+    engine, category_id, _, _ = triggerless_app
+    categories = await get("/api/categories/")
+
+    with Session(engine) as session:
+        session.get(Category, uuid.UUID(category_id)).name = "Rolled back"
+        session.flush()
+        session.rollback()
+        session.commit()
+    assert (await get("/api/categories/", if_none_match=categories.headers["etag"])).status_code == 304
+
+    async_engine = create_async_engine(engine.url.set(drivername="sqlite+aiosqlite"))
+    try:
+        async with AsyncSession(async_engine) as session:
+            (await session.get(Category, uuid.UUID(category_id))).name = "Async"
+            await session.commit()
+    finally:
+        await async_engine.dispose()
+    assert (await get("/api/categories/", if_none_match=categories.headers["etag"])).status_code == 200
@@ -0,0 +1,178 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app import fast_json
+from app.core.config import settings
+from app.crud.pagination import NEXT_CURSOR_HEADER
+from app.database import get_session
+from app.main import app
+from app.models import Category, ExifData, Image, Tag, normalize_tag_name
+
+
+@pytest.fixture
+def gallery_engine(tmp_path: Path):
+    """临时 SQLite 文件中的一个类别，含 5 张带标签、EXIF 和尺寸档位的图片"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'fast_json.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        category = Category(name="Fast", thumbnail_path="2025/01/0_thumb.jpg")
+        tag = Tag(name="鸟类", name_normalized=normalize_tag_name("鸟类"), usage_count=5)
+        for index in range(5):
+            session.add(
+                Image(
+                    category=category,
+                    original_filename=f"{index}.jpg",
+                    stored_filename=f"{index}.jpg",
+                    relative_file_path=f"2025/01/{index}.jpg",
+                    relative_thumbnail_path=f"2025/01/{index}_thumb.jpg" if index else None,
+                    exif_info=ExifData(make="Canon", iso_speed_rating="200") if index % 2 else None,
+                    renditions={
+                        "medium": {"path": f"2025/01/{index}_medium.jpg", "width": 1024, "height": 768},
+                        "thumb": {"path": f"2025/01/{index}_thumb.jpg", "width": 256, "height": 192},
+                    },
+                    created_at=datetime(2025, 1, 1, 12, 0, 0, 123456) + timedelta(minutes=index),
+                    tags=[tag],
+                )
+            )
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def gallery_app(gallery_engine):
+    """使用 gallery_engine 的应用，返回类别ID"""
+    with Session(gallery_engine) as session:
+        category_id = str(session.exec(select(Category.id)).one())
+
+    def get_session_override():
+        with Session(gallery_engine) as session:
+            yield session
+            session.commit()
+
+    app.dependency_overrides[get_session] = get_session_override
+    yield category_id
+    app.dependency_overrides.clear()
+
+
+async def get_both(monkeypatch, path: str, **params):
+    """分别用默认方式和 fast_json_responses 请求同一接口"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        monkeypatch.setattr(settings, "fast_json_responses", False)
+        default = await client.get(path, params=params)
+        monkeypatch.setattr(settings, "fast_json_responses", True)
+        fast = await client.get(path, params=params)
+    return default, fast
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "path, params",
+    [
+        ("/api/categories/{category_id}/", {"images_limit": 3}),
+        ("/api/categories/{category_id}/images/", {"limit": 3}),
+        ("/api/images/", {"limit": 3}),
+        ("/api/images/by-tags/", {"tag": "鸟类", "limit": 3}),
+    ],
+)
+async def test_fast_path_matches_default_serialization(gallery_app, monkeypatch, path, params):
+    """开启 fast_json_responses 后输出的 JSON 和响应头 (游标、ETag) 与默认方式相同"""
+    default, fast = await get_both(monkeypatch, path.format(category_id=gallery_app), **params)
+
+    assert default.status_code == fast.status_code == 200
+    assert fast.json() == default.json()
+    assert fast.headers[NEXT_CURSOR_HEADER] == default.headers[NEXT_CURSOR_HEADER]
+    assert fast.headers.get("etag") == default.headers.get("etag")
+    assert fast.headers["content-type"] == "application/json"
+
+
+@pytest.mark.asyncio
+async def test_fast_path_without_orjson_matches_default_serialization(gallery_app, monkeypatch):
+    """未安装 orjson (可选依赖) 时改用标准库 json 编码，输出与默认方式相同"""
+    monkeypatch.setattr(fast_json, "orjson", None)
+    default, fast = await get_both(
+        monkeypatch, f"/api/categories/{gallery_app}/images/", limit=3
+    )
+
+    assert default.status_code == fast.status_code == 200
+    assert fast.json() == default.json()
+    assert fast.headers.get("etag") == default.headers.get("etag")
+
+
+@pytest.mark.asyncio
+async def test_fast_path_keeps_404(gallery_app, monkeypatch):
+    default, fast = await get_both(
+        monkeypatch, "/api/categories/00000000-0000-0000-0000-000000000000/"
+    )
+    assert default.status_code == fast.status_code == 404
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "path, params",
+    [
+        ("/api/categories/{category_id}/images/", {}),
+        ("/api/images/", {}),
+        ("/api/images/by-tags/", {"tag": "鸟类"}),
+    ],
+)
+async def test_sparse_fields_only_load_requested_columns(
+    gallery_engine, gallery_app, monkeypatch, path, params
+):
+    """fields 只返回请求的字段 (值与完整响应相同)，查询不读取未请求的列和标签"""
+    path = path.format(category_id=gallery_app)
+    default, _ = await get_both(monkeypatch, path, **params)
+    monkeypatch.setattr(settings, "fast_json_responses", False)
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(gallery_engine, "before_cursor_execute", listener)
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            sparse = await client.get(
+                path, params={**params, "fields": "id,title,thumbnail_url,srcset"}
+            )
+    finally:
+        event.remove(gallery_engine, "before_cursor_execute", listener)
+
+    assert sparse.status_code == 200
+    assert sparse.json() == [
+        {name: image[name] for name in ("id", "title", "thumbnail_url", "srcset")}
+        for image in default.json()
+    ]
+    image_queries = [s for s in statements if "FROM image" in s and "image.id" in s]
+    assert image_queries
+    for statement in image_queries:
+        assert "file_metadata" not in statement and "exif_info" not in statement
+    assert not any("imagetaglink" in s and "tag.name" in s for s in statements)
+
+
+@pytest.mark.asyncio
+async def test_sparse_fields_with_tags_and_exif(gallery_app):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/api/images/", params={"fields": "exif_info,tags,exif_info"})
+    assert response.status_code == 200
+    first, second = response.json()[:2]
+    assert list(first) == ["exif_info", "tags"]
+    assert first["exif_info"] is None and second["exif_info"]["make"] == "Canon"
+    assert [tag["name"] for tag in first["tags"]] == ["鸟类"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fields", ["id,password", "", " , "])
+async def test_unknown_fields_are_rejected(gallery_app, fields):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/api/images/", params={"fields": fields})
+    assert response.status_code == 400
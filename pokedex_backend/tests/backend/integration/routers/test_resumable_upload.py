@@ -0,0 +1,194 @@
+import asyncio
+import io
+from pathlib import Path
+
+import httpx
+import pytest
+from PIL import Image as PILImage
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.database import get_async_session, get_session
+from app.main import app
+from app.models import Image, ImageProcessingJob, UploadChunk, UploadSession
+from app.routers import images as images_router
+
+
+def make_jpeg() -> bytes:
+    buffer = io.BytesIO()
+    PILImage.effect_noise((320, 240), 64).convert("RGB").save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def isolated_app(tmp_path: Path, monkeypatch):
+    """使用临时 SQLite 文件、临时存储目录和很小的块大小运行应用 (不启动后台任务队列)"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'resumable.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    SQLModel.metadata.create_all(engine)
+
+    def get_session_override():
+        with Session(engine) as session:
+            yield session
+            session.commit()
+
+    # async def 接口使用异步会话；NullPool 使连接随会话关闭，不跨测试的事件循环复用
+    async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'resumable.db'}", poolclass=NullPool
+    )
+
+    async def get_async_session_override():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+            await session.commit()
+
+    images_root = tmp_path / "images"
+    images_root.mkdir()
+    monkeypatch.setattr(settings, "image_storage_root", images_root)
+    monkeypatch.setattr(images_router.file_storage, "image_storage_root", images_root)
+    staging_root = tmp_path / "staging"
+    staging_root.mkdir()
+    monkeypatch.setattr(images_router.file_storage, "upload_staging_root", staging_root)
+    monkeypatch.setattr(settings, "resumable_upload_chunk_size", 4096)
+
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_async_session] = get_async_session_override
+    yield app, engine, images_root
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+async def create_upload(client: httpx.AsyncClient, data: bytes) -> dict:
+    response = await client.post("/api/categories/", json={"name": "Resumable"})
+    response = await client.post(
+        "/api/images/uploads/",
+        json={
+            "category_id": response.json()["id"],
+            "filename": "noise.jpg",
+            "size_bytes": len(data),
+            "title": "噪声",
+            "tags": "分块",
+        },
+    )
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def chunk_of(data: bytes, upload: dict, index: int) -> bytes:
+    chunk_size = upload["chunk_size"]
+    return data[index * chunk_size : (index + 1) * chunk_size]
+
+
+@pytest.mark.asyncio
+async def test_resumable_upload_accepts_chunks_out_of_order(isolated_app):
+    """验证乱序、重复上传的数据块能拼出完整文件，完成后创建 pending 图片
+
+    场景：
+    - 创建会话后倒序上传除第一块外的所有块，并重复上传其中一块
+    - 查询会话状态，再补传第一块并完成上传
+
+    期望结果：
+    - 状态中只缺第一块
+    - 完成后创建 pending 图片和处理任务，文件内容与原文件一致，暂存文件和会话被删除
+    """
+    test_app, engine, images_root = isolated_app
+    data = make_jpeg()
+    transport = httpx.ASGITransport(app=test_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        upload = await create_upload(client, data)
+        upload_url = f"/api/images/uploads/{upload['id']}"
+        assert upload["chunk_count"] > 2
+        assert upload["missing_chunks"] == list(range(upload["chunk_count"]))
+
+        for index in reversed(range(1, upload["chunk_count"])):
+            response = await client.put(
+                f"{upload_url}/chunks/{index}", content=chunk_of(data, upload, index)
+            )
+            assert response.status_code == 200, response.text
+        response = await client.put(
+            f"{upload_url}/chunks/1", content=chunk_of(data, upload, 1)
+        )
+        assert response.status_code == 200
+
+        response = await client.get(f"{upload_url}/")
+        assert response.json()["missing_chunks"] == [0]
+        assert response.json()["received_bytes"] == len(data) - upload["chunk_size"]
+
+        response = await client.post(f"{upload_url}/complete/")
+        assert response.status_code == 409
+
+        await client.put(f"{upload_url}/chunks/0", content=chunk_of(data, upload, 0))
+        response = await client.post(f"{upload_url}/complete/")
+
+    assert response.status_code == 201, response.text
+    image = response.json()
+    assert image["title"] == "噪声"
+    assert image["processing_status"] == "pending"
+    assert [tag["name"] for tag in image["tags"]] == ["分块"]
+    assert (images_root / image["relative_file_path"]).read_bytes() == data
+    assert list(images_router.file_storage.upload_staging_root.iterdir()) == []
+
+    with Session(engine) as session:
+        assert session.exec(select(UploadSession)).all() == []
+        assert session.exec(select(UploadChunk)).all() == []
+        assert len(session.exec(select(ImageProcessingJob)).all()) == 1
+
+
+@pytest.mark.asyncio
+async def test_resumable_upload_rejects_bad_chunks_and_can_be_aborted(isolated_app):
+    """块号越界或长度不符时拒绝写入；取消上传后删除会话和暂存文件"""
+    test_app, engine, images_root = isolated_app
+    data = make_jpeg()
+    transport = httpx.ASGITransport(app=test_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        upload = await create_upload(client, data)
+        upload_url = f"/api/images/uploads/{upload['id']}"
+
+        response = await client.put(
+            f"{upload_url}/chunks/{upload['chunk_count']}", content=b"x"
+        )
+        assert response.status_code == 400
+        response = await client.put(f"{upload_url}/chunks/0", content=b"short")
+        assert response.status_code == 400
+        assert (await client.get(f"{upload_url}/")).json()["received_chunks"] == []
+
+        response = await client.delete(f"{upload_url}/")
+        assert response.status_code == 204
+        assert (await client.get(f"{upload_url}/")).status_code == 404
+
+    assert list(images_router.file_storage.upload_staging_root.iterdir()) == []
+    with Session(engine) as session:
+        assert session.exec(select(Image)).all() == []
+
+
+@pytest.mark.asyncio
+async def test_concurrent_chunks_are_all_recorded(isolated_app):
+    """验证并发上传的数据块都被记录 (每块一行，不会互相覆盖)，且上传过程中暂存文件不在图片目录下"""
+    test_app, engine, images_root = isolated_app
+    data = make_jpeg()
+    transport = httpx.ASGITransport(app=test_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        upload = await create_upload(client, data)
+        upload_url = f"/api/images/uploads/{upload['id']}"
+
+        responses = await asyncio.gather(
+            *(
+                client.put(f"{upload_url}/chunks/{index}", content=chunk_of(data, upload, index))
+                for index in range(upload["chunk_count"])
+            )
+        )
+        assert all(response.status_code == 200 for response in responses)
+        assert list(images_root.rglob("*")) == []
+
+        state = (await client.get(f"{upload_url}/")).json()
+        assert state["received_chunks"] == list(range(upload["chunk_count"]))
+        assert state["missing_chunks"] == []
+        response = await client.post(f"{upload_url}/complete/")
+
+    assert response.status_code == 201, response.text
+    assert (images_root / response.json()["relative_file_path"]).read_bytes() == data
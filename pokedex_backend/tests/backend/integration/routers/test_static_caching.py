@@ -0,0 +1,119 @@
+import os
+from pathlib import Path
+import uuid
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from PIL import Image as PILImage
+
+from app.static_files import CachingStaticFiles, RenditionStaticFiles, parse_etags
+
+STEM = uuid.uuid4().hex
+
+
+@pytest.fixture
+def static_app(tmp_path: Path) -> FastAPI:
+    images_dir = tmp_path / "images"
+    thumbnails_dir = tmp_path / "thumbnails"
+    images_dir.mkdir()
+    thumbnails_dir.mkdir()
+    PILImage.new("RGB", (64, 48), color="red").save(images_dir / f"{STEM}.jpg", "JPEG")
+    (images_dir / "readme.txt").write_text("not an upload")
+    PILImage.new("RGB", (32, 24), color="red").save(thumbnails_dir / f"{STEM}_thumb.jpg", "JPEG")
+    PILImage.new("RGB", (32, 24), color="red").save(thumbnails_dir / f"{STEM}_thumb.webp", "WEBP")
+    app = FastAPI()
+    app.mount("/uploaded_images", CachingStaticFiles(directory=images_dir), name="uploaded_images")
+    app.mount(
+        "/thumbnails",
+        RenditionStaticFiles(directory=thumbnails_dir, immutable_max_age=600),
+        name="thumbnails",
+    )
+    return app
+
+
+async def fetch(app: FastAPI, path: str, **headers: str) -> httpx.Response:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path, headers={k.replace("_", "-"): v for k, v in headers.items()})
+
+
+@pytest.mark.asyncio
+async def test_uuid_named_files_are_immutable(static_app: FastAPI):
+    """uuid 命名的原图和缩略图返回长期 immutable 缓存头和强 ETag"""
+    image = await fetch(static_app, f"/uploaded_images/{STEM}.jpg")
+    assert image.status_code == 200
+    assert image.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert image.headers["etag"].startswith('"jpg-')
+
+    thumbnail = await fetch(static_app, f"/thumbnails/{STEM}_thumb.jpg")
+    assert thumbnail.headers["cache-control"] == "public, max-age=600, immutable"
+
+
+@pytest.mark.asyncio
+async def test_other_files_are_revalidated(static_app: FastAPI):
+    response = await fetch(static_app, "/uploaded_images/readme.txt")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "no-cache"
+    assert "etag" in response.headers
+
+
+@pytest.mark.asyncio
+async def test_matching_if_none_match_returns_304(static_app: FastAPI):
+    """ETag 匹配 (包括弱比较和 *) 时返回不带正文的 304，并保留缓存相关的头"""
+    first = await fetch(static_app, f"/thumbnails/{STEM}_thumb.jpg", accept="image/webp")
+    etag = first.headers["etag"]
+
+    for if_none_match in (etag, f'"other", W/{etag}', "*"):
+        response = await fetch(
+            static_app,
+            f"/thumbnails/{STEM}_thumb.jpg",
+            accept="image/webp",
+            if_none_match=if_none_match,
+        )
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        assert response.headers["cache-control"] == first.headers["cache-control"]
+        assert response.headers["vary"] == "Accept"
+
+
+@pytest.mark.asyncio
+async def test_negotiated_formats_have_distinct_etags(static_app: FastAPI):
+    """同一 URL 协商出的 WebP 与 JPEG 的 ETag 不同，JPEG 的 ETag 不会让 WebP 请求得到 304"""
+    webp = await fetch(static_app, f"/thumbnails/{STEM}_thumb.jpg", accept="image/webp")
+    jpeg = await fetch(static_app, f"/thumbnails/{STEM}_thumb.jpg", accept="*/*")
+    assert webp.headers["etag"] != jpeg.headers["etag"]
+
+    response = await fetch(
+        static_app,
+        f"/thumbnails/{STEM}_thumb.jpg",
+        accept="image/webp",
+        if_none_match=jpeg.headers["etag"],
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+
+
+@pytest.mark.asyncio
+async def test_stale_etag_ignores_if_modified_since(static_app: FastAPI, tmp_path: Path):
+    """If-None-Match 不匹配时不再参考 If-Modified-Since，文件被替换后一定返回新内容"""
+    path = tmp_path / "images" / f"{STEM}.jpg"
+    first = await fetch(static_app, f"/uploaded_images/{STEM}.jpg")
+
+    PILImage.new("RGB", (80, 60), color="blue").save(path, "JPEG")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    response = await fetch(
+        static_app,
+        f"/uploaded_images/{STEM}.jpg",
+        if_none_match=first.headers["etag"],
+        if_modified_since=first.headers["last-modified"],
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != first.headers["etag"]
+
+
+def test_parse_etags_strips_weak_prefix():
+    assert parse_etags('W/"a", "b" ,, *') == ['"a"', '"b"', "*"]
@@ -0,0 +1,69 @@
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from PIL import Image as PILImage
+
+from app.static_files import RenditionStaticFiles, parse_accept
+
+
+@pytest.fixture
+def thumbnails_app(tmp_path: Path) -> FastAPI:
+    PILImage.new("RGB", (64, 48), color="red").save(tmp_path / "photo_thumb.jpg", "JPEG")
+    PILImage.new("RGB", (64, 48), color="red").save(tmp_path / "photo_thumb.webp", "WEBP")
+    PILImage.new("RGBA", (64, 48)).save(tmp_path / "icon_thumb.png", "PNG")
+    app = FastAPI()
+    app.mount("/thumbnails", RenditionStaticFiles(directory=tmp_path), name="thumbnails")
+    return app
+
+
+async def fetch(app: FastAPI, path: str, accept: str) -> httpx.Response:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path, headers={"Accept": accept})
+
+
+@pytest.mark.asyncio
+async def test_serves_webp_when_client_accepts_it(thumbnails_app: FastAPI):
+    """浏览器显式接受 image/webp 时，同一个 URL 返回 WebP 版本"""
+    response = await fetch(
+        thumbnails_app,
+        "/thumbnails/photo_thumb.jpg",
+        "image/avif,image/webp,image/apng,image/*,*/*;q=0.8",
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+    assert response.headers["vary"] == "Accept"
+    assert response.content[8:12] == b"WEBP"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("accept", ["*/*", "image/*", "image/webp;q=0"])
+async def test_falls_back_to_original_format(thumbnails_app: FastAPI, accept: str):
+    """只有通配符或 q=0 时不协商，返回原格式文件并带 Vary: Accept"""
+    response = await fetch(thumbnails_app, "/thumbnails/photo_thumb.jpg", accept)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/jpeg"
+    assert response.headers["vary"] == "Accept"
+
+
+@pytest.mark.asyncio
+async def test_falls_back_when_alternate_is_missing(thumbnails_app: FastAPI):
+    """旧数据没有 WebP 版本时返回原文件，缺失的文件仍然是 404"""
+    response = await fetch(thumbnails_app, "/thumbnails/icon_thumb.png", "image/webp")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+
+    missing = await fetch(thumbnails_app, "/thumbnails/missing_thumb.jpg", "image/webp")
+    assert missing.status_code == 404
+
+
+def test_parse_accept_reads_quality_values():
+    assert parse_accept("image/webp;q=0.5, IMAGE/AVIF, */*;q=0.1") == {
+        "image/webp": 0.5,
+        "image/avif": 1.0,
+        "*/*": 0.1,
+    }
@@ -0,0 +1,202 @@
+import asyncio
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+import httpx
+import pytest
+from PIL import Image as PILImage
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.database import get_async_session, get_session
+from app.main import app
+from app.routers import images as images_router
+from app.services.processing_queue import image_processing_queue
+from app.services.thumbnail_engine import ThumbnailEngine
+
+UPLOAD_BURST_SIZE = 8
+# 等待后台任务的上限，只用于测试失败时不卡住，不是性能断言
+GATE_TIMEOUT_SECONDS = 30
+
+
+def make_jpeg_with_exif() -> bytes:
+    """生成一张带 EXIF 的 JPEG"""
+    exif = PILImage.Exif()
+    exif[0x010F] = "TestMake"
+    exif[0x0110] = "TestModel"
+    buffer = io.BytesIO()
+    PILImage.linear_gradient("L").resize((600, 400)).convert("RGB").save(
+        buffer, "JPEG", exif=exif.tobytes(), quality=90
+    )
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def isolated_app(tmp_path: Path, monkeypatch):
+    """使用临时 SQLite 文件和临时存储目录运行应用，不依赖外部服务"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'latency.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    SQLModel.metadata.create_all(engine)
+
+    def get_session_override():
+        with Session(engine) as session:
+            yield session
+            session.commit()
+
+    # async def 接口使用异步会话；NullPool 使连接随会话关闭，不跨测试的事件循环复用
+    async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'latency.db'}", poolclass=NullPool
+    )
+
+    async def get_async_session_override():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+            await session.commit()
+
+    images_root = tmp_path / "images"
+    thumbnails_root = tmp_path / "thumbnails"
+    images_root.mkdir()
+    thumbnails_root.mkdir()
+    monkeypatch.setattr(settings, "image_storage_root", images_root)
+    monkeypatch.setattr(settings, "thumbnail_storage_root", thumbnails_root)
+    monkeypatch.setattr(images_router.file_storage, "image_storage_root", images_root)
+    staging_root = tmp_path / "staging"
+    staging_root.mkdir()
+    monkeypatch.setattr(images_router.file_storage, "upload_staging_root", staging_root)
+    monkeypatch.setattr(
+        images_router.file_storage, "thumbnail_storage_root", thumbnails_root
+    )
+    monkeypatch.setattr(
+        images_router.image_processor, "thumbnail_storage_root", thumbnails_root
+    )
+    # ASGITransport 不触发启动事件，由测试自行启动后台任务队列
+    monkeypatch.setattr(image_processing_queue, "db_engine", engine)
+    monkeypatch.setattr(image_processing_queue, "poll_interval", 0.05)
+
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_async_session] = get_async_session_override
+    yield app
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+class GatedExecutor(ThreadPoolExecutor):
+    """记录提交的函数及其运行线程的线程池；gate 打开之前所有任务都停在工作线程中"""
+
+    def __init__(self) -> None:
+        super().__init__(max_workers=2, thread_name_prefix="gated-thumbnail")
+        self.gate = threading.Event()
+        self.submitted: List[str] = []
+        self.worker_thread_ids: List[int] = []
+
+    def submit(self, fn, /, *args, **kwargs):
+        self.submitted.append(fn.__name__)
+
+        def gated():
+            self.worker_thread_ids.append(threading.get_ident())
+            # 超时只用于防止测试失败时卡住，正常情况下由测试打开
+            self.gate.wait(timeout=GATE_TIMEOUT_SECONDS)
+            return fn(*args, **kwargs)
+
+        return super().submit(gated)
+
+
+@pytest.fixture
+def gated_executor(monkeypatch):
+    """让后台处理使用线程模式的缩略图引擎，解码任务提交到 GatedExecutor"""
+    engine = ThumbnailEngine(max_workers=2, mode="thread")
+    executor = GatedExecutor()
+    engine._executor = executor
+    monkeypatch.setattr(image_processing_queue.image_processor, "thumbnail_engine", engine)
+    yield executor
+    executor.gate.set()
+    engine.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_upload_returns_before_processing_and_decode_runs_off_loop(
+    isolated_app, gated_executor
+):
+    """验证上传接口不等待图片处理，解码在工作线程中进行，事件循环在解码期间保持响应
+
+    场景：
+    - 后台任务队列未启动时并发上传多张带 EXIF 的 JPEG
+    - 启动队列后，解码任务停在工作线程中 (gate 未打开)，此时发起 GET 请求
+    - 打开 gate，等待处理完成
+
+    期望结果：
+    - 上传接口返回 pending 的图片，此时还没有任何解码任务
+    - 解码阻塞期间 GET 请求正常完成 (解码如果在事件循环上执行，请求将无法完成)
+    - 解码任务 (render_thumbnail) 只通过线程池执行，且不在事件循环所在的线程上
+    - 处理完成后图片都保存了缩略图和 EXIF 信息
+    """
+    image_bytes = make_jpeg_with_exif()
+    transport = httpx.ASGITransport(app=isolated_app)
+    loop_thread_id = threading.get_ident()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/api/categories/", json={"name": "Latency"})
+        assert response.status_code == 201, response.text
+        category_id = response.json()["id"]
+
+        responses = await asyncio.gather(
+            *(
+                client.post(
+                    "/api/images/upload/",
+                    data={"category_id": category_id},
+                    files={"file": (f"photo_{i}.jpg", image_bytes, "image/jpeg")},
+                )
+                for i in range(UPLOAD_BURST_SIZE)
+            )
+        )
+        for response in responses:
+            assert response.status_code == 201, response.text
+            assert response.json()["processing_status"] == "pending"
+        assert gated_executor.submitted == []
+
+        async def wait_until(predicate):
+            while not predicate():
+                await asyncio.sleep(0.01)
+
+        async def wait_processed(image_id: str):
+            while True:
+                image = (await client.get(f"/api/images/{image_id}/")).json()
+                if image["processing_status"] != "pending":
+                    return image
+                await asyncio.sleep(0.05)
+
+        await image_processing_queue.start()
+        try:
+            await asyncio.wait_for(
+                wait_until(lambda: gated_executor.worker_thread_ids), GATE_TIMEOUT_SECONDS
+            )
+            # 解码任务停在工作线程中，事件循环仍能处理请求
+            read_response = await asyncio.wait_for(
+                client.get("/api/categories/"), GATE_TIMEOUT_SECONDS
+            )
+            assert read_response.status_code == 200
+            image = (await client.get(f"/api/images/{responses[0].json()['id']}/")).json()
+            assert image["processing_status"] == "pending"
+
+            gated_executor.gate.set()
+            processed_images = await asyncio.wait_for(
+                asyncio.gather(*(wait_processed(r.json()["id"]) for r in responses)),
+                timeout=60,
+            )
+        finally:
+            await image_processing_queue.stop()
+
+    assert gated_executor.submitted == ["render_thumbnail"] * UPLOAD_BURST_SIZE
+    assert loop_thread_id not in gated_executor.worker_thread_ids
+    for image in processed_images:
+        assert image["processing_status"] == "done"
+        assert image["thumbnail_url"]
+        assert image["exif_info"]["make"] == "TestMake"
@@ -1,9 +1,15 @@
+from pathlib import Path
+
 import pytest
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session
-from pokedex_backend.app.models.category_models import CategoryCreate, Category
-from pokedex_backend.app.crud.category_crud import (
+
+from app.core.config import settings
+from app.models.category_models import CategoryCreate, Category
+from app.models import Image
+from app.crud.category_crud import (
     create_category,
-    get_category,
+    get_category_by_id,
     delete_category,
 )
 
@@ -11,7 +17,7 @@ from pokedex_backend.app.crud.category_crud import (
 def test_create_category(session: Session):
     """测试创建分类功能"""
     category_data = CategoryCreate(name="Test Category", description="Test description")
-    created_category = create_category(session, category_data)
+    created_category = create_category(session=session, category_create=category_data)
 
     assert created_category.id is not None
     assert created_category.name == "Test Category"
@@ -22,10 +28,10 @@ def test_get_category(session: Session):
     """测试获取分类详情"""
     # 先创建测试数据
     category_data = CategoryCreate(name="Test Get", description="For get test")
-    created_category = create_category(session, category_data)
+    created_category = create_category(session=session, category_create=category_data)
 
     # 测试获取
-    fetched_category = get_category(session, created_category.id)
+    fetched_category = get_category_by_id(session=session, category_id=created_category.id)
     assert fetched_category.name == "Test Get"
     assert fetched_category.description == "For get test"
 
@@ -34,22 +40,112 @@ def test_delete_category(session: Session):
     """测试删除分类功能"""
     # 创建测试数据
     category_data = CategoryCreate(name="To Delete", description="Will be deleted")
-    created_category = create_category(session, category_data)
+    created_category = create_category(session=session, category_create=category_data)
 
     # 执行删除
-    deleted = delete_category(session, created_category.id)
-    assert deleted is True
+    deleted = delete_category(session=session, category_id=created_category.id)
+    assert deleted is not None and deleted.id == created_category.id
 
     # 验证删除后无法查询
-    assert get_category(session, created_category.id) is None
+    assert get_category_by_id(session=session, category_id=created_category.id) is None
+    assert delete_category(session=session, category_id=created_category.id) is None
+
+
+@pytest.fixture
+def category_with_image_file(session: Session, tmp_path: Path, monkeypatch):
+    """一个类别和一张带物理文件的图片，返回 (类别, 原图路径)"""
+    monkeypatch.setattr(settings, "image_storage_root", tmp_path / "images")
+    monkeypatch.setattr(settings, "thumbnail_storage_root", tmp_path / "thumbnails")
+    image_path = tmp_path / "images" / "2025" / "01" / "a.jpg"
+    image_path.parent.mkdir(parents=True)
+    image_path.write_bytes(b"\xff\xd8\xff")
+
+    category = Category(name=f"With Files {tmp_path.name}")
+    session.add(
+        Image(
+            category=category,
+            original_filename="a.jpg",
+            stored_filename="a.jpg",
+            relative_file_path="2025/01/a.jpg",
+        )
+    )
+    session.commit()
+    return category, image_path
+
+
+def test_delete_category_removes_files_after_commit(session: Session, category_with_image_file):
+    category, image_path = category_with_image_file
+    delete_category(session=session, category_id=category.id)
+    assert not image_path.exists()
+
+
+def test_failed_commit_keeps_files(session: Session, category_with_image_file, monkeypatch):
+    """事务提交失败时记录仍在，其引用的文件也不能被删除"""
+    category, image_path = category_with_image_file
+
+    def failing_commit():
+        raise IntegrityError("COMMIT", {}, Exception("simulated"))
+
+    monkeypatch.setattr(session, "commit", failing_commit)
+    with pytest.raises(IntegrityError):
+        delete_category(session=session, category_id=category.id)
+    assert image_path.exists()
+    session.rollback()
 
 
 def test_create_duplicate_category(session: Session):
-    """测试创建重复分类名称的异常处理"""
+    """测试创建重复分类名称的异常处理 (类别名称有唯一索引)"""
     category_data = CategoryCreate(name="Unique Category", description="First")
-    create_category(session, category_data)
+    create_category(session=session, category_create=category_data)
 
     # 再次创建同名分类应引发异常
-    with pytest.raises(ValueError) as exc_info:
-        create_category(session, category_data)
-    assert "Category name already exists" in str(exc_info.value)
+    with pytest.raises(IntegrityError):
+        create_category(session=session, category_create=category_data)
+    session.rollback()
+
+
+@pytest.mark.asyncio
+async def test_async_delete_category_unlinks_only_after_commit(tmp_path: Path, monkeypatch):
+    """异步删除：提交失败时文件保留，提交成功后才删除"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlmodel import SQLModel, create_engine
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    from app.crud import async_category_crud
+
+    monkeypatch.setattr(settings, "image_storage_root", tmp_path / "images")
+    monkeypatch.setattr(settings, "thumbnail_storage_root", tmp_path / "thumbnails")
+    image_path = tmp_path / "images" / "a.jpg"
+    image_path.parent.mkdir(parents=True)
+    image_path.write_bytes(b"\xff\xd8\xff")
+
+    database_path = tmp_path / "async_delete.db"
+    sync_engine = create_engine(f"sqlite:///{database_path}")
+    SQLModel.metadata.create_all(sync_engine)
+    with Session(sync_engine) as sync_session:
+        category = Category(name="Async Delete")
+        sync_session.add(
+            Image(category=category, stored_filename="a.jpg", relative_file_path="a.jpg")
+        )
+        sync_session.commit()
+        category_id = category.id
+    sync_engine.dispose()
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{database_path}")
+    async with AsyncSession(async_engine, expire_on_commit=False) as async_session:
+
+        async def failing_commit():
+            raise IntegrityError("COMMIT", {}, Exception("simulated"))
+
+        monkeypatch.setattr(async_session, "commit", failing_commit)
+        with pytest.raises(IntegrityError):
+            await async_category_crud.delete_category(
+                session=async_session, category_id=category_id
+            )
+        assert image_path.exists()
+        await async_session.rollback()
+
+    async with AsyncSession(async_engine, expire_on_commit=False) as async_session:
+        await async_category_crud.delete_category(session=async_session, category_id=category_id)
+    assert not image_path.exists()
+    await async_engine.dispose()
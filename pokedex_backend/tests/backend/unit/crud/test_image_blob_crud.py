@@ -0,0 +1,67 @@
+from pathlib import Path
+
+from sqlmodel import Session
+
+from app.crud import image_crud
+from app.models import ImageBlob
+from app.services.file_storage_service import FileStorageService
+
+
+def test_image_blob_reference_counting(session: Session):
+    """验证内容寻址存储的引用计数：只有最后一条引用释放时才允许删除物理文件"""
+    digest = "ab" * 32
+
+    image_crud.acquire_image_blob(session=session, content_digest=digest)
+    image_crud.acquire_image_blob(session=session, content_digest=digest)
+    session.commit()
+    assert session.get(ImageBlob, digest).ref_count == 2
+
+    assert image_crud.release_image_blob(session=session, content_digest=digest) is False
+    session.commit()
+    assert session.get(ImageBlob, digest).ref_count == 1
+
+    assert image_crud.release_image_blob(session=session, content_digest=digest) is True
+    session.commit()
+    assert session.get(ImageBlob, digest) is None
+
+
+def test_release_unknown_blob_allows_file_deletion(session: Session):
+    """没有引用计数记录的摘要 (例如历史数据) 视为最后一条引用"""
+    assert image_crud.release_image_blob(session=session, content_digest="cd" * 32) is True
+
+
+def test_acquire_image_blob_counts_in_one_statement(session: Session):
+    """引用计数在一条 INSERT ... ON CONFLICT DO UPDATE 中增加，不依赖会话中已加载的记录"""
+    digest = "ef" * 32
+
+    assert image_crud.acquire_image_blob(session=session, content_digest=digest) == 1
+    assert image_crud.acquire_image_blob(session=session, content_digest=digest) == 2
+    session.commit()
+
+
+def test_released_file_is_kept_when_referenced_again(session: Session, tmp_path: Path):
+    """最后一条引用释放并提交之后，文件删除前重新确认：期间又被引用的共享文件不删除"""
+    digest = "12" * 32
+    shared_path = tmp_path / "shared.jpg"
+    shared_path.write_bytes(b"\xff\xd8\xff")
+    released = image_crud.ReleasedFiles(paths=[shared_path], content_digest=digest)
+
+    image_crud.acquire_image_blob(session=session, content_digest=digest)
+    session.commit()
+    assert image_crud.release_image_blob(session=session, content_digest=digest) is True
+    session.commit()
+
+    # 并发的上传在文件删除之前提交了新的引用
+    image_crud.acquire_image_blob(session=session, content_digest=digest)
+    session.commit()
+    image_crud.delete_released_files(
+        session=session, file_storage=FileStorageService(), released=[released]
+    )
+    assert shared_path.exists()
+
+    assert image_crud.release_image_blob(session=session, content_digest=digest) is True
+    session.commit()
+    image_crud.delete_released_files(
+        session=session, file_storage=FileStorageService(), released=[released]
+    )
+    assert not shared_path.exists()
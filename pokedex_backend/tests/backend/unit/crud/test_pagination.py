@@ -0,0 +1,99 @@
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.crud import image_crud
+from app.crud.pagination import decode_cursor, encode_cursor, next_cursor, paginate
+from app.models import Category, Image
+
+
+@pytest.fixture
+def category_session(tmp_path: Path):
+    """独立的文件数据库，含一个类别和 25 张图片，其中 10 张的 created_at 完全相同"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'pagination.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        category = Category(name="Paging")
+        session.add(category)
+        session.flush()
+        for index in range(25):
+            created_at = datetime(2024, 1, 1) if index < 10 else datetime(2024, 1, 1, 0, index)
+            session.add(
+                Image(
+                    category_id=category.id,
+                    original_filename=f"{index}.jpg",
+                    stored_filename=f"{index}.jpg",
+                    relative_file_path=f"{index}.jpg",
+                    created_at=created_at,
+                )
+            )
+        session.commit()
+        yield session, category.id
+    engine.dispose()
+
+
+def test_cursor_pages_match_offset_pages(category_session):
+    """验证游标分页与 skip/limit 分页得到相同的确定顺序，created_at 相同的记录按 id 排序不重不漏"""
+    session, category_id = category_session
+    cursor_pages, cursor = [], None
+    while True:
+        page = image_crud.get_images_by_category_id(
+            session=session, category_id=category_id, limit=7, cursor=cursor
+        )
+        cursor_pages.append([image.id for image in page])
+        cursor = next_cursor(page, 7)
+        if cursor is None:
+            break
+
+    offset_pages = [
+        [
+            image.id
+            for image in image_crud.get_images_by_category_id(
+                session=session, category_id=category_id, skip=skip, limit=7
+            )
+        ]
+        for skip in range(0, 25, 7)
+    ]
+    assert cursor_pages == offset_pages
+    assert [len(page) for page in cursor_pages] == [7, 7, 7, 4]
+    all_images = session.exec(select(Image)).all()
+    expected = sorted(all_images, key=lambda image: (image.created_at, image.id.hex))
+    assert sum(cursor_pages, []) == [image.id for image in expected]
+
+
+def test_cursor_query_uses_composite_index(category_session):
+    """类别图片的游标查询使用 (category_id, created_at, id) 复合索引，无需临时排序"""
+    session, category_id = category_session
+    cursor = encode_cursor(datetime(2024, 1, 1), category_id)
+    statement = paginate(
+        select(Image).where(Image.category_id == category_id), Image, limit=50, cursor=cursor
+    )
+    captured = []
+
+    def capture(conn, cursor, sql, parameters, context, executemany):
+        captured.append((sql, parameters))
+
+    connection = session.connection()
+    event.listen(connection, "before_cursor_execute", capture)
+    session.exec(statement).all()
+    event.remove(connection, "before_cursor_execute", capture)
+    sql, parameters = captured[0]  # 后续语句是 selectin 加载标签
+    plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", parameters).all()
+    details = " ".join(row[-1] for row in plan)
+    assert "ix_image_category_id_created_at_id" in details
+    assert "TEMP B-TREE" not in details
+
+
+def test_invalid_cursor_is_rejected():
+    """篡改或格式错误的游标返回 400"""
+    created_at = datetime(2024, 5, 6, 7, 8, 9, 123456)
+    record_id = encode_cursor(created_at, Category().id)
+    assert decode_cursor(record_id)[0] == created_at
+    for cursor in ("not-a-cursor", "e30", record_id[:-3]):
+        with pytest.raises(HTTPException) as exc_info:
+            decode_cursor(cursor)
+        assert exc_info.value.status_code == 400
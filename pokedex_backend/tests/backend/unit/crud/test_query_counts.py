@@ -0,0 +1,110 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.crud import image_crud, tag_crud
+from app.crud.upsert import upsert_insert
+from app.models import Category, ImageCreate, ImageRead
+
+TAG_NAMES = ["鸟类", "哺乳动物", "昆虫"]
+
+
+@pytest.fixture
+def tagged_session(tmp_path: Path):
+    """独立的文件数据库：一个类别、30 张图片，每张都带全部 3 个标签"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'queries.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        category = Category(name="Queries")
+        session.add(category)
+        session.commit()
+        category_id = category.id
+        image_crud.create_images_with_tags(
+            db=session,
+            image_creates=[
+                ImageCreate(
+                    category_id=category_id,
+                    original_filename=f"{index}.jpg",
+                    stored_filename=f"{index}.jpg",
+                    relative_file_path=f"{index}.jpg",
+                    mime_type="image/jpeg",
+                    size_bytes=1024,
+                )
+                for index in range(30)
+            ],
+            tag_names=TAG_NAMES,
+        )
+        session.expunge_all()
+        yield session, category_id
+    engine.dispose()
+
+
+@contextmanager
+def count_queries(session: Session):
+    """统计代码块内执行的 SQL 语句"""
+    statements: List[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def test_tag_listing_uses_one_aggregate_query(tagged_session):
+    """标签列表只执行一条聚合查询，不加载关联的图片，使用次数来自 COUNT"""
+    session, _ = tagged_session
+    with count_queries(session) as statements:
+        tags = tag_crud.get_all_tags(session=session)
+        usage = {tag.name: tag.usage_count for tag in tags}
+
+    assert usage == {name: 30 for name in TAG_NAMES}
+    assert len(statements) == 1
+    assert "FROM image " not in statements[0]
+
+
+def test_image_listing_loads_tags_in_one_extra_query(tagged_session):
+    """图片列表显式 selectinload 标签：一条图片查询加一条标签查询，序列化时不再触发延迟加载"""
+    session, category_id = tagged_session
+    with count_queries(session) as statements:
+        images = image_crud.get_images_by_category_id(
+            session=session, category_id=category_id, limit=20
+        )
+        serialized = [ImageRead.model_validate(image) for image in images]
+
+    assert len(serialized) == 20
+    assert all(len(image.tags) == len(TAG_NAMES) for image in serialized)
+    assert len(statements) == 2
+
+
+def test_get_or_create_tags_uses_two_round_trips(tagged_session):
+    """一组标签 (含已有标签和仅大小写不同的重复名称) 只需一次 SELECT 和一次多行 INSERT"""
+    session, _ = tagged_session
+    with count_queries(session) as statements:
+        tags = tag_crud.get_or_create_tags(
+            session=session, names=["昆虫", " Frog ", "frog", "", "Newt"]
+        )
+
+    assert [tag.name for tag in tags] == ["昆虫", "Frog", "Newt"]
+    assert len(statements) == 2
+    assert statements[1].startswith("INSERT INTO tag")
+
+
+def test_insert_skips_tags_created_concurrently(tagged_session):
+    """另一个请求已创建同名标签时插入被跳过而不是违反唯一约束，随后可以查到对方的标签"""
+    session, _ = tagged_session
+    inserted = session.scalars(
+        tag_crud.insert_missing_tags_statement(
+            {"昆虫": "昆虫", "蛙": "蛙"}, upsert_insert(session)
+        )
+    ).all()
+    assert [tag.name for tag in inserted] == ["蛙"]
+    assert tag_crud.get_tag_by_name(session=session, name="昆虫").usage_count == 30
@@ -0,0 +1,80 @@
+from pathlib import Path
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select, update
+
+from app.crud import image_crud, tag_crud
+from app.models import Category, ImageCreate, ImageUpdate, Tag
+
+
+@pytest.fixture
+def db_session(tmp_path: Path):
+    """独立的文件数据库，含一个空类别"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'tags.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        category = Category(name="Tags")
+        session.add(category)
+        session.commit()
+        yield session, category.id
+    engine.dispose()
+
+
+def make_image_create(category_id, index: int) -> ImageCreate:
+    return ImageCreate(
+        category_id=category_id,
+        original_filename=f"{index}.jpg",
+        stored_filename=f"{index}.jpg",
+        relative_file_path=f"{index}.jpg",
+        mime_type="image/jpeg",
+        size_bytes=1024,
+    )
+
+
+def usage_counts(session: Session) -> dict:
+    session.expire_all()
+    return {tag.name: tag.usage_count for tag in session.exec(select(Tag)).all()}
+
+
+def test_usage_count_follows_link_changes(db_session):
+    """创建图片和修改标签时 usage_count 在同一事务中增减，降为 0 的标签被删除"""
+    session, category_id = db_session
+    first, second = image_crud.create_images_with_tags(
+        db=session,
+        image_creates=[make_image_create(category_id, 0), make_image_create(category_id, 1)],
+        tag_names=["鸟类", "昆虫"],
+    )
+    assert usage_counts(session) == {"鸟类": 2, "昆虫": 2}
+
+    # 第一张图片：保留 "鸟类"，移除 "昆虫"，新增 "植物"
+    plant = tag_crud.get_or_create_tag(session=session, tag_name="植物")
+    bird = tag_crud.get_tag_by_name(session=session, name="鸟类")
+    image_crud.update_image_metadata(
+        session=session,
+        image=first,
+        image_in=ImageUpdate(tags="鸟类,植物"),
+        new_tags=[bird, plant],
+    )
+    assert usage_counts(session) == {"鸟类": 2, "昆虫": 1, "植物": 1}
+    assert sorted(tag.name for tag in first.tags) == ["植物", "鸟类"]
+
+    # 第二张图片移除全部标签："昆虫" 降为 0 被删除
+    image_crud.update_image_metadata(
+        session=session, image=second, image_in=ImageUpdate(tags=""), new_tags=[]
+    )
+    assert usage_counts(session) == {"鸟类": 1, "植物": 1}
+
+
+def test_reconcile_repairs_drifted_counts(db_session):
+    """对账按关联表修正偏差的 usage_count，并删除没有关联的标签"""
+    session, category_id = db_session
+    image_crud.create_image_with_tags(
+        db=session, image_create=make_image_create(category_id, 0), tag_names=["鸟类"]
+    )
+    session.add(Tag(name="孤立", name_normalized="孤立", usage_count=3))
+    session.exec(update(Tag).where(Tag.name == "鸟类").values(usage_count=7))
+    session.commit()
+
+    assert tag_crud.reconcile_tag_usage_counts(session=session) == 2
+    assert usage_counts(session) == {"鸟类": 1}
+    assert tag_crud.reconcile_tag_usage_counts(session=session) == 0
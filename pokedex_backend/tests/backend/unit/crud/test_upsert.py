@@ -0,0 +1,26 @@
+import pytest
+from sqlalchemy import create_mock_engine
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.crud.tag_crud import insert_missing_tags_statement
+from app.crud.upsert import ensure_upsert_supported, upsert_insert
+
+
+def test_upsert_insert_follows_session_dialect(session):
+    assert upsert_insert(session) is sqlite.insert
+
+
+def test_unsupported_dialect_is_rejected_at_startup(session):
+    """不支持 INSERT ... ON CONFLICT 的数据库在启动检查时即报错"""
+    ensure_upsert_supported(session.get_bind())
+    mysql_engine = create_mock_engine("mysql://", lambda *args, **kwargs: None)
+    with pytest.raises(NotImplementedError, match="mysql"):
+        ensure_upsert_supported(session.get_bind(), mysql_engine)
+
+
+def test_missing_tags_statement_compiles_for_postgresql():
+    """标签批量插入在 PostgreSQL 上生成相同的 ON CONFLICT DO NOTHING 语句"""
+    statement = insert_missing_tags_statement({"bird": "Bird"}, postgresql.insert)
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (name_normalized) DO NOTHING" in sql
+    assert "RETURNING" in sql
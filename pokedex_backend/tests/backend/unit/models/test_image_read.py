@@ -0,0 +1,49 @@
+import uuid
+from datetime import datetime
+
+from app.core.config import settings
+from app.models import ImageRead
+
+
+def make_image_read(**overrides) -> ImageRead:
+    data = dict(
+        id=uuid.uuid4(),
+        category_id=uuid.uuid4(),
+        created_at=datetime.utcnow(),
+        relative_file_path="ab/cd/photo.jpg",
+        relative_thumbnail_path="ab/cd/photo_thumb.jpg",
+    )
+    data.update(overrides)
+    return ImageRead(**data)
+
+
+def test_srcset_lists_renditions_by_width():
+    """验证 srcset 按宽度从小到大列出各尺寸档位的URL"""
+    image = make_image_read(
+        renditions={
+            "large": {"path": "ab/cd/photo_large.jpg", "width": 2048, "height": 1365},
+            "thumb": {"path": "ab/cd/photo_thumb.jpg", "width": 256, "height": 171},
+            "medium": {"path": "ab/cd/photo_medium.jpg", "width": 1024, "height": 683},
+        }
+    )
+    base = (
+        f"http://{settings.server_host}:{settings.server_port}/"
+        f"{settings.THUMBNAILS_DIR_NAME}/ab/cd"
+    )
+
+    assert image.srcset == (
+        f"{base}/photo_thumb.jpg 256w, "
+        f"{base}/photo_medium.jpg 1024w, "
+        f"{base}/photo_large.jpg 2048w"
+    )
+    assert image.rendition_urls["medium"] == f"{base}/photo_medium.jpg"
+    assert image.model_dump()["srcset"] == image.srcset
+
+
+def test_srcset_is_none_without_renditions():
+    """旧数据没有尺寸档位时 srcset 为None，缩略图URL不受影响"""
+    image = make_image_read()
+
+    assert image.srcset is None
+    assert image.rendition_urls == {}
+    assert image.thumbnail_url.endswith("/ab/cd/photo_thumb.jpg")
@@ -0,0 +1,71 @@
+import io
+from pathlib import Path
+
+import exifread
+import pytest
+from PIL import Image as PILImage
+
+from app.services.exif_service import (
+    EXCLUDED_EXIF_TAGS,
+    ExifExtractionService,
+    read_jpeg_exif_segment,
+)
+
+
+def make_jpeg_with_exif(path: Path) -> Path:
+    """生成一张带 EXIF (相机厂商/型号) 并在 APP1 之前带 ICC 配置 (APP2) 的 JPEG"""
+    exif = PILImage.Exif()
+    exif[0x010F] = "TestMake"  # Image Make
+    exif[0x0110] = "TestModel"  # Image Model
+    PILImage.new("RGB", (64, 48), color="green").save(
+        path, "JPEG", exif=exif.tobytes(), icc_profile=b"\x00" * 4096
+    )
+    return path
+
+
+def test_read_jpeg_exif_segment_matches_whole_file_parse(tmp_path: Path):
+    """验证只读取 APP1 段得到的 EXIF 与 exifread 扫描整个文件的结果一致
+
+    期望结果：
+    - 读取停在 APP1 段末尾，不会读到图像数据
+    - 解析得到的标签与整文件解析相同
+    """
+    image_path = make_jpeg_with_exif(tmp_path / "photo.jpg")
+
+    with open(image_path, "rb") as f:
+        segment = read_jpeg_exif_segment(f)
+        stopped_at = f.tell()
+    assert segment is not None
+    assert stopped_at < image_path.stat().st_size
+
+    with open(image_path, "rb") as f:
+        whole_file_tags = exifread.process_file(f, details=False)
+    segment_tags = exifread.process_file(io.BytesIO(segment), details=False)
+    assert {
+        k: str(v) for k, v in segment_tags.items() if k not in EXCLUDED_EXIF_TAGS
+    } == {k: str(v) for k, v in whole_file_tags.items() if k not in EXCLUDED_EXIF_TAGS}
+
+
+def test_read_jpeg_exif_segment_returns_none_without_exif(tmp_path: Path):
+    """没有 EXIF 的 JPEG 和非 JPEG 文件都返回None"""
+    plain_jpeg = io.BytesIO()
+    PILImage.new("RGB", (8, 8)).save(plain_jpeg, "JPEG")
+    plain_jpeg.seek(0)
+    assert read_jpeg_exif_segment(plain_jpeg) is None
+    assert read_jpeg_exif_segment(io.BytesIO(b"\x89PNG\r\n\x1a\n")) is None
+
+
+@pytest.mark.asyncio
+async def test_extract_from_file_returns_structured_exif(tmp_path: Path):
+    """验证在专用线程池中提取 EXIF 并转换为结构化的 ExifData"""
+    image_path = make_jpeg_with_exif(tmp_path / "photo.jpg")
+    service = ExifExtractionService(max_workers=1)
+
+    exif_raw, exif_info = await service.extract_from_file(image_path)
+
+    assert exif_raw["Image Make"] == "TestMake"
+    assert exif_info is not None
+    assert exif_info.make == "TestMake"
+    assert exif_info.model == "TestModel"
+
+    assert await service.extract_from_file(tmp_path / "missing.jpg") == ({}, None)
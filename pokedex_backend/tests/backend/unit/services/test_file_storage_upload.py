@@ -0,0 +1,192 @@
+import errno
+import hashlib
+import io
+import uuid
+from pathlib import Path
+
+import aiofiles.os as aio_os
+import pytest
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+
+from app.core.config import settings
+from app.services.file_storage_service import FileStorageService
+
+JPEG_HEADER = b"\xff\xd8\xff\xe0"
+
+
+def make_upload_file(content: bytes, filename: str = "photo.jpg") -> UploadFile:
+    """构造一个与 FastAPI 上传时一致的 UploadFile 对象"""
+    return UploadFile(
+        file=io.BytesIO(content),
+        filename=filename,
+        headers=Headers({"content-type": "image/jpeg"}),
+    )
+
+
+@pytest.fixture
+def storage_service(tmp_upload_dir: Path, monkeypatch) -> FileStorageService:
+    monkeypatch.setattr(settings, "image_storage_root", tmp_upload_dir / "images")
+    monkeypatch.setattr(settings, "thumbnail_storage_root", tmp_upload_dir / "thumbs")
+    monkeypatch.setattr(settings, "upload_staging_root", tmp_upload_dir / "staging")
+    return FileStorageService()
+
+
+@pytest.mark.asyncio
+async def test_save_upload_file_streams_in_chunks(storage_service, monkeypatch):
+    """验证上传文件按块写入磁盘，并返回实际写入的字节数
+
+    场景：
+    - 块大小远小于文件大小，写入需要多次循环
+    - 写入完成后目录中只应留下最终文件，不应残留临时文件
+
+    期望结果：
+    - 文件内容完整，返回的字节数与文件大小一致
+    """
+    monkeypatch.setattr(settings, "upload_chunk_size", 7)
+    content = JPEG_HEADER + bytes(range(256)) * 3
+
+    stored = await storage_service.save_upload_file(upload_file=make_upload_file(content))
+
+    assert stored.absolute_path.name == stored.stored_filename
+    assert stored.absolute_path.read_bytes() == content
+    assert stored.size_bytes == len(content)
+    assert list(stored.absolute_path.parent.iterdir()) == [stored.absolute_path]
+
+
+@pytest.mark.asyncio
+async def test_save_upload_file_sniffs_type_and_digests_content(storage_service):
+    """验证文件类型由文件头魔数决定，并在写入时同时计算内容摘要
+
+    场景：
+    - 客户端把 PNG 内容声明为 image/jpeg，文件名也以 .jpg 结尾
+    - 客户端把非图片内容声明为 image/jpeg
+
+    期望结果：
+    - 前者按 image/png 保存，扩展名为 .png，摘要与 hashlib 计算结果一致
+    - 后者被拒绝 (400)
+    """
+    content = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+    stored = await storage_service.save_upload_file(
+        upload_file=make_upload_file(content, filename="shot.jpg")
+    )
+
+    assert stored.mime_type == "image/png"
+    assert stored.stored_filename.endswith(".png")
+    assert stored.content_digest == hashlib.sha256(content).hexdigest()
+
+    with pytest.raises(HTTPException) as exc_info:
+        await storage_service.save_upload_file(
+            upload_file=make_upload_file(b"<html></html>", filename="fake.jpg")
+        )
+    assert exc_info.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_save_upload_file_rejects_oversized_stream(storage_service, monkeypatch):
+    """验证流式写入过程中超过大小限制时返回413，且不留下任何文件"""
+    monkeypatch.setattr(settings, "upload_chunk_size", 4)
+    monkeypatch.setattr(settings, "max_image_size", 10)
+    upload_file = make_upload_file(JPEG_HEADER + b"x" * 32)
+    # 模拟 seek/tell 的预检查被绕过（例如客户端声明的大小与实际内容不一致）
+    monkeypatch.setattr(upload_file.file, "tell", lambda: 0)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await storage_service.save_upload_file(upload_file=upload_file)
+
+    assert exc_info.value.status_code == 413
+    assert not any(p.is_file() for p in storage_service.image_storage_root.rglob("*"))
+
+
+@pytest.mark.asyncio
+async def test_save_upload_file_closes_file_rejected_by_size_check(storage_service, monkeypatch):
+    """验证 seek/tell 预检查超过大小限制时同样关闭上传文件"""
+    monkeypatch.setattr(settings, "max_image_size", 10)
+    upload_file = make_upload_file(JPEG_HEADER + b"x" * 32)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await storage_service.save_upload_file(upload_file=upload_file)
+
+    assert exc_info.value.status_code == 413
+    assert upload_file.file.closed
+
+
+@pytest.mark.asyncio
+async def test_duplicate_upload_restores_shared_file_deleted_before_commit(
+    storage_service, monkeypatch
+):
+    """验证内容寻址模式下重复上传的内容保留到引用计数提交之后
+
+    场景：
+    - 第二次上传相同内容时共享文件已存在
+    - 提交之前共享文件被删除最后一条引用的请求删除
+
+    期望结果：
+    - 第二次上传不覆盖共享文件，保留本次上传的内容
+    - 提交之后用保留的内容恢复共享文件，且不残留临时文件
+    - 共享文件仍存在时只删除保留的内容
+    """
+    monkeypatch.setattr(settings, "content_addressed_storage", True)
+    content = JPEG_HEADER + b"same content"
+
+    first = await storage_service.save_upload_file(upload_file=make_upload_file(content))
+    assert not first.is_duplicate and first.retained_copy is None
+
+    second = await storage_service.save_upload_file(upload_file=make_upload_file(content))
+    assert second.is_duplicate
+    assert second.absolute_path == first.absolute_path
+    assert second.retained_copy.read_bytes() == content
+
+    first.absolute_path.unlink()
+    assert await storage_service.settle_retained_copy(second) is True
+    assert first.absolute_path.read_bytes() == content
+
+    third = await storage_service.save_upload_file(upload_file=make_upload_file(content))
+    assert await storage_service.settle_retained_copy(third) is False
+    files = [p for p in storage_service.image_storage_root.rglob("*") if p.is_file()]
+    assert files == [first.absolute_path]
+
+
+@pytest.mark.asyncio
+async def test_uploads_fall_back_to_copy_across_filesystems(storage_service, monkeypatch):
+    """验证暂存目录与存储目录不在同一文件系统 (EXDEV) 时改为复制后原子放置
+
+    场景：
+    - 从暂存目录 replace/link 到存储目录时抛出 EXDEV
+    - 分别保存一个普通上传、一个内容寻址上传和一个分块上传的暂存文件
+
+    期望结果：
+    - 三个文件都以完整内容放到最终路径
+    - 暂存目录和存储目录中都不残留临时文件
+    """
+    staging_root = storage_service.upload_staging_root
+
+    def cross_device(place):
+        async def wrapper(source, target):
+            if Path(source).parent == staging_root:
+                raise OSError(errno.EXDEV, "Invalid cross-device link")
+            return await place(source, target)
+
+        return wrapper
+
+    monkeypatch.setattr(aio_os, "replace", cross_device(aio_os.replace))
+    monkeypatch.setattr(aio_os, "link", cross_device(aio_os.link))
+    content = JPEG_HEADER + b"across devices"
+
+    plain = await storage_service.save_upload_file(upload_file=make_upload_file(content))
+    monkeypatch.setattr(settings, "content_addressed_storage", True)
+    addressed = await storage_service.save_upload_file(
+        upload_file=make_upload_file(content + b" (cas)")
+    )
+    upload_id = uuid.uuid4()
+    await storage_service.create_staging_file(upload_id, len(content))
+    storage_service.staging_path_for(upload_id).write_bytes(content + b" staged")
+    staged = await storage_service.finalize_staged_upload(upload_id)
+
+    assert plain.absolute_path.read_bytes() == content
+    assert addressed.absolute_path.read_bytes() == content + b" (cas)"
+    assert staged.absolute_path.read_bytes() == content + b" staged"
+    assert list(staging_root.iterdir()) == []
+    files = {p for p in storage_service.image_storage_root.rglob("*") if p.is_file()}
+    assert files == {plain.absolute_path, addressed.absolute_path, staged.absolute_path}
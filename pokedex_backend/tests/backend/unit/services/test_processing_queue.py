@@ -0,0 +1,192 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from PIL import Image as PILImage
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.core.config import settings
+from app.crud import job_crud
+from app.models import (
+    Category,
+    Image,
+    PROCESSING_DONE,
+    PROCESSING_FAILED,
+    PROCESSING_PENDING,
+    PROCESSING_RUNNING,
+)
+from app.services.image_processing_service import ImageProcessingService
+from app.services.processing_queue import ImageProcessingQueue
+from app.services.thumbnail_engine import ThumbnailEngine
+
+
+@pytest.fixture
+def storage(tmp_path: Path, monkeypatch):
+    images_root = tmp_path / "images"
+    thumbnails_root = tmp_path / "thumbnails"
+    (images_root / "ab" / "cd").mkdir(parents=True)
+    monkeypatch.setattr(settings, "image_storage_root", images_root)
+    monkeypatch.setattr(settings, "thumbnail_storage_root", thumbnails_root)
+    exif = PILImage.Exif()
+    exif[0x010F] = "TestMake"
+    PILImage.new("RGB", (1600, 1200), color="blue").save(
+        images_root / "ab" / "cd" / "photo.jpg", "JPEG", exif=exif.tobytes()
+    )
+    return images_root, thumbnails_root
+
+
+@pytest.fixture
+def db_engine(tmp_path: Path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False}
+    )
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def queue(db_engine, storage):
+    thumbnail_engine = ThumbnailEngine(max_workers=2, mode="thread")
+    yield ImageProcessingQueue(
+        image_processor=ImageProcessingService(engine=thumbnail_engine),
+        db_engine=db_engine,
+        workers=2,
+        max_attempts=2,
+        poll_interval=0.05,
+    )
+    thumbnail_engine.shutdown()
+
+
+def add_pending_image(db_engine, job_status: str = PROCESSING_PENDING, **job_fields):
+    with Session(db_engine) as session:
+        category = Category(name="Birds")
+        session.add(category)
+        session.flush()
+        image = Image(
+            stored_filename="photo.jpg",
+            relative_file_path="ab/cd/photo.jpg",
+            category_id=category.id,
+            processing_status=PROCESSING_PENDING,
+        )
+        session.add(image)
+        session.flush()
+        job = job_crud.add_processing_job(
+            session=session, image_id=image.id, **job_fields
+        )
+        job.status = job_status
+        session.commit()
+        return image.id, category.id
+
+
+async def wait_for_status(db_engine, image_id, timeout: float = 10.0) -> Image:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        with Session(db_engine) as session:
+            image = session.get(Image, image_id)
+            if image.processing_status != PROCESSING_PENDING:
+                return image
+        assert asyncio.get_running_loop().time() < deadline, "任务未在超时前完成"
+        await asyncio.sleep(0.05)
+
+
+@pytest.mark.asyncio
+async def test_interrupted_jobs_resume_after_restart(queue, db_engine, storage):
+    """验证上次运行中断 (仍为 processing) 的任务在启动时重新入队并完成
+
+    场景：
+    - 任务表中有一个 processing 状态的任务，模拟处理过程中应用被关闭
+    - 启动队列
+
+    期望结果：
+    - 任务被重新领取并完成，图片写入缩略图、尺寸档位和EXIF，状态为 done
+    - 任务要求设置类别缩略图时，类别缩略图指向生成的缩略图
+    """
+    image_id, category_id = add_pending_image(
+        db_engine, job_status=PROCESSING_RUNNING, set_as_category_thumbnail=True
+    )
+
+    await queue.start()
+    try:
+        image = await wait_for_status(db_engine, image_id)
+    finally:
+        await queue.stop()
+
+    _, thumbnails_root = storage
+    assert image.processing_status == PROCESSING_DONE
+    assert image.relative_thumbnail_path == "ab/cd/photo_thumb.jpg"
+    assert (thumbnails_root / image.relative_thumbnail_path).is_file()
+    assert set(image.renditions) == {"thumb", "medium"}
+    assert image.exif_info.make == "TestMake"
+    with Session(db_engine) as session:
+        (job,) = job_crud.get_jobs_by_image_id(session=session, image_id=image_id)
+        assert job.status == PROCESSING_DONE
+        assert job.attempts == 1
+        category = session.get(Category, category_id)
+        assert category.thumbnail_path == image.relative_thumbnail_path
+
+
+@pytest.mark.asyncio
+async def test_new_jobs_are_picked_up_when_notified(queue, db_engine):
+    """队列空闲时入队的新任务在通知后立即被处理，不必等待轮询"""
+    queue.poll_interval = 60
+    await queue.start()
+    try:
+        await asyncio.sleep(0.05)  # 工作协程进入等待
+        image_id, _ = add_pending_image(db_engine)
+        queue.notify()
+        image = await wait_for_status(db_engine, image_id, timeout=5)
+    finally:
+        await queue.stop()
+
+    assert image.processing_status == PROCESSING_DONE
+
+
+@pytest.mark.asyncio
+async def test_failing_job_is_retried_then_marked_failed(queue, db_engine, monkeypatch):
+    """处理失败的任务重试到最大尝试次数后标记为 failed，图片状态同步为 failed"""
+    calls = 0
+
+    async def broken_parse_segment(segment):
+        nonlocal calls
+        calls += 1
+        raise RuntimeError("exif parser crashed")
+
+    monkeypatch.setattr(queue.exif_extractor, "parse_segment", broken_parse_segment)
+    image_id, _ = add_pending_image(db_engine)
+
+    await queue.start()
+    try:
+        image = await wait_for_status(db_engine, image_id)
+    finally:
+        await queue.stop()
+
+    assert image.processing_status == PROCESSING_FAILED
+    assert image.relative_thumbnail_path is None
+    assert calls == 2
+    with Session(db_engine) as session:
+        (job,) = job_crud.get_jobs_by_image_id(session=session, image_id=image_id)
+        assert job.status == PROCESSING_FAILED
+        assert job.attempts == 2
+        assert "exif parser crashed" in job.last_error
+
+
+@pytest.mark.asyncio
+async def test_undecodable_image_is_retried_then_marked_failed(queue, db_engine, storage):
+    """原图无法解码时异常传到任务队列：任务重试到最大尝试次数后标记为 failed，而不是被当作处理成功"""
+    images_root, _ = storage
+    (images_root / "ab" / "cd" / "photo.jpg").write_bytes(b"\xff\xd8\xff not a jpeg")
+    image_id, _ = add_pending_image(db_engine)
+
+    await queue.start()
+    try:
+        image = await wait_for_status(db_engine, image_id)
+    finally:
+        await queue.stop()
+
+    assert image.processing_status == PROCESSING_FAILED
+    with Session(db_engine) as session:
+        (job,) = job_crud.get_jobs_by_image_id(session=session, image_id=image_id)
+        assert job.status == PROCESSING_FAILED
+        assert job.attempts == 2
+        assert job.last_error
@@ -0,0 +1,160 @@
+import random
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.core.config import settings
+from app.crud import image_crud, tag_crud
+from app.crud.pagination import next_cursor
+from app.models import Category, Image, ImageTagLink, ImageUpdate
+from app.services.tag_posting_index import tag_posting_index
+
+TAG_NAMES = ["鸟类", "哺乳动物", "昆虫", "植物", "夜行"]
+
+
+@pytest.fixture
+def tagged_session(tmp_path: Path):
+    """60 张随机带 0~3 个标签的图片，其中 10 张的 created_at 相同 (验证按 id 排序)"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'postings.db'}")
+    SQLModel.metadata.create_all(engine)
+    rng = random.Random(20)
+    with Session(engine) as session:
+        category = Category(name="Postings")
+        session.add(category)
+        tags = tag_crud.get_or_create_tags(session=session, names=TAG_NAMES)
+        for index in range(60):
+            image = Image(
+                category_id=category.id,
+                original_filename=f"{index}.jpg",
+                stored_filename=f"{index}.jpg",
+                relative_file_path=f"{index}.jpg",
+                created_at=datetime(2025, 1, 1) + timedelta(minutes=max(index - 10, 0)),
+            )
+            session.add(image)
+            session.flush()
+            for tag in rng.sample(tags, rng.randint(0, 3)):
+                session.add(ImageTagLink(image_id=image.id, tag_id=tag.id))
+        session.commit()
+        tag_posting_index.invalidate()
+        yield session
+    tag_posting_index.invalidate()
+    engine.dispose()
+
+
+def search(session: Session, tag_names, match_all: bool, indexed: bool, **page):
+    settings.tag_posting_index_enabled = indexed
+    try:
+        images = image_crud.get_images_by_tag_names(
+            session=session, tag_names=tag_names, match_all=match_all, **page
+        )
+    finally:
+        settings.tag_posting_index_enabled = False
+    return images
+
+
+@pytest.mark.parametrize("match_all", [False, True])
+@pytest.mark.parametrize("tag_names", [["鸟类"], ["鸟类", "昆虫"], ["植物", "夜行", "哺乳动物"]])
+def test_posting_index_matches_sql(tagged_session, tag_names, match_all):
+    """倒排索引的结果、顺序和分页 (skip 与游标) 与 SQL 查询完全一致"""
+    expected = search(tagged_session, tag_names, match_all, indexed=False, limit=1000)
+    assert [i.id for i in search(tagged_session, tag_names, match_all, indexed=True, limit=1000)] == [
+        i.id for i in expected
+    ]
+
+    pages, cursor = [], None
+    while True:
+        page = search(tagged_session, tag_names, match_all, indexed=True, limit=4, cursor=cursor)
+        pages += page
+        cursor = next_cursor(page, 4)
+        if cursor is None:
+            break
+    assert [i.id for i in pages] == [i.id for i in expected]
+    assert [i.id for i in search(tagged_session, tag_names, match_all, indexed=True, skip=3, limit=5)] == [
+        i.id for i in expected[3:8]
+    ]
+
+
+def test_index_is_rebuilt_after_tag_changes(tagged_session):
+    """修改图片标签后索引失效，下一次搜索反映新的关联"""
+    before = search(tagged_session, ["新标签"], False, indexed=True)
+    assert before == []
+
+    image = search(tagged_session, ["鸟类"], False, indexed=True, limit=1)[0]
+    new_tags = tag_crud.get_or_create_tags(session=tagged_session, names=["新标签"])
+    image_crud.update_image_metadata(
+        session=tagged_session, image=image, image_in=ImageUpdate(tags="新标签"), new_tags=new_tags
+    )
+
+    assert [i.id for i in search(tagged_session, ["新标签"], False, indexed=True)] == [image.id]
+    assert image.id not in [i.id for i in search(tagged_session, ["鸟类"], False, indexed=True, limit=1000)]
+
+
+def test_write_between_tag_lookup_and_rebuild_is_not_lost(tmp_path: Path, monkeypatch):
+    """标签查询之后、重建索引之前提交的写入不会被缓存成过期的索引
+
+    场景：
+    - WAL 模式下请求的会话在事务中查询标签 (读事务从这里开始)
+    - 随后另一个会话给新图片加上同一标签、提交并使索引失效
+    - 请求继续搜索，触发重建
+
+    期望结果：
+    - 索引在新的会话中重建，包含新图片；之后的搜索不会一直缺少它
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'race.db'}")
+
+    # pysqlite 默认在 SELECT 之前不开启事务；按 SQLAlchemy 文档的方式改为显式 BEGIN，使读事务有固定的快照
+    @event.listens_for(engine, "connect")
+    def use_wal_and_explicit_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+    @event.listens_for(engine, "begin")
+    def begin_transaction(connection):
+        connection.exec_driver_sql("BEGIN")
+
+    SQLModel.metadata.create_all(engine)
+
+    def add_tagged_image(session: Session, name: str) -> uuid.UUID:
+        category = session.exec(select(Category)).first() or Category(name="Race")
+        image = Image(
+            category=category,
+            original_filename=name,
+            stored_filename=name,
+            relative_file_path=name,
+        )
+        session.add(image)
+        image.tags = tag_crud.get_or_create_tags(session=session, names=["鸟类"])
+        session.commit()
+        tag_posting_index.invalidate()
+        return image.id
+
+    with Session(engine) as writer:
+        first_id = add_tagged_image(writer, "first.jpg")
+    tag_posting_index.invalidate()
+
+    snapshot = tag_posting_index.snapshot
+    written = []
+
+    def write_then_snapshot(session):
+        # 在请求已查询过标签、尚未重建索引时提交另一张图片
+        if not written:
+            with Session(engine) as writer:
+                written.append(add_tagged_image(writer, "second.jpg"))
+        return snapshot(session)
+
+    monkeypatch.setattr(tag_posting_index, "snapshot", write_then_snapshot)
+    try:
+        with Session(engine) as request_session:
+            search(request_session, ["鸟类"], False, indexed=True)
+        monkeypatch.undo()
+
+        with Session(engine) as later_session:
+            found = [i.id for i in search(later_session, ["鸟类"], False, indexed=True)]
+        assert set(found) == {first_id, written[0]}
+    finally:
+        tag_posting_index.invalidate()
+        engine.dispose()
@@ -0,0 +1,221 @@
+import asyncio
+import threading
+from pathlib import Path
+
+import pytest
+from PIL import Image as PILImage
+
+from app.services import thumbnail_engine as thumbnail_engine_module
+from app.services.thumbnail_engine import (
+    ThumbnailEngine,
+    alternate_format_paths,
+    fit_within,
+    save_renditions,
+    save_thumbnail,
+)
+
+
+def make_jpeg_with_exif(path: Path) -> Path:
+    exif = PILImage.Exif()
+    exif[0x010F] = "TestMake"
+    PILImage.new("RGB", (640, 480), color="blue").save(path, "JPEG", exif=exif.tobytes())
+    return path
+
+
+def test_save_thumbnail_uses_jpeg_draft_decode(tmp_path: Path):
+    """验证 JPEG 通过草稿模式按 1/8 缩放解码，输出尺寸与完整解码一致"""
+    source = tmp_path / "large.jpg"
+    PILImage.new("RGB", (4096, 3072), color="red").save(source, "JPEG")
+
+    with PILImage.open(source) as img:
+        save_thumbnail(img, tmp_path / "draft_thumb.jpg", (256, 256), 85)
+        decoded_size = img.size  # 草稿模式会把解码尺寸缩小为原图的 1/8
+    with PILImage.open(source) as img:
+        save_thumbnail(img, tmp_path / "full_thumb.jpg", (256, 256), 85, use_draft=False)
+        full_size = img.size
+
+    assert decoded_size == (512, 384)
+    assert full_size == (4096, 3072)
+    for name in ("draft_thumb.jpg", "full_thumb.jpg"):
+        with PILImage.open(tmp_path / name) as thumbnail:
+            assert thumbnail.size == (256, 192)
+
+
+def test_save_thumbnail_falls_back_for_png(tmp_path: Path):
+    """PNG 没有草稿模式，完整解码后缩放，透明通道保留"""
+    source = tmp_path / "screenshot.png"
+    PILImage.new("RGBA", (1000, 500), color=(0, 0, 255, 128)).save(source, "PNG")
+
+    with PILImage.open(source) as img:
+        save_thumbnail(img, tmp_path / "thumb.png", (256, 256), 85)
+
+    with PILImage.open(tmp_path / "thumb.png") as thumbnail:
+        assert thumbnail.size == (256, 128)
+        assert thumbnail.mode == "RGBA"
+    assert fit_within((100, 50), (256, 256)) == (100, 50)  # 不放大小图
+
+
+def test_save_renditions_generates_all_sizes_from_one_decode(tmp_path: Path):
+    """验证多个尺寸档位在一次草稿解码中生成，不小于原图的档位被跳过
+
+    场景：
+    - 3000x2000 的 JPEG，档位 thumb/medium/large/huge，其中 huge 大于原图
+
+    期望结果：
+    - 按最大的 large 档位以 1/2 草稿模式解码
+    - thumb/medium/large 按各自尺寸保存，huge 不生成
+    """
+    source = tmp_path / "photo.jpg"
+    PILImage.new("RGB", (3000, 2000), color="red").save(source, "JPEG")
+    targets = {
+        name: (tmp_path / f"photo_{name}.jpg", size)
+        for name, size in {
+            "thumb": (256, 256),
+            "medium": (1024, 1024),
+            "large": (1400, 1400),
+            "huge": (4000, 4000),
+        }.items()
+    }
+
+    with PILImage.open(source) as img:
+        written = save_renditions(img, targets, 85)
+        decoded_size = img.size
+
+    assert decoded_size == (1500, 1000)
+    assert written == {
+        "large": (1400, 933),
+        "medium": (1024, 683),
+        "thumb": (256, 171),
+    }
+    for name, expected_size in written.items():
+        with PILImage.open(tmp_path / f"photo_{name}.jpg") as rendition:
+            assert rendition.size == expected_size
+    assert not (tmp_path / "photo_huge.jpg").exists()
+
+
+def test_save_renditions_always_writes_thumbnail_for_small_images(tmp_path: Path):
+    """原图小于所有档位时只生成缩略图 (保持原尺寸)"""
+    source = tmp_path / "icon.png"
+    PILImage.new("RGB", (100, 80)).save(source, "PNG")
+    targets = {
+        "thumb": (tmp_path / "icon_thumb.png", (256, 256)),
+        "medium": (tmp_path / "icon_medium.png", (1024, 1024)),
+    }
+
+    with PILImage.open(source) as img:
+        written = save_renditions(img, targets, 85)
+
+    assert written == {"thumb": (100, 80)}
+    assert not (tmp_path / "icon_medium.png").exists()
+
+
+@pytest.mark.asyncio
+async def test_process_engine_renders_thumbnail_and_returns_exif(tmp_path: Path):
+    """验证进程池模式下生成缩略图，并把 EXIF 数据段和解码耗时传回主进程"""
+    source = make_jpeg_with_exif(tmp_path / "photo.jpg")
+    thumbnail_path = tmp_path / "thumbs" / "photo_thumb.jpg"
+    engine = ThumbnailEngine(max_workers=1, mode="process")
+    try:
+        result = await engine.render(source, thumbnail_path, (64, 64))
+    finally:
+        engine.shutdown()
+
+    assert result.thumbnail_written
+    with PILImage.open(thumbnail_path) as thumbnail:
+        assert max(thumbnail.size) == 64
+    assert result.exif_segment and b"TestMake" in result.exif_segment
+    assert engine.metrics.completed == 1
+    assert engine.metrics.total_decode_seconds == result.decode_seconds > 0
+
+
+@pytest.mark.asyncio
+async def test_engine_bounds_concurrency_and_reports_queue_depth(
+    tmp_path: Path, monkeypatch
+):
+    """验证同时进行的解码数量不超过上限，超出的任务排队并计入队列深度
+
+    场景：
+    - 并发上限为 2，同时提交 5 个任务，工作函数在放行前阻塞
+
+    期望结果：
+    - 任一时刻最多 2 个任务在执行，其余 3 个在排队
+    - 全部完成后队列清空，完成数为 5
+    """
+    release = threading.Event()
+    running = []
+    max_running = 0
+    lock = threading.Lock()
+    original_render = thumbnail_engine_module.render_thumbnail
+
+    def blocking_render(*args):
+        nonlocal max_running
+        with lock:
+            running.append(1)
+            max_running = max(max_running, len(running))
+        release.wait(timeout=5)
+        with lock:
+            running.pop()
+        return original_render(*args)
+
+    monkeypatch.setattr(thumbnail_engine_module, "render_thumbnail", blocking_render)
+    source = make_jpeg_with_exif(tmp_path / "photo.jpg")
+    engine = ThumbnailEngine(max_workers=2, mode="thread")
+
+    tasks = [
+        asyncio.create_task(engine.render(source, tmp_path / f"thumb_{i}.jpg"))
+        for i in range(5)
+    ]
+    while engine.metrics.in_flight < 2 or engine.metrics.queue_depth < 3:
+        await asyncio.sleep(0.01)
+    assert engine.metrics.queue_depth == 3
+
+    release.set()
+    await asyncio.gather(*tasks)
+    engine.shutdown()
+
+    assert max_running == 2
+    snapshot = engine.metrics.snapshot()
+    assert snapshot["queue_depth"] == 0
+    assert snapshot["in_flight"] == 0
+    assert snapshot["max_queue_depth"] == 3
+    assert snapshot["completed"] == 5
+    assert snapshot["avg_decode_seconds"] > 0
+
+
+@pytest.mark.asyncio
+async def test_engine_counts_failures_for_unreadable_images(tmp_path: Path):
+    """无法识别的原图抛出异常由调用方处理，并计入失败数"""
+    source = tmp_path / "broken.jpg"
+    source.write_bytes(b"not an image")
+    engine = ThumbnailEngine(max_workers=1, mode="thread")
+
+    with pytest.raises(OSError):
+        await engine.render(source, tmp_path / "broken_thumb.jpg")
+    engine.shutdown()
+
+    assert engine.metrics.failed == 1
+    assert engine.metrics.completed == 0
+
+
+def test_save_renditions_writes_alternate_formats(tmp_path: Path):
+    """验证每个尺寸档位在原格式之外再写出 WebP 版本，文件名只替换扩展名"""
+    source = tmp_path / "photo.jpg"
+    PILImage.new("RGB", (2000, 1500), color="green").save(source, "JPEG")
+    targets = {
+        "thumb": (tmp_path / "photo_thumb.jpg", (256, 256)),
+        "medium": (tmp_path / "photo_medium.jpg", (1024, 1024)),
+    }
+
+    with PILImage.open(source) as img:
+        written = save_renditions(img, targets, 85, alternate_formats=("webp",))
+
+    assert set(written) == {"thumb", "medium"}
+    for name, expected_size in written.items():
+        assert alternate_format_paths(tmp_path / f"photo_{name}.jpg") == [
+            tmp_path / f"photo_{name}.avif",
+            tmp_path / f"photo_{name}.webp",
+        ]
+        with PILImage.open(tmp_path / f"photo_{name}.webp") as rendition:
+            assert rendition.format == "WEBP"
+            assert rendition.size == expected_size
+        assert not (tmp_path / f"photo_{name}.avif").exists()
@@ -0,0 +1,116 @@
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from app.compression import CompressedBodyCache, CompressionMiddleware, choose_encoding
+
+LARGE_PAYLOAD = [{"id": index, "title": f"image {index}"} for index in range(200)]
+
+
+@pytest.fixture
+def cache() -> CompressedBodyCache:
+    return CompressedBodyCache(max_bytes=1024 * 1024)
+
+
+@pytest.fixture
+def compressed_app(cache: CompressedBodyCache) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/large")
+    def large():
+        return JSONResponse(LARGE_PAYLOAD, headers={"ETag": '"v1"'})
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/image")
+    def image():
+        return Response(b"\x89PNG" + b"\x00" * 4096, media_type="image/png")
+
+    @app.get("/uploaded_images/data.json")
+    def excluded():
+        return JSONResponse(LARGE_PAYLOAD)
+
+    @app.get("/stream")
+    def stream():
+        lines = (json.dumps(item) + "\n" for item in LARGE_PAYLOAD)
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=500,
+        excluded_paths=["/uploaded_images"],
+        cache=cache,
+    )
+    return app
+
+
+async def get(app: FastAPI, path: str, accept_encoding: str = "gzip") -> httpx.Response:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path, headers={"Accept-Encoding": accept_encoding})
+
+
+@pytest.mark.asyncio
+async def test_large_json_is_gzipped_and_cached(compressed_app, cache):
+    """超过阈值的 JSON 被压缩；相同的响应体第二次直接使用缓存的压缩结果"""
+    first = await get(compressed_app, "/large")
+    assert first.headers["content-encoding"] == "gzip"
+    assert int(first.headers["content-length"]) < len(json.dumps(LARGE_PAYLOAD)) / 3
+    assert first.headers["vary"] == "Accept-Encoding"
+    assert first.headers["etag"] == 'W/"v1"'
+    assert first.json() == LARGE_PAYLOAD
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    second = await get(compressed_app, "/large")
+    assert second.json() == LARGE_PAYLOAD
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "path, accept_encoding",
+    [
+        ("/small", "gzip"),
+        ("/image", "gzip"),
+        ("/uploaded_images/data.json", "gzip"),
+        ("/large", "identity"),
+        ("/large", "gzip;q=0"),
+    ],
+)
+async def test_responses_left_uncompressed(compressed_app, path, accept_encoding):
+    """小响应、图片、排除的挂载点以及不接受 gzip 的客户端都原样返回"""
+    response = await get(compressed_app, path, accept_encoding)
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert int(response.headers["content-length"]) == len(response.content)
+
+
+@pytest.mark.asyncio
+async def test_streaming_response_is_compressed_incrementally(compressed_app, cache):
+    response = await get(compressed_app, "/stream")
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert [json.loads(line) for line in response.text.splitlines()] == LARGE_PAYLOAD
+    assert cache.misses == 0  # 流式响应不经过缓存
+
+
+def test_choose_encoding_prefers_explicitly_accepted():
+    assert choose_encoding("deflate, gzip;q=0.5") == "gzip"
+    assert choose_encoding("*") is None
+    assert choose_encoding("") is None
+
+
+def test_cache_evicts_least_recently_used():
+    cache = CompressedBodyCache(max_bytes=10)
+    cache.put((b"a", "gzip"), b"12345")
+    cache.put((b"b", "gzip"), b"12345")
+    cache.get((b"a", "gzip"))
+    cache.put((b"c", "gzip"), b"12345")
+    assert cache.get((b"b", "gzip")) is None
+    assert cache.get((b"a", "gzip")) == b"12345"
+    assert cache.size == 10
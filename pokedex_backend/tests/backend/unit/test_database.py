@@ -0,0 +1,34 @@
+from pathlib import Path
+
+from sqlmodel import create_engine
+
+from app.core.config import settings
+from app.database import configure_sqlite_engine
+
+
+def read_pragma(engine, name: str):
+    with engine.connect() as connection:
+        return connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def test_sqlite_pragmas_applied_on_every_connection(tmp_path: Path, monkeypatch):
+    """验证 connect 事件为每个新连接设置 Settings 中的 PRAGMA
+
+    场景：
+    - 将 synchronous 配置为 FULL，为文件数据库引擎注册 connect 事件
+    - 释放连接池后重新连接
+
+    期望结果：
+    - 数据库进入 WAL 模式，新连接上的 synchronous、busy_timeout 等与配置一致
+    """
+    monkeypatch.setattr(settings, "sqlite_synchronous", "FULL")
+    engine = create_engine(f"sqlite:///{tmp_path / 'pragmas.db'}")
+    configure_sqlite_engine(engine)
+
+    assert read_pragma(engine, "journal_mode") == "wal"
+    engine.dispose()
+    assert read_pragma(engine, "synchronous") == 2  # FULL
+    assert read_pragma(engine, "busy_timeout") == settings.sqlite_busy_timeout
+    assert read_pragma(engine, "cache_size") == settings.sqlite_cache_size
+    assert read_pragma(engine, "temp_store") == 2  # MEMORY
+    engine.dispose()
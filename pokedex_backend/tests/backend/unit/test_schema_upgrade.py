@@ -0,0 +1,169 @@
+from pathlib import Path
+import uuid
+
+import pytest
+from sqlalchemy import inspect
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.database import create_db_and_tables
+from app.models import Image, Tag
+
+# 新增列之前的表结构 (与旧版本 create_all 生成的结构相同)
+CATEGORY_ID = uuid.UUID(int=1)
+IMAGE_A, IMAGE_B = uuid.UUID(int=0xA), uuid.UUID(int=0xB)
+BIRD, BIRD_LOWER, FISH = uuid.UUID(int=0x10), uuid.UUID(int=0x11), uuid.UUID(int=0x12)
+UPLOAD = uuid.UUID(int=0x20)
+
+LEGACY_SCHEMA = """
+CREATE TABLE category (
+    name VARCHAR(50) NOT NULL, description VARCHAR(300), id CHAR(32) NOT NULL,
+    thumbnail_path VARCHAR, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL,
+    PRIMARY KEY (id)
+);
+CREATE UNIQUE INDEX ix_category_name ON category (name);
+CREATE TABLE image (
+    title VARCHAR(255), original_filename VARCHAR, stored_filename VARCHAR,
+    relative_file_path VARCHAR, relative_thumbnail_path VARCHAR, mime_type VARCHAR,
+    size_bytes INTEGER, description VARCHAR(500), id CHAR(32) NOT NULL,
+    created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL, file_metadata JSON,
+    exif_info JSON, category_id CHAR(32) NOT NULL, PRIMARY KEY (id),
+    FOREIGN KEY(category_id) REFERENCES category (id)
+);
+CREATE UNIQUE INDEX ix_image_stored_filename ON image (stored_filename);
+CREATE TABLE tag (
+    name VARCHAR(100) NOT NULL, id CHAR(32) NOT NULL,
+    created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL, PRIMARY KEY (id)
+);
+CREATE UNIQUE INDEX ix_tag_name ON tag (name);
+CREATE TABLE imagetaglink (
+    image_id CHAR(32) NOT NULL, tag_id CHAR(32) NOT NULL, PRIMARY KEY (image_id, tag_id),
+    FOREIGN KEY(image_id) REFERENCES image (id), FOREIGN KEY(tag_id) REFERENCES tag (id)
+);
+CREATE TABLE uploadsession (
+    category_id CHAR(32) NOT NULL, filename VARCHAR(255) NOT NULL, size_bytes INTEGER NOT NULL,
+    title VARCHAR(255), description VARCHAR(500), tags VARCHAR,
+    set_as_category_thumbnail BOOLEAN NOT NULL, id CHAR(32) NOT NULL, chunk_size INTEGER NOT NULL,
+    received_chunks JSON, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL,
+    PRIMARY KEY (id), FOREIGN KEY(category_id) REFERENCES category (id)
+);
+INSERT INTO category VALUES ('鸟类', NULL, '{category}', NULL, '2025-01-01', '2025-01-01');
+INSERT INTO image (stored_filename, relative_file_path, id, created_at, updated_at, category_id)
+VALUES ('a.jpg', '2025/01/a.jpg', '{image_a}', '2025-01-01', '2025-01-01', '{category}'),
+       ('b.jpg', '2025/01/b.jpg', '{image_b}', '2025-01-02', '2025-01-02', '{category}');
+INSERT INTO tag VALUES ('Bird', '{bird}', '2025-01-01', '2025-01-01'),
+                       ('bird ', '{bird_lower}', '2025-01-02', '2025-01-02'),
+                       ('Fish', '{fish}', '2025-01-03', '2025-01-03');
+INSERT INTO imagetaglink VALUES ('{image_a}', '{bird}'), ('{image_a}', '{bird_lower}'),
+                                ('{image_b}', '{bird_lower}'), ('{image_b}', '{fish}');
+INSERT INTO uploadsession VALUES ('{category}', 'big.jpg', 10000, NULL, NULL, NULL, 0,
+                                 '{upload}', 4096, '[2, 0, 2]', '2025-01-01', '2025-01-01');
+""".format(
+    category=CATEGORY_ID.hex,
+    image_a=IMAGE_A.hex,
+    image_b=IMAGE_B.hex,
+    bird=BIRD.hex,
+    bird_lower=BIRD_LOWER.hex,
+    fish=FISH.hex,
+    upload=UPLOAD.hex,
+)
+
+
+@pytest.fixture
+def legacy_engine(tmp_path: Path):
+    """带有旧表结构和数据的 SQLite 文件数据库"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        for statement in LEGACY_SCHEMA.split(";"):
+            if statement.strip():
+                connection.exec_driver_sql(statement)
+    yield engine
+    engine.dispose()
+
+
+def rows(engine, sql: str):
+    with engine.connect() as connection:
+        return connection.exec_driver_sql(sql).all()
+
+
+def test_existing_database_is_upgraded(legacy_engine):
+    """已有数据库启动时补齐新增的列，之后才创建依赖这些列的索引"""
+    create_db_and_tables(legacy_engine)
+
+    inspector = inspect(legacy_engine)
+    assert "content_digest" in {column["name"] for column in inspector.get_columns("image")}
+    assert "ix_image_content_digest" in {index["name"] for index in inspector.get_indexes("image")}
+    assert rows(
+        legacy_engine,
+        "SELECT id, content_digest, renditions, processing_status FROM image ORDER BY id",
+    ) == [
+        (IMAGE_A.hex, None, None, "done"),
+        (IMAGE_B.hex, None, None, "done"),
+    ]
+
+    # 模型的所有列都已存在，ORM 查询可以读取旧数据
+    with Session(legacy_engine) as session:
+        images = session.exec(select(Image).order_by(Image.created_at)).all()
+        assert [image.relative_file_path for image in images] == ["2025/01/a.jpg", "2025/01/b.jpg"]
+
+
+def test_stored_filename_is_no_longer_unique(legacy_engine):
+    """内容寻址存储模式下多条图片记录共享同一个文件名，旧的唯一索引被重建为普通索引"""
+    create_db_and_tables(legacy_engine)
+
+    indexes = {index["name"]: index for index in inspect(legacy_engine).get_indexes("image")}
+    assert indexes["ix_image_stored_filename"]["unique"] == 0
+    with legacy_engine.begin() as connection:
+        connection.exec_driver_sql("UPDATE image SET stored_filename = 'a.jpg'")
+
+
+def test_case_duplicate_tags_are_merged_before_unique_index(legacy_engine):
+    """仅大小写或首尾空白不同的旧标签合并为最早创建的一个，图片关联指向保留的标签"""
+    create_db_and_tables(legacy_engine)
+
+    assert rows(legacy_engine, "SELECT id, name, name_normalized FROM tag ORDER BY name") == [
+        (BIRD.hex, "Bird", "bird"),
+        (FISH.hex, "Fish", "fish"),
+    ]
+    assert sorted(rows(legacy_engine, "SELECT image_id, tag_id FROM imagetaglink")) == [
+        (IMAGE_A.hex, BIRD.hex),
+        (IMAGE_B.hex, BIRD.hex),
+        (IMAGE_B.hex, FISH.hex),
+    ]
+    indexes = {index["name"]: index for index in inspect(legacy_engine).get_indexes("tag")}
+    assert indexes["ix_tag_name_normalized"]["unique"] == 1
+
+
+def test_tag_usage_counts_are_backfilled(legacy_engine):
+    create_db_and_tables(legacy_engine)
+
+    with Session(legacy_engine) as session:
+        tags = session.exec(select(Tag).order_by(Tag.name)).all()
+        assert [(tag.name, tag.usage_count) for tag in tags] == [("Bird", 2), ("Fish", 1)]
+
+
+def test_received_chunks_move_to_chunk_table(legacy_engine):
+    """未完成的分块上传会话的块号从 JSON 列移到每块一行的 uploadchunk 表"""
+    create_db_and_tables(legacy_engine)
+    create_db_and_tables(legacy_engine)
+
+    assert rows(legacy_engine, "SELECT upload_id, chunk_index FROM uploadchunk ORDER BY chunk_index") == [
+        (UPLOAD.hex, 0),
+        (UPLOAD.hex, 2),
+    ]
+    assert rows(legacy_engine, "SELECT received_chunks FROM uploadsession") == [(None,)]
+
+
+def test_upgraded_schema_matches_models(legacy_engine):
+    """升级后每张表都包含模型中的所有列"""
+    create_db_and_tables(legacy_engine)
+
+    inspector = inspect(legacy_engine)
+    for table in SQLModel.metadata.sorted_tables:
+        database_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        assert set(table.columns.keys()) <= database_columns, table.name
+
+
+def test_upgrade_is_idempotent(legacy_engine):
+    create_db_and_tables(legacy_engine)
+    create_db_and_tables(legacy_engine)
+    assert rows(legacy_engine, "SELECT count(*) FROM image") == [(2,)]
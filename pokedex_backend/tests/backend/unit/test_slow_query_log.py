@@ -0,0 +1,64 @@
+import json
+import logging
+
+from sqlalchemy import text
+from sqlmodel import create_engine
+
+from app.slow_query_log import SlowQueryLog, fingerprint_statement
+
+
+def test_fingerprint_collapses_literals_and_in_lists():
+    """字面量和不同长度的 IN 参数列表得到相同的指纹"""
+    assert fingerprint_statement(
+        "SELECT * FROM image\n  WHERE id IN (?, ?, ?) AND title = 'a''b' LIMIT 50"
+    ) == fingerprint_statement("SELECT * FROM image WHERE id IN (?, ?) AND title = 'x' LIMIT 10")
+    assert fingerprint_statement("SELECT * FROM image WHERE id IN (?, ?)") == (
+        "SELECT * FROM image WHERE id IN (...)"
+    )
+
+
+def test_only_statements_above_threshold_are_logged(caplog):
+    """验证挂到引擎上后，只有超过阈值的语句输出 JSON 日志，统计中保留最慢的语句
+
+    场景：
+    - 阈值设为 0 和一个极大值，分别在内存数据库上执行同一条语句
+
+    期望结果：
+    - 阈值为 0 时输出包含指纹、耗时和行数的 JSON；阈值很大时不输出日志
+    - 两种情况下语句都进入统计
+    """
+    for threshold_ms, expect_log in ((0.0, True), (1e9, False)):
+        engine = create_engine("sqlite://")
+        query_log = SlowQueryLog(threshold_ms=threshold_ms, top_n=5)
+        query_log.attach(engine)
+        caplog.clear()
+        with caplog.at_level(logging.WARNING, logger="app.slow_query"):
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1 WHERE 2 > 1"))
+
+        records = [json.loads(r.getMessage()) for r in caplog.records]
+        fingerprints = [r["fingerprint"] for r in records]
+        assert ("SELECT ? WHERE ? > ?" in fingerprints) is expect_log
+        if expect_log:
+            record = records[fingerprints.index("SELECT ? WHERE ? > ?")]
+            assert record["event"] == "slow_query" and record["duration_ms"] >= 0
+            assert "row_count" in record
+        assert "SELECT ? WHERE ? > ?" in [s.fingerprint for s in query_log.top()]
+        engine.dispose()
+
+
+def test_top_n_keeps_slowest_fingerprints():
+    """记录已满时较快的语句被挤出，同一指纹的多次执行合并统计"""
+    query_log = SlowQueryLog(threshold_ms=1e9, top_n=2)
+    query_log.record("SELECT a", 5.0)
+    query_log.record("SELECT b", 1.0)
+    query_log.record("SELECT c", 3.0)  # 挤出 b
+    query_log.record("SELECT b", 0.5)  # 比当前最快的还快，直接跳过
+    query_log.record("SELECT a", 7.0, row_count=3)
+
+    top = query_log.top()
+    assert [s.fingerprint for s in top] == ["SELECT a", "SELECT c"]
+    assert (top[0].count, top[0].max_ms, top[0].avg_ms) == (2, 7.0, 6.0)
+    assert top[0].last_row_count == 3
+    query_log.reset()
+    assert query_log.top() == []
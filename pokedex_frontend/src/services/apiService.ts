@@ -201,10 +201,10 @@ export const uploadImage = async (imageFile: File, metadata: ImageCreateMetadata
 };
 
 /**
- * 检索图片列表。支持分页和过滤。
- * 对应: GET /api/categories/{category_id}/ 然后提取图片
- * @param skip - 要跳过的记录数（注意：由于使用类别API，此参数可能不生效，分页需在前端处理）。
- * @param limit - 要返回的最大记录数（注意：由于使用类别API，此参数可能不生效，分页需在前端处理）。
+ * 检索类别下的图片列表。支持分页。
+ * 对应: GET /api/categories/{category_id}/images/
+ * @param skip - 要跳过的记录数。
+ * @param limit - 要返回的最大记录数。
  * @param categoryId - 必需的类别 ID (UUID字符串)。
  * @returns 一个解析为图片数据数组的 Promise。
  */
@@ -220,25 +220,12 @@ export const getImages = async (
   }
 
   try {
-    // 通过分类ID获取图片，使用/api/categories/{categoryId}/端点
-    // 该端点返回类别及其包含的所有图片
-    const response = await apiClient.get(`/categories/${categoryId}/`);
-    
-    // 从response.data.images中提取图片列表
-    if (response.data && Array.isArray(response.data.images)) {
-      // 提取图片数组，可以在这里进行前端分页
-      let images = response.data.images as ImageRead[];
-      
-      // 如果需要，前端分页处理
-      if (skip > 0 || limit < images.length) {
-        images = images.slice(skip, skip + limit);
-      }
-      
-      return images;
-    }
-    
-    // 如果response.data.images不是数组或不存在，返回空数组
-    return [];
+    // GET /api/categories/{categoryId}/ 只返回第一页图片，分页获取使用 images 子资源
+    const response: AxiosResponse<ImageRead[]> = await apiClient.get(
+      `/categories/${categoryId}/images/`,
+      { params: { skip, limit } }
+    );
+    return response.data;
   } catch (error) {
     handleApiError(error as AxiosError);
     throw error;
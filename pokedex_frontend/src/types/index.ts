@@ -110,8 +110,21 @@ export interface ImageRead {
   updated_at: string | null;         // 最后更新时间戳 (openapi: string | null)
   file_metadata?: object | null;      // (openapi: object | null)
   exif_info?: ExifData | null;       // 新增：结构化的EXIF信息
+  processing_status: 'pending' | 'processing' | 'done' | 'failed'; // 缩略图和EXIF的后台处理状态，上传刚返回时为 pending
   image_url: string;                 // 查看完整图片的 URL (openapi: image_url, required)
   thumbnail_url: string | null;        // 缩略图的 URL (openapi: thumbnail_url, required, nullable)
+  renditions?: Record<string, ImageRendition> | null; // 响应式图片的尺寸档位 (thumb/medium/large)
+  rendition_urls: Record<string, string>; // 各尺寸档位的 URL
+  srcset: string | null;              // 可直接用于 <img srcset> 的字符串，无尺寸档位时为 null
+}
+
+/**
+ * 响应式图片的一个尺寸档位
+ */
+export interface ImageRendition {
+  path: string;   // 相对于缩略图存储根目录的路径
+  width: number;
+  height: number;
 }
 
 /**
@@ -4,18 +4,56 @@ API客户端模块，提供与后端API交互的功能。
 """
 
 import os
+import json
 import logging
+import time
+import uuid
 import requests
-from typing import Dict, Any, List, Optional, Union
+from typing import Callable, Dict, Any, Iterator, List, Optional, Union
 from urllib.parse import urljoin
 import mimetypes
 
-from .config import MAX_RETRIES
+from .config import (
+    MAX_RETRIES,
+    RESUMABLE_UPLOAD_THRESHOLD,
+    RETRY_BACKOFF_SECONDS,
+    RETRYABLE_STATUS_CODES,
+    STREAM_BATCH_SIZE,
+)
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
 
+def is_retryable(error: requests.RequestException) -> bool:
+    """
+    判断请求错误是否值得重试：连接失败、超时，以及 429 和 5xx 响应。
+
+    参数:
+        error (requests.RequestException): 请求抛出的异常
+
+    返回:
+        bool: 是否应重试
+    """
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+
+def retry_delay(attempt: int, error: requests.RequestException) -> float:
+    """
+    第 attempt 次 (从0开始) 失败后重试前的等待秒数：优先使用响应的 Retry-After，否则指数退避。
+    """
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return float(retry_after)
+    return RETRY_BACKOFF_SECONDS * 2**attempt
+
+
 class APIClient:
     """
     API客户端类，封装与后端API的所有交互。
@@ -36,6 +74,41 @@ class APIClient:
             }
         )
 
+    def _send_with_retry(
+        self, action: str, send: Callable[[], requests.Response]
+    ) -> requests.Response:
+        """
+        发送请求，遇到可重试的错误 (见 is_retryable) 时退避后重试，最多 MAX_RETRIES 次。
+
+        send 每次调用都应重新构造请求 (例如重新打开文件)，上一次失败的请求可能已读完文件。
+        请求可能在服务端已经生效而响应丢失，只有幂等的请求 (或带上传幂等键的上传) 才能使用本方法。
+
+        参数:
+            action (str): 日志中的操作描述
+            send (Callable[[], requests.Response]): 发送一次请求
+
+        返回:
+            requests.Response: 成功的响应
+
+        异常:
+            requests.RequestException: 不可重试的错误，或重试用尽后的最后一个错误
+        """
+        for attempt in range(MAX_RETRIES):
+            try:
+                response = send()
+                response.raise_for_status()
+                return response
+            except requests.RequestException as e:
+                if attempt < MAX_RETRIES - 1 and is_retryable(e):
+                    delay = retry_delay(attempt, e)
+                    logger.warning(
+                        f"{action}失败，{delay:.1f} 秒后重试 ({attempt+1}/{MAX_RETRIES}): {e}"
+                    )
+                    time.sleep(delay)
+                    continue
+                logger.error(f"{action}失败: {e}")
+                raise
+
     def create_category(
         self, name: str, description: Optional[str] = None
     ) -> Dict[str, Any]:
@@ -86,17 +159,29 @@ class APIClient:
             Dict[str, Any]: 上传的图片信息
 
         异常:
-            requests.HTTPError: 请求失败时抛出
+            requests.RequestException: 请求失败 (或可重试的错误重试用尽) 时抛出
             FileNotFoundError: 图片文件不存在时抛出
         """
         if not os.path.exists(image_path):
             raise FileNotFoundError(f"图片文件不存在: {image_path}")
 
+        # 大文件使用分块上传，失败时只重传缺失的块
+        if os.path.getsize(image_path) > RESUMABLE_UPLOAD_THRESHOLD:
+            return self.upload_image_resumable(
+                image_path=image_path,
+                category_id=category_id,
+                title=title,
+                description=description,
+                tags=tags,
+                set_as_thumbnail=set_as_thumbnail,
+            )
+
         url = f"{self.base_url}/api/images/upload/"
 
-        # 准备表单数据
+        # 准备表单数据 (幂等键保证重试不会重复创建图片：上次请求已生效时服务端直接返回已创建的图片)
         data = {
             "category_id": category_id,
+            "upload_key": uuid.uuid4().hex,
         }
         if set_as_thumbnail:
             data["set_as_category_thumbnail"] = "true"
@@ -119,23 +204,168 @@ class APIClient:
         
         logger.info(f"为文件 '{filename}' 设置 Content-Type 为: {content_type}")
 
+        def send() -> requests.Response:
+            with open(image_path, "rb") as f:
+                # 使用原始 filename 进行上传
+                files = {"file": (filename, f, content_type)}
+                return self.session.post(url, data=data, files=files)
+
+        return self._send_with_retry(f"上传 {filename} ", send).json()
+
+    def upload_image_resumable(
+        self,
+        image_path: str,
+        category_id: str,
+        title: Optional[str] = None,
+        description: Optional[str] = None,
+        tags: Optional[str] = None,
+        set_as_thumbnail: bool = False,
+        upload_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        使用可续传的分块上传协议上传图片。
+
+        先创建上传会话 (或通过 upload_id 继续之前的会话)，再逐块 PUT 会话中缺失的块，
+        最后完成上传。单个块失败时只重试该块；所有重试用尽后抛出异常，
+        会话保留在服务端，可以用异常中的 upload_id 再次调用本方法续传。
+
+        参数:
+            image_path (str): 图片文件路径
+            category_id (str): 目标类别ID
+            title (Optional[str]): 图片标题
+            description (Optional[str]): 图片描述
+            tags (Optional[str]): 图片标签（逗号分隔）
+            set_as_thumbnail (bool): 是否设置为类别缩略图
+            upload_id (Optional[str]): 要继续的上传会话ID
+
+        返回:
+            Dict[str, Any]: 上传的图片信息
+
+        异常:
+            requests.RequestException: 某个块或完成请求在重试后仍失败时抛出
+            FileNotFoundError: 图片文件不存在时抛出
+        """
+        if not os.path.exists(image_path):
+            raise FileNotFoundError(f"图片文件不存在: {image_path}")
+
+        uploads_url = f"{self.base_url}/api/images/uploads/"
+        filename = os.path.basename(image_path)
+
+        if upload_id:
+            response = self.session.get(f"{uploads_url}{upload_id}/")
+        else:
+            response = self.session.post(
+                uploads_url,
+                json={
+                    "category_id": category_id,
+                    "filename": filename,
+                    "size_bytes": os.path.getsize(image_path),
+                    "title": title,
+                    "description": description,
+                    "tags": tags,
+                    "set_as_category_thumbnail": set_as_thumbnail,
+                },
+            )
+        response.raise_for_status()
+        upload = response.json()
+        upload_id = upload["id"]
+        chunk_size = upload["chunk_size"]
+        logger.debug(
+            f"分块上传 {filename}: 会话 {upload_id}，"
+            f"缺失 {len(upload['missing_chunks'])}/{upload['chunk_count']} 块"
+        )
+
         with open(image_path, "rb") as f:
-            # 使用原始 filename 进行上传
-            files = {"file": (filename, f, content_type)}
-            for attempt in range(MAX_RETRIES):
+            for chunk_index in upload["missing_chunks"]:
+                f.seek(chunk_index * chunk_size)
+                chunk = f.read(chunk_size)
+                # 同一块重复写入是幂等的
                 try:
-                    response = self.session.post(url, data=data, files=files)
-                    response.raise_for_status()
-                    return response.json()
-                except requests.HTTPError as e:
-                    if attempt < MAX_RETRIES - 1:
-                        logger.warning(
-                            f"上传失败，重试中 ({attempt+1}/{MAX_RETRIES}): {e}"
-                        )
-                        continue
-                    logger.error(f"上传失败: {e}")
+                    self._send_with_retry(
+                        f"数据块 {chunk_index} 上传",
+                        lambda: self.session.put(
+                            f"{uploads_url}{upload_id}/chunks/{chunk_index}",
+                            data=chunk,
+                            headers={"Content-Type": "application/octet-stream"},
+                        ),
+                    )
+                except requests.RequestException:
+                    logger.error(f"分块上传失败，可使用 upload_id={upload_id} 续传")
                     raise
 
+        response = self.session.post(f"{uploads_url}{upload_id}/complete/")
+        response.raise_for_status()
+        return response.json()
+
+    def upload_images(
+        self,
+        image_paths: List[str],
+        category_id: str,
+        titles: Optional[List[str]] = None,
+        tags: Optional[str] = None,
+        set_as_thumbnail: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        在一个请求中批量上传多张图片到指定类别。
+
+        参数:
+            image_paths (List[str]): 图片文件路径列表
+            category_id (str): 目标类别ID
+            titles (Optional[List[str]]): 与 image_paths 一一对应的标题
+            tags (Optional[str]): 所有图片共用的标签（逗号分隔）
+            set_as_thumbnail (bool): 是否将第一张图片设置为类别缩略图
+
+        返回:
+            Dict[str, Any]: 批量上传结果 (uploaded、failed 及按文件顺序排列的 results)
+
+        异常:
+            requests.RequestException: 请求失败 (或可重试的错误重试用尽) 时抛出
+            FileNotFoundError: 图片文件不存在时抛出
+        """
+        for image_path in image_paths:
+            if not os.path.exists(image_path):
+                raise FileNotFoundError(f"图片文件不存在: {image_path}")
+
+        url = f"{self.base_url}/api/images/batch-upload/"
+
+        # 准备表单数据 (titles、upload_keys 作为重复字段按文件顺序发送)；
+        # 每个文件的幂等键在所有重试中保持不变，上次请求已生效时服务端返回已创建的图片而不是重复创建
+        data: Dict[str, Any] = {
+            "category_id": category_id,
+            "upload_keys": [uuid.uuid4().hex for _ in image_paths],
+        }
+        if titles:
+            data["titles"] = titles
+        if tags:
+            data["tags"] = tags
+        if set_as_thumbnail:
+            data["set_as_category_thumbnail"] = "true"
+
+        logger.debug(f"批量上传 {len(image_paths)} 张图片到类别ID: {category_id}")
+
+        def send() -> requests.Response:
+            handles = [open(image_path, "rb") for image_path in image_paths]
+            try:
+                files = []
+                for image_path, handle in zip(image_paths, handles):
+                    content_type, _ = mimetypes.guess_type(image_path)
+                    files.append(
+                        (
+                            "files",
+                            (
+                                os.path.basename(image_path),
+                                handle,
+                                content_type or "application/octet-stream",
+                            ),
+                        )
+                    )
+                return self.session.post(url, data=data, files=files)
+            finally:
+                for handle in handles:
+                    handle.close()
+
+        return self._send_with_retry("批量上传", send).json()
+
     def get_categories(self, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
         """
         获取所有分类列表。
@@ -158,12 +388,15 @@ class APIClient:
         response.raise_for_status()
         return response.json()
 
-    def get_category_with_images(self, category_id: str) -> Dict[str, Any]:
+    def get_category_with_images(
+        self, category_id: str, images_limit: int = 50
+    ) -> Dict[str, Any]:
         """
-        获取特定分类及其包含的所有图片。
+        获取特定分类及其第一页图片 (最多 images_limit 张)。需要全部图片时使用 iter_category_images。
 
         参数:
             category_id (str): 分类ID
+            images_limit (int): 返回的最大图片数
 
         返回:
             Dict[str, Any]: 分类及其图片信息
@@ -172,12 +405,39 @@ class APIClient:
             requests.HTTPError: 请求失败时抛出
         """
         url = f"{self.base_url}/api/categories/{category_id}/"
+        params = {"images_limit": images_limit}
 
         logger.debug(f"获取分类及图片: category_id={category_id}")
-        response = self.session.get(url)
+        response = self.session.get(url, params=params)
         response.raise_for_status()
         return response.json()
 
+    def iter_category_images(
+        self, category_id: str, batch_size: int = STREAM_BATCH_SIZE
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        以 NDJSON 流的形式逐张获取分类下的全部图片，边接收边返回，不需要一次性加载整个列表。
+
+        参数:
+            category_id (str): 分类ID
+            batch_size (int): 服务端每次查询读取的图片数
+
+        返回:
+            Iterator[Dict[str, Any]]: 图片信息的迭代器
+
+        异常:
+            requests.HTTPError: 请求失败时抛出
+        """
+        url = f"{self.base_url}/api/categories/{category_id}/images/stream/"
+        params = {"batch_size": batch_size}
+
+        logger.debug(f"流式获取分类图片: category_id={category_id}")
+        with self.session.get(url, params=params, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
     def download_file(self, url: str, output_path: str) -> None:
         """
         下载文件到指定路径。
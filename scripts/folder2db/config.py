@@ -12,9 +12,26 @@ SUPPORTED_FORMATS = [".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp"]
 # 上传错误重试次数
 MAX_RETRIES = 3
 
+# 只重试可能是暂时性的错误：连接失败、超时，以及以下 HTTP 状态码 (请求过多、服务端错误)；
+# 其他 4xx 错误重试也不会成功
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# 重试的退避间隔 (秒)：第 n 次重试前等待 RETRY_BACKOFF_SECONDS * 2**(n-1)，
+# 429/503 响应带 Retry-After 时按其等待
+RETRY_BACKOFF_SECONDS = 1.0
+
+# 超过此大小的图片使用可续传的分块上传 (网络中断后只补传缺失的块，而不是重新上传整个文件)
+RESUMABLE_UPLOAD_THRESHOLD = 8 * 1024 * 1024
+
+# 批量上传时每个请求包含的图片数量 (不超过后端的 batch_upload_max_files)
+BATCH_UPLOAD_SIZE = 20
+
 # 默认分页参数
 DEFAULT_SKIP = 0
 DEFAULT_LIMIT = 100
 
+# 流式导出时服务端每次查询读取的图片数
+STREAM_BATCH_SIZE = 200
+
 # 默认下载缓冲区大小 (8KB)
 DOWNLOAD_CHUNK_SIZE = 8192
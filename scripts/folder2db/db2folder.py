@@ -96,45 +96,45 @@ def process_category(
     category_dir = os.path.join(output_dir, category_name)
     ensure_dir(category_dir)
 
-    # 获取该分类下的所有图片
+    # 以 NDJSON 流逐张获取该分类下的图片，边接收边下载，大分类也不需要一次性加载整个列表
+    success_count = 0
+    total_count = 0
     try:
-        category_with_images = client.get_category_with_images(category_id)
-        images = category_with_images.get("images", [])
-        logger.info(f"分类 '{category_name}' 下有 {len(images)} 张图片")
+        images_pbar = tqdm(
+            client.iter_category_images(category_id),
+            desc=f"下载 {category_name} 图片",
+            unit="张",
+            leave=False,
+        )
+        for image in images_pbar:
+            total_count += 1
+            # 获取图片URL
+            image_url = image["image_url"]
+
+            # 使用原始文件名或根据标题/ID生成文件名
+            if image.get("original_filename"):
+                filename = image["original_filename"]
+            elif image.get("title"):
+                # 添加适当的扩展名
+                filename = f"{image['title']}.jpg"
+            else:
+                filename = f"{image['id']}.jpg"
+
+            # 确保文件名安全
+            filename = sanitize_filename(filename)
+            output_path = os.path.join(category_dir, filename)
+
+            images_pbar.set_description(f"下载: {filename}")
+
+            # 下载图片
+            if download_image(client, image_url, output_path, skip_existing):
+                success_count += 1
     except Exception as e:
         logger.error(f"获取分类 '{category_name}' 的图片列表失败: {e}")
-        return 0, 0
-
-    success_count = 0
+        return success_count, total_count
 
-    # 处理每张图片
-    images_pbar = tqdm(
-        images, desc=f"下载 {category_name} 图片", unit="张", leave=False
-    )
-    for image in images_pbar:
-        # 获取图片URL
-        image_url = image["image_url"]
-
-        # 使用原始文件名或根据标题/ID生成文件名
-        if image.get("original_filename"):
-            filename = image["original_filename"]
-        elif image.get("title"):
-            # 添加适当的扩展名
-            filename = f"{image['title']}.jpg"
-        else:
-            filename = f"{image['id']}.jpg"
-
-        # 确保文件名安全
-        filename = sanitize_filename(filename)
-        output_path = os.path.join(category_dir, filename)
-
-        images_pbar.set_description(f"下载: {filename}")
-
-        # 下载图片
-        if download_image(client, image_url, output_path, skip_existing):
-            success_count += 1
-
-    return success_count, len(images)
+    logger.info(f"分类 '{category_name}' 下有 {total_count} 张图片")
+    return success_count, total_count
 
 
 def main():
@@ -15,7 +15,7 @@ from tqdm import tqdm
 
 from .api_client import APIClient
 from .file_utils import scan_folders, get_image_files
-from .config import DEFAULT_API_URL
+from .config import DEFAULT_API_URL, BATCH_UPLOAD_SIZE, RESUMABLE_UPLOAD_THRESHOLD
 
 # 配置日志
 logging.basicConfig(
@@ -50,6 +50,12 @@ def setup_arg_parser() -> argparse.ArgumentParser:
         action="store_false",
         help="不将第一张图片设置为类别缩略图 (默认启用缩略图设置)"
     )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BATCH_UPLOAD_SIZE,
+        help=f"每个批量上传请求包含的图片数量 (默认 {BATCH_UPLOAD_SIZE}，1 表示逐张上传)",
+    )
     parser.add_argument("--verbose", "-v", action="store_true", help="显示详细日志")
     parser.add_argument("--dry-run", action="store_true", help="仅测试，不实际上传")
 
@@ -62,6 +68,7 @@ def process_category(
     category_path: str,
     set_thumbnail: bool = False,
     dry_run: bool = False,
+    batch_size: int = BATCH_UPLOAD_SIZE,
 ) -> Tuple[int, int]:
     """
     处理单个分类文件夹。
@@ -72,6 +79,7 @@ def process_category(
         category_path (str): 分类文件夹路径
         set_thumbnail (bool): 是否设置缩略图
         dry_run (bool): 是否仅测试不上传
+        batch_size (int): 每个批量上传请求包含的图片数量，1 表示逐张上传
 
     返回:
         Tuple[int, int]: 成功上传的图片数量和总图片数量
@@ -98,6 +106,14 @@ def process_category(
 
     success_count = 0
 
+    if batch_size > 1 and not dry_run:
+        return (
+            upload_category_in_batches(
+                client, category_name, category_id, images, set_thumbnail, batch_size
+            ),
+            len(images),
+        )
+
     # 处理每张图片
     images_pbar = tqdm(
         enumerate(images),
@@ -132,6 +148,74 @@ def process_category(
     return success_count, len(images)
 
 
+def upload_category_in_batches(
+    client: APIClient,
+    category_name: str,
+    category_id: str,
+    images: List[str],
+    set_thumbnail: bool,
+    batch_size: int,
+) -> int:
+    """
+    通过批量上传接口上传一个分类下的图片，每个请求包含 batch_size 张。
+
+    参数:
+        client (APIClient): API客户端实例
+        category_name (str): 分类名称
+        category_id (str): 分类ID
+        images (List[str]): 图片文件路径列表
+        set_thumbnail (bool): 是否将第一张图片设为缩略图
+        batch_size (int): 每个请求包含的图片数量
+
+    返回:
+        int: 成功上传的图片数量
+    """
+    success_count = 0
+    images_pbar = tqdm(total=len(images), desc=f"上传 {category_name} 图片", unit="张")
+
+    # 大文件单独使用可续传的分块上传，不放进批量请求
+    large_images = [
+        path for path in images if os.path.getsize(path) > RESUMABLE_UPLOAD_THRESHOLD
+    ]
+    images = [path for path in images if path not in large_images]
+    for i, image_path in enumerate(large_images):
+        filename = os.path.basename(image_path)
+        try:
+            client.upload_image_resumable(
+                image_path=image_path,
+                category_id=category_id,
+                title=os.path.splitext(filename)[0],
+                set_as_thumbnail=set_thumbnail and i == 0,
+            )
+            success_count += 1
+        except Exception as e:
+            logger.error(f"上传图片 '{filename}' 失败: {e}")
+        images_pbar.update(1)
+    # 第一张大图已负责设置缩略图
+    set_thumbnail = set_thumbnail and not large_images
+
+    for start in range(0, len(images), batch_size):
+        batch = images[start : start + batch_size]
+        # 提取图片名作为标题
+        titles = [os.path.splitext(os.path.basename(path))[0] for path in batch]
+        try:
+            result = client.upload_images(
+                image_paths=batch,
+                category_id=category_id,
+                titles=titles,
+                set_as_thumbnail=set_thumbnail and start == 0,
+            )
+            success_count += result["uploaded"]
+            for item in result["results"]:
+                if item["error"]:
+                    logger.error(f"上传图片 '{item['filename']}' 失败: {item['error']}")
+        except Exception as e:
+            logger.error(f"批量上传 {len(batch)} 张图片失败: {e}")
+        images_pbar.update(len(batch))
+    images_pbar.close()
+    return success_count
+
+
 def main():
     """主函数"""
     # 解析命令行参数
@@ -177,6 +261,7 @@ def main():
                 category_path=category_path,
                 set_thumbnail=args.thumbnail,
                 dry_run=args.dry_run,
+                batch_size=args.batch_size,
             )
 
             # 更新统计